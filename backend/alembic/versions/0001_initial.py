@@ -0,0 +1,63 @@
+"""initial metadata tables
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+TABLE_STATUS = postgresql.ENUM("DRAFT", "CREATED", "ARCHIVED", name="tablestatus", create_type=False)
+
+
+def _timestamps():
+    return [
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False, comment="创建时间"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False, comment="最后更新时间"),
+    ]
+
+
+def upgrade() -> None:
+    # 已有库 (迁移引入前建好的表) 直接跳过, 只做版本标记
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "table_categories" not in existing:
+        op.create_table(
+            "table_categories",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("code", sa.String(), nullable=False, unique=True, comment="分类编码 (e.g., market_data)"),
+            sa.Column("name", sa.String(), nullable=False, comment="显示名称"),
+            sa.Column("description", sa.String(), nullable=True),
+            *_timestamps(),
+        )
+        op.create_index("ix_table_categories_id", "table_categories", ["id"])
+
+    if "data_table_configs" not in existing:
+        TABLE_STATUS.create(op.get_bind(), checkfirst=True)
+        op.create_table(
+            "data_table_configs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("category_id", sa.Integer(), sa.ForeignKey("table_categories.id"), nullable=False),
+            sa.Column("name", sa.String(), nullable=False, comment="显示名称"),
+            sa.Column("table_name", sa.String(), nullable=False, unique=True, comment="物理表名"),
+            sa.Column("description", sa.Text(), nullable=False, comment="详细描述"),
+            sa.Column("status", TABLE_STATUS, nullable=False),
+            sa.Column("last_published_at", sa.DateTime(), nullable=True, comment="上次成功发布(物理建表)的时间"),
+            sa.Column("columns_schema", postgresql.JSONB(), nullable=False, comment="列定义元数据"),
+            sa.Column("indexes_schema", postgresql.JSONB(), nullable=False, comment="索引定义元数据"),
+            sa.Column("partition_config", postgresql.JSONB(), nullable=True, comment="分区策略配置"),
+            *_timestamps(),
+        )
+        op.create_index("ix_data_table_configs_id", "data_table_configs", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("data_table_configs")
+    op.drop_table("table_categories")
+    TABLE_STATUS.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,34 @@
+"""pg_trgm GIN indexes for data table search
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+TRGM_COLUMNS = ("name", "table_name", "description")
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY 不能在事务中执行; 元数据表规模有限, 普通建索引即可
+    for column in TRGM_COLUMNS:
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS ix_data_table_configs_{column}_trgm "
+            f"ON data_table_configs USING gin ({column} gin_trgm_ops)"
+        )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_data_table_configs_category_id_id "
+        "ON data_table_configs (category_id, id)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_data_table_configs_category_id_id")
+    for column in TRGM_COLUMNS:
+        op.execute(f"DROP INDEX IF EXISTS ix_data_table_configs_{column}_trgm")
@@ -0,0 +1,44 @@
+"""background jobs table
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+JOB_STATUS = postgresql.ENUM("QUEUED", "RUNNING", "SUCCEEDED", "FAILED", name="jobstatus", create_type=False)
+
+
+def upgrade() -> None:
+    JOB_STATUS.create(op.get_bind(), checkfirst=True)
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("kind", sa.String(), nullable=False, comment="任务类型 (e.g., publish, bulk_publish, column_migration)"),
+        sa.Column("status", JOB_STATUS, nullable=False),
+        sa.Column("table_id", sa.Integer(), nullable=True, comment="关联的数据表配置 id"),
+        sa.Column("params", postgresql.JSONB(), nullable=False, comment="任务参数"),
+        sa.Column("current_step", sa.Text(), nullable=True, comment="当前执行的步骤 / SQL"),
+        sa.Column("attempts", sa.Integer(), nullable=False, comment="被 worker 领取的次数"),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True, comment="worker 最近一次写回进度的时间"),
+        sa.Column("result", postgresql.JSONB(), nullable=True, comment="成功时的返回结果"),
+        sa.Column("error", postgresql.JSONB(), nullable=True, comment="失败原因: {status_code, detail}"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False, comment="创建时间"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False, comment="最后更新时间"),
+    )
+    op.create_index("ix_jobs_id", "jobs", ["id"])
+    op.create_index("ix_jobs_table_id_status", "jobs", ["table_id", "status"])
+
+
+def downgrade() -> None:
+    op.drop_table("jobs")
+    JOB_STATUS.drop(op.get_bind(), checkfirst=True)
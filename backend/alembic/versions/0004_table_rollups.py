@@ -0,0 +1,37 @@
+"""aggregation rollup tables
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "table_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("table_id", sa.Integer(), sa.ForeignKey("data_table_configs.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("name", sa.String(), nullable=False, comment="rollup 名称 (e.g., 5min)"),
+        sa.Column("rollup_table", sa.String(), nullable=False, unique=True, comment="物化表名"),
+        sa.Column("spec", postgresql.JSONB(), nullable=False, comment="聚合定义"),
+        sa.Column("lookback_buckets", sa.Integer(), nullable=False, comment="每次刷新重算水位之前的桶数 (覆盖迟到数据)"),
+        sa.Column("watermark", sa.DateTime(), nullable=True, comment="早于该时间 (UTC) 的桶已完整物化, 之后的桶查询时实时聚合"),
+        sa.Column("last_refreshed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False, comment="创建时间"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False, comment="最后更新时间"),
+        sa.UniqueConstraint("table_id", "name", name="uq_table_rollups_table_id_name"),
+    )
+    op.create_index("ix_table_rollups_id", "table_rollups", ["id"])
+    op.create_index("ix_table_rollups_table_id", "table_rollups", ["table_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("table_rollups")
@@ -0,0 +1,41 @@
+"""data lifecycle policies and event log
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "data_table_configs",
+        sa.Column("lifecycle_policy", postgresql.JSONB(), nullable=True, comment="数据生命周期策略"),
+    )
+    op.create_table(
+        "table_lifecycle_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("table_id", sa.Integer(), sa.ForeignKey("data_table_configs.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("partition_name", sa.String(), nullable=False, comment="分区表名"),
+        sa.Column("action", sa.String(), nullable=False, comment="tier | archive | drop"),
+        sa.Column("status", sa.String(), nullable=False, comment="done | failed"),
+        sa.Column("detail", postgresql.JSONB(), nullable=False, comment="操作明细"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("elapsed_seconds", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False, comment="创建时间"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False, comment="最后更新时间"),
+    )
+    op.create_index("ix_table_lifecycle_events_id", "table_lifecycle_events", ["id"])
+    op.create_index("ix_table_lifecycle_events_table_id", "table_lifecycle_events", ["table_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("table_lifecycle_events")
+    op.drop_column("data_table_configs", "lifecycle_policy")
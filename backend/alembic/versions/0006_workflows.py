@@ -0,0 +1,81 @@
+"""workflows, runs and per-node run records
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+RUN_STATUS = postgresql.ENUM(
+    "QUEUED", "RUNNING", "SUCCEEDED", "FAILED", name="workflowrunstatus", create_type=False
+)
+
+
+def _timestamps():
+    return [
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False, comment="创建时间"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False, comment="最后更新时间"),
+    ]
+
+
+def upgrade() -> None:
+    RUN_STATUS.create(op.get_bind(), checkfirst=True)
+    op.create_table(
+        "workflows",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False, unique=True, comment="工作流名称"),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("graph", postgresql.JSONB(), nullable=False, comment="节点与连线 {nodes, edges, concurrency}"),
+        sa.Column("max_concurrency", sa.Integer(), nullable=True, comment="一次运行中同时执行的节点数上限, 为空时使用全局配置"),
+        *_timestamps(),
+    )
+    op.create_index("ix_workflows_id", "workflows", ["id"])
+
+    op.create_table(
+        "workflow_runs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("workflow_id", sa.Integer(), sa.ForeignKey("workflows.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("job_id", sa.Integer(), nullable=True, comment="执行本次运行的后台任务 id"),
+        sa.Column("status", RUN_STATUS, nullable=False),
+        sa.Column("graph", postgresql.JSONB(), nullable=False, comment="启动时的图快照"),
+        sa.Column("inputs", postgresql.JSONB(), nullable=False, comment="运行输入"),
+        sa.Column("outputs", postgresql.JSONB(), nullable=True, comment="end 节点 (或末端节点) 的输出"),
+        sa.Column("error", postgresql.JSONB(), nullable=True, comment="导致运行失败的节点与原因"),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("elapsed_seconds", sa.Float(), nullable=True),
+        *_timestamps(),
+    )
+    op.create_index("ix_workflow_runs_id", "workflow_runs", ["id"])
+    op.create_index("ix_workflow_runs_workflow_id_id", "workflow_runs", ["workflow_id", "id"])
+
+    op.create_table(
+        "workflow_node_runs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("run_id", sa.Integer(), sa.ForeignKey("workflow_runs.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("node_id", sa.String(), nullable=False),
+        sa.Column("node_type", sa.String(), nullable=False),
+        sa.Column("scope", sa.String(), nullable=True, comment="循环体内的节点所在的循环与轮次, e.g. each_symbol[3]"),
+        sa.Column("status", sa.String(), nullable=False, comment="succeeded | failed | skipped | cancelled"),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("wait_seconds", sa.Float(), nullable=True, comment="就绪后等待并发名额的时间"),
+        sa.Column("elapsed_seconds", sa.Float(), nullable=True),
+        sa.Column("detail", postgresql.JSONB(), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+    )
+    op.create_index("ix_workflow_node_runs_run_id", "workflow_node_runs", ["run_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("workflow_node_runs")
+    op.drop_table("workflow_runs")
+    op.drop_table("workflows")
+    RUN_STATUS.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,30 @@
+"""message bus topic registry
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "topics",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False, unique=True, comment="Topic 名称, 生产者 / 消费者节点以名称引用"),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("max_length", sa.Integer(), nullable=True, comment="保留的消息数上限 (发布时近似裁剪), 为空表示不限制"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False, comment="创建时间"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False, comment="最后更新时间"),
+    )
+    op.create_index("ix_topics_id", "topics", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("topics")
@@ -1,18 +1,51 @@
+import json
 import logging
+import time
 from datetime import datetime
-from typing import List, Optional, Any
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Literal, Optional, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text, func, inspect
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
 
-from app.db.session import get_session
-from app.models.data_table import DataTableConfig, TableCategory, TableStatus
+from app.db.session import get_session, engine
+from app.models.data_table import DataTableConfig, TableCategory, TableLifecycleEvent, TableRollup, TableStatus
 from app.schemas.data_table import (
-    DataTableCreate, DataTableUpdate, DataTableResponse, DataTableListResponse,
-    CategoryCreate, CategoryUpdate, CategoryResponse
+    DataTableCreate, DataTableUpdate, DataTableResponse, DataTableListResponse, IndexDef,
+    CategoryCreate, CategoryUpdate, CategoryResponse, IngestResponse,
+    BulkPublishRequest, BulkPublishResponse, ParquetExportRequest, AggregateRequest, RollupCreate, RollupResponse,
+    LifecyclePolicy, LifecycleEventResponse
 )
+from app.schemas.job import JobAccepted
 from app.db.ddl_generator import DDLGenerator
+from app.db.aggregation import (
+    ROLLUP_REFRESH_JOB, AggregateError, build_aggregate_query, build_aggregate_spec, rollup_covers,
+    rollup_create_sqls, rollup_table_name
+)
+from app.db.bulk_loader import IngestError, copy_upload, open_reader, resolve_format, upsert_upload
+from app.db.catalog import get_table_snapshots, table_drift
+from app.db.table_stats import table_stats_cache
+from app.db.lifecycle import (
+    LIFECYCLE_JOB, LifecycleError, apply_lifecycle, archived_tables, validate_policy_target
+)
+from app.db.online_migration import get_migrations
+from app.db.parquet_export import PARQUET_EXPORT_JOB, ExportError, export_root, read_manifest, validate_export
+from app.db.job_runner import enqueue_job, has_active_job
+from app.db.publisher import (
+    BULK_PUBLISH_JOB, PUBLISH_JOB, PublishError, publish_table_config, publish_tables, summarize_publish_results
+)
+from app.core.config import settings
+from app.core.request_metrics import tag_table
+from app.core.cache import (
+    CATEGORIES_TAG, TABLES_TAG, cached_json_response, invalidate_table_cache, response_cache, table_tag
+)
+from app.db.arrow_schema import require_pyarrow
+from app.db.row_reader import (
+    READ_FORMATS, RowQueryError, build_range_query, encode_arrow, encode_ndjson, stream_row_batches
+)
 
 logger = logging.getLogger(__name__)
 
@@ -21,10 +54,13 @@ router = APIRouter()
 # --- Categories API ---
 
 @router.get("/categories", response_model=List[CategoryResponse])
-async def get_categories(session: AsyncSession = Depends(get_session)):
-    stmt = select(TableCategory).order_by(TableCategory.id)
-    result = await session.execute(stmt)
-    return result.scalars().all()
+async def get_categories(request: Request, session: AsyncSession = Depends(get_session)):
+    async def produce():
+        stmt = select(TableCategory).order_by(TableCategory.id)
+        result = await session.execute(stmt)
+        return [CategoryResponse.model_validate(c) for c in result.scalars().all()]
+
+    return await cached_json_response(request, [CATEGORIES_TAG], produce)
 
 @router.post("/categories", response_model=CategoryResponse)
 async def create_category(data: CategoryCreate, session: AsyncSession = Depends(get_session)):
@@ -41,6 +77,7 @@ async def create_category(data: CategoryCreate, session: AsyncSession = Depends(
     session.add(new_cat)
     try:
         await session.commit()
+        await response_cache.invalidate(CATEGORIES_TAG)
         await session.refresh(new_cat)
         return new_cat
     except IntegrityError:
@@ -57,6 +94,7 @@ async def update_category(id: int, data: CategoryUpdate, session: AsyncSession =
     cat.name = data.name
     cat.description = data.description
     await session.commit()
+    await response_cache.invalidate(CATEGORIES_TAG)
     await session.refresh(cat)
     return cat
 
@@ -74,69 +112,200 @@ async def delete_category(id: int, session: AsyncSession = Depends(get_session))
         
     await session.delete(cat)
     await session.commit()
+    await response_cache.invalidate(CATEGORIES_TAG)
     return {"message": "Category deleted"}
 
 # --- Data Tables API ---
 
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) <statement>; statement 的参数照常绑定 (不拼接进 SQL)"""
+    # 结果列 (QUERY PLAN) 与 statement 的列不同, 不能复用编译缓存中按 statement 列适配的结果元数据
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+@compiles(_Explain)
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+async def _estimate_count(session: AsyncSession, query) -> int:
+    """用查询计划的行数估计代替 count(*): 不扫描数据, 结果随统计信息的新旧有误差。"""
+    plan = (await session.execute(_Explain(query))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+# 列表/详情接口可选择返回的字段 (fields=name,status,...); stats 为物理表统计, 其余均为 data_table_configs 的列
+TABLE_FIELDS = tuple(DataTableResponse.model_fields)
+
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    """解析 fields 参数, 未指定时返回全部字段; id 始终返回 (游标分页依赖它)"""
+    if not fields:
+        return list(TABLE_FIELDS)
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in TABLE_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown field(s): {', '.join(unknown)}; available: {', '.join(TABLE_FIELDS)}"
+        )
+    return list(dict.fromkeys(["id", *names]))
+
+
+def _select_table_fields(fields: List[str]):
+    """只查询需要的列; 附加统计时还需要 table_name 与 status"""
+    columns = [f for f in fields if f != "stats"]
+    if "stats" in fields:
+        columns += [c for c in ("table_name", "status") if c not in columns]
+    return select(*(getattr(DataTableConfig, c) for c in columns))
+
+
+async def _table_items(session: AsyncSession, rows, fields: List[str]) -> List[dict]:
+    """
+    查询结果行 -> 响应项 (dict, 直接序列化, 不再经过 DataTableResponse 校验 JSONB 列)。
+    附加物理表统计: 所有已发布表共用一次批量查询 (带缓存), 未发布的表不查询
+    """
+    stats = {}
+    if "stats" in fields:
+        published = [r["table_name"] for r in rows if r["status"] == TableStatus.CREATED]
+        stats = await table_stats_cache.get(session, published)
+    items = []
+    for row in rows:
+        item = {f: row[f] for f in fields if f != "stats"}
+        if "stats" in fields:
+            item["stats"] = stats.get(row["table_name"])
+        items.append(item)
+    return items
+
 @router.get("/data-tables", response_model=DataTableListResponse)
 async def list_tables(
+    request: Request,
     page: int = 1,
-    page_size: int = 20,
+    page_size: int = Query(20, ge=1, le=500),
     search: Optional[str] = None,
     category_id: Optional[int] = None,
     status: Optional[TableStatus] = None,
+    cursor: Optional[int] = Query(None, description="上一页返回的 next_cursor; 指定后忽略 page, 使用 keyset 分页"),
+    count: Literal["exact", "estimate"] = Query("exact", description="total 的计算方式: exact 为 count(*), estimate 取查询计划的行数估计"),
+    fields: Optional[str] = Query(None, description="逗号分隔的返回字段, e.g. name,table_name,status; 默认全部"),
     session: AsyncSession = Depends(get_session)
 ):
-    # Base query
-    query = select(DataTableConfig)
+    selected = _parse_fields(fields)
+
+    async def produce():
+        # Base query: 只查询需要的列 (宽表的 columns_schema 可能很大)
+        query = _select_table_fields(selected)
     
-    # Filters
-    filters = []
-    if search:
-        search_term = f"%{search}%"
-        filters.append(
-            (DataTableConfig.name.ilike(search_term)) | 
-            (DataTableConfig.table_name.ilike(search_term)) |
-            (DataTableConfig.description.ilike(search_term))
-        )
-    if category_id is not None:
-        filters.append(DataTableConfig.category_id == category_id)
-    if status is not None:
-        filters.append(DataTableConfig.status == status)
+        # Filters
+        # ILIKE '%term%' 由 pg_trgm GIN 索引支持 (见 alembic 迁移 0002)
+        filters = []
+        if search:
+            search_term = f"%{search}%"
+            filters.append(
+                (DataTableConfig.name.ilike(search_term)) | 
+                (DataTableConfig.table_name.ilike(search_term)) |
+                (DataTableConfig.description.ilike(search_term))
+            )
+        if category_id is not None:
+            filters.append(DataTableConfig.category_id == category_id)
+        if status is not None:
+            filters.append(DataTableConfig.status == status)
     
-    if filters:
-        query = query.where(*filters)
+        if filters:
+            query = query.where(*filters)
     
-    # Count total (before pagination)
-    count_stmt = select(func.count()).select_from(query.subquery())
-    total_result = await session.execute(count_stmt)
-    total = total_result.scalar() or 0
+        # Count total (before pagination)
+        if count == "exact":
+            count_stmt = select(func.count()).select_from(query.subquery())
+            total_result = await session.execute(count_stmt)
+            total = total_result.scalar() or 0
+        else:
+            total = await _estimate_count(session, query)
     
-    # Pagination
-    offset = (page - 1) * page_size
-    stmt = query.order_by(DataTableConfig.id.desc()).offset(offset).limit(page_size)
+        # Pagination: cursor 为上一页最后一条的 id, 沿主键索引向后定位, 不受页码深度影响
+        stmt = query.order_by(DataTableConfig.id.desc())
+        if cursor is not None:
+            stmt = stmt.where(DataTableConfig.id < cursor)
+        else:
+            stmt = stmt.offset((page - 1) * page_size)
+        # 多取一条用于判断是否还有下一页
+        stmt = stmt.limit(page_size + 1)
     
-    result = await session.execute(stmt)
-    items = result.scalars().all()
+        result = await session.execute(stmt)
+        rows = result.mappings().all()
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
     
-    return {"total": total, "items": items}
+        return {
+            "total": total,
+            "estimated": count == "estimate",
+            "next_cursor": rows[-1]["id"] if has_more else None,
+            "items": await _table_items(session, rows, selected),
+        }
+
+    return await cached_json_response(request, [TABLES_TAG], produce)
+
+@router.get("/data-tables/drift")
+async def get_tables_drift(
+    category_id: Optional[int] = None,
+    status: Optional[TableStatus] = None,
+    only_drifted: bool = False,
+    session: AsyncSession = Depends(get_session)
+):
+    """对比所有表配置与物理表结构 (单次目录查询), 报告需要发布/同步的差异"""
+    stmt = select(DataTableConfig).order_by(DataTableConfig.id)
+    if category_id is not None:
+        stmt = stmt.where(DataTableConfig.category_id == category_id)
+    if status is not None:
+        stmt = stmt.where(DataTableConfig.status == status)
+    configs = (await session.execute(stmt)).scalars().all()
+
+    snapshots = await get_table_snapshots(session, [c.table_name for c in configs])
+    tables = []
+    for config in configs:
+        drift = table_drift(
+            config.table_name, config.columns_schema, config.indexes_schema,
+            config.partition_config, snapshots[config.table_name]
+        )
+        if only_drifted and drift["in_sync"]:
+            continue
+        tables.append({"id": config.id, "table_name": config.table_name, "status": config.status, **drift})
+
+    return {
+        "total": len(configs),
+        "drifted": sum(1 for t in tables if not t["in_sync"]),
+        "tables": tables,
+    }
 
 @router.get("/data-tables/{id}", response_model=DataTableResponse)
-async def get_table(id: int, session: AsyncSession = Depends(get_session)):
-    stmt = select(DataTableConfig).where(DataTableConfig.id == id)
-    result = await session.execute(stmt)
-    config = result.scalar_one_or_none()
-    if not config:
-        raise HTTPException(status_code=404, detail="Table config not found")
-    return config
+async def get_table(
+    id: int,
+    request: Request,
+    fields: Optional[str] = Query(None, description="逗号分隔的返回字段, 默认全部"),
+    session: AsyncSession = Depends(get_session)
+):
+    selected = _parse_fields(fields)
+
+    async def produce():
+        stmt = _select_table_fields(selected).where(DataTableConfig.id == id)
+        result = await session.execute(stmt)
+        row = result.mappings().one_or_none()
+        if not row:
+            raise HTTPException(status_code=404, detail="Table config not found")
+        return (await _table_items(session, [row], selected))[0]
+
+    return await cached_json_response(request, [table_tag(id)], produce)
 
 @router.post("/data-tables", response_model=DataTableResponse)
 async def create_data_table(data: DataTableCreate, session: AsyncSession = Depends(get_session)):
     # 1. Validate Schema Logic
+    partition_config = data.partition_config.model_dump(mode="json") if data.partition_config else None
     is_valid, error_msg = DDLGenerator.validate_schema(
         data.table_name, 
         [c.model_dump() for c in data.columns_schema],
-        [i.model_dump() for i in data.indexes_schema]
+        [i.model_dump() for i in data.indexes_schema],
+        partition_config
     )
     if not is_valid:
         raise HTTPException(status_code=400, detail=f"Schema Validation Error: {error_msg}")
@@ -153,10 +322,12 @@ async def create_data_table(data: DataTableCreate, session: AsyncSession = Depen
         description=data.description,
         status=TableStatus.DRAFT,
         columns_schema=[c.model_dump() for c in data.columns_schema],
-        indexes_schema=[i.model_dump() for i in data.indexes_schema]
+        indexes_schema=[i.model_dump() for i in data.indexes_schema],
+        partition_config=partition_config
     )
     session.add(new_table)
     await session.commit()
+    await invalidate_table_cache()
     await session.refresh(new_table)
     return new_table
 
@@ -167,12 +338,15 @@ async def update_data_table(table_id: int, data: DataTableUpdate, session: Async
     
     if not table:
         raise HTTPException(status_code=404, detail="Data table not found")
+    tag_table(table.table_name)
 
     # Validate Schema Logic
+    new_partition = data.partition_config.model_dump(mode="json") if data.partition_config else None
     is_valid, error_msg = DDLGenerator.validate_schema(
         data.table_name, 
         [c.model_dump() for c in data.columns_schema], 
-        [i.model_dump() for i in data.indexes_schema]
+        [i.model_dump() for i in data.indexes_schema],
+        new_partition
     )
     if not is_valid:
         raise HTTPException(status_code=400, detail=f"Schema Validation Error: {error_msg}")
@@ -180,8 +354,10 @@ async def update_data_table(table_id: int, data: DataTableUpdate, session: Async
     # --- Snapshot Comparison ---
     old_table_name = table.table_name
     old_cols = table.columns_schema
-    old_idxs = table.indexes_schema
+    # 补齐旧配置中没有的索引字段默认值 (method / include / ...), 避免仅因格式不同被视为变更
+    old_idxs = [IndexDef.model_validate(i).model_dump() for i in table.indexes_schema]
     old_desc = table.description
+    old_partition = table.partition_config
     
     new_table_name = data.table_name
     new_cols = [c.model_dump() for c in data.columns_schema]
@@ -189,7 +365,7 @@ async def update_data_table(table_id: int, data: DataTableUpdate, session: Async
     new_desc = data.description
     
     has_renamed = old_table_name != new_table_name
-    has_schema_changed = (old_cols != new_cols) or (old_idxs != new_idxs) or (old_desc != new_desc)
+    has_schema_changed = (old_cols != new_cols) or (old_idxs != new_idxs) or (old_desc != new_desc) or (old_partition != new_partition)
     
     # Check physical existence
     physical_exists = (table.status == TableStatus.CREATED) or (table.last_published_at is not None)
@@ -217,6 +393,7 @@ async def update_data_table(table_id: int, data: DataTableUpdate, session: Async
     table.description = new_desc
     table.columns_schema = new_cols
     table.indexes_schema = new_idxs
+    table.partition_config = new_partition
     
     # 3. Update Status Logic
     # If any physical attribute changed, force DRAFT to trigger Sync flow
@@ -224,96 +401,467 @@ async def update_data_table(table_id: int, data: DataTableUpdate, session: Async
         table.status = TableStatus.DRAFT
     
     await session.commit()
+    await invalidate_table_cache(table_id)
     await session.refresh(table)
     return table
 
-@router.post("/data-tables/{id}/publish")
-async def publish_table(id: int, session: AsyncSession = Depends(get_session)):
+def _job_accepted(request: Request, job) -> JSONResponse:
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status.value,
+        "status_url": request.app.url_path_for("get_job", id=job.id),
+    })
+
+@router.post("/data-tables/publish", response_model=BulkPublishResponse, responses={202: {"model": JobAccepted}})
+async def publish_tables_bulk(request: Request, data: BulkPublishRequest, session: AsyncSession = Depends(get_session)):
+    """批量发布: 按 ids 或分类 (仅草稿状态的表) 并发发布, 返回每张表的结果与耗时"""
+    if data.ids:
+        table_ids = list(dict.fromkeys(data.ids))
+    else:
+        stmt = (
+            select(DataTableConfig.id)
+            .where(DataTableConfig.category_id == data.category_id, DataTableConfig.status == TableStatus.DRAFT)
+            .order_by(DataTableConfig.id)
+        )
+        table_ids = list((await session.execute(stmt)).scalars().all())
+    if data.background:
+        job = await enqueue_job(session, BULK_PUBLISH_JOB, {
+            "table_ids": table_ids,
+            "concurrency": data.concurrency,
+            "batch_size": data.batch_size,
+            "throttle_ms": data.throttle_ms,
+        })
+        return _job_accepted(request, job)
+
+    # 释放请求 session 的事务, 避免阻塞各表的 CREATE INDEX CONCURRENTLY
+    await session.close()
+
+    started = time.perf_counter()
+    try:
+        results = await publish_tables(
+            engine, table_ids,
+            concurrency=data.concurrency or settings.PUBLISH_CONCURRENCY,
+            batch_size=data.batch_size,
+            throttle_ms=data.throttle_ms,
+        )
+    finally:
+        await invalidate_table_cache()
+        await response_cache.invalidate(*(table_tag(i) for i in table_ids))
+
+    return summarize_publish_results(results, time.perf_counter() - started)
+
+@router.post("/data-tables/{id}/publish", responses={202: {"model": JobAccepted}})
+async def publish_table(
+    request: Request,
+    id: int,
+    batch_size: Optional[int] = Query(None, ge=100, description="在线类型迁移的每批回填行数"),
+    throttle_ms: Optional[int] = Query(None, ge=0, description="在线类型迁移的批间休眠 (毫秒)"),
+    background: bool = Query(False, description="作为后台任务执行, 立即返回 202 与任务 id"),
+    session: AsyncSession = Depends(get_session)
+):
+    if background:
+        if not await session.get(DataTableConfig, id):
+            raise HTTPException(status_code=404, detail="Table config not found")
+        job = await enqueue_job(
+            session, PUBLISH_JOB, {"table_id": id, "batch_size": batch_size, "throttle_ms": throttle_ms}, table_id=id
+        )
+        return _job_accepted(request, job)
+
+    # 发布过程中有多个提交点 (DDL / 索引 / 状态), 无论成功与否都使缓存失效
+    try:
+        return await publish_table_config(engine, session, id, batch_size, throttle_ms)
+    except PublishError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    finally:
+        await invalidate_table_cache(id)
+
+@router.get("/data-tables/{id}/migrations")
+async def get_table_migrations(id: int, session: AsyncSession = Depends(get_session)):
+    """在线列类型迁移的进度"""
     stmt = select(DataTableConfig).where(DataTableConfig.id == id)
-    result = await session.execute(stmt)
-    config = result.scalar_one_or_none()
-    
+    config = (await session.execute(stmt)).scalar_one_or_none()
     if not config:
         raise HTTPException(status_code=404, detail="Table config not found")
-    
-    if config.status == TableStatus.CREATED:
-        raise HTTPException(status_code=400, detail="Table is already published/synced")
-
-    # Determine mode: Create or Sync
-    # Check if physical table exists
-    def check_table_exists(sync_session):
-        # run_sync provides a synchronous Session object
-        insp = inspect(sync_session.connection())
-        return insp.has_table(config.table_name)
-    
-    table_exists = await session.run_sync(check_table_exists)
-    
-    sqls_to_execute = []
+    return {
+        "table_name": config.table_name,
+        "migrations": [m.to_dict() for m in get_migrations(config.table_name)],
+    }
 
+@router.post("/data-tables/{id}/export", status_code=202, response_model=JobAccepted)
+async def export_table_parquet(
+    request: Request,
+    id: int,
+    data: ParquetExportRequest,
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    将物理表导出为按 partition_column 切分的 Parquet 数据集 (后台任务)。
+    再次导出时只重写源数据有变化的分区。
+    """
+    config = await session.get(DataTableConfig, id)
+    if not config:
+        raise HTTPException(status_code=404, detail="Table config not found")
+    if config.last_published_at is None:
+        raise HTTPException(status_code=400, detail="Table has not been published")
     try:
-        if table_exists:
-            # --- Sync Mode ---
-            def get_db_info(sync_session):
-                insp = inspect(sync_session.connection())
-                cols = insp.get_columns(config.table_name)
-                # Filter out PK index usually named {table}_pkey
-                indexes = insp.get_indexes(config.table_name) 
-                return cols, indexes
-
-            db_cols, db_indexes = await session.run_sync(get_db_info)
-
-            # 0. Sync Table Comment
-            if config.description:
-                safe_desc = config.description.replace("'", "''")
-                sqls_to_execute.append(f"COMMENT ON TABLE {config.table_name} IS '{safe_desc}';")
-
-            # 1. Sync Columns (Add/Drop/Comment)
-            sqls_to_execute.extend(DDLGenerator.generate_sync_sqls(config.table_name, db_cols, config.columns_schema))
-            
-            # 2. Sync Indexes (Drop All + Re-create All) - Brutal but effective
-            for idx in db_indexes:
-                # Avoid dropping Primary Key index (usually ends with _pkey or matches PK constraint)
-                idx_name = idx['name']
-                sqls_to_execute.append(f"DROP INDEX IF EXISTS {idx_name};")
-            
-            sqls_to_execute.extend(DDLGenerator.generate_index_sqls(config.table_name, config.indexes_schema))
-            
-        else:
-            # --- Create Mode ---
-            ddl_sqls = DDLGenerator.generate_create_table_sqls(
-                config.table_name, 
-                config.description,
-                config.columns_schema
-            )
-            idx_sqls = DDLGenerator.generate_index_sqls(
-                config.table_name, 
-                config.indexes_schema
-            )
-            sqls_to_execute = ddl_sqls + idx_sqls
+        require_pyarrow()
+        validate_export(config.columns_schema, data.partition_column, data.granularity)
+    except (RuntimeError, ExportError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # 同一张表的两次导出会写同一个数据集目录
+    if await has_active_job(session, PARQUET_EXPORT_JOB, id):
+        raise HTTPException(status_code=409, detail="A parquet export is already queued or running for this table")
 
-        # Execute SQLs
-        logger.info(f"Executing SQLs for table {config.table_name}: {sqls_to_execute}")
-        for sql in sqls_to_execute:
-            await session.execute(text(sql))
-        
-        # Update Status
-        config.status = TableStatus.CREATED
-        config.last_published_at = datetime.utcnow()
+    job = await enqueue_job(session, PARQUET_EXPORT_JOB, {
+        "table_name": config.table_name,
+        "columns_schema": config.columns_schema,
+        **data.model_dump(),
+    }, table_id=id)
+    return _job_accepted(request, job)
+
+@router.get("/data-tables/{id}/export")
+async def get_table_export(id: int, session: AsyncSession = Depends(get_session)):
+    """上次导出的 manifest (分区、行数、指纹、文件)"""
+    config = await session.get(DataTableConfig, id)
+    if not config:
+        raise HTTPException(status_code=404, detail="Table config not found")
+    manifest = read_manifest(export_root(config.table_name))
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Table has not been exported")
+    return manifest
+
+@router.post("/data-tables/{id}/rows", response_model=IngestResponse)
+async def ingest_rows(
+    id: int,
+    request: Request,
+    fmt: Optional[str] = Query(None, alias="format", description="csv | ndjson | parquet (默认按 Content-Type 推断)"),
+    mode: Literal["insert", "upsert"] = Query("insert", description="insert: 直接 COPY; upsert: 经暂存表按主键合并"),
+    batch_rows: Optional[int] = Query(None, ge=1000, description="upsert 每批合并的行数"),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    将上传的 CSV/NDJSON/Parquet 流式写入已发布的物理表 (COPY)。
+    请求体直接作为文件内容，不使用 multipart。
+    upsert 模式下主键已存在的行只更新有变化的列，响应中返回 inserted/updated/unchanged 计数。
+    NDJSON 总是包含全部列 (缺失的键为 NULL)；只更新部分列时使用只含这些列 (及主键) 的 CSV / Parquet。
+    """
+    stmt = select(DataTableConfig).where(DataTableConfig.id == id)
+    config = (await session.execute(stmt)).scalar_one_or_none()
+    if not config:
+        raise HTTPException(status_code=404, detail="Table config not found")
+
+    if config.status != TableStatus.CREATED:
+        raise HTTPException(status_code=400, detail="Table must be published/synced before ingesting rows")
+
+    # rollback 会使 ORM 对象过期，先取出后续需要的字段
+    table_name = config.table_name
+    tag_table(table_name)
+
+    try:
+        upload_format = resolve_format(fmt, request.headers.get("content-type"))
+        reader = open_reader(upload_format, request.stream(), config.columns_schema)
+        if mode == "upsert":
+            stats = await upsert_upload(
+                session, table_name, config.columns_schema, reader,
+                batch_rows=batch_rows or settings.INGEST_UPSERT_BATCH_ROWS,
+            )
+        else:
+            stats = await copy_upload(session, table_name, reader)
         await session.commit()
-        
-        return {
-            "message": f"Table '{config.table_name}' {'synced' if table_exists else 'published'} successfully", 
-            "executed_sqls": sqls_to_execute
-        }
-        
+    except IngestError as e:
+        await session.rollback()
+        raise HTTPException(status_code=400, detail=f"Ingest Error: {e}")
     except Exception as e:
         await session.rollback()
-        logger.exception(f"Failed to publish/sync table {id}")
+        logger.exception(f"Failed to ingest rows into table {table_name}")
         err_msg = str(e)
-        if "already exists" in err_msg:
-             raise HTTPException(status_code=400, detail=f"Conflict: {err_msg}")
+        if "duplicate key" in err_msg:
+            raise HTTPException(status_code=409, detail=f"Conflict: {err_msg}")
         raise HTTPException(status_code=500, detail=f"Database Execution failed: {err_msg}")
 
+    logger.info(
+        f"Ingested {stats.rows} rows ({stats.bytes} bytes) into {table_name} ({mode}) "
+        f"in {stats.elapsed_seconds:.2f}s ({stats.rows_per_sec:.0f} rows/s)"
+    )
+    merge = stats.merge
+    return IngestResponse(
+        table_name=table_name,
+        format=upload_format,
+        mode=mode,
+        inserted=merge.inserted if merge else None,
+        updated=merge.updated if merge else None,
+        unchanged=merge.unchanged if merge else None,
+        duplicates=merge.duplicates if merge else None,
+        rows=stats.rows,
+        bytes=stats.bytes,
+        elapsed_seconds=stats.elapsed_seconds,
+        rows_per_sec=stats.rows_per_sec,
+        bytes_per_sec=stats.bytes_per_sec,
+    )
+
+@router.get("/data-tables/{id}/rows")
+async def read_rows(
+    id: int,
+    columns: Optional[str] = Query(None, description="逗号分隔的列名, 主键列总会被包含"),
+    after: Optional[str] = Query(None, description="keyset 游标: 上一页最后一行主键值的 JSON 数组"),
+    eq: Optional[str] = Query(None, description="主键列等值过滤, JSON 对象 e.g. {\"ts_code\": \"000001.SZ\"}"),
+    time_column: Optional[str] = Query(None, description="时间过滤列, 默认为 range 分区键"),
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    batch_size: int = Query(5000, ge=100, le=100000),
+    fmt: str = Query("ndjson", alias="format", description="ndjson | arrow"),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    流式读取物理表数据 (服务端游标 + 主键 keyset 分页)。
+    """
+    stmt = select(DataTableConfig).where(DataTableConfig.id == id)
+    config = (await session.execute(stmt)).scalar_one_or_none()
+    if not config:
+        raise HTTPException(status_code=404, detail="Table config not found")
+    if config.last_published_at is None:
+        raise HTTPException(status_code=400, detail="Table has not been published")
+    tag_table(config.table_name)
+    if fmt not in READ_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{fmt}', expected one of {', '.join(READ_FORMATS)}")
+
+    partition = config.partition_config or {}
+    if time_column is None and partition.get("strategy") == "range":
+        time_column = partition.get("key")
+
+    try:
+        query = build_range_query(
+            config.table_name,
+            config.columns_schema,
+            columns=[c.strip() for c in columns.split(",") if c.strip()] if columns else None,
+            after=json.loads(after) if after else None,
+            pk_eq=json.loads(eq) if eq else None,
+            time_column=time_column,
+            start=start,
+            end=end,
+            limit=limit,
+        )
+    except (RowQueryError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid query: {e}")
+
+    if fmt == "arrow":
+        try:
+            require_pyarrow()
+        except RuntimeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    batches = stream_row_batches(engine, query, batch_size)
+    if fmt == "arrow":
+        body = encode_arrow(batches, query, config.columns_schema)
+    else:
+        body = encode_ndjson(batches, query)
+
+    return StreamingResponse(
+        body,
+        media_type=READ_FORMATS[fmt],
+        headers={"X-Keyset-Columns": ",".join(query.keyset_columns)},
+    )
+
+@router.post("/data-tables/{id}/aggregate")
+async def aggregate_rows(
+    id: int,
+    data: AggregateRequest,
+    batch_size: int = Query(5000, ge=100, le=100000),
+    fmt: str = Query("ndjson", alias="format", description="ndjson | arrow"),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    服务端按时间分桶聚合 (OHLCV 重采样), 按分组列 + 桶排序流式返回。
+    存在匹配的 rollup 时, 水位之前的完整桶直接读取物化表 (响应头 X-Rollup)。
+    """
+    stmt = select(DataTableConfig).where(DataTableConfig.id == id)
+    config = (await session.execute(stmt)).scalar_one_or_none()
+    if not config:
+        raise HTTPException(status_code=404, detail="Table config not found")
+    if config.last_published_at is None:
+        raise HTTPException(status_code=400, detail="Table has not been published")
+    tag_table(config.table_name)
+    if fmt not in READ_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{fmt}', expected one of {', '.join(READ_FORMATS)}")
+
+    time_column = data.time_column
+    partition = config.partition_config or {}
+    if time_column is None and partition.get("strategy") == "range":
+        time_column = partition.get("key")
+
+    try:
+        spec = build_aggregate_spec(
+            config.table_name, config.columns_schema, time_column, data.bucket, data.aggregations,
+            group_by=data.group_by, origin=data.origin,
+        )
+        rollup = None
+        if data.use_rollup:
+            rollup_stmt = select(TableRollup).where(TableRollup.table_id == id, TableRollup.watermark.is_not(None))
+            rollups = (await session.execute(rollup_stmt)).scalars().all()
+            rollup = next((r for r in rollups if rollup_covers(spec, r.spec)), None)
+        query = build_aggregate_query(
+            spec, start=data.start, end=data.end, filters=data.filters,
+            rollup_table=rollup.rollup_table if rollup else None,
+            watermark=rollup.watermark if rollup else None,
+        )
+    except AggregateError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid aggregation: {e}")
+
+    if fmt == "arrow":
+        try:
+            require_pyarrow()
+        except RuntimeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    batches = stream_row_batches(engine, query, batch_size)
+    if fmt == "arrow":
+        body = encode_arrow(batches, query, spec.output_schema())
+    else:
+        body = encode_ndjson(batches, query)
+
+    headers = {"X-Keyset-Columns": ",".join(query.keyset_columns)}
+    if rollup:
+        headers["X-Rollup"] = rollup.name
+    return StreamingResponse(body, media_type=READ_FORMATS[fmt], headers=headers)
+
+@router.get("/data-tables/{id}/rollups", response_model=List[RollupResponse])
+async def list_rollups(id: int, session: AsyncSession = Depends(get_session)):
+    stmt = select(TableRollup).where(TableRollup.table_id == id).order_by(TableRollup.id)
+    return (await session.execute(stmt)).scalars().all()
+
+@router.post("/data-tables/{id}/rollups", status_code=202, response_model=JobAccepted)
+async def create_rollup(request: Request, id: int, data: RollupCreate, session: AsyncSession = Depends(get_session)):
+    """
+    创建聚合物化表并在后台任务中完成首次全量计算, 之后由定时任务增量刷新。
+    """
+    config = await session.get(DataTableConfig, id)
+    if not config:
+        raise HTTPException(status_code=404, detail="Table config not found")
+    if config.last_published_at is None:
+        raise HTTPException(status_code=400, detail="Table has not been published")
+    tag_table(config.table_name)
+
+    time_column = data.time_column
+    partition = config.partition_config or {}
+    if time_column is None and partition.get("strategy") == "range":
+        time_column = partition.get("key")
+    try:
+        spec = build_aggregate_spec(
+            config.table_name, config.columns_schema, time_column, data.bucket, data.aggregations,
+            group_by=data.group_by, origin=data.origin,
+        )
+        rollup_table = rollup_table_name(config.table_name, data.name)
+    except AggregateError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid rollup: {e}")
+
+    stmt = select(TableRollup.id).where(TableRollup.table_id == id, TableRollup.name == data.name)
+    if (await session.execute(stmt)).scalar_one_or_none():
+        raise HTTPException(status_code=400, detail=f"Rollup '{data.name}' already exists")
+
+    try:
+        for sql in rollup_create_sqls(spec, rollup_table):
+            await session.execute(text(sql))
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to create rollup table: {str(e)}")
+    rollup = TableRollup(
+        table_id=id, name=data.name, rollup_table=rollup_table,
+        spec=spec.to_params(), lookback_buckets=data.lookback_buckets,
+    )
+    session.add(rollup)
+    await session.flush()
+
+    # 建表、配置与任务在同一事务中提交
+    job = await enqueue_job(session, ROLLUP_REFRESH_JOB, {"rollup_id": rollup.id, "full": True}, table_id=id)
+    return _job_accepted(request, job)
+
+@router.post("/data-tables/{id}/rollups/{rollup_id}/refresh", status_code=202, response_model=JobAccepted)
+async def refresh_table_rollup(
+    request: Request,
+    id: int,
+    rollup_id: int,
+    full: bool = Query(False, description="清空后全量重算, 默认只重算水位附近的桶"),
+    session: AsyncSession = Depends(get_session)
+):
+    rollup = await session.get(TableRollup, rollup_id)
+    if not rollup or rollup.table_id != id:
+        raise HTTPException(status_code=404, detail="Rollup not found")
+    job = await enqueue_job(session, ROLLUP_REFRESH_JOB, {"rollup_id": rollup_id, "full": full}, table_id=id)
+    return _job_accepted(request, job)
+
+@router.delete("/data-tables/{id}/rollups/{rollup_id}")
+async def delete_rollup(id: int, rollup_id: int, session: AsyncSession = Depends(get_session)):
+    rollup = await session.get(TableRollup, rollup_id)
+    if not rollup or rollup.table_id != id:
+        raise HTTPException(status_code=404, detail="Rollup not found")
+    await session.execute(text(f"DROP TABLE IF EXISTS {rollup.rollup_table}"))
+    await session.delete(rollup)
+    await session.commit()
+    return {"message": "Rollup deleted successfully"}
+
+@router.get("/data-tables/{id}/lifecycle")
+async def get_lifecycle(id: int, limit: int = Query(100, ge=1, le=1000), session: AsyncSession = Depends(get_session)):
+    """生命周期策略、按当前日期的执行计划 (不执行) 与最近的执行记录"""
+    config = await session.get(DataTableConfig, id)
+    if not config:
+        raise HTTPException(status_code=404, detail="Table config not found")
+    stmt = select(TableLifecycleEvent).where(TableLifecycleEvent.table_id == id).order_by(
+        TableLifecycleEvent.id.desc()
+    ).limit(limit)
+    events = [LifecycleEventResponse.model_validate(e) for e in (await session.execute(stmt)).scalars().all()]
+    plan = None
+    if config.lifecycle_policy and config.status == TableStatus.CREATED:
+        try:
+            plan = (await apply_lifecycle(engine, session, config, dry_run=True))["planned"]
+        except LifecycleError as e:
+            plan = {"error": str(e)}
+    return {"policy": config.lifecycle_policy, "plan": plan, "events": events}
+
+@router.put("/data-tables/{id}/lifecycle")
+async def set_lifecycle(id: int, data: LifecyclePolicy, session: AsyncSession = Depends(get_session)):
+    config = await session.get(DataTableConfig, id)
+    if not config:
+        raise HTTPException(status_code=404, detail="Table config not found")
+    try:
+        validate_policy_target(config.partition_config)
+    except LifecycleError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    config.lifecycle_policy = data.model_dump()
+    await session.commit()
+    await invalidate_table_cache(id)
+    return {"policy": config.lifecycle_policy}
+
+@router.delete("/data-tables/{id}/lifecycle")
+async def delete_lifecycle(id: int, session: AsyncSession = Depends(get_session)):
+    config = await session.get(DataTableConfig, id)
+    if not config:
+        raise HTTPException(status_code=404, detail="Table config not found")
+    config.lifecycle_policy = None
+    await session.commit()
+    await invalidate_table_cache(id)
+    return {"message": "Lifecycle policy removed"}
+
+@router.post("/data-tables/{id}/lifecycle/apply", status_code=202, response_model=JobAccepted)
+async def apply_table_lifecycle(
+    request: Request,
+    id: int,
+    dry_run: bool = Query(False, description="只规划不执行"),
+    session: AsyncSession = Depends(get_session),
+):
+    """立即按策略处理分区 (后台任务), 不等待定时执行"""
+    config = await session.get(DataTableConfig, id)
+    if not config:
+        raise HTTPException(status_code=404, detail="Table config not found")
+    if not config.lifecycle_policy:
+        raise HTTPException(status_code=400, detail="Table has no lifecycle policy")
+    if config.status != TableStatus.CREATED:
+        raise HTTPException(status_code=400, detail="Table is not published")
+    tag_table(config.table_name)
+    job = await enqueue_job(session, LIFECYCLE_JOB, {"table_id": id, "dry_run": dry_run}, table_id=id)
+    return _job_accepted(request, job)
+
 @router.delete("/data-tables/{id}")
 async def delete_table(id: int, session: AsyncSession = Depends(get_session)):
     stmt = select(DataTableConfig).where(DataTableConfig.id == id)
@@ -323,9 +871,17 @@ async def delete_table(id: int, session: AsyncSession = Depends(get_session)):
     if not config:
         raise HTTPException(status_code=404, detail="Table config not found")
         
+    tag_table(config.table_name)
     if config.status == TableStatus.CREATED:
         # 允许删除已发布表，同时删除物理表
         try:
+            # rollup 物化表随源表一起删除 (配置行由外键级联删除)
+            rollup_stmt = select(TableRollup.rollup_table).where(TableRollup.table_id == id)
+            for rollup_table in (await session.execute(rollup_stmt)).scalars().all():
+                await session.execute(text(f"DROP TABLE IF EXISTS {rollup_table}"))
+            # 已归档 (解除挂载) 的分区不再属于父表, 单独删除; Parquet 归档文件保留
+            for partition in await archived_tables(session, id):
+                await session.execute(text(f"DROP TABLE IF EXISTS {partition}"))
             # DROP TABLE IF EXISTS ... CASCADE
             # table_name is validated by regex on creation, so injection risk is minimal
             drop_sql = text(f"DROP TABLE IF EXISTS {config.table_name} CASCADE")
@@ -336,4 +892,5 @@ async def delete_table(id: int, session: AsyncSession = Depends(get_session)):
 
     await session.delete(config)
     await session.commit()
+    await invalidate_table_cache(id)
     return {"message": "Table and configuration deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,40 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.job_runner import describe_job
+from app.db.session import get_session
+from app.models.job import Job, JobStatus
+from app.schemas.job import JobListResponse, JobResponse
+
+router = APIRouter()
+
+
+@router.get("/jobs", response_model=JobListResponse)
+async def list_jobs(
+    status: Optional[JobStatus] = None,
+    kind: Optional[str] = None,
+    table_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+    session: AsyncSession = Depends(get_session)
+):
+    """最近的后台任务 (按创建时间倒序)"""
+    stmt = select(Job)
+    if status:
+        stmt = stmt.where(Job.status == status)
+    if kind:
+        stmt = stmt.where(Job.kind == kind)
+    if table_id is not None:
+        stmt = stmt.where(Job.table_id == table_id)
+    jobs = (await session.execute(stmt.order_by(Job.id.desc()).limit(limit))).scalars().all()
+    return {"items": [describe_job(job) for job in jobs]}
+
+
+@router.get("/jobs/{id}", response_model=JobResponse)
+async def get_job(id: int, session: AsyncSession = Depends(get_session)):
+    """任务状态: 当前步骤 (SQL)、耗时、结果或错误"""
+    job = await session.get(Job, id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return describe_job(job)
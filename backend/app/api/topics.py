@@ -0,0 +1,176 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.message_bus import MessageBusError, message_bus
+from app.db.session import get_session
+from app.db.topics import get_topic, invalidate_topic, topic_links
+from app.models.topic import Topic
+from app.schemas.topic import (
+    AckRequest, AckResponse, ClaimRequest, ConsumeRequest, GroupCreate, MessageListResponse, OffsetRequest,
+    PublishRequest, PublishResponse, TopicCreate, TopicInfoResponse, TopicLinkResponse, TopicResponse, TopicUpdate
+)
+
+router = APIRouter()
+
+
+async def _get_topic(session: AsyncSession, name: str) -> Topic:
+    topic = await get_topic(session, name)
+    if not topic:
+        raise HTTPException(status_code=404, detail="Topic not found")
+    return topic
+
+
+def _bus_error(e: MessageBusError) -> HTTPException:
+    # 消费组不存在为 404, 其余 (偏移量格式错误等) 为 400
+    return HTTPException(status_code=404 if "does not exist" in str(e) else 400, detail=str(e))
+
+
+def _messages(messages) -> dict:
+    return {
+        "items": [{"id": m.id, "data": m.data, "deliveries": m.deliveries} for m in messages],
+        "last_id": messages[-1].id if messages else None,
+    }
+
+
+@router.get("/topic-links", response_model=List[TopicLinkResponse])
+async def list_topic_links(session: AsyncSession = Depends(get_session)):
+    """各 Topic 的生产者与消费者节点 (跨工作流), 画布据此绘制幽灵连线"""
+    return await topic_links(session)
+
+
+@router.get("/topics", response_model=List[TopicResponse])
+async def list_topics(session: AsyncSession = Depends(get_session)):
+    return (await session.execute(select(Topic).order_by(Topic.name))).scalars().all()
+
+
+@router.post("/topics", response_model=TopicResponse)
+async def create_topic(data: TopicCreate, session: AsyncSession = Depends(get_session)):
+    if await get_topic(session, data.name):
+        raise HTTPException(status_code=400, detail=f"Topic '{data.name}' already exists")
+    topic = Topic(**data.model_dump())
+    session.add(topic)
+    await session.commit()
+    await session.refresh(topic)
+    invalidate_topic(topic.name)
+    return topic
+
+
+@router.get("/topics/{name}", response_model=TopicInfoResponse)
+async def get_topic_info(name: str, session: AsyncSession = Depends(get_session)):
+    """Topic 配置、消息数、各消费组的积压 (lag) 与待确认数, 以及引用它的节点"""
+    topic = await _get_topic(session, name)
+    links = await topic_links(session, name)
+    return {
+        **TopicResponse.model_validate(topic).model_dump(),
+        **await message_bus.info(name),
+        "producers": links[0]["producers"] if links else [],
+        "consumers": links[0]["consumers"] if links else [],
+    }
+
+
+@router.put("/topics/{name}", response_model=TopicResponse)
+async def update_topic(name: str, data: TopicUpdate, session: AsyncSession = Depends(get_session)):
+    """只更新请求中给出的字段; 新的 max_length 在下一次发布时生效"""
+    topic = await _get_topic(session, name)
+    for key, value in data.model_dump(exclude_unset=True).items():
+        setattr(topic, key, value)
+    await session.commit()
+    await session.refresh(topic)
+    invalidate_topic(name)
+    return topic
+
+
+@router.delete("/topics/{name}")
+async def delete_topic(name: str, session: AsyncSession = Depends(get_session)):
+    """删除 Topic 及其全部消息与消费组"""
+    topic = await _get_topic(session, name)
+    await session.delete(topic)
+    await session.commit()
+    invalidate_topic(name)
+    await message_bus.delete_topic(name)
+    return {"message": "Topic deleted"}
+
+
+@router.post("/topics/{name}/messages", response_model=PublishResponse)
+async def publish_messages(name: str, data: PublishRequest, session: AsyncSession = Depends(get_session)):
+    """批量发布, 返回各消息的 id (与请求中的顺序一致)"""
+    topic = await _get_topic(session, name)
+    return {"ids": await message_bus.publish(name, data.messages, max_length=topic.max_length)}
+
+
+@router.get("/topics/{name}/messages", response_model=MessageListResponse)
+async def read_messages(
+    name: str,
+    after: Optional[str] = Query(None, description="从该消息 id 之后开始读取, 为空时从最早保留的消息开始"),
+    count: int = Query(100, ge=1, le=10000),
+    session: AsyncSession = Depends(get_session),
+):
+    """按偏移量回放消息 (不影响消费组); 以返回的 last_id 作为下一页的 after"""
+    await _get_topic(session, name)
+    try:
+        return _messages(await message_bus.read(name, after, count))
+    except MessageBusError as e:
+        raise _bus_error(e)
+
+
+@router.post("/topics/{name}/groups")
+async def create_group(name: str, data: GroupCreate, session: AsyncSession = Depends(get_session)):
+    await _get_topic(session, name)
+    try:
+        created = await message_bus.create_group(name, data.group, data.start)
+    except MessageBusError as e:
+        raise _bus_error(e)
+    if not created:
+        raise HTTPException(status_code=400, detail=f"Consumer group '{data.group}' already exists")
+    return {"message": "Consumer group created"}
+
+
+@router.delete("/topics/{name}/groups/{group}")
+async def delete_group(name: str, group: str, session: AsyncSession = Depends(get_session)):
+    await _get_topic(session, name)
+    if not await message_bus.delete_group(name, group):
+        raise HTTPException(status_code=404, detail="Consumer group not found")
+    return {"message": "Consumer group deleted"}
+
+
+@router.post("/topics/{name}/groups/{group}/consume", response_model=MessageListResponse)
+async def consume_messages(name: str, group: str, data: ConsumeRequest, session: AsyncSession = Depends(get_session)):
+    """读取该组尚未投递的消息 (最多 count 条); 处理完成后调用 ack, 否则消息留在待确认列表中"""
+    await _get_topic(session, name)
+    try:
+        return _messages(await message_bus.consume(name, group, data.consumer, data.count, data.block_ms))
+    except MessageBusError as e:
+        raise _bus_error(e)
+
+
+@router.post("/topics/{name}/groups/{group}/ack", response_model=AckResponse)
+async def ack_messages(name: str, group: str, data: AckRequest, session: AsyncSession = Depends(get_session)):
+    await _get_topic(session, name)
+    try:
+        return {"acked": await message_bus.ack(name, group, data.ids)}
+    except MessageBusError as e:
+        raise _bus_error(e)
+
+
+@router.post("/topics/{name}/groups/{group}/claim", response_model=MessageListResponse)
+async def claim_messages(name: str, group: str, data: ClaimRequest, session: AsyncSession = Depends(get_session)):
+    """把超时未确认的消息转交给 consumer (原消费者退出或卡住时)"""
+    await _get_topic(session, name)
+    try:
+        return _messages(await message_bus.claim(name, group, data.consumer, data.min_idle_ms, data.count))
+    except MessageBusError as e:
+        raise _bus_error(e)
+
+
+@router.post("/topics/{name}/groups/{group}/offset")
+async def set_group_offset(name: str, group: str, data: OffsetRequest, session: AsyncSession = Depends(get_session)):
+    """移动消费组的位置, e.g. 回到某个消息 id 重新消费"""
+    await _get_topic(session, name)
+    try:
+        await message_bus.set_offset(name, group, data.offset)
+    except MessageBusError as e:
+        raise _bus_error(e)
+    return {"message": "Offset updated"}
@@ -0,0 +1,153 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_session
+from app.db.workflow_runs import describe_run, get_node_runs, start_run
+from app.engine import GraphError, load_graph
+from app.engine.nodes import node_types
+from app.models.workflow import Workflow, WorkflowRun
+from app.schemas.workflow import (
+    GraphPlanResponse, GraphValidateRequest, NodeTypeResponse, WorkflowCreate, WorkflowResponse,
+    WorkflowRunAccepted, WorkflowRunListResponse, WorkflowRunRequest, WorkflowRunResponse, WorkflowSummary,
+    WorkflowUpdate
+)
+
+router = APIRouter()
+
+
+async def _get_workflow(session: AsyncSession, id: int) -> Workflow:
+    workflow = await session.get(Workflow, id)
+    if not workflow:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return workflow
+
+
+async def _check_name(session: AsyncSession, name: str, exclude_id: int | None = None):
+    stmt = select(Workflow.id).where(Workflow.name == name)
+    if exclude_id is not None:
+        stmt = stmt.where(Workflow.id != exclude_id)
+    if (await session.execute(stmt)).first():
+        raise HTTPException(status_code=400, detail=f"Workflow '{name}' already exists")
+
+
+@router.get("/workflow-node-types", response_model=List[NodeTypeResponse])
+async def list_node_types():
+    """已注册的节点类型 (画布的节点面板)"""
+    return [
+        {
+            "type": name,
+            "container": spec.container,
+            "requires_body": spec.requires_body,
+            "streams": spec.streams,
+            "description": (spec.fn.__doc__ or "").strip().split("\n")[0] or None,
+        }
+        for name, spec in sorted(node_types().items())
+    ]
+
+
+@router.post("/workflows/validate", response_model=GraphPlanResponse)
+async def validate_workflow_graph(data: GraphValidateRequest):
+    """校验图并返回执行分层 (不保存)"""
+    try:
+        graph = load_graph(data.graph)
+    except GraphError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"node_count": len(graph.nodes), "levels": graph.levels()}
+
+
+@router.get("/workflows", response_model=List[WorkflowSummary])
+async def list_workflows(session: AsyncSession = Depends(get_session)):
+    stmt = select(
+        Workflow.id, Workflow.name, Workflow.description, Workflow.max_concurrency, Workflow.updated_at,
+        func.coalesce(func.jsonb_array_length(Workflow.graph["nodes"]), 0).label("node_count"),
+    ).order_by(Workflow.id)
+    return [dict(row) for row in (await session.execute(stmt)).mappings().all()]
+
+
+@router.post("/workflows", response_model=WorkflowResponse)
+async def create_workflow(data: WorkflowCreate, session: AsyncSession = Depends(get_session)):
+    await _check_name(session, data.name)
+    workflow = Workflow(**data.model_dump())
+    session.add(workflow)
+    await session.commit()
+    await session.refresh(workflow)
+    return workflow
+
+
+@router.get("/workflows/{id}", response_model=WorkflowResponse)
+async def get_workflow(id: int, session: AsyncSession = Depends(get_session)):
+    return await _get_workflow(session, id)
+
+
+@router.put("/workflows/{id}", response_model=WorkflowResponse)
+async def update_workflow(id: int, data: WorkflowUpdate, session: AsyncSession = Depends(get_session)):
+    """只更新请求中给出的字段; 进行中的运行使用启动时的图快照, 不受影响"""
+    workflow = await _get_workflow(session, id)
+    changes = data.model_dump(exclude_unset=True)
+    if changes.get("name") is not None:
+        await _check_name(session, changes["name"], exclude_id=id)
+    for key in ("name", "graph"):
+        if key in changes and changes[key] is None:
+            raise HTTPException(status_code=400, detail=f"{key} cannot be null")
+    for key, value in changes.items():
+        setattr(workflow, key, value)
+    await session.commit()
+    await session.refresh(workflow)
+    return workflow
+
+
+@router.delete("/workflows/{id}")
+async def delete_workflow(id: int, session: AsyncSession = Depends(get_session)):
+    """删除工作流及其运行记录"""
+    workflow = await _get_workflow(session, id)
+    await session.delete(workflow)
+    await session.commit()
+    return {"message": "Workflow deleted"}
+
+
+@router.post("/workflows/{id}/runs", status_code=202, response_model=WorkflowRunAccepted)
+async def run_workflow(request: Request, id: int, data: WorkflowRunRequest, session: AsyncSession = Depends(get_session)):
+    """启动一次运行 (后台任务), 通过 status_url 查询运行状态与各节点耗时"""
+    workflow = await _get_workflow(session, id)
+    try:
+        load_graph(workflow.graph)
+    except GraphError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid workflow graph: {e}")
+    run, job = await start_run(session, workflow, data.inputs)
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={
+        "run_id": run.id,
+        "job_id": job.id,
+        "status": run.status.value,
+        "status_url": request.app.url_path_for("get_workflow_run", run_id=run.id),
+    })
+
+
+@router.get("/workflows/{id}/runs", response_model=WorkflowRunListResponse)
+async def list_workflow_runs(
+    id: int,
+    limit: int = Query(20, ge=1, le=200),
+    session: AsyncSession = Depends(get_session),
+):
+    """最近的运行 (不含节点明细)"""
+    await _get_workflow(session, id)
+    stmt = select(WorkflowRun).where(WorkflowRun.workflow_id == id).order_by(WorkflowRun.id.desc()).limit(limit)
+    runs = (await session.execute(stmt)).scalars().all()
+    return {"items": [describe_run(run) for run in runs]}
+
+
+@router.get("/workflow-runs/{run_id}", response_model=WorkflowRunResponse)
+async def get_workflow_run(
+    run_id: int,
+    loop_nodes: bool = Query(False, description="包含循环体内各轮的节点记录"),
+    session: AsyncSession = Depends(get_session),
+):
+    """运行状态、输出与各节点的执行记录 (状态、等待并发名额的时间、执行耗时)"""
+    run = await session.get(WorkflowRun, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Workflow run not found")
+    nodes = await get_node_runs(session, run_id, loop_nodes=loop_nodes)
+    return describe_run(run, nodes)
@@ -0,0 +1,204 @@
+"""
+元数据接口的响应缓存 (ETag / If-None-Match)。
+
+缓存的是序列化后的 JSON 响应体，命中时不访问数据库、不经过 pydantic。
+失效基于标签版本号: 每个缓存项记录写入时各标签的版本，写操作对标签 +1，
+读取时版本不一致即视为未命中。读取开始前先取版本号，因此与写操作并发的读不会把旧数据写回缓存。
+
+默认使用进程内存储 (多 worker 部署时各进程独立失效不可见)，配置 REDIS_URL 后改用 Redis 共享。
+响应体由 json_dumps (orjson) 序列化一次后缓存; 较大的响应按 Accept-Encoding 压缩 (见 app.core.compression)。
+"""
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app.core.compression import encode_body
+from app.core.config import settings
+from app.core.serialization import json_dumps
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES_TAG = "categories"
+TABLES_TAG = "tables"
+
+
+def table_tag(table_id: int) -> str:
+    return f"table:{table_id}"
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    etag: str
+    versions: Dict[str, int]
+
+
+class MemoryCacheBackend:
+    """进程内 LRU + TTL。"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, CacheEntry]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        return {tag: self._versions.get(tag, 0) for tag in tags}
+
+    async def bump(self, tags: Iterable[str]):
+        for tag in tags:
+            self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    async def clear(self):
+        self._entries.clear()
+        self._versions.clear()
+
+
+class RedisCacheBackend:
+    """Redis 存储，多 worker 共享缓存与失效。"""
+
+    PREFIX = "qf:cache:"
+
+    def __init__(self, url: str, ttl_seconds: int):
+        import redis.asyncio as redis
+
+        self.ttl_seconds = ttl_seconds
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        raw = await self._redis.get(self.PREFIX + "e:" + key)
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        return CacheEntry(body=data["body"].encode(), etag=data["etag"], versions=data["versions"])
+
+    async def set(self, key: str, entry: CacheEntry):
+        raw = json.dumps({"body": entry.body.decode(), "etag": entry.etag, "versions": entry.versions})
+        await self._redis.set(self.PREFIX + "e:" + key, raw, ex=self.ttl_seconds)
+
+    async def versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        tags = list(tags)
+        values = await self._redis.mget([self.PREFIX + "v:" + t for t in tags])
+        return {tag: int(v or 0) for tag, v in zip(tags, values)}
+
+    async def bump(self, tags: Iterable[str]):
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(self.PREFIX + "v:" + tag)
+            await pipe.execute()
+
+    async def clear(self):
+        async for key in self._redis.scan_iter(match=self.PREFIX + "*"):
+            await self._redis.delete(key)
+
+
+class ResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def lookup(self, key: str, tags: Iterable[str]) -> Tuple[Optional[CacheEntry], Dict[str, int]]:
+        """返回 (有效缓存项或 None, 当前标签版本)。缓存后端异常时按未命中处理。"""
+        try:
+            versions = await self.backend.versions(tags)
+            entry = await self.backend.get(key)
+        except Exception:
+            logger.exception("Response cache lookup failed")
+            return None, {}
+        if entry is not None and entry.versions == versions:
+            return entry, versions
+        return None, versions
+
+    async def store(self, key: str, body: bytes, versions: Dict[str, int]) -> CacheEntry:
+        entry = CacheEntry(body=body, etag=f'"{hashlib.sha1(body).hexdigest()}"', versions=versions)
+        if versions:
+            try:
+                await self.backend.set(key, entry)
+            except Exception:
+                logger.exception("Response cache store failed")
+        return entry
+
+    async def invalidate(self, *tags: str):
+        try:
+            await self.backend.bump(tags)
+        except Exception:
+            logger.exception(f"Response cache invalidation failed for {tags}")
+
+
+def _create_backend():
+    if settings.REDIS_URL:
+        return RedisCacheBackend(settings.REDIS_URL, settings.RESPONSE_CACHE_TTL_SECONDS)
+    return MemoryCacheBackend(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_TTL_SECONDS)
+
+
+response_cache = ResponseCache(_create_backend())
+
+
+def cache_key(request: Request) -> str:
+    return f"{request.url.path}?{'&'.join(f'{k}={v}' for k, v in sorted(request.query_params.multi_items()))}"
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [t.strip() for t in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+async def cached_json_response(
+    request: Request,
+    tags: Iterable[str],
+    produce: Callable[[], Awaitable[Any]],
+) -> Response:
+    """
+    以 JSON 形式返回 produce() 的结果并缓存; 命中时直接返回缓存的响应体,
+    请求带有匹配的 If-None-Match 时返回 304。
+    produce() 可以直接返回 dict/list (e.g. 查询结果行), 不经过 pydantic 校验。
+    """
+    tags = list(tags)
+    key = cache_key(request)
+    entry, versions = await response_cache.lookup(key, tags)
+    cache_status = "HIT"
+    if entry is None:
+        cache_status = "MISS"
+        payload = await produce()
+        body = json_dumps(payload)
+        entry = await response_cache.store(key, body, versions)
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "X-Cache": cache_status, "Vary": "Accept-Encoding"}
+    if _etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    body, encoding = encode_body(entry.body, entry.etag, request.headers.get("accept-encoding"))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def invalidate_table_cache(table_id: Optional[int] = None):
+    tags = [TABLES_TAG]
+    if table_id is not None:
+        tags.append(table_tag(table_id))
+    await response_cache.invalidate(*tags)
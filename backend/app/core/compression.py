@@ -0,0 +1,88 @@
+"""
+JSON 响应体压缩 (按请求的 Accept-Encoding 协商)。
+
+优先 zstd (需要可选依赖 zstandard), 其次 gzip; 小于 RESPONSE_COMPRESSION_MIN_BYTES 的响应不压缩。
+同一响应体 (以 ETag 标识) 的压缩结果在进程内缓存, 缓存命中的大列表不会每次重新压缩。
+"""
+import gzip
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.core.config import settings
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 取决于安装环境
+    zstandard = None
+
+
+def supported_encodings() -> Tuple[str, ...]:
+    return ("zstd", "gzip") if zstandard is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """从 Accept-Encoding 中选出支持的编码 (q 值最高者, 相同时按 supported_encodings 的顺序), 都不接受时返回 None"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=settings.RESPONSE_ZSTD_LEVEL).compress(body)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+class CompressedBodyCache:
+    """(etag, encoding) -> 压缩后的响应体, LRU"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+
+    def get_or_compress(self, etag: str, encoding: str, body: bytes) -> bytes:
+        key = (etag, encoding)
+        compressed = self._entries.get(key)
+        if compressed is None:
+            compressed = compress(body, encoding)
+            self._entries[key] = compressed
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+        return compressed
+
+    def clear(self):
+        self._entries.clear()
+
+
+compressed_bodies = CompressedBodyCache(settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+def encode_body(body: bytes, etag: str, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """返回 (响应体, Content-Encoding 或 None)"""
+    min_bytes = settings.RESPONSE_COMPRESSION_MIN_BYTES
+    if min_bytes <= 0 or len(body) < min_bytes:
+        return body, None
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding is None:
+        return body, None
+    return compressed_bodies.get_or_compress(etag, encoding, body), encoding
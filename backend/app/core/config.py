@@ -1,14 +1,116 @@
+from typing import Dict, Optional, Tuple
+
+from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+
+def parse_rate_limits(value: str) -> Dict[str, Tuple[float, int]]:
+    """WORKFLOW_HOST_RATE_LIMITS: "api.tushare.pro=3,data.example.com=10:20" -> {host: (每秒次数, burst)}"""
+    limits = {}
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        host, _, spec = part.partition("=")
+        rate, _, burst = spec.partition(":")
+        try:
+            rate, burst = float(rate), int(burst) if burst else 1
+        except ValueError:
+            raise ValueError(f"Invalid rate limit '{part}', expected host=rate[:burst]") from None
+        if not host.strip() or not rate > 0 or burst < 1:
+            raise ValueError(f"Invalid rate limit '{part}', rate must be > 0 and burst >= 1")
+        limits[host.strip()] = (rate, burst)
+    return limits
+
+
 class Settings(BaseSettings):
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
     POSTGRES_SERVER: str
     POSTGRES_PORT: str = "5432"
     POSTGRES_DB: str
+
+    # 连接池: 常驻连接数 / 溢出上限 / 取连接等待超时 (秒) / 连接回收周期 (秒) / 取出前探活
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # asyncpg 预编译语句缓存大小, 经 pgbouncer (transaction 模式) 连接时设为 0
+    DB_STATEMENT_CACHE_SIZE: int = 100
+
+    # 分区维护 (补建未来分区) 的执行间隔, 0 表示禁用
+    PARTITION_MAINTENANCE_INTERVAL_SECONDS: int = 3600
+
+    # 在线列类型迁移: 每批回填行数 / 批间休眠 / 切换时的锁等待上限
+    ONLINE_MIGRATION_BATCH_SIZE: int = 5000
+    ONLINE_MIGRATION_THROTTLE_MS: int = 50
+    ONLINE_MIGRATION_LOCK_TIMEOUT_MS: int = 3000
+
+    # upsert 写入时每批 COPY 到暂存表并合并的行数
+    INGEST_UPSERT_BATCH_ROWS: int = 100_000
+
+    # Parquet 导出: 数据集根目录 / 并行读取的分区数 (每个分区占用一个连接) / 每批读取行数
+    EXPORT_ROOT: str = "exports"
+    EXPORT_PARALLELISM: int = 4
+    EXPORT_BATCH_ROWS: int = 50_000
+
+    # 聚合 rollup 的增量刷新间隔, 0 表示禁用 (只能通过接口手动刷新)
+    ROLLUP_REFRESH_INTERVAL_SECONDS: int = 60
+
+    # 分区生命周期策略 (冷热分层 / 保留) 的执行间隔, 0 表示禁用 (只能通过接口触发);
+    # 移动表空间 / 解除挂载 / 删除分区等待表锁的超时 (毫秒), 超时的分区下次再处理
+    LIFECYCLE_INTERVAL_SECONDS: int = 3600
+    LIFECYCLE_LOCK_TIMEOUT_MS: int = 5000
+
+    # 批量发布时同时处理的表数 (每张表最多占用 3 个连接);
+    # 所有发布合计不超过 (DB_POOL_SIZE + DB_MAX_OVERFLOW - PUBLISH_POOL_RESERVE) // 3 张表, 预留的连接留给请求与其它任务
+    PUBLISH_CONCURRENCY: int = 4
+    PUBLISH_POOL_RESERVE: int = 6
+
+    # 工作流: 一次运行中同时执行的节点数上限 (工作流可单独配置);
+    # function 节点允许调用的模块前缀 (逗号分隔, e.g. "etl,strategies"), 为空表示不允许调用任何模块
+    WORKFLOW_MAX_CONCURRENCY: int = 16
+    WORKFLOW_CALLABLE_MODULES: str = ""
+    # process 节点的工作进程数 (0 表示 CPU 核数); 传给工作进程的数组 / 表达到该字节数时经共享内存传递, 否则 pickle
+    WORKFLOW_PROCESS_WORKERS: int = 0
+    WORKFLOW_SHARED_MEMORY_MIN_BYTES: int = 65536
+    # thread 节点中同步函数 (IO) 的线程数; 按 host 的默认限速, "host=每秒次数[:burst]" 逗号分隔
+    # (e.g. "api.tushare.pro=3,data.example.com=10:20", 每秒次数 > 0, burst >= 1, 加载时校验), 节点的 rate_limit 配置优先
+    WORKFLOW_IO_THREADS: int = 64
+    WORKFLOW_HOST_RATE_LIMITS: str = ""
+    # table_sink 节点: 每批写入的行数 / 不满一批时最多等待的秒数 / 等待写入的批次上限 (达到后对上游施加背压)
+    WORKFLOW_SINK_BATCH_ROWS: int = 5000
+    WORKFLOW_SINK_FLUSH_SECONDS: float = 1.0
+    WORKFLOW_SINK_MAX_PENDING_BATCHES: int = 2
+
+    # 后台任务 (发布 / 同步 / 回填): 本进程的 worker 数 (0 表示只入队, 由其它进程执行)、
+    # 进度写回间隔 (秒)、心跳超过该时长 (秒) 的运行中任务视为 worker 已退出
+    JOB_WORKERS: int = 2
+    JOB_HEARTBEAT_SECONDS: int = 5
+    JOB_STALE_SECONDS: int = 120
+
+    # 慢 SQL 日志阈值 (毫秒, 0 表示关闭) 与日志中语句的最大长度
+    SLOW_SQL_THRESHOLD_MS: int = 500
+    SLOW_SQL_MAX_LENGTH: int = 1000
+
+    # 元数据接口响应缓存; 配置 REDIS_URL (e.g. redis://localhost:6379/0) 后多 worker 共享缓存与失效,
+    # 后台任务队列与消息总线 (Topic) 也改用 Redis
+    REDIS_URL: Optional[str] = None
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    # 表列表中物理表统计 (行数/大小/vacuum) 的进程内缓存时长 (秒)
+    TABLE_STATS_TTL_SECONDS: int = 300
+    # 元数据接口响应体压缩: 不小于该字节数时按 Accept-Encoding 使用 zstd (需安装 zstandard) 或 gzip, 0 表示关闭
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024
+    RESPONSE_GZIP_LEVEL: int = 5
+    RESPONSE_ZSTD_LEVEL: int = 3
     
     model_config = SettingsConfigDict(env_file=".env")
 
+    @field_validator("WORKFLOW_HOST_RATE_LIMITS")
+    @classmethod
+    def _check_rate_limits(cls, value: str) -> str:
+        parse_rate_limits(value)
+        return value
+
     @property
     def DATABASE_URL(self) -> str:
         return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
@@ -0,0 +1,109 @@
+"""
+后台任务队列与任务上下文。
+
+队列只传递任务 id，任务状态与参数存放在 jobs 表中:
+    - 配置了 REDIS_URL 时使用 Redis 列表 (多进程共享，API 进程入队、任意 worker 进程消费)
+    - 否则使用进程内 asyncio.Queue (重启后由 worker 从 jobs 表重新入队未执行的任务)
+同一任务可能被重复投递 (重新入队 / 多进程恢复)，由 worker 领取时的条件更新保证只执行一次。
+
+任务执行期间通过 contextvar 持有 JobContext，DDL / 回填等代码调用 set_job_step 报告当前步骤，
+无任务上下文时为空操作。
+"""
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from app.core.config import settings
+
+# 步骤描述 (通常为正在执行的 SQL) 的最大长度
+MAX_STEP_LENGTH = 2000
+
+
+class MemoryJobQueue:
+    """进程内队列，仅当前进程的 worker 可见。"""
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        # 延迟创建, 绑定到实际运行的事件循环
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    async def put(self, job_id: int):
+        self.queue.put_nowait(job_id)
+
+    async def get(self, timeout: float) -> Optional[int]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class RedisJobQueue:
+    """Redis 列表 (LPUSH / BRPOP)，多进程共享。"""
+
+    KEY = "qf:jobs:queue"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+
+    async def put(self, job_id: int):
+        await self._redis.lpush(self.KEY, job_id)
+
+    async def get(self, timeout: float) -> Optional[int]:
+        item = await self._redis.brpop([self.KEY], timeout=max(int(timeout), 1))
+        if item is None:
+            return None
+        return int(item[1])
+
+
+def _create_queue():
+    if settings.REDIS_URL:
+        return RedisJobQueue(settings.REDIS_URL)
+    return MemoryJobQueue()
+
+
+job_queue = _create_queue()
+
+
+class JobContext:
+    """正在执行的任务的进度; step 由 worker 的心跳定期写回 jobs 表。"""
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self.step: Optional[str] = None
+        self.dirty = False
+
+    def set_step(self, step: str):
+        self.step = step[:MAX_STEP_LENGTH]
+        self.dirty = True
+
+
+_current_job: ContextVar[Optional[JobContext]] = ContextVar("qf_current_job", default=None)
+
+
+def current_job() -> Optional[JobContext]:
+    return _current_job.get()
+
+
+@contextmanager
+def job_context(job_id: int) -> Iterator[JobContext]:
+    ctx = JobContext(job_id)
+    token = _current_job.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current_job.reset(token)
+
+
+def set_job_step(step: str):
+    """报告当前任务正在执行的步骤; 不在任务中执行时忽略。"""
+    ctx = _current_job.get()
+    if ctx is not None:
+        ctx.set_step(" ".join(step.split()))
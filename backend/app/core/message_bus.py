@@ -0,0 +1,360 @@
+"""
+消息总线: Topic 的发布 / 订阅, 由 /topics 接口与工作流的 producer / consumer 节点共用。
+
+    - 配置了 REDIS_URL 时使用 Redis Streams (多进程共享、持久化): 每个 Topic 一个 stream (qf:topic:<name>),
+      每个订阅方一个消费组, 组内多个消费者分摊消息; 消息在确认 (ack) 前保留在组的待确认列表中,
+      消费者退出后由 claim 转交其它消费者; read 从任意偏移量回放, set_offset 把消费组移到指定偏移量重新消费
+    - 否则使用进程内实现 (接口与语义相同, 仅当前进程可见, 重启后丢失), 用于测试与单机部署
+批量: publish 一次写入多条消息 (Redis 管道, 一次往返), consume 一次读取最多 count 条, ack 一次确认多条;
+行情分发给多个策略时每个策略一个消费组, 一次 publish 即对所有组可见。
+消息 id 为 "<毫秒时间戳>-<序号>", 在 Topic 内递增, 可以作为回放的偏移量。
+"""
+import asyncio
+import bisect
+import json
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.core.serialization import json_dumps
+
+ID_PATTERN = re.compile(r"^\d+(-\d+)?$")
+TOPIC_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_.:-]{0,127}$")
+
+
+class MessageBusError(ValueError):
+    """消费组不存在、偏移量格式错误等。"""
+
+
+@dataclass
+class Message:
+    id: str
+    data: Any
+    deliveries: Optional[int] = None  # 在消费组中的投递次数 (consume / claim 返回时)
+
+
+def parse_id(value: str) -> Tuple[int, int]:
+    if not ID_PATTERN.match(value or ""):
+        raise MessageBusError(f"Invalid message id '{value}', expected '<ms>-<seq>'")
+    ms, _, seq = value.partition("-")
+    return int(ms), int(seq or 0)
+
+
+def format_id(value: Tuple[int, int]) -> str:
+    return f"{value[0]}-{value[1]}"
+
+
+class _MemoryGroup:
+    def __init__(self, last: Tuple[int, int]):
+        self.last = last
+        # id -> [consumer, 投递时间, 投递次数], 按投递顺序
+        self.pending: "OrderedDict[Tuple[int, int], list]" = OrderedDict()
+        self.consumers: set = set()
+
+
+class _MemoryStream:
+    def __init__(self):
+        self.ids: List[Tuple[int, int]] = []
+        self.data: List[Any] = []
+        self.last: Tuple[int, int] = (0, 0)
+        self.groups: Dict[str, _MemoryGroup] = {}
+        self.waiters: List[asyncio.Future] = []
+
+    def after(self, last: Tuple[int, int]) -> int:
+        return bisect.bisect_right(self.ids, last)
+
+    def index(self, message_id: Tuple[int, int]) -> Optional[int]:
+        index = bisect.bisect_left(self.ids, message_id)
+        if index < len(self.ids) and self.ids[index] == message_id:
+            return index
+        return None
+
+
+class MemoryMessageBus:
+    """进程内实现, 仅当前进程可见。"""
+
+    def __init__(self):
+        self._streams: Dict[str, _MemoryStream] = {}
+
+    def _stream(self, topic: str) -> _MemoryStream:
+        stream = self._streams.get(topic)
+        if stream is None:
+            stream = self._streams[topic] = _MemoryStream()
+        return stream
+
+    def _group(self, topic: str, group: str) -> _MemoryGroup:
+        stream = self._streams.get(topic)
+        if stream is None or group not in stream.groups:
+            raise MessageBusError(f"Consumer group '{group}' does not exist on topic '{topic}'")
+        return stream.groups[group]
+
+    def _resolve(self, stream: _MemoryStream, start: str) -> Tuple[int, int]:
+        return stream.last if start == "$" else parse_id(start)
+
+    async def publish(self, topic: str, messages: Sequence[Any], max_length: Optional[int] = None) -> List[str]:
+        stream = self._stream(topic)
+        ids = []
+        for message in messages:
+            ms = int(time.time() * 1000)
+            stream.last = (ms, 0) if ms > stream.last[0] else (stream.last[0], stream.last[1] + 1)
+            stream.ids.append(stream.last)
+            # 与 Redis 一致: 存储序列化后的副本, 发布方之后修改对象不影响消息
+            stream.data.append(json.loads(json_dumps(message)))
+            ids.append(format_id(stream.last))
+        if max_length is not None and len(stream.ids) > max_length:
+            excess = len(stream.ids) - max_length
+            del stream.ids[:excess], stream.data[:excess]
+        waiters, stream.waiters = stream.waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        return ids
+
+    async def create_group(self, topic: str, group: str, start: str = "$") -> bool:
+        stream = self._stream(topic)
+        if group in stream.groups:
+            return False
+        stream.groups[group] = _MemoryGroup(self._resolve(stream, start))
+        return True
+
+    async def delete_group(self, topic: str, group: str) -> bool:
+        stream = self._streams.get(topic)
+        return stream is not None and stream.groups.pop(group, None) is not None
+
+    async def consume(
+        self, topic: str, group: str, consumer: str, count: int = 100, block_ms: int = 0
+    ) -> List[Message]:
+        state = self._group(topic, group)
+        stream = self._streams[topic]
+        deadline = time.monotonic() + block_ms / 1000
+        while True:
+            start = stream.after(state.last)
+            if start < len(stream.ids) or time.monotonic() >= deadline:
+                break
+            waiter = asyncio.get_running_loop().create_future()
+            stream.waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                pass
+            state = self._group(topic, group)
+
+        state.consumers.add(consumer)
+        now = time.monotonic()
+        messages = []
+        for index in range(start, min(start + count, len(stream.ids))):
+            message_id = stream.ids[index]
+            state.pending[message_id] = [consumer, now, 1]
+            messages.append(Message(format_id(message_id), stream.data[index], 1))
+        if messages:
+            state.last = stream.ids[start + len(messages) - 1]
+        return messages
+
+    async def ack(self, topic: str, group: str, ids: Sequence[str]) -> int:
+        state = self._group(topic, group)
+        return sum(state.pending.pop(parse_id(i), None) is not None for i in ids)
+
+    async def claim(
+        self, topic: str, group: str, consumer: str, min_idle_ms: int, count: int = 100
+    ) -> List[Message]:
+        state = self._group(topic, group)
+        stream = self._streams[topic]
+        now = time.monotonic()
+        messages = []
+        for message_id, entry in list(state.pending.items()):
+            if len(messages) >= count:
+                break
+            if (now - entry[1]) * 1000 < min_idle_ms:
+                continue
+            index = stream.index(message_id)
+            if index is None:
+                # 已被裁剪的消息无法再投递
+                del state.pending[message_id]
+                continue
+            entry[0], entry[1], entry[2] = consumer, now, entry[2] + 1
+            messages.append(Message(format_id(message_id), stream.data[index], entry[2]))
+        state.consumers.add(consumer)
+        return messages
+
+    async def read(self, topic: str, after: Optional[str] = None, count: int = 100) -> List[Message]:
+        stream = self._streams.get(topic)
+        if stream is None:
+            return []
+        start = stream.after(parse_id(after)) if after else 0
+        return [
+            Message(format_id(stream.ids[i]), stream.data[i])
+            for i in range(start, min(start + count, len(stream.ids)))
+        ]
+
+    async def set_offset(self, topic: str, group: str, offset: str):
+        state = self._group(topic, group)
+        state.last = self._resolve(self._streams[topic], offset)
+
+    async def info(self, topic: str) -> Dict[str, Any]:
+        stream = self._streams.get(topic) or _MemoryStream()
+        return {
+            "length": len(stream.ids),
+            "first_id": format_id(stream.ids[0]) if stream.ids else None,
+            "last_id": format_id(stream.last) if stream.last != (0, 0) else None,
+            "groups": [
+                {
+                    "name": name,
+                    "consumers": len(state.consumers),
+                    "pending": len(state.pending),
+                    "last_delivered_id": format_id(state.last),
+                    "lag": len(stream.ids) - stream.after(state.last),
+                }
+                for name, state in stream.groups.items()
+            ],
+        }
+
+    async def delete_topic(self, topic: str):
+        self._streams.pop(topic, None)
+
+
+class RedisMessageBus:
+    """Redis Streams, 多进程共享。"""
+
+    PREFIX = "qf:topic:"
+    FIELD = "d"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        from redis.exceptions import ResponseError
+
+        self._redis = redis.from_url(url)
+        self._response_error = ResponseError
+
+    def _key(self, topic: str) -> str:
+        return self.PREFIX + topic
+
+    def _message(self, message_id: bytes, fields: Optional[Dict[bytes, bytes]], deliveries: Optional[int] = None):
+        raw = (fields or {}).get(self.FIELD.encode())
+        return Message(message_id.decode(), json.loads(raw) if raw is not None else None, deliveries)
+
+    def _check_group(self, e: Exception, topic: str, group: str):
+        if "NOGROUP" in str(e):
+            raise MessageBusError(f"Consumer group '{group}' does not exist on topic '{topic}'") from None
+        raise e
+
+    async def publish(self, topic: str, messages: Sequence[Any], max_length: Optional[int] = None) -> List[str]:
+        # 一批消息在一个管道中写入 (一次往返); MAXLEN ~ 按整块裁剪, 开销小于精确裁剪
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for message in messages:
+                pipe.xadd(self._key(topic), {self.FIELD: json_dumps(message)}, maxlen=max_length, approximate=True)
+            ids = await pipe.execute()
+        return [i.decode() for i in ids]
+
+    async def create_group(self, topic: str, group: str, start: str = "$") -> bool:
+        if start != "$":
+            parse_id(start)
+        try:
+            await self._redis.xgroup_create(self._key(topic), group, id=start, mkstream=True)
+        except self._response_error as e:
+            if "BUSYGROUP" in str(e):
+                return False
+            raise
+        return True
+
+    async def delete_group(self, topic: str, group: str) -> bool:
+        try:
+            return bool(await self._redis.xgroup_destroy(self._key(topic), group))
+        except self._response_error:
+            return False
+
+    async def consume(
+        self, topic: str, group: str, consumer: str, count: int = 100, block_ms: int = 0
+    ) -> List[Message]:
+        try:
+            # BLOCK 0 表示无限等待, 不等待时不传 BLOCK
+            response = await self._redis.xreadgroup(
+                group, consumer, {self._key(topic): ">"}, count=count, block=block_ms or None
+            )
+        except self._response_error as e:
+            self._check_group(e, topic, group)
+        if not response:
+            return []
+        return [self._message(message_id, fields, 1) for message_id, fields in response[0][1]]
+
+    async def ack(self, topic: str, group: str, ids: Sequence[str]) -> int:
+        if not ids:
+            return 0
+        for i in ids:
+            parse_id(i)
+        return await self._redis.xack(self._key(topic), group, *ids)
+
+    async def claim(
+        self, topic: str, group: str, consumer: str, min_idle_ms: int, count: int = 100
+    ) -> List[Message]:
+        key = self._key(topic)
+        try:
+            response = await self._redis.xautoclaim(key, group, consumer, min_idle_ms, start_id="0-0", count=count)
+        except self._response_error as e:
+            self._check_group(e, topic, group)
+        claimed = [(message_id, fields) for message_id, fields in response[1] if fields is not None]
+        if not claimed:
+            return []
+        # 投递次数在待确认列表中
+        pending = await self._redis.xpending_range(
+            key, group, min=claimed[0][0], max=claimed[-1][0], count=len(claimed), consumername=consumer
+        )
+        deliveries = {p["message_id"]: p["times_delivered"] for p in pending}
+        return [self._message(message_id, fields, deliveries.get(message_id)) for message_id, fields in claimed]
+
+    async def read(self, topic: str, after: Optional[str] = None, count: int = 100) -> List[Message]:
+        if after:
+            parse_id(after)
+        response = await self._redis.xrange(self._key(topic), min=f"({after}" if after else "-", count=count)
+        return [self._message(message_id, fields) for message_id, fields in response]
+
+    async def set_offset(self, topic: str, group: str, offset: str):
+        if offset != "$":
+            parse_id(offset)
+        try:
+            await self._redis.xgroup_setid(self._key(topic), group, offset)
+        except self._response_error as e:
+            self._check_group(e, topic, group)
+
+    async def info(self, topic: str) -> Dict[str, Any]:
+        key = self._key(topic)
+        try:
+            stream = await self._redis.xinfo_stream(key)
+            groups = await self._redis.xinfo_groups(key)
+        except self._response_error:
+            # stream 不存在 (还没有发布过消息)
+            return {"length": 0, "first_id": None, "last_id": None, "groups": []}
+
+        def text(value):
+            return value.decode() if isinstance(value, bytes) else value
+
+        first = stream.get("first-entry")
+        return {
+            "length": stream["length"],
+            "first_id": text(first[0]) if first else None,
+            "last_id": text(stream["last-generated-id"]) if stream["length"] or first else None,
+            "groups": [
+                {
+                    "name": text(g["name"]),
+                    "consumers": g["consumers"],
+                    "pending": g["pending"],
+                    "last_delivered_id": text(g["last-delivered-id"]),
+                    "lag": g.get("lag"),  # Redis 7+
+                }
+                for g in groups
+            ],
+        }
+
+    async def delete_topic(self, topic: str):
+        await self._redis.delete(self._key(topic))
+
+
+def _create_bus():
+    if settings.REDIS_URL:
+        return RedisMessageBus(settings.REDIS_URL)
+    return MemoryMessageBus()
+
+
+message_bus = _create_bus()
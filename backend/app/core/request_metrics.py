@@ -0,0 +1,128 @@
+"""
+HTTP 请求指标 (纯 ASGI 中间件) 与请求上下文标签。
+
+中间件记录每个路由 (路由模板, 非原始路径) 的延迟直方图、请求/响应字节数与状态码计数；
+同时把当前请求的 scope 放入 contextvar，供 SQL 计时按路由打标签 (路由在进入应用后才匹配, 读取时再解析)。
+表名标签由处理具体物理表的代码通过 tag_table 设置。
+"""
+import time
+from contextvars import ContextVar, Token
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.core.metrics import Histogram, MetricFamily, register_collector
+
+BYTE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000, 1_000_000_000)
+
+_request_scope: ContextVar[Optional[dict]] = ContextVar("qf_request_scope", default=None)
+_table_name: ContextVar[Optional[str]] = ContextVar("qf_table_name", default=None)
+
+
+def route_of(scope: Optional[dict]) -> str:
+    if scope is None:
+        return "background"
+    route = scope.get("route")
+    # 未匹配的路径统一归类, 避免任意 URL 造成标签基数膨胀
+    return getattr(route, "path", None) or "unmatched"
+
+
+def current_route() -> str:
+    return route_of(_request_scope.get())
+
+
+def current_table() -> Optional[str]:
+    return _table_name.get()
+
+
+class _TableTag:
+    def __init__(self, token: Token):
+        self._token = token
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        _table_name.reset(self._token)
+
+
+def tag_table(table_name: Optional[str]) -> _TableTag:
+    """
+    为当前请求 / 任务上的后续 SQL 打上物理表名标签。
+    请求处理中直接调用即可 (请求结束时上下文随之丢弃); 后台循环与任务处理函数在同一个长期运行的任务上
+    依次处理多张表, 应使用 with tag_table(name): 在退出时恢复之前的标签。
+    """
+    return _TableTag(_table_name.set(table_name))
+
+
+class _RouteStats:
+    def __init__(self):
+        self.duration = Histogram()
+        self.request_bytes = Histogram(BYTE_BUCKETS)
+        self.response_bytes = Histogram(BYTE_BUCKETS)
+
+
+_route_stats: Dict[Tuple[str, str], _RouteStats] = {}
+_status_counts: Dict[Tuple[str, str, str], int] = {}
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        request_bytes = 0
+        response_bytes = 0
+
+        async def counting_receive():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        scope_token = _request_scope.set(scope)
+        table_token = _table_name.set(None)
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            _table_name.reset(table_token)
+            _request_scope.reset(scope_token)
+            key = (scope["method"], route_of(scope))
+            stats = _route_stats.get(key)
+            if stats is None:
+                stats = _route_stats[key] = _RouteStats()
+            stats.duration.observe(time.perf_counter() - started)
+            stats.request_bytes.observe(request_bytes)
+            stats.response_bytes.observe(response_bytes)
+            status_key = key + (str(status_code),)
+            _status_counts[status_key] = _status_counts.get(status_key, 0) + 1
+
+
+@register_collector
+def collect_request_metrics() -> Iterable[MetricFamily]:
+    duration = MetricFamily("qf_http_request_duration_seconds", "histogram", "HTTP request latency by route")
+    request_size = MetricFamily("qf_http_request_size_bytes", "histogram", "HTTP request body size by route")
+    response_size = MetricFamily("qf_http_response_size_bytes", "histogram", "HTTP response body size by route")
+    for (method, route), stats in sorted(_route_stats.items()):
+        labels = {"method": method, "route": route}
+        stats.duration.add_to(duration, labels)
+        stats.request_bytes.add_to(request_size, labels)
+        stats.response_bytes.add_to(response_size, labels)
+
+    requests = MetricFamily("qf_http_requests_total", "counter", "HTTP requests by route and status code")
+    for (method, route, status), count in sorted(_status_counts.items()):
+        requests.add(count, {"method": method, "route": route, "status": status})
+    return [duration, request_size, response_size, requests]
@@ -0,0 +1,42 @@
+"""
+JSON 序列化: 安装了 orjson 时使用 orjson (可选依赖), 否则退回标准库 json + jsonable_encoder。
+
+两者输出一致 (datetime 为 ISO 8601, Enum 取值, Decimal 转为数字, 非 ASCII 字符不转义),
+orjson 直接序列化 dict/list/datetime, 不需要先经过 jsonable_encoder 复制一遍结构。
+"""
+import json
+from decimal import Decimal
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 取决于安装环境
+    orjson = None
+
+
+def _orjson_default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Decimal):
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)  # 与 jsonable_encoder 相同
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return jsonable_encoder(obj)
+
+
+def json_dumps(obj: Any) -> bytes:
+    """序列化为紧凑的 UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(jsonable_encoder(obj), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """使用 json_dumps 渲染的 JSONResponse, 作为应用的默认响应类"""
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
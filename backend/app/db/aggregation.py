@@ -0,0 +1,565 @@
+"""
+行情表的服务端重采样 / 聚合 (OHLCV)。
+
+按 time_column 分桶 (date_bin / date_trunc)、按 group_by (e.g. ts_code) 分组,
+每个输出列由一个聚合函数定义:
+    {"open": "first", "high": "max", "low": "min", "close": "last", "vol": "sum", "vwap": "vwap(close, vol)"}
+聚合在 Postgres 中完成, 结果与 row_reader 一样流式编码为 NDJSON / Arrow。
+
+热点粒度可以物化为 rollup 表 (e.g. 1 分钟线 -> 5 分钟线):
+    - 水位 (watermark) 之前的桶视为已完整, 查询时直接读 rollup 表
+    - 水位之后的桶以及查询区间首尾不完整的桶实时聚合
+    - 刷新时只重算水位前 lookback_buckets 个桶之后的数据 (覆盖迟到/修正的数据)
+"""
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import types as sa_types
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.core.job_queue import set_job_step
+from app.core.request_metrics import tag_table
+from app.db.bulk_loader import make_coercer
+from app.db.ddl_generator import DDLGenerator, RANGE_PARTITION_KEY_TYPES
+from app.db.job_runner import JobError, job_handler
+from app.db.row_reader import RangeQuery
+from app.db.session import AsyncSessionLocal
+from app.models.data_table import DataTableConfig, TableRollup, TableStatus
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_REFRESH_JOB = "rollup_refresh"
+
+# advisory lock 的第一个 key (与 publisher 的锁区分); 第二个 key 为 rollup id
+ROLLUP_LOCK_NAMESPACE = 0x5147
+
+AGGREGATE_FUNCTIONS = ("first", "last", "min", "max", "sum", "vwap", "count")
+
+# date_bin 的默认对齐点: 2000-01-03 为周一, 周线从周一开始
+DEFAULT_ORIGIN = datetime(2000, 1, 3)
+
+_FIXED_UNITS = {
+    "second": timedelta(seconds=1),
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+# 按日历截断的粒度 (date_trunc), 只支持宽度 1
+_CALENDAR_MONTHS = {"month": 1, "quarter": 3, "year": 12}
+# 支持的单位写法 (含复数与缩写) -> 规范单位名; 不在表中的写法 (如 "ms") 一律拒绝, 不做前缀/去 s 猜测
+_UNIT_NAMES = {
+    "s": "second", "sec": "second", "secs": "second", "second": "second", "seconds": "second",
+    "m": "minute", "min": "minute", "mins": "minute", "minute": "minute", "minutes": "minute",
+    "h": "hour", "hour": "hour", "hours": "hour",
+    "d": "day", "day": "day", "days": "day",
+    "w": "week", "week": "week", "weeks": "week",
+    "month": "month", "months": "month",
+    "quarter": "quarter", "quarters": "quarter",
+    "year": "year", "years": "year",
+}
+_BUCKET_RE = re.compile(
+    r"^\s*(\d+)?\s*(" + "|".join(sorted(_UNIT_NAMES, key=len, reverse=True)) + r")\s*$"
+)
+_BUCKET_SHAPE_RE = re.compile(r"^\s*\d*\s*([a-z]+)\s*$")
+_IDENTIFIER_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+class AggregateError(ValueError):
+    """聚合参数无效 (分桶/列/聚合函数)。"""
+
+
+def _shift_months(d: datetime, months: int) -> datetime:
+    index = d.year * 12 + d.month - 1 + months
+    return d.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+
+@dataclass(frozen=True)
+class Bucket:
+    """桶宽度: 固定宽度 (秒 ~ 周) 用 date_bin 对齐到 origin, 月/季/年按日历截断。"""
+    count: int
+    unit: str
+
+    @classmethod
+    def parse(cls, value: str) -> "Bucket":
+        m = _BUCKET_RE.match(str(value).lower())
+        if not m:
+            shape = _BUCKET_SHAPE_RE.match(str(value).lower())
+            if shape:
+                raise AggregateError(f"Unknown bucket unit '{shape.group(1)}'")
+            raise AggregateError(f"Invalid bucket '{value}', expected e.g. '5 minutes', '1 day', '1 month'")
+        count = int(m.group(1) or 1)
+        unit = _UNIT_NAMES[m.group(2)]
+        if count < 1:
+            raise AggregateError("Bucket width must be positive")
+        if unit in _CALENDAR_MONTHS and count != 1:
+            raise AggregateError(f"'{unit}' buckets only support a width of 1")
+        return cls(count, unit)
+
+    def __str__(self) -> str:
+        return f"{self.count} {self.unit}"
+
+    @property
+    def width(self) -> Optional[timedelta]:
+        return _FIXED_UNITS[self.unit] * self.count if self.unit in _FIXED_UNITS else None
+
+    def floor(self, ts: datetime, origin: datetime = DEFAULT_ORIGIN) -> datetime:
+        """与 bucket_sql 相同的对齐规则 (naive UTC)"""
+        if self.width is not None:
+            return origin + ((ts - origin) // self.width) * self.width
+        months = _CALENDAR_MONTHS[self.unit]
+        return datetime(ts.year, (ts.month - 1) // months * months + 1, 1)
+
+    def ceil(self, ts: datetime, origin: datetime = DEFAULT_ORIGIN) -> datetime:
+        start = self.floor(ts, origin)
+        return start if start == ts else self.shift(start, 1)
+
+    def shift(self, bucket_start: datetime, n: int) -> datetime:
+        if self.width is not None:
+            return bucket_start + self.width * n
+        return _shift_months(bucket_start, _CALENDAR_MONTHS[self.unit] * n)
+
+    def sql(self, column: str, time_type: str, origin: datetime = DEFAULT_ORIGIN) -> str:
+        """
+        桶起点表达式, 类型与原列一致。
+        TIMESTAMPTZ 在 UTC 下分桶, 避免结果依赖会话时区; DATE 列只支持按天及以上的粒度。
+        """
+        time_type = time_type.strip().upper()
+        if time_type == "DATE":
+            if self.width is not None and self.width % timedelta(days=1):
+                raise AggregateError(f"'{self}' buckets are finer than the DATE column")
+            source = f"{column}::timestamp"
+        elif time_type == "TIMESTAMPTZ":
+            source = f"({column} AT TIME ZONE 'UTC')"
+        else:
+            source = column
+
+        if self.width is not None:
+            expr = f"date_bin(INTERVAL '{self}', {source}, TIMESTAMP '{origin.isoformat(sep=' ')}')"
+        else:
+            expr = f"date_trunc('{self.unit}', {source})"
+
+        if time_type == "DATE":
+            return f"({expr})::date"
+        if time_type == "TIMESTAMPTZ":
+            return f"({expr} AT TIME ZONE 'UTC')"
+        return expr
+
+
+@dataclass(frozen=True)
+class Aggregation:
+    name: str
+    fn: str
+    column: Optional[str] = None
+    weight: Optional[str] = None  # vwap 的成交量列
+
+    @property
+    def canonical(self) -> str:
+        args = [a for a in (self.column, self.weight) if a] or ["*"]
+        return f"{self.fn}({', '.join(args)})"
+
+
+def parse_aggregation(name: str, spec: str) -> Aggregation:
+    """
+    'max' -> max(name); 'max(high)'; 'vwap(close, vol)'; 'count' / 'count(*)' / 'count(col)'
+    """
+    m = re.match(r"^\s*([a-z_]+)\s*(?:\((.*)\))?\s*$", str(spec).lower())
+    if not m or m.group(1) not in AGGREGATE_FUNCTIONS:
+        raise AggregateError(
+            f"Invalid aggregation '{spec}' for '{name}', expected one of {', '.join(AGGREGATE_FUNCTIONS)}"
+        )
+    fn = m.group(1)
+    if m.group(2) is None:
+        args = [] if fn == "count" else [name]
+    else:
+        args = [a.strip() for a in m.group(2).split(",") if a.strip() and a.strip() != "*"]
+
+    expected = {"vwap": 2, "count": (0, 1)}.get(fn, 1)
+    if len(args) not in (expected if isinstance(expected, tuple) else (expected,)):
+        usage = "vwap(price, volume)" if fn == "vwap" else f"{fn}(column)"
+        raise AggregateError(f"Invalid aggregation '{spec}' for '{name}', expected {usage}")
+    return Aggregation(name, fn, args[0] if args else None, args[1] if len(args) > 1 else None)
+
+
+@dataclass
+class AggregateSpec:
+    table_name: str
+    columns_schema: List[Dict[str, Any]]
+    time_column: str
+    bucket: Bucket
+    group_by: List[str]
+    aggregations: List[Aggregation]
+    origin: datetime = DEFAULT_ORIGIN
+
+    @property
+    def type_map(self) -> Dict[str, str]:
+        return {c["name"]: c["type"] for c in self.columns_schema}
+
+    @property
+    def time_type(self) -> str:
+        return self.type_map[self.time_column]
+
+    @property
+    def key_columns(self) -> List[str]:
+        return [*self.group_by, self.time_column]
+
+    @property
+    def output_columns(self) -> List[str]:
+        return [*self.key_columns, *(a.name for a in self.aggregations)]
+
+    def _aggregate_sql(self, agg: Aggregation) -> Tuple[str, str]:
+        """聚合表达式与输出类型"""
+        t = self.time_column
+        col_type = self.type_map.get(agg.column) if agg.column else None
+        if agg.fn == "count":
+            return (f"count({agg.column or '*'})", "BIGINT")
+        if agg.fn == "first":
+            return (f"(array_agg({agg.column} ORDER BY {t}))[1]", col_type)
+        if agg.fn == "last":
+            return (f"(array_agg({agg.column} ORDER BY {t} DESC))[1]", col_type)
+        if agg.fn in ("min", "max"):
+            return (f"{agg.fn}({agg.column})", col_type)
+        if agg.fn == "sum":
+            sql_type = DDLGenerator._parse_type(col_type)
+            if isinstance(sql_type, sa_types.Integer):
+                return (f"sum({agg.column})::bigint", "BIGINT")
+            if isinstance(sql_type, sa_types.Float):
+                return (f"sum({agg.column})::double precision", "DOUBLE PRECISION")
+            scale = sql_type.scale or 0
+            return (f"sum({agg.column})::numeric(38, {scale})", f"NUMERIC(38, {scale})")
+        # vwap
+        return (
+            f"(sum({agg.column} * {agg.weight}) / NULLIF(sum({agg.weight}), 0))::double precision",
+            "DOUBLE PRECISION",
+        )
+
+    def output_schema(self) -> List[Dict[str, Any]]:
+        """输出列定义 (columns_schema 格式), 分组列 + 桶列为主键, 供 Arrow 编码与 rollup 建表"""
+        schema = [
+            {"name": c, "type": self.type_map[c], "is_pk": True, "comment": ""} for c in self.key_columns
+        ]
+        for agg in self.aggregations:
+            schema.append({"name": agg.name, "type": self._aggregate_sql(agg)[1], "is_pk": False, "comment": agg.canonical})
+        return schema
+
+    def select_sql(self, where: Sequence[str] = ()) -> str:
+        """从源表实时聚合的 SELECT (不含排序)"""
+        bucket = self.bucket.sql(self.time_column, self.time_type, self.origin)
+        items = [*self.group_by, f"{bucket} AS {self.time_column}"]
+        items += [f"{self._aggregate_sql(a)[0]} AS {a.name}" for a in self.aggregations]
+        sql = f"SELECT {', '.join(items)} FROM {self.table_name}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return sql + f" GROUP BY {', '.join(str(i) for i in range(1, len(self.key_columns) + 1))}"
+
+    def to_params(self) -> Dict[str, Any]:
+        return {
+            "time_column": self.time_column,
+            "bucket": str(self.bucket),
+            "origin": self.origin.isoformat(),
+            "group_by": self.group_by,
+            "aggregations": {a.name: a.canonical for a in self.aggregations},
+        }
+
+    # --- 时间值在 naive UTC (分桶计算) 与列类型之间转换 ---
+
+    def to_utc(self, value: Any) -> datetime:
+        if isinstance(value, datetime):
+            return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+        return datetime(value.year, value.month, value.day)
+
+    def to_column_value(self, value: datetime):
+        time_type = self.time_type.strip().upper()
+        if time_type == "DATE":
+            return value.date()
+        if time_type == "TIMESTAMPTZ":
+            return value.replace(tzinfo=timezone.utc)
+        return value
+
+
+def build_aggregate_spec(
+    table_name: str,
+    columns_schema: List[Dict[str, Any]],
+    time_column: Optional[str],
+    bucket: str,
+    aggregations: Dict[str, str],
+    group_by: Optional[Sequence[str]] = None,
+    origin: Optional[datetime] = None,
+) -> AggregateSpec:
+    type_map = {c["name"]: c["type"] for c in columns_schema}
+    if not time_column:
+        raise AggregateError("time_column is required")
+    if time_column not in type_map:
+        raise AggregateError(f"Unknown time_column '{time_column}'")
+    if type_map[time_column].strip().upper() not in RANGE_PARTITION_KEY_TYPES:
+        raise AggregateError(f"time_column '{time_column}' must be DATE/TIMESTAMP/TIMESTAMPTZ")
+
+    if group_by is None:
+        # 默认按除时间列以外的主键分组 (e.g. ts_code)
+        group_by = [c["name"] for c in columns_schema if c.get("is_pk") and c["name"] != time_column]
+    group_by = list(dict.fromkeys(group_by))
+    unknown = [c for c in group_by if c not in type_map]
+    if unknown:
+        raise AggregateError(f"Unknown group_by columns: {', '.join(unknown)}")
+    if time_column in group_by:
+        raise AggregateError("time_column cannot be used in group_by")
+
+    if not aggregations:
+        raise AggregateError("At least one aggregation is required")
+    parsed = []
+    for name, spec in aggregations.items():
+        if not _IDENTIFIER_RE.match(name):
+            raise AggregateError(f"Invalid output column name '{name}'")
+        if name == time_column or name in group_by:
+            raise AggregateError(f"Output column '{name}' conflicts with a group_by/time column")
+        agg = parse_aggregation(name, spec)
+        for col in (agg.column, agg.weight):
+            if col is None:
+                continue
+            if col not in type_map:
+                raise AggregateError(f"Unknown column '{col}' in aggregation '{name}'")
+            sql_type = DDLGenerator._parse_type(type_map[col])
+            if isinstance(sql_type, ARRAY) and agg.fn != "count":
+                raise AggregateError(f"Array column '{col}' cannot be aggregated with {agg.fn}")
+            if agg.fn in ("sum", "vwap") and not isinstance(sql_type, (sa_types.Integer, sa_types.Numeric)):
+                raise AggregateError(f"{agg.fn} requires a numeric column, got '{col}' ({type_map[col]})")
+            if agg.fn in ("min", "max") and isinstance(sql_type, (sa_types.Boolean, sa_types.JSON)):
+                raise AggregateError(f"{agg.fn} is not supported on '{col}' ({type_map[col]})")
+        parsed.append(agg)
+
+    if origin is not None and origin.tzinfo is not None:
+        origin = origin.astimezone(timezone.utc).replace(tzinfo=None)
+    spec = AggregateSpec(
+        table_name=table_name,
+        columns_schema=columns_schema,
+        time_column=time_column,
+        bucket=Bucket.parse(bucket),
+        group_by=group_by,
+        aggregations=parsed,
+        origin=origin or DEFAULT_ORIGIN,
+    )
+    spec.bucket.sql(time_column, spec.time_type, spec.origin)  # 校验桶宽度与列类型
+    return spec
+
+
+def spec_from_params(table_name: str, columns_schema: List[Dict[str, Any]], params: Dict[str, Any]) -> AggregateSpec:
+    return build_aggregate_spec(
+        table_name, columns_schema, params["time_column"], params["bucket"], params["aggregations"],
+        group_by=params["group_by"], origin=datetime.fromisoformat(params["origin"]),
+    )
+
+
+# --- Query ---
+
+def rollup_covers(spec: AggregateSpec, rollup_spec: Dict[str, Any]) -> bool:
+    """rollup 的分桶/分组一致, 且包含请求的所有聚合列 (同名同定义)"""
+    params = spec.to_params()
+    if any(params[k] != rollup_spec.get(k) for k in ("time_column", "bucket", "origin", "group_by")):
+        return False
+    available = rollup_spec.get("aggregations") or {}
+    return all(available.get(name) == canonical for name, canonical in params["aggregations"].items())
+
+
+def build_aggregate_query(
+    spec: AggregateSpec,
+    start: Optional[Any] = None,
+    end: Optional[Any] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    rollup_table: Optional[str] = None,
+    watermark: Optional[datetime] = None,
+) -> RangeQuery:
+    """
+    生成聚合查询, 时间范围 [start, end) 作用于原始行 (首尾的桶可能不完整)。
+    提供 rollup_table 时, 区间内完整且早于 watermark 的桶读 rollup 表, 其余部分实时聚合:
+        [start, lo) 实时 | [lo, hi) rollup | [hi, end) 实时
+    各部分的桶互不重叠, UNION ALL 后按分组列 + 桶排序。
+    """
+    params: Dict[str, Any] = {}
+    type_map = spec.type_map
+    filter_sql = []
+    if filters is not None and not isinstance(filters, dict):
+        raise AggregateError("Filters must be a JSON object")
+    for i, (col, value) in enumerate((filters or {}).items()):
+        if col not in spec.group_by:
+            raise AggregateError(f"Filters are only supported on group_by columns, got '{col}'")
+        coerce = make_coercer(type_map[col])
+        try:
+            if isinstance(value, (list, tuple)):
+                params[f"f{i}"] = [coerce(v) for v in value]
+                filter_sql.append(f"{col} = ANY(:f{i})")
+            else:
+                params[f"f{i}"] = coerce(value)
+                filter_sql.append(f"{col} = :f{i}")
+        except (ValueError, TypeError) as e:
+            raise AggregateError(f"Invalid filter value for {col}: {e}")
+
+    coerce_time = make_coercer(spec.time_type)
+    try:
+        start_utc = spec.to_utc(coerce_time(start)) if start is not None else None
+        end_utc = spec.to_utc(coerce_time(end)) if end is not None else None
+    except (ValueError, TypeError) as e:
+        raise AggregateError(f"Invalid start/end: {e}")
+
+    t = spec.time_column
+    bounds = 0
+
+    def live_part(lower: Optional[datetime], upper: Optional[datetime]) -> str:
+        nonlocal bounds
+        where = list(filter_sql)
+        for bound, op in ((lower, ">="), (upper, "<")):
+            if bound is not None:
+                key = f"t{bounds}"
+                bounds += 1
+                params[key] = spec.to_column_value(bound)
+                where.append(f"{t} {op} :{key}")
+        return spec.select_sql(where)
+
+    parts = []
+    if rollup_table and watermark is not None:
+        lo = spec.bucket.ceil(start_utc, spec.origin) if start_utc else None
+        hi = min(spec.bucket.floor(end_utc, spec.origin), watermark) if end_utc else watermark
+        if lo is None or lo < hi:
+            if start_utc is not None and start_utc < lo:
+                parts.append(live_part(start_utc, lo))
+            where = list(filter_sql)
+            if lo is not None:
+                params["rollup_lo"] = spec.to_column_value(lo)
+                where.append(f"{t} >= :rollup_lo")
+            params["rollup_hi"] = spec.to_column_value(hi)
+            where.append(f"{t} < :rollup_hi")
+            parts.append(f"SELECT {', '.join(spec.output_columns)} FROM {rollup_table} WHERE {' AND '.join(where)}")
+            parts.append(live_part(hi, end_utc))
+    if not parts:
+        parts.append(live_part(start_utc, end_utc))
+
+    sql = " UNION ALL ".join(f"({p})" for p in parts) if len(parts) > 1 else parts[0]
+    sql += f" ORDER BY {', '.join(spec.key_columns)}"
+    output = spec.output_schema()
+    return RangeQuery(
+        sql=sql,
+        params=params,
+        columns=spec.output_columns,
+        keyset_columns=spec.key_columns,
+        column_types={c["name"]: c["type"] for c in output},
+    )
+
+
+# --- Rollups ---
+
+def rollup_table_name(table_name: str, rollup_name: str) -> str:
+    name = f"{table_name}_rollup_{rollup_name}"
+    if len(name) > 63:
+        raise AggregateError(f"Rollup table name '{name}' exceeds 63 characters")
+    return name
+
+
+def rollup_create_sqls(spec: AggregateSpec, rollup_table: str) -> List[str]:
+    return DDLGenerator.generate_create_table_sqls(
+        rollup_table, f"{spec.table_name} 按 {spec.bucket} 聚合", spec.output_schema()
+    )
+
+
+async def refresh_rollup(session: AsyncSession, rollup: TableRollup, config: DataTableConfig, full: bool = False) -> Dict[str, Any]:
+    """
+    增量刷新: 删除并重算 watermark 前 lookback_buckets 个桶之后的聚合结果, 然后推进 watermark
+    到源表最新数据所在桶的起点。全部在一个事务中完成, 查询方看到的始终是一致的版本。
+    同一个 rollup 的并发刷新 (多进程的定时任务) 通过事务级 advisory lock 跳过。
+    调用方负责 commit。
+    """
+    locked = (await session.execute(
+        text("SELECT pg_try_advisory_xact_lock(:ns, :id)"), {"ns": ROLLUP_LOCK_NAMESPACE, "id": rollup.id}
+    )).scalar()
+    if not locked:
+        return {"rollup": rollup.name, "skipped": True}
+
+    spec = spec_from_params(config.table_name, config.columns_schema, rollup.spec)
+    t = spec.time_column
+    since = None
+    if not full and rollup.watermark is not None:
+        since = spec.bucket.shift(rollup.watermark, -rollup.lookback_buckets)
+
+    params = {}
+    where = []
+    if since is not None:
+        params["since"] = spec.to_column_value(since)
+        where.append(f"{t} >= :since")
+
+    latest_sql = f"SELECT max({t}) FROM {config.table_name}" + (f" WHERE {where[0]}" if where else "")
+    latest = (await session.execute(text(latest_sql), params)).scalar()
+
+    delete_sql = f"DELETE FROM {rollup.rollup_table}" + (f" WHERE {where[0]}" if where else "")
+    set_job_step(delete_sql)
+    deleted = (await session.execute(text(delete_sql), params)).rowcount
+
+    insert_sql = f"INSERT INTO {rollup.rollup_table} ({', '.join(spec.output_columns)}) {spec.select_sql(where)}"
+    set_job_step(insert_sql)
+    inserted = (await session.execute(text(insert_sql), params)).rowcount
+
+    if latest is not None:
+        rollup.watermark = spec.bucket.floor(spec.to_utc(latest), spec.origin)
+    rollup.last_refreshed_at = datetime.now(timezone.utc)
+    return {
+        "rollup": rollup.name,
+        "since": since.isoformat() if since else None,
+        "watermark": rollup.watermark.isoformat() if rollup.watermark else None,
+        "deleted": deleted,
+        "inserted": inserted,
+    }
+
+
+async def _refresh_by_id(rollup_id: int, full: bool = False) -> Optional[Dict[str, Any]]:
+    async with AsyncSessionLocal() as session:
+        rollup = await session.get(TableRollup, rollup_id)
+        if rollup is None:
+            return None
+        config = await session.get(DataTableConfig, rollup.table_id)
+        with tag_table(config.table_name):
+            result = await refresh_rollup(session, rollup, config, full=full)
+            await session.commit()
+        return result
+
+
+@job_handler(ROLLUP_REFRESH_JOB)
+async def run_rollup_refresh_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        result = await _refresh_by_id(params["rollup_id"], full=params.get("full", False))
+    except AggregateError as e:
+        raise JobError(str(e), status_code=400)
+    if result is None:
+        raise JobError("Rollup not found", status_code=404)
+    return result
+
+
+async def run_rollup_refresh() -> int:
+    """刷新所有已发布表的 rollup, 单个失败不影响其他。返回成功刷新的数量。"""
+    async with AsyncSessionLocal() as session:
+        stmt = select(TableRollup.id).join(DataTableConfig, DataTableConfig.id == TableRollup.table_id).where(
+            DataTableConfig.status == TableStatus.CREATED
+        )
+        rollup_ids = (await session.execute(stmt)).scalars().all()
+
+    done = 0
+    for rollup_id in rollup_ids:
+        try:
+            result = await _refresh_by_id(rollup_id)
+            if result and not result.get("skipped"):
+                done += 1
+        except Exception:
+            logger.exception(f"Rollup refresh failed for rollup {rollup_id}")
+    return done
+
+
+async def rollup_refresh_loop(interval_seconds: int):
+    while True:
+        try:
+            count = await run_rollup_refresh()
+            logger.info(f"Rollup refresh finished for {count} rollups")
+        except Exception:
+            logger.exception("Rollup refresh run failed")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,81 @@
+"""
+columns_schema -> Apache Arrow 类型映射。
+与 DDLGenerator._parse_type 共用同一套类型解析，保证 Arrow/Parquet 输出与物理表类型一致。
+pyarrow 为可选依赖，仅在需要时导入。
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import types as sa_types
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+
+from app.db.ddl_generator import DDLGenerator
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError("Arrow/Parquet support requires the 'pyarrow' package")
+    return pyarrow
+
+
+def _arrow_scalar_type(pa, sql_type):
+    if isinstance(sql_type, sa_types.Boolean):
+        return pa.bool_()
+    if isinstance(sql_type, sa_types.BigInteger):
+        return pa.int64()
+    if isinstance(sql_type, sa_types.SmallInteger):
+        return pa.int16()
+    if isinstance(sql_type, sa_types.Integer):
+        return pa.int32()
+    if isinstance(sql_type, sa_types.Float):
+        return pa.float64()
+    if isinstance(sql_type, sa_types.Numeric):
+        # 无精度的 NUMERIC 无法映射为定长 decimal，退化为 float64
+        if sql_type.precision is not None and sql_type.precision <= 38:
+            return pa.decimal128(sql_type.precision, sql_type.scale or 0)
+        return pa.float64()
+    if isinstance(sql_type, sa_types.DateTime):
+        return pa.timestamp("us", tz="UTC" if sql_type.timezone else None)
+    if isinstance(sql_type, sa_types.Date):
+        return pa.date32()
+    if isinstance(sql_type, sa_types.Time):
+        return pa.time64("us")
+    return pa.string()  # VARCHAR / TEXT / JSON / UUID ...
+
+
+def arrow_type_for(type_str: str):
+    pa = require_pyarrow()
+    sql_type = DDLGenerator._parse_type(type_str)
+    if isinstance(sql_type, ARRAY):
+        return pa.list_(_arrow_scalar_type(pa, sql_type.item_type))
+    return _arrow_scalar_type(pa, sql_type)
+
+
+def arrow_schema_for(columns_schema: List[Dict[str, Any]], columns: Optional[Sequence[str]] = None):
+    pa = require_pyarrow()
+    type_map = {c["name"]: c["type"] for c in columns_schema}
+    names = list(columns) if columns is not None else list(type_map)
+    return pa.schema([pa.field(name, arrow_type_for(type_map[name])) for name in names])
+
+
+def _value_converter(pa, arrow_type) -> Optional[Callable[[Any], Any]]:
+    """数据库驱动返回值 -> pyarrow 可接受的值。返回 None 表示无需转换。"""
+    if pa.types.is_string(arrow_type):
+        return lambda v: v if v is None or isinstance(v, str) else str(v)
+    if pa.types.is_floating(arrow_type):
+        return lambda v: v if v is None else float(v)
+    return None
+
+
+def record_batch_from_rows(schema, rows: Sequence[Sequence[Any]]):
+    """按列构建 RecordBatch (rows 为驱动返回的行, 列顺序与 schema 一致)。"""
+    pa = require_pyarrow()
+    arrays = []
+    for i, field in enumerate(schema):
+        values = [row[i] for row in rows]
+        convert = _value_converter(pa, field.type)
+        if convert is not None:
+            values = [convert(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
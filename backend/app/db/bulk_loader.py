@@ -0,0 +1,617 @@
+"""
+物理表批量写入工具 (PostgreSQL COPY)。
+
+上传内容以流的方式解析 (CSV / NDJSON / Parquet)，按 DataTableConfig.columns_schema
+做类型转换后，通过 asyncpg 的二进制 COPY 协议直接写入物理表，全程不在内存中保留整个文件。
+
+upsert 模式: 每批记录先 COPY 到按 columns_schema 建立的临时暂存表 (临时表不写 WAL)，
+再以一条 INSERT ... ON CONFLICT (主键) DO UPDATE 合并到目标表; 只更新上传中包含且值有变化的列，
+未变化的行不产生新版本。合并语句同时返回合并前已存在的主键数与实际写入的行数，
+由此得到 inserted/updated/unchanged 计数，无需再次扫描。
+"""
+import abc
+import asyncio
+import codecs
+import csv
+import io
+import json
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dt_time, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text, types as sa_types
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.ddl_generator import DDLGenerator
+from app.db.sql_metrics import record_statement
+
+SUPPORTED_FORMATS = ("csv", "ndjson", "parquet")
+
+# Content-Type -> format, used when the client does not pass ?format=
+CONTENT_TYPE_FORMATS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+}
+
+PARQUET_BATCH_SIZE = 10_000
+
+_TRUE_VALUES = {"true", "t", "1", "yes", "y"}
+_FALSE_VALUES = {"false", "f", "0", "no", "n"}
+
+
+# 暂存表中记录上传顺序的列, 同一批次内主键重复时保留最后一行
+STAGE_ORDINAL_COLUMN = "__qf_ord"
+
+
+class IngestError(ValueError):
+    """上传数据无法解析或类型转换失败。"""
+
+
+@dataclass
+class MergeCounts:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0  # 主键已存在且所有上传列的值都相同
+    duplicates: int = 0  # 同一批次内主键重复而被跳过的行 (保留最后一行)
+    batches: int = 0
+
+    def add(self, row, batch_rows: int):
+        """累加一批的合并结果 (merge_sql 返回的 source_rows / existing_rows / merged_rows)。"""
+        inserted = row.source_rows - row.existing_rows
+        updated = row.merged_rows - inserted
+        self.inserted += inserted
+        self.updated += updated
+        self.unchanged += row.existing_rows - updated
+        self.duplicates += batch_rows - row.source_rows
+        self.batches += 1
+
+
+@dataclass
+class IngestStats:
+    rows: int
+    bytes: int
+    elapsed_seconds: float
+    merge: Optional[MergeCounts] = field(default=None)
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    @property
+    def bytes_per_sec(self) -> float:
+        return self.bytes / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+
+# --- Type coercion ---
+
+def _to_bool(v: Any) -> bool:
+    if isinstance(v, bool):
+        return v
+    s = str(v).strip().lower()
+    if s in _TRUE_VALUES:
+        return True
+    if s in _FALSE_VALUES:
+        return False
+    raise ValueError(f"invalid boolean '{v}'")
+
+
+def _to_int(v: Any) -> int:
+    if isinstance(v, bool):
+        return int(v)
+    if isinstance(v, int):
+        return v
+    if isinstance(v, float):
+        if not v.is_integer():
+            raise ValueError(f"invalid integer '{v}'")
+        return int(v)
+    return int(str(v).strip())
+
+
+def _to_decimal(v: Any) -> Decimal:
+    if isinstance(v, Decimal):
+        return v
+    try:
+        return Decimal(str(v).strip())
+    except InvalidOperation:
+        raise ValueError(f"invalid numeric '{v}'")
+
+
+def _to_float(v: Any) -> float:
+    return float(v)
+
+
+def _to_date(v: Any) -> date:
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    s = str(v).strip()
+    if len(s) == 8 and s.isdigit():  # 20240102
+        return date(int(s[:4]), int(s[4:6]), int(s[6:]))
+    return date.fromisoformat(s[:10])
+
+
+def _parse_datetime(v: Any) -> datetime:
+    if isinstance(v, datetime):
+        return v
+    if isinstance(v, date):
+        return datetime(v.year, v.month, v.day)
+    s = str(v).strip()
+    if s.endswith("Z"):
+        s = s[:-1] + "+00:00"
+    return datetime.fromisoformat(s)
+
+
+def _to_timestamp(v: Any) -> datetime:
+    dt = _parse_datetime(v)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _to_timestamptz(v: Any) -> datetime:
+    dt = _parse_datetime(v)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _to_time(v: Any) -> dt_time:
+    if isinstance(v, dt_time):
+        return v
+    return dt_time.fromisoformat(str(v).strip())
+
+
+def _to_uuid(v: Any) -> uuid.UUID:
+    if isinstance(v, uuid.UUID):
+        return v
+    return uuid.UUID(str(v).strip())
+
+
+def _to_json_text(v: Any) -> str:
+    # asyncpg 的 json/jsonb 编解码器接收 str
+    if isinstance(v, str):
+        json.loads(v)  # validate
+        return v
+    return json.dumps(v, ensure_ascii=False, default=str)
+
+
+def _to_str(v: Any) -> str:
+    return v if isinstance(v, str) else str(v)
+
+
+def _scalar_converter(sql_type) -> Callable[[Any], Any]:
+    # 注意顺序: Float 是 Numeric 的子类, JSONB 是 JSON 的子类
+    if isinstance(sql_type, sa_types.Boolean):
+        return _to_bool
+    if isinstance(sql_type, sa_types.Integer):
+        return _to_int
+    if isinstance(sql_type, sa_types.Float):
+        return _to_float
+    if isinstance(sql_type, sa_types.Numeric):
+        return _to_decimal
+    if isinstance(sql_type, sa_types.DateTime):
+        return _to_timestamptz if sql_type.timezone else _to_timestamp
+    if isinstance(sql_type, sa_types.Date):
+        return _to_date
+    if isinstance(sql_type, sa_types.Time):
+        return _to_time
+    if isinstance(sql_type, sa_types.JSON):
+        return _to_json_text
+    if isinstance(sql_type, UUID):
+        return _to_uuid
+    return _to_str
+
+
+def _is_text_type(sql_type) -> bool:
+    return isinstance(sql_type, sa_types.String) and not isinstance(sql_type, sa_types.JSON)
+
+
+def make_coercer(type_str: str) -> Callable[[Any], Any]:
+    """
+    根据列定义的类型字符串 (e.g. 'NUMERIC(10, 2)', 'INT[]') 构造值转换函数。
+    复用 DDLGenerator._parse_type 的类型映射，保证写入类型与建表类型一致。
+    文本类型之外，空字符串视为 NULL。
+    """
+    sql_type = DDLGenerator._parse_type(type_str)
+
+    if isinstance(sql_type, ARRAY):
+        item = _scalar_converter(sql_type.item_type)
+
+        def convert_array(v: Any):
+            if v is None or v == "":
+                return None
+            if isinstance(v, str):
+                v = json.loads(v)
+            if not isinstance(v, (list, tuple)):
+                raise ValueError(f"invalid array '{v}'")
+            return [None if x is None else item(x) for x in v]
+
+        return convert_array
+
+    convert = _scalar_converter(sql_type)
+    keep_empty = _is_text_type(sql_type)
+
+    def convert_scalar(v: Any):
+        if v is None:
+            return None
+        if v == "" and not keep_empty:
+            return None
+        return convert(v)
+
+    return convert_scalar
+
+
+def build_coercers(columns_schema: List[Dict[str, Any]], column_names: List[str]) -> List[Callable[[Any], Any]]:
+    type_map = {c["name"]: c["type"] for c in columns_schema}
+    return [make_coercer(type_map[name]) for name in column_names]
+
+
+# --- Upload readers ---
+
+def _last_record_boundary(text: str) -> int:
+    """
+    返回 text 中最后一个完整 CSV 记录的结束位置 (换行符之后)。
+    引号内的换行不算记录边界 (按引号奇偶判断, 兼容 "" 转义)。
+    """
+    boundary = -1
+    quotes = 0
+    start = 0
+    while True:
+        nl = text.find("\n", start)
+        if nl < 0:
+            break
+        quotes += text.count('"', start, nl)
+        if quotes % 2 == 0:
+            boundary = nl + 1
+        start = nl + 1
+    return boundary
+
+
+class UploadReader(abc.ABC):
+    """
+    上传流读取器基类。
+    open() 确定写入的列，records() 逐行产出已做类型转换的 tuple。
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], columns_schema: List[Dict[str, Any]]):
+        self._source = chunks
+        self.columns_schema = columns_schema
+        self.known_columns = [c["name"] for c in columns_schema]
+        self.columns: List[str] = []
+        self.bytes_read = 0
+        self.rows_read = 0
+
+    async def _chunks(self) -> AsyncIterator[bytes]:
+        async for chunk in self._source:
+            if chunk:
+                self.bytes_read += len(chunk)
+                yield chunk
+
+    def _check_columns(self, columns: List[str]):
+        unknown = [c for c in columns if c not in self.known_columns]
+        if unknown:
+            raise IngestError(f"Unknown columns: {', '.join(unknown)}")
+        if len(set(columns)) != len(columns):
+            raise IngestError("Duplicate columns in upload header")
+
+    def _coerce(self, coercers, values) -> Tuple[Any, ...]:
+        self.rows_read += 1
+        try:
+            return tuple(conv(v) for conv, v in zip(coercers, values))
+        except (ValueError, TypeError) as e:
+            raise IngestError(f"Row {self.rows_read}: {e}")
+
+    @abc.abstractmethod
+    async def open(self) -> List[str]:
+        """读取表头 (或首条记录) 并校验列名, 返回写入的列。"""
+
+    @abc.abstractmethod
+    def records(self) -> AsyncIterator[Tuple[Any, ...]]:
+        """逐行产出按 self.columns 顺序做过类型转换的 tuple。"""
+
+
+class CsvUploadReader(UploadReader):
+    """CSV (首行为表头)，按块增量解码，引号内换行安全。"""
+
+    def __init__(self, chunks, columns_schema):
+        super().__init__(chunks, columns_schema)
+        self._raw = self._raw_rows()
+
+    async def _raw_rows(self) -> AsyncIterator[List[str]]:
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        buf = ""
+        async for chunk in self._chunks():
+            buf += decoder.decode(chunk)
+            cut = _last_record_boundary(buf)
+            if cut < 0:
+                continue
+            block, buf = buf[:cut], buf[cut:]
+            for row in csv.reader(io.StringIO(block)):
+                if row:
+                    yield row
+        buf += decoder.decode(b"", final=True)
+        if buf.strip():
+            for row in csv.reader(io.StringIO(buf)):
+                if row:
+                    yield row
+
+    async def open(self) -> List[str]:
+        try:
+            header = await self._raw.__anext__()
+        except StopAsyncIteration:
+            raise IngestError("Empty CSV upload")
+        except UnicodeDecodeError as e:
+            raise IngestError(f"Invalid UTF-8 in CSV header: {e}")
+        self.columns = [h.strip() for h in header]
+        self._check_columns(self.columns)
+        return self.columns
+
+    async def records(self) -> AsyncIterator[Tuple[Any, ...]]:
+        coercers = build_coercers(self.columns_schema, self.columns)
+        width = len(self.columns)
+        try:
+            async for row in self._raw:
+                if len(row) != width:
+                    raise IngestError(f"Row {self.rows_read + 1}: expected {width} fields, got {len(row)}")
+                yield self._coerce(coercers, row)
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise IngestError(f"Row {self.rows_read + 1}: {e}")
+
+
+class NdjsonUploadReader(UploadReader):
+    """每行一个 JSON 对象；缺失的键写入 NULL。"""
+
+    async def open(self) -> List[str]:
+        self.columns = list(self.known_columns)
+        return self.columns
+
+    async def _lines(self) -> AsyncIterator[bytes]:
+        buf = b""
+        async for chunk in self._chunks():
+            buf += chunk
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                yield line
+        yield buf
+
+    async def records(self) -> AsyncIterator[Tuple[Any, ...]]:
+        coercers = build_coercers(self.columns_schema, self.columns)
+        known = set(self.columns)
+        async for line in self._lines():
+            if not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError as e:
+                raise IngestError(f"Row {self.rows_read + 1}: invalid JSON ({e})")
+            if not isinstance(obj, dict):
+                raise IngestError(f"Row {self.rows_read + 1}: expected a JSON object")
+            unknown = obj.keys() - known
+            if unknown:
+                raise IngestError(f"Row {self.rows_read + 1}: unknown columns {sorted(unknown)}")
+            yield self._coerce(coercers, [obj.get(c) for c in self.columns])
+
+
+class ParquetUploadReader(UploadReader):
+    """
+    Parquet 的元数据位于文件尾部，无法纯流式解析：
+    先将上传内容落盘到临时文件，再按 row group 分批读取。
+    """
+
+    def __init__(self, chunks, columns_schema):
+        super().__init__(chunks, columns_schema)
+        self._file = None
+        self._parquet = None
+
+    async def open(self) -> List[str]:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise IngestError("Parquet upload requires the 'pyarrow' package")
+
+        self._file = tempfile.TemporaryFile()
+        async for chunk in self._chunks():
+            self._file.write(chunk)
+        if self.bytes_read == 0:
+            raise IngestError("Empty Parquet upload")
+        self._file.seek(0)
+        try:
+            self._parquet = pq.ParquetFile(self._file)
+        except Exception as e:
+            raise IngestError(f"Invalid Parquet file: {e}")
+        self.columns = list(self._parquet.schema_arrow.names)
+        self._check_columns(self.columns)
+        return self.columns
+
+    async def records(self) -> AsyncIterator[Tuple[Any, ...]]:
+        coercers = build_coercers(self.columns_schema, self.columns)
+        batches = self._parquet.iter_batches(batch_size=PARQUET_BATCH_SIZE, columns=self.columns)
+        try:
+            while True:
+                batch = await asyncio.to_thread(next, batches, None)
+                if batch is None:
+                    break
+                for values in zip(*(col.to_pylist() for col in batch.columns)):
+                    yield self._coerce(coercers, values)
+        finally:
+            self._file.close()
+
+
+_READERS = {
+    "csv": CsvUploadReader,
+    "ndjson": NdjsonUploadReader,
+    "parquet": ParquetUploadReader,
+}
+
+
+def resolve_format(fmt: Optional[str], content_type: Optional[str]) -> str:
+    if fmt:
+        fmt = fmt.lower()
+    elif content_type:
+        fmt = CONTENT_TYPE_FORMATS.get(content_type.split(";")[0].strip().lower())
+    if fmt not in SUPPORTED_FORMATS:
+        raise IngestError(f"Unsupported upload format '{fmt}', expected one of {', '.join(SUPPORTED_FORMATS)}")
+    return fmt
+
+
+def open_reader(fmt: str, chunks: AsyncIterator[bytes], columns_schema: List[Dict[str, Any]]) -> UploadReader:
+    return _READERS[fmt](chunks, columns_schema)
+
+
+# --- COPY ---
+
+async def get_asyncpg_connection(session: AsyncSession):
+    """取得当前 session 事务所在的 asyncpg 原生连接 (COPY 随 session 一起提交/回滚)。"""
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    return raw.driver_connection
+
+
+async def copy_upload(session: AsyncSession, table_name: str, reader: UploadReader) -> IngestStats:
+    """
+    将 reader 产出的记录通过二进制 COPY 写入 table_name。
+    调用方负责 commit / rollback。
+    """
+    started = time.perf_counter()
+    columns = await reader.open()
+    pg_conn = await get_asyncpg_connection(session)
+    await pg_conn.copy_records_to_table(table_name, records=reader.records(), columns=columns)
+    # 驱动层 COPY 不经过 engine 事件, 单独上报
+    record_statement(f"COPY {table_name} FROM STDIN (BINARY)", time.perf_counter() - started, "COPY")
+    return IngestStats(
+        rows=reader.rows_read,
+        bytes=reader.bytes_read,
+        elapsed_seconds=time.perf_counter() - started,
+    )
+
+
+# --- Upsert (staging table + set-based merge) ---
+
+def staging_table_name(table_name: str) -> str:
+    return f"qf_stage_{table_name}"[:63]
+
+
+def staging_table_sql(stage_name: str, columns_schema: List[Dict[str, Any]], columns: List[str]) -> str:
+    """暂存表只包含上传的列, 类型与建表时一致; 事务结束时自动删除。"""
+    type_map = {c["name"]: c["type"] for c in columns_schema}
+    defs = [f"{STAGE_ORDINAL_COLUMN} BIGINT GENERATED ALWAYS AS IDENTITY"]
+    defs.extend(
+        f"{name} {DDLGenerator._parse_type(type_map[name]).compile(dialect=postgresql.dialect())}"
+        for name in columns
+    )
+    return f"CREATE TEMPORARY TABLE {stage_name} ({', '.join(defs)}) ON COMMIT DROP"
+
+
+def _comparable(expr: str, type_str: str) -> str:
+    # json 类型没有相等运算符, 比较前转为 jsonb
+    return f"{expr}::jsonb" if type_str.strip().upper() == "JSON" else expr
+
+
+def merge_sql(
+    table_name: str,
+    stage_name: str,
+    columns_schema: List[Dict[str, Any]],
+    columns: List[str],
+    pk_columns: List[str],
+) -> str:
+    """
+    生成集合式合并语句, 返回一行计数 (source_rows, existing_rows, merged_rows)。
+    DISTINCT ON 去掉批次内重复的主键; WHERE ... IS DISTINCT FROM 跳过值未变化的行。
+    existing 与 INSERT 在同一快照下执行, 统计的是合并前已存在的主键
+    (分区表不支持在 RETURNING 中读取 xmax, 无法据此区分插入与更新)。
+    """
+    type_map = {c["name"]: c["type"] for c in columns_schema}
+    col_list = ", ".join(columns)
+    pk_list = ", ".join(pk_columns)
+    updatable = [c for c in columns if c not in pk_columns]
+    if updatable:
+        assignments = ", ".join(f"{c} = EXCLUDED.{c}" for c in updatable)
+        current = ", ".join(_comparable(f"t.{c}", type_map[c]) for c in updatable)
+        incoming = ", ".join(_comparable(f"EXCLUDED.{c}", type_map[c]) for c in updatable)
+        conflict = f"DO UPDATE SET {assignments} WHERE ROW({current}) IS DISTINCT FROM ROW({incoming})"
+    else:
+        conflict = "DO NOTHING"
+    return (
+        f"WITH src AS ("
+        f"SELECT DISTINCT ON ({pk_list}) {col_list} FROM {stage_name} "
+        f"ORDER BY {pk_list}, {STAGE_ORDINAL_COLUMN} DESC"
+        f"), existing AS ("
+        f"SELECT count(*) AS n FROM src JOIN {table_name} USING ({pk_list})"
+        f"), merged AS ("
+        f"INSERT INTO {table_name} AS t ({col_list}) SELECT {col_list} FROM src "
+        f"ON CONFLICT ({pk_list}) {conflict} "
+        f"RETURNING 1"
+        f") SELECT "
+        f"(SELECT count(*) FROM src) AS source_rows, "
+        f"(SELECT n FROM existing) AS existing_rows, "
+        f"(SELECT count(*) FROM merged) AS merged_rows"
+    )
+
+
+async def _take(records: AsyncIterator[Tuple[Any, ...]], limit: int) -> AsyncIterator[Tuple[Any, ...]]:
+    """从 records 中最多取出 limit 行 (不关闭底层迭代器, 可继续取下一批)。"""
+    for _ in range(limit):
+        try:
+            yield await records.__anext__()
+        except StopAsyncIteration:
+            return
+
+
+async def upsert_upload(
+    session: AsyncSession,
+    table_name: str,
+    columns_schema: List[Dict[str, Any]],
+    reader: UploadReader,
+    batch_rows: int,
+) -> IngestStats:
+    """
+    将 reader 产出的记录按 batch_rows 分批 COPY 到暂存表并合并到 table_name (按主键 upsert)。
+    所有批次在 session 的同一事务中执行, 调用方负责 commit / rollback。
+    """
+    started = time.perf_counter()
+    pk_columns = [c["name"] for c in columns_schema if c.get("is_pk")]
+    if not pk_columns:
+        raise IngestError("Upsert requires a primary key in columns_schema")
+    columns = await reader.open()
+    missing_pk = [c for c in pk_columns if c not in columns]
+    if missing_pk:
+        raise IngestError(f"Upsert requires the primary key columns in the upload: {', '.join(missing_pk)}")
+
+    stage_name = staging_table_name(table_name)
+    await session.execute(text(staging_table_sql(stage_name, columns_schema, columns)))
+    merge = text(merge_sql(table_name, stage_name, columns_schema, columns, pk_columns))
+    pg_conn = await get_asyncpg_connection(session)
+
+    counts = MergeCounts()
+    records = reader.records().__aiter__()
+    while True:
+        rows_before = reader.rows_read
+        copy_started = time.perf_counter()
+        await pg_conn.copy_records_to_table(stage_name, records=_take(records, batch_rows), columns=columns)
+        batch = reader.rows_read - rows_before
+        if batch == 0:
+            break
+        record_statement(f"COPY {stage_name} FROM STDIN (BINARY)", time.perf_counter() - copy_started, "COPY")
+
+        counts.add((await session.execute(merge)).one(), batch)
+        await session.execute(text(f"TRUNCATE {stage_name}"))
+        if batch < batch_rows:
+            break
+
+    return IngestStats(
+        rows=reader.rows_read,
+        bytes=reader.bytes_read,
+        elapsed_seconds=time.perf_counter() - started,
+        merge=counts,
+    )
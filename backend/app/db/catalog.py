@@ -0,0 +1,234 @@
+"""
+物理表的目录快照 (pg_catalog)。
+
+一次查询取回任意多张表的列、注释、索引与约束，替代 SQLAlchemy Inspector 的逐表多次查询。
+返回结构与 Inspector 兼容 (columns -> get_columns, indexes -> get_indexes)，
+可直接交给 DDLGenerator.generate_sync_sqls / detect_type_changes / diff_indexes。
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.db.ddl_generator import DDLGenerator
+
+_CACHE_KEY = "catalog_snapshots"
+
+CATALOG_SQL = text("""
+SELECT
+    c.relname AS name,
+    c.relkind::text AS relkind,
+    obj_description(c.oid, 'pg_class') AS comment,
+    (
+        SELECT coalesce(json_agg(json_build_object(
+            'name', a.attname,
+            'type', format_type(a.atttypid, a.atttypmod),
+            'nullable', NOT a.attnotnull,
+            'default', pg_get_expr(d.adbin, d.adrelid),
+            'comment', col_description(c.oid, a.attnum)
+        ) ORDER BY a.attnum), '[]')
+        FROM pg_attribute a
+        LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+        WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+    ) AS columns,
+    (
+        SELECT coalesce(json_agg(json_build_object(
+            'name', ic.relname,
+            'unique', i.indisunique,
+            'primary', i.indisprimary,
+            'valid', i.indisvalid,
+            'method', am.amname,
+            'column_names', (
+                SELECT json_agg(pg_get_indexdef(i.indexrelid, k, true) ORDER BY k)
+                FROM generate_series(1, i.indnkeyatts) k
+            ),
+            'include_columns', (
+                SELECT coalesce(json_agg(pg_get_indexdef(i.indexrelid, k, true) ORDER BY k), '[]')
+                FROM generate_series(i.indnkeyatts + 1, i.indnatts) k
+            ),
+            -- indoption 每个键列一位标志: 1 = DESC, 2 = NULLS FIRST
+            'options', (
+                SELECT json_agg(i.indoption[k - 1] ORDER BY k)
+                FROM generate_series(1, i.indnkeyatts) k
+            ),
+            'predicate', pg_get_expr(i.indpred, i.indrelid, true),
+            'reloptions', ic.reloptions,
+            'comment', obj_description(i.indexrelid, 'pg_class'),
+            'constraint', con.conname
+        ) ORDER BY ic.relname), '[]')
+        FROM pg_index i
+        JOIN pg_class ic ON ic.oid = i.indexrelid
+        JOIN pg_am am ON am.oid = ic.relam
+        LEFT JOIN pg_constraint con ON con.conindid = i.indexrelid AND con.conrelid = c.oid
+        WHERE i.indrelid = c.oid
+    ) AS indexes,
+    (
+        SELECT coalesce(json_agg(json_build_object(
+            'name', con.conname,
+            'type', con.contype,
+            'columns', (
+                SELECT json_agg(a.attname ORDER BY k.ord)
+                FROM unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+                JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = k.attnum
+            ),
+            'definition', pg_get_constraintdef(con.oid)
+        ) ORDER BY con.conname), '[]')
+        FROM pg_constraint con
+        WHERE con.conrelid = c.oid
+    ) AS constraints
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = current_schema()
+  AND c.relkind IN ('r', 'p')
+  AND c.relname = ANY(:names)
+""")
+
+
+@dataclass
+class TableSnapshot:
+    name: str
+    relkind: str
+    comment: Optional[str] = None
+    columns: List[Dict[str, Any]] = field(default_factory=list)
+    # 不含主键索引; 约束背后的索引带 duplicates_constraint (与 Inspector.get_indexes 一致)
+    indexes: List[Dict[str, Any]] = field(default_factory=list)
+    primary_key: List[str] = field(default_factory=list)
+    constraints: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def is_partitioned(self) -> bool:
+        return self.relkind == "p"
+
+
+def _json(value):
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def _column_sorting(option: int):
+    """indoption -> Inspector.get_indexes 的 column_sorting 标志 (只记录非默认的排序)"""
+    desc, nulls_first = bool(option & 1), bool(option & 2)
+    if desc:
+        return ("desc",) if nulls_first else ("desc", "nulls_last")
+    return ("nulls_first",) if nulls_first else ()
+
+
+def _index_from_catalog(idx: Dict[str, Any]) -> Dict[str, Any]:
+    """目录查询的索引 -> 与 Inspector.get_indexes 兼容的结构 (附加 valid 与 comment)"""
+    options = {}
+    if idx["method"] != "btree":
+        options["postgresql_using"] = idx["method"]
+    if idx["include_columns"]:
+        options["postgresql_include"] = idx["include_columns"]
+    if idx["predicate"]:
+        options["postgresql_where"] = idx["predicate"]
+    if idx["reloptions"]:
+        options["postgresql_with"] = dict(o.split("=", 1) for o in idx["reloptions"])
+    item = {
+        "name": idx["name"],
+        "column_names": idx["column_names"],
+        "unique": idx["unique"],
+        "valid": idx["valid"],
+        "include_columns": idx["include_columns"],
+        "dialect_options": options,
+        "comment": idx["comment"],
+    }
+    sorting = {
+        col: _column_sorting(opt) for col, opt in zip(idx["column_names"], idx["options"] or []) if _column_sorting(opt)
+    }
+    if sorting:
+        item["column_sorting"] = sorting
+    if idx["constraint"]:
+        item["duplicates_constraint"] = idx["constraint"]
+    return item
+
+
+def _snapshot_from_row(row) -> TableSnapshot:
+    indexes = []
+    primary_key = []
+    for idx in _json(row.indexes):
+        if idx["primary"]:
+            primary_key = idx["column_names"]
+            continue
+        indexes.append(_index_from_catalog(idx))
+    return TableSnapshot(
+        name=row.name,
+        relkind=row.relkind,
+        comment=row.comment,
+        columns=_json(row.columns),
+        indexes=indexes,
+        primary_key=primary_key,
+        constraints=_json(row.constraints),
+    )
+
+
+async def load_table_snapshots(
+    conn: Union[AsyncSession, AsyncConnection], table_names: Iterable[str]
+) -> Dict[str, Optional[TableSnapshot]]:
+    """一次查询加载多张表; 不存在的表对应 None。"""
+    names = list(dict.fromkeys(table_names))
+    snapshots: Dict[str, Optional[TableSnapshot]] = {name: None for name in names}
+    if not names:
+        return snapshots
+    result = await conn.execute(CATALOG_SQL, {"names": names})
+    for row in result:
+        snapshots[row.name] = _snapshot_from_row(row)
+    return snapshots
+
+
+async def get_table_snapshots(session: AsyncSession, table_names: Iterable[str]) -> Dict[str, Optional[TableSnapshot]]:
+    """
+    同 load_table_snapshots, 但在 session 的当前事务内缓存结果。
+    事务结束 (commit/rollback) 后自动失效; 事务内执行了 DDL 时调用 invalidate_snapshots。
+    """
+    names = list(dict.fromkeys(table_names))
+    cached_txn, cache = session.info.get(_CACHE_KEY, (None, {}))
+    if cached_txn is None or cached_txn is not session.sync_session.get_transaction():
+        cache = {}
+
+    missing = [name for name in names if name not in cache]
+    if missing:
+        cache.update(await load_table_snapshots(session, missing))
+        session.info[_CACHE_KEY] = (session.sync_session.get_transaction(), cache)
+    return {name: cache[name] for name in names}
+
+
+async def get_table_snapshot(session: AsyncSession, table_name: str) -> Optional[TableSnapshot]:
+    return (await get_table_snapshots(session, [table_name]))[table_name]
+
+
+def invalidate_snapshots(session: AsyncSession):
+    session.info.pop(_CACHE_KEY, None)
+
+
+def table_drift(
+    table_name: str,
+    columns_schema: List[Dict[str, Any]],
+    indexes_schema: List[Dict[str, Any]],
+    partition_config: Optional[Dict[str, Any]],
+    snapshot: Optional[TableSnapshot],
+) -> Dict[str, Any]:
+    """对比表配置与物理表, 返回差异明细; in_sync 表示无需发布。"""
+    if snapshot is None:
+        return {"exists": False, "in_sync": False}
+
+    db_cols = {c["name"]: c for c in snapshot.columns}
+    config_cols = {c["name"]: c for c in columns_schema}
+    to_drop, to_create = DDLGenerator.diff_indexes(table_name, snapshot.indexes, indexes_schema)
+    drift = {
+        "exists": True,
+        "missing_columns": [name for name in config_cols if name not in db_cols],
+        "extra_columns": [name for name in db_cols if name not in config_cols],
+        "type_changes": DDLGenerator.detect_type_changes(snapshot.columns, columns_schema),
+        "comment_changes": [
+            name for name, col in config_cols.items()
+            if name in db_cols and (col.get("comment") or None) != db_cols[name].get("comment")
+        ],
+        "primary_key_changed": snapshot.primary_key != [c["name"] for c in columns_schema if c.get("is_pk")],
+        "indexes_to_drop": to_drop,
+        "indexes_to_create": [idx["name"] for idx in to_create],
+        "partitioning_changed": bool(partition_config) != snapshot.is_partitioned,
+    }
+    drift["in_sync"] = not any(v for k, v in drift.items() if k != "exists")
+    return drift
@@ -1,4 +1,6 @@
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Optional
+from datetime import date, timedelta
+import hashlib
 import re
 from sqlalchemy import MetaData, Table, Column
 from sqlalchemy.schema import CreateTable
@@ -23,6 +25,46 @@ RESERVED_KEYWORDS = {
     "TRAILING", "TRUE", "UNION", "UNIQUE", "USER", "USING", "VERBOSE", "WHEN", "WHERE", "WINDOW", "WITH"
 }
 
+# 类型名别名 -> 规范名, 用于对比配置类型与数据库实际类型 (inspect 对象或 format_type 字符串)
+TYPE_ALIASES = {
+    "INT": "INTEGER", "INT4": "INTEGER", "INT8": "BIGINT", "INT2": "SMALLINT",
+    "FLOAT": "DOUBLE PRECISION", "FLOAT8": "DOUBLE PRECISION", "FLOAT4": "REAL",
+    "DECIMAL": "NUMERIC", "BOOL": "BOOLEAN",
+    "CHARACTER VARYING": "VARCHAR", "CHARACTER": "CHAR", "BPCHAR": "CHAR",
+    "TIMESTAMP": "TIMESTAMP WITHOUT TIME ZONE", "TIMESTAMPTZ": "TIMESTAMP WITH TIME ZONE",
+    "TIME": "TIME WITHOUT TIME ZONE", "TIMETZ": "TIME WITH TIME ZONE",
+}
+
+# 索引方法; unique / include / 排序只有 btree 支持
+INDEX_METHODS = {"btree", "brin", "hash", "gin"}
+# 各索引方法允许的存储参数 (WITH (...)) 及取值类型
+INDEX_STORAGE_PARAMS = {
+    "btree": {"fillfactor": int, "deduplicate_items": bool},
+    "hash": {"fillfactor": int},
+    "brin": {"pages_per_range": int, "autosummarize": bool},
+    "gin": {"fastupdate": bool, "gin_pending_list_limit": int},
+}
+INDEX_STORAGE_RANGES = {"fillfactor": (10, 100), "pages_per_range": (1, 131072), "gin_pending_list_limit": (64, 2147483647)}
+
+# 部分索引 WHERE 条件允许的关键字 / 函数 / 类型 (谓词只能引用本表列, 且必须是 IMMUTABLE 的表达式)
+PREDICATE_KEYWORDS = {"AND", "OR", "NOT", "IS", "NULL", "TRUE", "FALSE", "IN", "BETWEEN", "LIKE", "ILIKE", "DISTINCT", "FROM"}
+PREDICATE_FUNCTIONS = {"lower", "upper", "abs", "coalesce", "length", "trim"}
+PREDICATE_TYPES = {"date", "timestamp", "timestamptz", "numeric", "int", "integer", "bigint", "smallint", "text", "varchar", "boolean", "real"}
+PREDICATE_MAX_LENGTH = 1000
+# Postgres 标识符的最大字节数 (NAMEDATALEN - 1)
+MAX_IDENTIFIER_LENGTH = 63
+_PREDICATE_TOKEN = re.compile(
+    r"\s*(?:(?P<string>'(?:[^']|'')*')|(?P<number>\d+(?:\.\d+)?)|(?P<ident>[A-Za-z_][A-Za-z0-9_]*)"
+    r"|(?P<comment>--|/\*)|(?P<op>::|<>|!=|<=|>=|=|<|>|\+|-|\*|/|%|\|\|)|(?P<paren>[()])|(?P<comma>,))"
+)
+# 记录在索引注释中的 WHERE 条件 (数据库会改写谓词文本, 无法与配置直接比较)
+INDEX_PREDICATE_COMMENT_PREFIX = "where: "
+
+PARTITION_STRATEGIES = {"range", "list"}
+PARTITION_INTERVALS = {"day", "month", "year"}
+# range 分区键必须是时间类型
+RANGE_PARTITION_KEY_TYPES = {"DATE", "TIMESTAMP", "TIMESTAMPTZ"}
+
 class DDLGenerator:
     """
     负责将 DataTableConfig 的元数据转换为可执行的 SQL DDL 语句。
@@ -78,7 +120,7 @@ class DDLGenerator:
         return base_type
 
     @staticmethod
-    def validate_schema(table_name: str, columns_schema: List[Dict[str, Any]], indexes_schema: List[Dict[str, Any]]) -> Tuple[bool, str | None]:
+    def validate_schema(table_name: str, columns_schema: List[Dict[str, Any]], indexes_schema: List[Dict[str, Any]], partition_config: Optional[Dict[str, Any]] = None) -> Tuple[bool, str | None]:
         """
         Validate the table schema before creation.
         Returns: (is_valid, error_message)
@@ -119,20 +161,183 @@ class DDLGenerator:
             return False, "必须定义主键 (Primary Key)"
 
         # 4. Check Indexes
+        col_map = {c["name"]: c for c in columns_schema}
         for idx in indexes_schema:
-            idx_cols = idx.get("columns", [])
-            if not idx_cols:
-                return False, f"索引 '{idx.get('name')}' 未指定任何列"
+            error = DDLGenerator.validate_index(idx, col_map)
+            if error:
+                return False, error
+
+        # 5. Check Partitioning
+        if partition_config:
+            return DDLGenerator.validate_partition_config(columns_schema, indexes_schema, partition_config, table_name)
+
+        return True, None
+
+    @staticmethod
+    def validate_index(idx: Dict[str, Any], col_map: Dict[str, Dict[str, Any]]) -> Optional[str]:
+        """校验单个索引定义 (方法、列、INCLUDE、排序、存储参数、WHERE 条件), 返回错误信息或 None"""
+        label = idx.get("name") or ", ".join(idx.get("columns", []))
+        idx_cols = idx.get("columns", [])
+        if not idx_cols:
+            return f"索引 '{idx.get('name')}' 未指定任何列"
+        for c in idx_cols:
+            if c not in col_map:
+                return f"索引引用的列 '{c}' 不存在"
+        if len(set(idx_cols)) != len(idx_cols):
+            return f"索引 '{label}' 的列重复"
+
+        method = idx.get("method") or "btree"
+        if method not in INDEX_METHODS:
+            return f"索引 '{label}' 的方法 '{method}' 不支持 (可选 {', '.join(sorted(INDEX_METHODS))})"
+        include = idx.get("include") or []
+        order = idx.get("order") or {}
+        if method != "btree":
+            if idx.get("unique"):
+                return f"{method} 索引 '{label}' 不支持 unique"
+            if include:
+                return f"{method} 索引 '{label}' 不支持 include 列"
+            if order:
+                return f"{method} 索引 '{label}' 不支持列排序"
+        if method == "hash" and len(idx_cols) != 1:
+            return f"hash 索引 '{label}' 只能包含一列"
+        if method == "gin":
             for c in idx_cols:
-                if c not in col_names:
-                    return False, f"索引引用的列 '{c}' 不存在"
+                if not isinstance(DDLGenerator._parse_type(col_map[c]["type"]), (JSONB, ARRAY)):
+                    return f"gin 索引 '{label}' 的列 '{c}' 必须是 JSONB 或数组类型"
+
+        for c in include:
+            if c not in col_map:
+                return f"索引 '{label}' 的 include 列 '{c}' 不存在"
+            if c in idx_cols:
+                return f"索引 '{label}' 的 include 列 '{c}' 已是索引列"
+        for c, direction in order.items():
+            if c not in idx_cols:
+                return f"索引 '{label}' 的排序列 '{c}' 不是索引列"
+            if direction not in ("asc", "desc"):
+                return f"索引 '{label}' 的列 '{c}' 排序方向无效 (asc/desc)"
+
+        allowed = INDEX_STORAGE_PARAMS[method]
+        for key, value in (idx.get("storage") or {}).items():
+            if key not in allowed:
+                return f"{method} 索引 '{label}' 不支持存储参数 '{key}' (可选 {', '.join(sorted(allowed))})"
+            expected = allowed[key]
+            if expected is bool and not isinstance(value, bool):
+                return f"索引 '{label}' 的存储参数 '{key}' 必须是布尔值"
+            if expected is int:
+                if isinstance(value, bool) or not isinstance(value, int):
+                    return f"索引 '{label}' 的存储参数 '{key}' 必须是整数"
+                low, high = INDEX_STORAGE_RANGES[key]
+                if not low <= value <= high:
+                    return f"索引 '{label}' 的存储参数 '{key}' 超出范围 [{low}, {high}]"
+
+        where = idx.get("where")
+        if where is not None:
+            error = DDLGenerator.validate_index_predicate(where, col_map)
+            if error:
+                return f"索引 '{label}' 的 WHERE 条件无效: {error}"
+        return None
+
+    @staticmethod
+    def validate_index_predicate(predicate: str, col_map: Dict[str, Any]) -> Optional[str]:
+        """
+        部分索引的 WHERE 条件: 只允许本表列、字面量、比较/逻辑运算与少量不可变函数,
+        不允许子查询、分号、注释与引号标识符 (条件会直接拼接进 DDL)。
+        """
+        if not predicate.strip():
+            return "条件为空"
+        if len(predicate) > PREDICATE_MAX_LENGTH:
+            return f"条件过长 (最多 {PREDICATE_MAX_LENGTH} 字符)"
+
+        tokens = []
+        pos = 0
+        source = predicate.rstrip()
+        while pos < len(source):
+            match = _PREDICATE_TOKEN.match(source, pos)
+            if not match or match.end() == pos:
+                return f"无法识别 '{source[pos:].strip()[:20]}'"
+            kind = match.lastgroup
+            if kind == "comment":
+                # 注释会吞掉 DDL 脚本中其后的语句终止符
+                return "不允许注释 (-- 或 /*)"
+            tokens.append((kind, match.group(kind)))
+            pos = match.end()
+
+        depth = 0
+        for i, (kind, value) in enumerate(tokens):
+            prev = tokens[i - 1] if i > 0 else (None, None)
+            nxt = tokens[i + 1] if i + 1 < len(tokens) else (None, None)
+            if kind == "paren":
+                depth += 1 if value == "(" else -1
+                if depth < 0:
+                    return "括号不匹配"
+            elif kind == "ident":
+                lowered = value.lower()
+                if prev == ("op", "::"):
+                    if lowered not in PREDICATE_TYPES:
+                        return f"不支持的类型转换 '{value}'"
+                elif lowered in col_map:
+                    continue
+                elif value.upper() in PREDICATE_KEYWORDS:
+                    continue
+                elif lowered in PREDICATE_FUNCTIONS and nxt == ("paren", "("):
+                    continue
+                elif lowered in PREDICATE_TYPES and nxt[0] == "string":
+                    continue  # 类型字面量, e.g. DATE '2024-01-01'
+                else:
+                    return f"未知的列或关键字 '{value}'"
+        if depth != 0:
+            return "括号不匹配"
+        return None
+
+    @staticmethod
+    def normalize_predicate(predicate: Optional[str]) -> Optional[str]:
+        if predicate is None:
+            return None
+        return " ".join(predicate.split())
+
+    @staticmethod
+    def validate_partition_config(columns_schema: List[Dict[str, Any]], indexes_schema: List[Dict[str, Any]], partition_config: Dict[str, Any], table_name: Optional[str] = None) -> Tuple[bool, str | None]:
+        """
+        PostgreSQL 要求主键和唯一索引必须包含分区键。
+        list 分区的各 value 必须对应不同的分区表名 (分区 DDL 为 IF NOT EXISTS, 重名的分区会被跳过, 数据落入默认分区)。
+        """
+        key = partition_config.get("key")
+        strategy = partition_config.get("strategy")
+        col_map = {c["name"]: c for c in columns_schema}
+
+        if key not in col_map:
+            return False, f"分区键 '{key}' 不存在"
+        if strategy not in PARTITION_STRATEGIES:
+            return False, f"不支持的分区策略 '{strategy}'"
+
+        if strategy == "range":
+            if partition_config.get("interval") not in PARTITION_INTERVALS:
+                return False, "range 分区必须指定 interval (day/month/year)"
+            if col_map[key]["type"].strip().upper() not in RANGE_PARTITION_KEY_TYPES:
+                return False, f"range 分区键 '{key}' 必须是 DATE/TIMESTAMP/TIMESTAMPTZ 类型"
+        elif not partition_config.get("values"):
+            return False, "list 分区必须指定 values"
+        elif table_name:
+            seen = {}
+            for value in partition_config["values"]:
+                name = DDLGenerator.list_partition_name(table_name, value)
+                if name in seen:
+                    return False, f"list 分区值 '{seen[name]}' 与 '{value}' 对应同一个分区表 {name}"
+                seen[name] = value
+
+        if not col_map[key].get("is_pk"):
+            return False, f"分区键 '{key}' 必须是主键的一部分"
+        for idx in indexes_schema:
+            if idx.get("unique") and key not in idx.get("columns", []):
+                return False, f"唯一索引 '{idx.get('name')}' 必须包含分区键 '{key}'"
 
         return True, None
 
     @staticmethod
-    def generate_create_table_sqls(table_name: str, table_comment: str, columns_schema: List[Dict[str, Any]]) -> List[str]:
+    def generate_create_table_sqls(table_name: str, table_comment: str, columns_schema: List[Dict[str, Any]], partition_config: Optional[Dict[str, Any]] = None) -> List[str]:
         """
         生成建表 SQL 语句列表
+        配置了 partition_config 时创建分区父表，并预建分区。
         """
         metadata = MetaData()
         columns = []
@@ -153,7 +358,10 @@ class DDLGenerator:
                 comments[col_name] = comment
 
         # 创建临时的 Table 对象
-        table = Table(table_name, metadata, *columns)
+        table_kwargs = {}
+        if partition_config:
+            table_kwargs["postgresql_partition_by"] = f"{partition_config['strategy'].upper()} ({partition_config['key']})"
+        table = Table(table_name, metadata, *columns, **table_kwargs)
 
         # 生成 CREATE TABLE 语句
         create_stmt = CreateTable(table).compile(dialect=postgresql.dialect())
@@ -169,32 +377,287 @@ class DDLGenerator:
         for col_name, comment in comments.items():
             safe_comment = comment.replace("'", "''")
             sql_lines.append(f"COMMENT ON COLUMN {table_name}.{col_name} IS '{safe_comment}';")
+
+        if partition_config:
+            start = partition_config.get("start")
+            sql_lines.extend(DDLGenerator.generate_partition_sqls(
+                table_name, partition_config,
+                from_date=date.fromisoformat(start) if start else None
+            ))
             
         return sql_lines
 
     @staticmethod
-    def generate_index_sqls(table_name: str, indexes_schema: List[Dict[str, Any]]) -> List[str]:
+    def _period_start(d: date, interval: str) -> date:
+        if interval == "year":
+            return date(d.year, 1, 1)
+        if interval == "month":
+            return date(d.year, d.month, 1)
+        return d
+
+    @staticmethod
+    def _next_period(d: date, interval: str) -> date:
+        if interval == "year":
+            return date(d.year + 1, 1, 1)
+        if interval == "month":
+            return date(d.year + (d.month // 12), d.month % 12 + 1, 1)
+        return d + timedelta(days=1)
+
+    @staticmethod
+    def _hashed_name(name: str, key: str) -> str:
+        """截断到 63 字节并追加 key 的短哈希: Postgres 会静默截断过长的标识符, 截断后同名的分区会被 IF NOT EXISTS 跳过"""
+        digest = hashlib.sha1(key.encode()).hexdigest()[:8]
+        return name[:MAX_IDENTIFIER_LENGTH - len(digest) - 1].rstrip("_") + f"_{digest}"
+
+    @staticmethod
+    def range_partition_name(table_name: str, period_start: date, interval: str) -> str:
+        fmt = {"day": "%Y%m%d", "month": "%Y%m", "year": "%Y"}[interval]
+        name = f"{table_name}_p{period_start.strftime(fmt)}"
+        if len(name) > MAX_IDENTIFIER_LENGTH:
+            name = DDLGenerator._hashed_name(name, name)
+        return name
+
+    @staticmethod
+    def default_partition_name(table_name: str) -> str:
+        name = f"{table_name}_default"
+        if len(name) > MAX_IDENTIFIER_LENGTH:
+            name = DDLGenerator._hashed_name(name, name)
+        return name
+
+    @staticmethod
+    def list_partition_name(table_name: str, value: str) -> str:
+        """
+        值只含字母、数字与下划线时为 {table}_p_{小写值}; 否则 (e.g. 'A-B', '上交所') 或超过 63 字节时
+        截断并追加原值的短哈希, 避免不同的值映射到同一个分区表名。
+        """
+        raw = str(value)
+        slug = re.sub(r"[^a-z0-9]+", "_", raw.lower()).strip("_")
+        name = f"{table_name}_p_{slug}"
+        if slug != raw.lower() or len(name.encode()) > MAX_IDENTIFIER_LENGTH:
+            name = DDLGenerator._hashed_name(name, raw)
+        return name
+
+    @staticmethod
+    def generate_partition_sqls(table_name: str, partition_config: Dict[str, Any], from_date: Optional[date] = None, today: Optional[date] = None) -> List[str]:
+        """
+        生成子分区 DDL (幂等, IF NOT EXISTS)。
+        range: 从 from_date (默认为当前周期) 起建到当前周期之后 premake 个周期。
+        list: 每个 value 一个分区。
+        """
+        sqls = []
+        strategy = partition_config["strategy"]
+
+        if strategy == "range":
+            interval = partition_config["interval"]
+            premake = partition_config.get("premake", 3)
+            today = today or date.today()
+
+            current = DDLGenerator._period_start(from_date or today, interval)
+            end = DDLGenerator._period_start(today, interval)
+            for _ in range(premake + 1):
+                end = DDLGenerator._next_period(end, interval)
+
+            while current < end:
+                upper = DDLGenerator._next_period(current, interval)
+                part_name = DDLGenerator.range_partition_name(table_name, current, interval)
+                sqls.append(
+                    f"CREATE TABLE IF NOT EXISTS {part_name} PARTITION OF {table_name} "
+                    f"FOR VALUES FROM ('{current.isoformat()}') TO ('{upper.isoformat()}');"
+                )
+                current = upper
+        else:
+            for value in partition_config["values"]:
+                part_name = DDLGenerator.list_partition_name(table_name, value)
+                safe_value = str(value).replace("'", "''")
+                sqls.append(
+                    f"CREATE TABLE IF NOT EXISTS {part_name} PARTITION OF {table_name} "
+                    f"FOR VALUES IN ('{safe_value}');"
+                )
+
+        if partition_config.get("default_partition", True):
+            sqls.append(
+                f"CREATE TABLE IF NOT EXISTS {DDLGenerator.default_partition_name(table_name)} PARTITION OF {table_name} DEFAULT;"
+            )
+
+        return sqls
+
+    @staticmethod
+    def index_name(table_name: str, idx: Dict[str, Any]) -> str:
+        idx_name = (idx.get("name") or "").strip()
+        # Auto-generate index name if missing
+        if not idx_name:
+            clean_cols = [c.replace('"', '').replace(' ', '') for c in idx["columns"]]
+            base = "_".join(clean_cols)
+            # Truncate to avoid too long names (Postgres limit 63 chars usually)
+            idx_name = f"idx_{table_name}_{base}"[:60]
+        return idx_name
+
+    @staticmethod
+    def _storage_value(value: Any) -> str:
+        if isinstance(value, bool):
+            return "on" if value else "off"
+        return str(value)
+
+    @staticmethod
+    def index_predicate_comment(idx: Dict[str, Any]) -> Optional[str]:
+        where = DDLGenerator.normalize_predicate(idx.get("where"))
+        return f"{INDEX_PREDICATE_COMMENT_PREFIX}{where}" if where else None
+
+    @staticmethod
+    def generate_index_comment_sql(table_name: str, idx: Dict[str, Any]) -> Optional[str]:
+        comment = DDLGenerator.index_predicate_comment(idx)
+        if not comment:
+            return None
+        safe_comment = comment.replace("'", "''")
+        return f"COMMENT ON INDEX {DDLGenerator.index_name(table_name, idx)} IS '{safe_comment}';"
+
+    @staticmethod
+    def generate_index_sql(table_name: str, idx: Dict[str, Any], concurrently: bool = False) -> str:
+        """
+        CREATE [UNIQUE] INDEX [CONCURRENTLY] IF NOT EXISTS name ON table [USING method]
+            (col [DESC], ...) [INCLUDE (...)] [WITH (...)] [WHERE ...]
+        """
+        idx_name = DDLGenerator.index_name(table_name, idx)
+        method = idx.get("method") or "btree"
+        order = idx.get("order") or {}
+
+        unique_str = "UNIQUE " if idx.get("unique", False) else ""
+        concurrently_str = "CONCURRENTLY " if concurrently else ""
+        using_str = f"USING {method} " if method != "btree" else ""
+        cols_str = ", ".join(f"{c} DESC" if order.get(c) == "desc" else c for c in idx["columns"])
+
+        sql = f"CREATE {unique_str}INDEX {concurrently_str}IF NOT EXISTS {idx_name} ON {table_name} {using_str}({cols_str})"
+        if idx.get("include"):
+            sql += f" INCLUDE ({', '.join(idx['include'])})"
+        if idx.get("storage"):
+            params = ", ".join(f"{k} = {DDLGenerator._storage_value(v)}" for k, v in idx["storage"].items())
+            sql += f" WITH ({params})"
+        if idx.get("where"):
+            sql += f" WHERE {DDLGenerator.normalize_predicate(idx['where'])}"
+        return sql + ";"
+
+    @staticmethod
+    def generate_index_sqls(table_name: str, indexes_schema: List[Dict[str, Any]], concurrently: bool = False) -> List[str]:
+        """
+        concurrently=True 时生成 CREATE INDEX CONCURRENTLY (不能在事务中执行)。
+        部分索引在建索引后记录 WHERE 条件的注释, 供 diff_indexes 比较。
+        """
         sqls = []
         for idx in indexes_schema:
-            idx_name = idx.get("name", "").strip()
-            cols = idx["columns"]
-            is_unique = idx.get("unique", False)
-            
-            # Auto-generate index name if missing
-            if not idx_name:
-                clean_cols = [c.replace('"', '').replace(' ', '') for c in cols]
-                base = "_".join(clean_cols)
-                # Truncate to avoid too long names (Postgres limit 63 chars usually)
-                idx_name = f"idx_{table_name}_{base}"[:60]
-
-            unique_str = "UNIQUE" if is_unique else ""
-            cols_str = ", ".join(cols)
-            
-            # Double check syntax: CREATE [UNIQUE] INDEX [IF NOT EXISTS] name ON table (col1, col2)
-            sql = f"CREATE {unique_str} INDEX IF NOT EXISTS {idx_name} ON {table_name} ({cols_str});"
-            sqls.append(sql)
+            sqls.append(DDLGenerator.generate_index_sql(table_name, idx, concurrently))
+            comment_sql = DDLGenerator.generate_index_comment_sql(table_name, idx)
+            if comment_sql:
+                sqls.append(comment_sql)
         return sqls
 
+    @staticmethod
+    def generate_drop_index_sqls(index_names: List[str], concurrently: bool = False) -> List[str]:
+        concurrently_str = "CONCURRENTLY " if concurrently else ""
+        return [f"DROP INDEX {concurrently_str}IF EXISTS {name};" for name in index_names]
+
+    @staticmethod
+    def _index_matches(db_idx: Dict[str, Any], target: Dict[str, Any]) -> bool:
+        options = db_idx.get("dialect_options") or {}
+        db_include = db_idx.get("include_columns") or options.get("postgresql_include") or []
+        db_sorting = {c: "desc" for c, flags in (db_idx.get("column_sorting") or {}).items() if "desc" in flags}
+        db_storage = {k: str(v).lower() for k, v in (options.get("postgresql_with") or {}).items()}
+        target_storage = {k: DDLGenerator._storage_value(v) for k, v in (target.get("storage") or {}).items()}
+        if target.get("where"):
+            # 数据库中的谓词文本已被改写, 比较建索引时记录的注释
+            same_where = bool(options.get("postgresql_where")) and db_idx.get("comment") == DDLGenerator.index_predicate_comment(target)
+        else:
+            same_where = not options.get("postgresql_where")
+        return (
+            list(db_idx.get("column_names") or []) == list(target["columns"])
+            and bool(db_idx.get("unique")) == bool(target.get("unique", False))
+            and options.get("postgresql_using", "btree") == (target.get("method") or "btree")
+            and list(db_include) == list(target.get("include") or [])
+            and db_sorting == {c: d for c, d in (target.get("order") or {}).items() if d == "desc"}
+            and db_storage == target_storage
+            and same_where
+        )
+
+    @staticmethod
+    def diff_indexes(table_name: str, db_indexes: List[Dict[str, Any]], indexes_schema: List[Dict[str, Any]]) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        对比期望的 indexes_schema 与数据库中的索引 (来自 inspect().get_indexes() 或 catalog 快照)，
+        只返回需要变更的部分: (要删除的索引名, 要创建的索引定义)。
+        定义变化 (列/唯一性/索引方法/INCLUDE/排序/存储参数/WHERE 条件) 的同名索引会先删后建；
+        主键及约束背后的索引不处理。
+        """
+        desired = {DDLGenerator.index_name(table_name, idx): idx for idx in indexes_schema}
+
+        to_drop = []
+        unchanged = set()
+        for db_idx in db_indexes:
+            name = db_idx["name"]
+            if db_idx.get("duplicates_constraint"):
+                continue
+            target = desired.get(name)
+            if target is None:
+                to_drop.append(name)
+                continue
+
+            # 失败的 CONCURRENTLY 建索引残留的 INVALID 索引需要重建
+            if db_idx.get("valid", True) and DDLGenerator._index_matches(db_idx, target):
+                unchanged.add(name)
+            else:
+                to_drop.append(name)
+
+        to_create = [
+            {**idx, "name": name} for name, idx in desired.items() if name not in unchanged
+        ]
+        return to_drop, to_create
+
+    @staticmethod
+    def canonical_type(type_def: Any) -> str:
+        """
+        将类型 (SQLAlchemy 类型对象或 SQL 类型字符串) 规范化为可比较的字符串。
+        e.g. 'character varying(20)' / VARCHAR(length=20) -> 'VARCHAR(20)'
+        """
+        if isinstance(type_def, str):
+            type_sql = type_def
+        else:
+            type_sql = str(type_def.compile(dialect=postgresql.dialect()))
+
+        type_sql = " ".join(type_sql.strip().upper().split())
+        suffix = ""
+        while type_sql.endswith("[]"):
+            suffix += "[]"
+            type_sql = type_sql[:-2].strip()
+
+        args = ""
+        match = re.match(r"^(.*?)\s*\((.*)\)(.*)$", type_sql)
+        if match:
+            # 'timestamp(3) without time zone' 形式: 参数在中间
+            base = f"{match.group(1)}{match.group(3)}".strip()
+            args = "(" + ",".join(a.strip() for a in match.group(2).split(",")) + ")"
+        else:
+            base = type_sql
+        return TYPE_ALIASES.get(base, base) + args + suffix
+
+    @staticmethod
+    def detect_type_changes(current_db_columns: List[Dict[str, Any]], new_schema_columns: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        找出配置类型与数据库类型不一致的已存在列。
+        返回: [{'name', 'from_type', 'to_type', 'is_pk'}], to_type 为可直接用于 DDL 的类型 SQL。
+        """
+        db_col_map = {c['name']: c for c in current_db_columns}
+        changes = []
+        for col in new_schema_columns:
+            db_col = db_col_map.get(col['name'])
+            if db_col is None:
+                continue
+            target = DDLGenerator._parse_type(col['type']).compile(dialect=postgresql.dialect())
+            if DDLGenerator.canonical_type(db_col['type']) != DDLGenerator.canonical_type(target):
+                changes.append({
+                    'name': col['name'],
+                    'from_type': DDLGenerator.canonical_type(db_col['type']),
+                    'to_type': str(target),
+                    'is_pk': bool(col.get('is_pk')),
+                })
+        return changes
+
     @staticmethod
     def generate_sync_sqls(table_name: str, current_db_columns: List[Dict[str, Any]], new_schema_columns: List[Dict[str, Any]]) -> List[str]:
         """
@@ -234,8 +697,8 @@ class DDLGenerator:
                     safe_comment = (new_comment or "").replace("'", "''")
                     sqls.append(f"COMMENT ON COLUMN {table_name}.{name} IS '{safe_comment}';")
 
-                # ALTER TYPE? (Skipped for safety as discussed)
-                pass
+                # 类型变化不在这里 ALTER TYPE (会重写全表并长时间持有排他锁),
+                # 由 detect_type_changes + online_migration 在线迁移处理
 
         # 2. Handle DROP
         for name in db_col_map:
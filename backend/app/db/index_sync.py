@@ -0,0 +1,134 @@
+"""
+索引同步执行器。
+
+按 DDLGenerator.diff_indexes 的结果只变更有差异的索引，
+使用 CREATE/DROP INDEX CONCURRENTLY 在独立的 AUTOCOMMIT 连接上逐个执行，避免长时间阻塞读写。
+定义变化的索引先以临时名称建好新定义, 成功后再删除旧索引并改名; 新建失败时保留旧索引。
+"""
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.job_queue import set_job_step
+from app.db.ddl_generator import DDLGenerator
+
+logger = logging.getLogger(__name__)
+
+# 替换定义变化的索引时, 新定义使用的临时名称后缀
+REPLACE_SUFFIX = "__qf_tmp"
+
+
+@dataclass
+class IndexOperation:
+    index_name: str
+    action: str  # "drop" | "create" | "rename" | "comment" (部分索引记录 WHERE 条件)
+    sql: str
+    status: str = "pending"  # pending | done | failed | skipped
+    depends_on: Optional[str] = None  # 该索引的 create 失败时跳过 (不删除旧索引)
+    elapsed_seconds: float = 0.0
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def replacement_index_name(index_name: str) -> str:
+    return f"{index_name[:63 - len(REPLACE_SUFFIX)]}{REPLACE_SUFFIX}"
+
+
+def plan_index_operations(
+    table_name: str,
+    db_indexes: List[Dict[str, Any]],
+    indexes_schema: List[Dict[str, Any]],
+    concurrently: bool = True,
+) -> List[IndexOperation]:
+    """
+    生成索引变更计划: 删除过期的索引, 创建新增的索引。
+    定义变化的同名索引: 以临时名称创建新定义 -> 删除旧索引 -> 改名, 后两步在创建失败时跳过, 旧索引保留。
+    分区父表不支持 CONCURRENTLY，调用方应传 concurrently=False。
+    """
+    to_drop, to_create = DDLGenerator.diff_indexes(table_name, db_indexes, indexes_schema)
+    replaced = {idx["name"] for idx in to_create} & set(to_drop)
+    stale = [name for name in to_drop if name not in replaced]
+    ops = [
+        IndexOperation(index_name=name, action="drop", sql=sql)
+        for name, sql in zip(stale, DDLGenerator.generate_drop_index_sqls(stale, concurrently))
+    ]
+    for idx in to_create:
+        name = idx["name"]
+        if name not in replaced:
+            ops.append(IndexOperation(
+                index_name=name, action="create", sql=DDLGenerator.generate_index_sql(table_name, idx, concurrently)
+            ))
+        else:
+            temp = replacement_index_name(name)
+            # 上次中断残留的临时索引可能是旧定义, 先删除
+            drop_temp, drop_old = DDLGenerator.generate_drop_index_sqls([temp, name], concurrently)
+            ops += [
+                IndexOperation(index_name=temp, action="drop", sql=drop_temp),
+                IndexOperation(
+                    index_name=temp, action="create",
+                    sql=DDLGenerator.generate_index_sql(table_name, {**idx, "name": temp}, concurrently),
+                ),
+                IndexOperation(index_name=name, action="drop", sql=drop_old, depends_on=temp),
+                IndexOperation(
+                    index_name=name, action="rename", sql=f"ALTER INDEX {temp} RENAME TO {name};", depends_on=temp
+                ),
+            ]
+        comment_sql = DDLGenerator.generate_index_comment_sql(table_name, idx)
+        if comment_sql:
+            ops.append(IndexOperation(
+                index_name=name, action="comment", sql=comment_sql,
+                depends_on=replacement_index_name(name) if name in replaced else None,
+            ))
+    return ops
+
+
+async def apply_index_operations(
+    engine: AsyncEngine,
+    ops: List[IndexOperation],
+    on_progress: Optional[Callable[[IndexOperation, int, int], None]] = None,
+) -> List[IndexOperation]:
+    """
+    在 AUTOCOMMIT 连接上逐个执行索引操作，记录每个索引的耗时与结果。
+    某个索引失败不会中断后续操作；失败的 CONCURRENTLY 建索引会残留 INVALID 索引，需要清理掉。
+    依赖的 create 失败的操作标记为 skipped (被替换的旧索引保留)。
+    """
+    if not ops:
+        return ops
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        total = len(ops)
+        failed_creates = set()
+        for i, op in enumerate(ops, start=1):
+            if op.depends_on in failed_creates:
+                op.status = "skipped"
+                logger.warning(f"[{i}/{total}] {op.action} index {op.index_name}: skipped ({op.depends_on} failed)")
+                continue
+            started = time.perf_counter()
+            set_job_step(f"[{i}/{total}] {op.sql}")
+            try:
+                await conn.execute(text(op.sql))
+                op.status = "done"
+            except Exception as e:
+                op.status = "failed"
+                op.error = str(e)
+                logger.error(f"Index operation failed: {op.sql} | {e}")
+                if op.action == "create":
+                    failed_creates.add(op.index_name)
+                    try:
+                        await conn.execute(text(f"DROP INDEX IF EXISTS {op.index_name}"))
+                    except Exception:
+                        logger.exception(f"Failed to clean up invalid index {op.index_name}")
+            op.elapsed_seconds = time.perf_counter() - started
+
+            logger.info(f"[{i}/{total}] {op.action} index {op.index_name}: {op.status} ({op.elapsed_seconds:.2f}s)")
+            if on_progress:
+                on_progress(op, i, total)
+
+    return ops
@@ -0,0 +1,260 @@
+"""
+后台任务的执行: 入队、worker 池、心跳与恢复。
+
+任务状态流转: queued -> running -> succeeded | failed
+    - enqueue_job 写入 jobs 表并把 id 放入队列 (app.core.job_queue)
+    - worker 以条件更新 (status = queued) 领取任务，重复投递的 id 会被跳过
+    - 执行期间心跳定期写回 heartbeat_at 与 current_step；心跳超过 JOB_STALE_SECONDS 的任务视为 worker 已退出
+各任务类型的处理函数通过 @job_handler(kind) 注册，参数为 jobs.params，返回值 (可 JSON 序列化) 写入 jobs.result。
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.job_queue import JobContext, job_context, job_queue
+from app.db.session import AsyncSessionLocal
+from app.models.job import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+_handlers: Dict[str, JobHandler] = {}
+
+# 当前进程中正在执行的任务, 查询时优先返回尚未写回的实时步骤
+_running: Dict[int, JobContext] = {}
+
+ACTIVE_STATUSES = (JobStatus.QUEUED, JobStatus.RUNNING)
+
+
+class JobError(Exception):
+    """任务失败; status_code/detail 原样写入 jobs.error。"""
+
+    def __init__(self, detail: Any, status_code: int = 500):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def job_handler(kind: str):
+    def decorator(fn: JobHandler) -> JobHandler:
+        _handlers[kind] = fn
+        return fn
+    return decorator
+
+
+def _error_payload(exc: BaseException) -> Dict[str, Any]:
+    # PublishError / HTTPException 等带 status_code + detail 的异常保留原始信息
+    return {
+        "status_code": getattr(exc, "status_code", 500),
+        "detail": jsonable_encoder(getattr(exc, "detail", None) or str(exc) or type(exc).__name__),
+    }
+
+
+async def enqueue_job(
+    session: AsyncSession, kind: str, params: Dict[str, Any], table_id: Optional[int] = None
+) -> Job:
+    """创建任务并入队。会提交 session 的当前事务。"""
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = Job(kind=kind, params=jsonable_encoder(params), table_id=table_id, status=JobStatus.QUEUED, attempts=0)
+    session.add(job)
+    await session.commit()
+    try:
+        await job_queue.put(job.id)
+    except Exception:
+        # 任务已落库, worker 启动时会重新入队
+        logger.exception(f"Failed to push job {job.id} to the queue")
+    return job
+
+
+async def has_active_job(session: AsyncSession, kind: str, table_id: int) -> bool:
+    stmt = select(Job.id).where(Job.kind == kind, Job.table_id == table_id, Job.status.in_(ACTIVE_STATUSES)).limit(1)
+    return (await session.execute(stmt)).scalar_one_or_none() is not None
+
+
+def describe_job(job: Job) -> Dict[str, Any]:
+    ctx = _running.get(job.id)
+    current_step = ctx.step if ctx is not None and ctx.step is not None else job.current_step
+    elapsed = None
+    if job.started_at is not None:
+        end = job.finished_at or datetime.now(timezone.utc)
+        elapsed = round((end - job.started_at).total_seconds(), 3)
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "table_id": job.table_id,
+        "params": job.params,
+        "current_step": current_step,
+        "attempts": job.attempts,
+        "elapsed_seconds": elapsed,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "heartbeat_at": job.heartbeat_at,
+    }
+
+
+async def _claim(job_id: int) -> Optional[Job]:
+    async with AsyncSessionLocal() as session:
+        stmt = (
+            update(Job)
+            .where(Job.id == job_id, Job.status == JobStatus.QUEUED)
+            .values(
+                status=JobStatus.RUNNING,
+                attempts=Job.attempts + 1,
+                started_at=func.now(),
+                heartbeat_at=func.now(),
+                current_step=None,
+            )
+            .returning(Job)
+        )
+        job = (await session.execute(stmt)).scalar_one_or_none()
+        await session.commit()
+        return job
+
+
+async def _write_progress(ctx: JobContext, **values):
+    if ctx.dirty:
+        values["current_step"] = ctx.step
+        ctx.dirty = False
+    async with AsyncSessionLocal() as session:
+        await session.execute(update(Job).where(Job.id == ctx.job_id).values(heartbeat_at=func.now(), **values))
+        await session.commit()
+
+
+async def _heartbeat(ctx: JobContext):
+    while True:
+        await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+        try:
+            await _write_progress(ctx)
+        except Exception:
+            logger.exception(f"Failed to write heartbeat of job {ctx.job_id}")
+
+
+async def run_job(job_id: int) -> bool:
+    """领取并执行一个任务; 任务已被领取或不存在时返回 False。"""
+    job = await _claim(job_id)
+    if job is None:
+        return False
+
+    handler = _handlers.get(job.kind)
+    with job_context(job.id) as ctx:
+        _running[job.id] = ctx
+        heartbeat = asyncio.create_task(_heartbeat(ctx))
+        logger.info(f"Job {job.id} ({job.kind}) started")
+        try:
+            if handler is None:
+                raise JobError(f"No handler registered for job kind '{job.kind}'")
+            result = await handler(job.params or {})
+            await _write_progress(
+                ctx, status=JobStatus.SUCCEEDED, result=jsonable_encoder(result), finished_at=func.now()
+            )
+            logger.info(f"Job {job.id} ({job.kind}) succeeded")
+        except asyncio.CancelledError:
+            await _write_progress(
+                ctx, status=JobStatus.FAILED, finished_at=func.now(),
+                error={"status_code": 503, "detail": "Job interrupted: worker shut down"},
+            )
+            raise
+        except Exception as e:
+            if getattr(e, "status_code", 500) >= 500:
+                logger.exception(f"Job {job.id} ({job.kind}) failed")
+            else:
+                logger.warning(f"Job {job.id} ({job.kind}) failed: {e}")
+            await _write_progress(ctx, status=JobStatus.FAILED, error=_error_payload(e), finished_at=func.now())
+        finally:
+            heartbeat.cancel()
+            _running.pop(job.id, None)
+    return True
+
+
+async def fail_stale_jobs() -> int:
+    """把心跳超时的运行中任务标记为失败 (所在 worker 已退出)。"""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.JOB_STALE_SECONDS)
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(Job)
+            .where(Job.status == JobStatus.RUNNING, or_(Job.heartbeat_at.is_(None), Job.heartbeat_at < cutoff))
+            .values(
+                status=JobStatus.FAILED,
+                finished_at=func.now(),
+                error={"status_code": 500, "detail": "Worker stopped before the job finished"},
+            )
+        )
+        await session.commit()
+    if result.rowcount:
+        logger.warning(f"Marked {result.rowcount} stale job(s) as failed")
+    return result.rowcount
+
+
+async def requeue_pending_jobs() -> List[int]:
+    """重新投递所有排队中的任务 (进程内队列在重启后为空; 重复投递的 id 领取时会被跳过)。"""
+    async with AsyncSessionLocal() as session:
+        job_ids = list((await session.execute(
+            select(Job.id).where(Job.status == JobStatus.QUEUED).order_by(Job.id)
+        )).scalars().all())
+    for job_id in job_ids:
+        await job_queue.put(job_id)
+    return job_ids
+
+
+class JobWorkerPool:
+    """在当前事件循环中运行 N 个 worker 协程，外加一个定期清理失联任务的协程。"""
+
+    def __init__(self, workers: int, poll_seconds: float = 1.0):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        try:
+            await fail_stale_jobs()
+            await requeue_pending_jobs()
+        except Exception:
+            logger.exception("Failed to recover jobs on startup")
+        self._tasks = [asyncio.create_task(self._work(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._reap()))
+        logger.info(f"Job worker pool started with {self.workers} worker(s)")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self, index: int):
+        while True:
+            try:
+                job_id = await job_queue.get(self.poll_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Job worker {index} failed to read the queue")
+                await asyncio.sleep(self.poll_seconds)
+                continue
+            if job_id is None:
+                continue
+            try:
+                await run_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Job worker {index} failed to run job {job_id}")
+
+    async def _reap(self):
+        while True:
+            await asyncio.sleep(settings.JOB_STALE_SECONDS)
+            try:
+                await fail_stale_jobs()
+            except Exception:
+                logger.exception("Failed to reap stale jobs")
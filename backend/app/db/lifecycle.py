@@ -0,0 +1,362 @@
+"""
+range 分区表的数据生命周期: 冷热分层与保留 (DataTableConfig.lifecycle_policy)。
+
+按分区上界判断年龄, 分区内的数据全部早于 N 天才处理:
+    - tier (tier_action=tablespace): ALTER TABLE/INDEX ... SET TABLESPACE 移到较慢的表空间
+    - archive (tier_action=archive): 锁住分区禁止写入, 导出为 {EXPORT_ROOT}/{table}/_archive/{partition}.parquet (zstd),
+      核对行数后 DETACH PARTITION; 解除挂载的表不再参与查询 (分区裁剪之外也不占用规划与缓存)
+    - drop (drop_after_days): 删除分区; archive 模式下先归档再删除, Parquet 文件保留
+热数据只留在默认表空间的已挂载分区中, shared_buffers 与 OS 缓存的工作集只覆盖近期数据。
+
+每个分区的每个操作在独立事务中执行 (lock_timeout 为 LIFECYCLE_LOCK_TIMEOUT_MS), 结果记录到 table_lifecycle_events;
+单个分区失败不影响其它分区, 下次执行时重新规划。同一张表的并发执行 (多进程的定时任务) 通过 advisory lock 跳过。
+"""
+import asyncio
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.cache import invalidate_table_cache
+from app.core.config import settings
+from app.core.job_queue import set_job_step
+from app.core.request_metrics import tag_table
+from app.db.arrow_schema import arrow_schema_for, require_pyarrow
+from app.db.job_runner import JobError, job_handler
+from app.db.parquet_export import export_root, write_parquet
+from app.db.row_reader import build_range_query
+from app.db.session import AsyncSessionLocal, engine as default_engine
+from app.db.table_stats import table_stats_cache
+from app.models.data_table import DataTableConfig, TableLifecycleEvent, TableStatus
+
+logger = logging.getLogger(__name__)
+
+LIFECYCLE_JOB = "lifecycle"
+# advisory lock 的第一个 key (与发布 / rollup 的锁区分); 第二个 key 为表配置 id
+LIFECYCLE_LOCK_NAMESPACE = 0x5148
+ARCHIVE_DIR = "_archive"
+
+# 已挂载的叶子分区及其上界 (DEFAULT 分区的 bound 为 'DEFAULT', 不参与生命周期)
+PARTITIONS_SQL = text("""
+SELECT c.relname AS name, pg_get_expr(c.relpartbound, c.oid) AS bound, ts.spcname AS tablespace
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+LEFT JOIN pg_tablespace ts ON ts.oid = c.reltablespace
+WHERE i.inhparent = to_regclass(:table_name)
+""")
+
+_UPPER_BOUND = re.compile(r"\bTO \('(\d{4}-\d{2}-\d{2})[^']*'\)")
+
+
+class LifecycleError(ValueError):
+    """策略无效或不适用于该表 (非 range 分区表 / 表空间不存在)。"""
+
+
+@dataclass
+class PartitionState:
+    name: str
+    upper: date
+    attached: bool = True
+    tablespace: Optional[str] = None  # None 表示默认表空间
+
+
+@dataclass
+class LifecycleAction:
+    action: str  # tier | archive | drop
+    partition: str
+    upper: date
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"action": self.action, "partition": self.partition, "upper": self.upper.isoformat()}
+
+
+def validate_policy_target(partition_config: Optional[Dict[str, Any]]):
+    if not partition_config or partition_config.get("strategy") != "range":
+        raise LifecycleError("Lifecycle policies require a range-partitioned table")
+
+
+def parse_upper_bound(bound: Optional[str]) -> Optional[date]:
+    """'FOR VALUES FROM (...) TO ('2024-02-01')' -> date(2024, 2, 1); DEFAULT / MAXVALUE 返回 None"""
+    match = _UPPER_BOUND.search(bound or "")
+    return date.fromisoformat(match.group(1)) if match else None
+
+
+def plan_lifecycle(policy: Dict[str, Any], partitions: List[PartitionState], today: date) -> List[LifecycleAction]:
+    """
+    按策略规划操作, 按分区上界从旧到新排列。
+    archive 模式下需要删除但仍挂载的分区先归档再删除 (包括未配置 tier_after_days 的策略);
+    tablespace 模式下即将删除的分区不再移动。
+    """
+    tier_days = policy.get("tier_after_days")
+    drop_days = policy.get("drop_after_days")
+    tier_action = policy.get("tier_action", "tablespace")
+    actions = []
+    for part in sorted(partitions, key=lambda p: (p.upper, p.name)):
+        tierable = tier_days is not None and part.upper <= today - timedelta(days=tier_days)
+        droppable = drop_days is not None and part.upper <= today - timedelta(days=drop_days)
+        if part.attached and tier_action == "archive" and (tierable or droppable):
+            actions.append(LifecycleAction("archive", part.name, part.upper))
+        elif part.attached and tierable and not droppable and part.tablespace != policy.get("tablespace"):
+            actions.append(LifecycleAction("tier", part.name, part.upper))
+        if droppable:
+            actions.append(LifecycleAction("drop", part.name, part.upper))
+    return actions
+
+
+async def load_partition_states(session: AsyncSession, config: DataTableConfig) -> List[PartitionState]:
+    """已挂载的分区 + 已归档 (解除挂载) 但尚未删除的表"""
+    states = []
+    for row in await session.execute(PARTITIONS_SQL, {"table_name": config.table_name}):
+        upper = parse_upper_bound(row.bound)
+        if upper is not None:
+            states.append(PartitionState(row.name, upper, attached=True, tablespace=row.tablespace))
+
+    attached = {s.name for s in states}
+    stmt = select(TableLifecycleEvent.partition_name, TableLifecycleEvent.detail).where(
+        TableLifecycleEvent.table_id == config.id,
+        TableLifecycleEvent.action == "archive",
+        TableLifecycleEvent.status == "done",
+    )
+    archived = {name: detail for name, detail in (await session.execute(stmt)).all() if name not in attached}
+    if archived:
+        existing = (await session.execute(
+            text("SELECT relname FROM pg_class WHERE relname = ANY(:names) AND relkind = 'r' AND pg_table_is_visible(oid)"),
+            {"names": list(archived)},
+        )).scalars().all()
+        for name in existing:
+            states.append(PartitionState(name, date.fromisoformat(archived[name]["upper"]), attached=False))
+    return states
+
+
+async def archived_tables(session: AsyncSession, table_id: int) -> List[str]:
+    """已归档 (解除挂载) 的分区表名, 删除表配置时一并删除"""
+    stmt = select(TableLifecycleEvent.partition_name).where(
+        TableLifecycleEvent.table_id == table_id,
+        TableLifecycleEvent.action == "archive",
+        TableLifecycleEvent.status == "done",
+    ).distinct()
+    return list((await session.execute(stmt)).scalars().all())
+
+
+def archive_path(table_name: str, partition: str) -> Path:
+    return export_root(table_name) / ARCHIVE_DIR / f"{partition}.parquet"
+
+
+async def _set_lock_timeout(conn):
+    await conn.execute(text(f"SET LOCAL lock_timeout = {int(settings.LIFECYCLE_LOCK_TIMEOUT_MS)}"))
+
+
+async def _tier(engine: AsyncEngine, action: LifecycleAction, tablespace: str) -> Dict[str, Any]:
+    """
+    SET TABLESPACE 重写分区及其索引的全部数据文件, 整个复制过程持有 ACCESS EXCLUSIVE 锁:
+    期间对该分区的读写都会阻塞 (lock_timeout 只限制获取锁的等待时间, 不限制复制耗时)。
+    分区越大阻塞越久, 应在低峰期执行或改用 archive。
+    """
+    async with engine.begin() as conn:
+        await _set_lock_timeout(conn)
+        await conn.execute(text(f"ALTER TABLE {action.partition} SET TABLESPACE {tablespace}"))
+        indexes = (await conn.execute(
+            text("SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = to_regclass(:name)"),
+            {"name": action.partition},
+        )).scalars().all()
+        for index in indexes:
+            await conn.execute(text(f"ALTER INDEX {index} SET TABLESPACE {tablespace}"))
+    return {"tablespace": tablespace, "indexes": len(indexes)}
+
+
+async def _archive(engine: AsyncEngine, config: DataTableConfig, action: LifecycleAction) -> Dict[str, Any]:
+    """导出 -> 核对行数 -> 解除挂载, 全程持有分区的 SHARE 锁 (允许读, 禁止写)"""
+    schema = arrow_schema_for(config.columns_schema)
+    path = archive_path(config.table_name, action.partition)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+
+    async with engine.begin() as conn:
+        await _set_lock_timeout(conn)
+        await conn.execute(text(f"LOCK TABLE {action.partition} IN SHARE MODE"))
+        expected = (await conn.execute(text(f"SELECT count(*) FROM {action.partition}"))).scalar()
+        query = build_range_query(action.partition, config.columns_schema)
+        written = await write_parquet(engine, query, schema, tmp, settings.EXPORT_BATCH_ROWS)
+        if written != expected:
+            tmp.unlink(missing_ok=True)
+            raise LifecycleError(f"Archive of {action.partition} wrote {written} rows, expected {expected}")
+        os.replace(tmp, path)
+        await conn.execute(text(f"ALTER TABLE {config.table_name} DETACH PARTITION {action.partition}"))
+    return {"path": str(path), "rows": written, "bytes": path.stat().st_size}
+
+
+async def _drop(engine: AsyncEngine, action: LifecycleAction) -> Dict[str, Any]:
+    async with engine.begin() as conn:
+        await _set_lock_timeout(conn)
+        await conn.execute(text(f"DROP TABLE IF EXISTS {action.partition}"))
+    return {}
+
+
+async def _record(table_id: int, action: LifecycleAction, status: str, detail: Dict[str, Any],
+                  error: Optional[str], elapsed: float):
+    async with AsyncSessionLocal() as session:
+        session.add(TableLifecycleEvent(
+            table_id=table_id, partition_name=action.partition, action=action.action, status=status,
+            detail={"upper": action.upper.isoformat(), **detail}, error=error, elapsed_seconds=round(elapsed, 3),
+        ))
+        await session.commit()
+
+
+async def _try_lock(engine: AsyncEngine, table_id: int):
+    """会话级 advisory lock (AUTOCOMMIT 连接); 已被占用时返回 None"""
+    conn = await engine.connect()
+    try:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        acquired = (await conn.execute(
+            text("SELECT pg_try_advisory_lock(:ns, :id)"), {"ns": LIFECYCLE_LOCK_NAMESPACE, "id": table_id}
+        )).scalar()
+    except Exception:
+        await conn.close()
+        raise
+    if not acquired:
+        await conn.close()
+        return None
+    return conn
+
+
+async def _unlock(conn, table_id: int):
+    try:
+        await conn.execute(
+            text("SELECT pg_advisory_unlock(:ns, :id)"), {"ns": LIFECYCLE_LOCK_NAMESPACE, "id": table_id}
+        )
+    except Exception:
+        # 会话锁不会随连接归还连接池而释放, 解锁失败时丢弃该连接
+        logger.exception(f"Failed to release lifecycle lock of table {table_id}")
+        await conn.invalidate()
+    finally:
+        await conn.close()
+
+
+async def apply_lifecycle(
+    engine: AsyncEngine,
+    session: AsyncSession,
+    config: DataTableConfig,
+    today: Optional[date] = None,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """按策略处理一张表的分区, 返回执行摘要; dry_run 时只返回计划。"""
+    policy = config.lifecycle_policy
+    if not policy:
+        raise LifecycleError("Table has no lifecycle policy")
+    validate_policy_target(config.partition_config)
+    today = today or date.today()
+
+    if policy.get("tier_after_days") is not None:
+        if policy.get("tier_action") == "archive":
+            try:
+                require_pyarrow()
+            except RuntimeError as e:
+                raise LifecycleError(str(e))
+        else:
+            exists = (await session.execute(
+                text("SELECT 1 FROM pg_tablespace WHERE spcname = :name"), {"name": policy["tablespace"]}
+            )).scalar()
+            if not exists:
+                raise LifecycleError(f"Tablespace '{policy['tablespace']}' does not exist")
+
+    actions = plan_lifecycle(policy, await load_partition_states(session, config), today)
+    # 释放 session 的连接与事务 (DETACH / DROP 需要父表的排他锁); close 不会使 config 的已加载属性过期
+    await session.close()
+    summary = {"table_name": config.table_name, "today": today.isoformat(), "dry_run": dry_run,
+               "planned": [a.to_dict() for a in actions]}
+    if dry_run or not actions:
+        return {**summary, "done": 0, "failed": 0, "results": []}
+
+    lock_conn = await _try_lock(engine, config.id)
+    if lock_conn is None:
+        return {**summary, "skipped": "locked", "done": 0, "failed": 0, "results": []}
+
+    results = []
+    failed_partitions = set()
+    try:
+        for i, action in enumerate(actions, start=1):
+            set_job_step(f"[{i}/{len(actions)}] {action.action} {action.partition}")
+            if action.partition in failed_partitions:
+                # 归档失败的分区不能删除 (数据尚未导出)
+                continue
+            started = time.perf_counter()
+            detail, error = {}, None
+            try:
+                if action.action == "tier":
+                    detail = await _tier(engine, action, policy["tablespace"])
+                elif action.action == "archive":
+                    detail = await _archive(engine, config, action)
+                else:
+                    detail = await _drop(engine, action)
+                status = "done"
+            except Exception as e:
+                status, error = "failed", str(e)
+                failed_partitions.add(action.partition)
+                logger.error(f"Lifecycle {action.action} of {action.partition} failed: {e}")
+            elapsed = time.perf_counter() - started
+            await _record(config.id, action, status, detail, error, elapsed)
+            results.append({**action.to_dict(), "status": status, "detail": detail, "error": error,
+                            "elapsed_seconds": round(elapsed, 3)})
+    finally:
+        await _unlock(lock_conn, config.id)
+
+    table_stats_cache.invalidate()
+    await invalidate_table_cache(config.id)
+    done = sum(1 for r in results if r["status"] == "done")
+    logger.info(f"Lifecycle of {config.table_name}: {done}/{len(actions)} actions done")
+    return {**summary, "done": done, "failed": len(results) - done, "results": results}
+
+
+@job_handler(LIFECYCLE_JOB)
+async def run_lifecycle_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    async with AsyncSessionLocal() as session:
+        config = await session.get(DataTableConfig, params["table_id"])
+        if config is None:
+            raise JobError("Table config not found", status_code=404)
+        with tag_table(config.table_name):
+            try:
+                return await apply_lifecycle(default_engine, session, config, dry_run=params.get("dry_run", False))
+            except LifecycleError as e:
+                raise JobError(str(e), status_code=400)
+
+
+async def run_lifecycle() -> int:
+    """对所有已发布且启用了生命周期策略的表执行一次, 单表失败不影响其他表。返回执行了操作的表数。"""
+    async with AsyncSessionLocal() as session:
+        stmt = select(DataTableConfig.id, DataTableConfig.lifecycle_policy).where(
+            DataTableConfig.status == TableStatus.CREATED,
+            DataTableConfig.lifecycle_policy.is_not(None),
+        )
+        table_ids = [table_id for table_id, policy in (await session.execute(stmt)).all() if policy.get("enabled", True)]
+
+    done = 0
+    for table_id in table_ids:
+        async with AsyncSessionLocal() as session:
+            config = await session.get(DataTableConfig, table_id)
+            if config is None:
+                continue
+            with tag_table(config.table_name):
+                try:
+                    result = await apply_lifecycle(default_engine, session, config)
+                    if result["done"]:
+                        done += 1
+                except Exception:
+                    logger.exception(f"Lifecycle run failed for table {config.table_name}")
+    return done
+
+
+async def lifecycle_loop(interval_seconds: int):
+    while True:
+        try:
+            count = await run_lifecycle()
+            logger.info(f"Lifecycle policies applied to {count} tables")
+        except Exception:
+            logger.exception("Lifecycle run failed")
+        await asyncio.sleep(interval_seconds)
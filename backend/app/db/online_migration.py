@@ -0,0 +1,404 @@
+"""
+在线列类型迁移 (shadow column + 分批回填 + 短锁切换)。
+
+流程:
+    1. prepare : 添加影子列 {col}__qf_new，并创建 BEFORE INSERT/UPDATE 触发器保持新写入同步
+    2. backfill: 按主键顺序分批 UPDATE 影子列，每批独立事务，批间可限速
+    3. index   : 在影子列上按 indexes_schema 建好引用该列的索引 (临时名称)
+    4. swap    : 短事务内 (lock_timeout 保护) 删除触发器与旧列，将影子列与其索引改名为原名称
+旧列上的索引随 DROP COLUMN 一起删除，切换后影子列上的索引立即接替 (唯一约束不会中断)。
+触发器中的类型转换失败不会让用户的写入失败: 影子列置 NULL 并计入 {table}_{col} 的错误计数序列，
+回填每批之后与切换时检查该计数，存在无法转换的值时迁移失败并清理，原列保持不变。
+切换后该列位于表的最后 (Postgres 不能调整列的位置)，应用内的读写均显式列出列名，不受影响。
+发布时检测到类型变化会创建 column_migration 后台任务，由任务 worker 执行整个流程。
+"""
+import asyncio
+import logging
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, text, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.cache import invalidate_table_cache
+from app.core.job_queue import set_job_step
+from app.db.catalog import load_table_snapshots
+from app.db.ddl_generator import DDLGenerator
+from app.db.index_sync import IndexOperation, apply_index_operations, plan_index_operations
+from app.db.job_runner import JobError, job_handler
+from app.db.session import AsyncSessionLocal, engine as default_engine
+from app.models.data_table import DataTableConfig, TableStatus
+
+logger = logging.getLogger(__name__)
+
+SHADOW_SUFFIX = "__qf_new"
+
+COLUMN_MIGRATION_JOB = "column_migration"
+
+
+@dataclass
+class ColumnMigration:
+    table_name: str
+    column: str
+    from_type: str
+    to_type: str
+    pk_columns: List[str]
+    comment: str = ""
+    indexes: List[Dict[str, Any]] = field(default_factory=list)  # indexes_schema 中引用该列的索引 (执行时读取)
+    status: str = "pending"  # pending | preparing | backfilling | indexing | swapping | done | failed
+    rows_done: int = 0
+    batches_done: int = 0
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+    @property
+    def shadow_column(self) -> str:
+        return f"{self.column[:63 - len(SHADOW_SUFFIX)]}{SHADOW_SUFFIX}"
+
+    @property
+    def sync_function(self) -> str:
+        return f"qf_sync_{self.table_name}_{self.column}"[:63]
+
+    @property
+    def error_sequence(self) -> str:
+        """触发器中类型转换失败的计数 (序列不随事务回滚, 切换事务中可直接读取)"""
+        return f"qf_cast_err_{self.table_name}_{self.column}"[:63]
+
+    @property
+    def key(self) -> str:
+        return f"{self.table_name}.{self.column}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["shadow_column"] = self.shadow_column
+        return data
+
+    def to_params(self) -> Dict[str, Any]:
+        """任务参数 (不含进度字段), ColumnMigration(**params) 可还原。"""
+        return {
+            "table_name": self.table_name,
+            "column": self.column,
+            "from_type": self.from_type,
+            "to_type": self.to_type,
+            "pk_columns": self.pk_columns,
+            "comment": self.comment,
+        }
+
+
+class MigrationError(RuntimeError):
+    pass
+
+
+# 进程内的迁移进度登记 (key: table.column)
+_MIGRATIONS: Dict[str, ColumnMigration] = {}
+
+
+def get_migrations(table_name: str) -> List[ColumnMigration]:
+    return [m for m in _MIGRATIONS.values() if m.table_name == table_name]
+
+
+def is_migration_running(table_name: str) -> bool:
+    return any(m.status not in ("done", "failed") for m in get_migrations(table_name))
+
+
+def register_migration(migration: ColumnMigration) -> ColumnMigration:
+    _MIGRATIONS[migration.key] = migration
+    return migration
+
+
+# --- SQL ---
+
+def prepare_sqls(m: ColumnMigration) -> List[str]:
+    # 转换失败时影子列置 NULL 并计数, 由迁移 (而不是用户的写入) 报错
+    return [
+        f"ALTER TABLE {m.table_name} ADD COLUMN IF NOT EXISTS {m.shadow_column} {m.to_type};",
+        f"DROP SEQUENCE IF EXISTS {m.error_sequence};",
+        f"CREATE SEQUENCE {m.error_sequence};",
+        f"CREATE OR REPLACE FUNCTION {m.sync_function}() RETURNS trigger AS $$ "
+        f"BEGIN "
+        f"BEGIN NEW.{m.shadow_column} := NEW.{m.column}::{m.to_type}; "
+        f"EXCEPTION WHEN others THEN NEW.{m.shadow_column} := NULL; PERFORM nextval('{m.error_sequence}'); END; "
+        f"RETURN NEW; END; "
+        f"$$ LANGUAGE plpgsql;",
+        f"DROP TRIGGER IF EXISTS {m.sync_function} ON {m.table_name};",
+        f"CREATE TRIGGER {m.sync_function} BEFORE INSERT OR UPDATE ON {m.table_name} "
+        f"FOR EACH ROW EXECUTE FUNCTION {m.sync_function}();",
+    ]
+
+
+def cast_errors_sql(m: ColumnMigration) -> str:
+    """触发器中转换失败的次数"""
+    return f"SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {m.error_sequence}"
+
+
+def _replace_identifier(sql: str, old: str, new: str) -> str:
+    """替换 SQL 片段中的标识符 old (跳过字符串字面量)"""
+    pattern = re.compile(rf"'(?:[^']|'')*'|\b{re.escape(old)}\b")
+    return pattern.sub(lambda match: match.group(0) if match.group(0).startswith("'") else new, sql)
+
+
+def shadow_index_name(index_name: str) -> str:
+    return f"{index_name[:63 - len(SHADOW_SUFFIX)]}{SHADOW_SUFFIX}"
+
+
+def shadow_index_operations(m: ColumnMigration, concurrently: bool) -> List[IndexOperation]:
+    """在影子列上建 m.indexes 的副本 (临时名称), 切换时改名为原索引名"""
+    ops = []
+    for idx in m.indexes:
+        name = shadow_index_name(DDLGenerator.index_name(m.table_name, idx))
+        shadow = {
+            **idx,
+            "name": name,
+            "columns": [_replace_identifier(c, m.column, m.shadow_column) for c in idx["columns"]],
+            "include": [_replace_identifier(c, m.column, m.shadow_column) for c in idx.get("include") or []],
+            "order": {
+                _replace_identifier(c, m.column, m.shadow_column): o for c, o in (idx.get("order") or {}).items()
+            },
+        }
+        if idx.get("where"):
+            shadow["where"] = _replace_identifier(idx["where"], m.column, m.shadow_column)
+        ops.append(IndexOperation(
+            index_name=name, action="create", sql=DDLGenerator.generate_index_sql(m.table_name, shadow, concurrently)
+        ))
+    return ops
+
+
+def indexes_on_column(indexes_schema: List[Dict[str, Any]], column: str) -> List[Dict[str, Any]]:
+    """indexes_schema 中键列、INCLUDE 列或 WHERE 条件引用了 column 的索引"""
+    def refers(sql: str) -> bool:
+        return _replace_identifier(sql, column, "") != sql
+
+    return [
+        idx for idx in indexes_schema
+        if any(refers(c) for c in idx["columns"] + list(idx.get("include") or [])) or refers(idx.get("where") or "")
+    ]
+
+
+def _pk_placeholders(pk_columns: List[str], prefix: str) -> str:
+    return ", ".join(f":{prefix}{i}" for i in range(len(pk_columns)))
+
+
+def batch_bound_sql(m: ColumnMigration, first: bool) -> str:
+    """取本批次的上界主键 (第 batch_size 行)。"""
+    pk = ", ".join(m.pk_columns)
+    where = "" if first else f" WHERE ({pk}) > ({_pk_placeholders(m.pk_columns, 'lo')})"
+    return f"SELECT {pk} FROM {m.table_name}{where} ORDER BY {pk} OFFSET :offset LIMIT 1"
+
+
+def batch_update_sql(m: ColumnMigration, first: bool, last: bool) -> str:
+    """回填 (lo, hi] 区间的影子列; first/last 时对应一侧不设边界。"""
+    pk = ", ".join(m.pk_columns)
+    conds = []
+    if not first:
+        conds.append(f"({pk}) > ({_pk_placeholders(m.pk_columns, 'lo')})")
+    if not last:
+        conds.append(f"({pk}) <= ({_pk_placeholders(m.pk_columns, 'hi')})")
+    where = f" WHERE {' AND '.join(conds)}" if conds else ""
+    return f"UPDATE {m.table_name} SET {m.shadow_column} = {m.column}::{m.to_type}{where}"
+
+
+def swap_sqls(m: ColumnMigration, lock_timeout_ms: int) -> List[str]:
+    sqls = [
+        f"SET LOCAL lock_timeout = {int(lock_timeout_ms)};",
+        f"LOCK TABLE {m.table_name} IN ACCESS EXCLUSIVE MODE;",
+        # 持锁后不再有新的写入: 计数为 0 时影子列与原列一致
+        f"DO $$ BEGIN IF ({cast_errors_sql(m)}) > 0 THEN "
+        f"RAISE EXCEPTION 'Values written to {m.key} cannot be cast to {m.to_type.replace(chr(39), chr(39) * 2)}'; "
+        f"END IF; END $$;",
+        f"DROP TRIGGER IF EXISTS {m.sync_function} ON {m.table_name};",
+        f"DROP FUNCTION IF EXISTS {m.sync_function}();",
+        f"DROP SEQUENCE IF EXISTS {m.error_sequence};",
+        f"ALTER TABLE {m.table_name} DROP COLUMN {m.column};",
+        f"ALTER TABLE {m.table_name} RENAME COLUMN {m.shadow_column} TO {m.column};",
+    ]
+    # 旧列的索引已随 DROP COLUMN 删除; 同名但不引用该列的旧索引定义已过期, 一并删除
+    for idx in m.indexes:
+        name = DDLGenerator.index_name(m.table_name, idx)
+        sqls.append(f"DROP INDEX IF EXISTS {name};")
+        sqls.append(f"ALTER INDEX {shadow_index_name(name)} RENAME TO {name};")
+        comment_sql = DDLGenerator.generate_index_comment_sql(m.table_name, idx)
+        if comment_sql:
+            sqls.append(comment_sql)
+    if m.comment:
+        safe_comment = m.comment.replace("'", "''")
+        sqls.append(f"COMMENT ON COLUMN {m.table_name}.{m.column} IS '{safe_comment}';")
+    return sqls
+
+
+def cleanup_sqls(m: ColumnMigration) -> List[str]:
+    # 影子列上的索引随列删除
+    return [
+        f"DROP TRIGGER IF EXISTS {m.sync_function} ON {m.table_name};",
+        f"DROP FUNCTION IF EXISTS {m.sync_function}();",
+        f"DROP SEQUENCE IF EXISTS {m.error_sequence};",
+        f"ALTER TABLE {m.table_name} DROP COLUMN IF EXISTS {m.shadow_column};",
+    ]
+
+
+# --- Execution ---
+
+def _key_params(prefix: str, values) -> Dict[str, Any]:
+    return {f"{prefix}{i}": v for i, v in enumerate(values)}
+
+
+async def _execute_in_transaction(engine: AsyncEngine, sqls: List[str]):
+    async with engine.begin() as conn:
+        for sql in sqls:
+            await conn.execute(text(sql))
+
+
+async def _backfill(engine: AsyncEngine, m: ColumnMigration, batch_size: int, throttle_seconds: float):
+    lower = None
+    while True:
+        first = lower is None
+        params = {"offset": batch_size - 1}
+        if not first:
+            params.update(_key_params("lo", lower))
+
+        async with engine.begin() as conn:
+            upper = (await conn.execute(text(batch_bound_sql(m, first)), params)).first()
+            last = upper is None
+            update_params = {} if first else _key_params("lo", lower)
+            if not last:
+                update_params.update(_key_params("hi", upper))
+            result = await conn.execute(text(batch_update_sql(m, first, last)), update_params)
+            errors = (await conn.execute(text(cast_errors_sql(m)))).scalar()
+        if errors:
+            raise MigrationError(f"{errors} values of {m.key} cannot be cast to {m.to_type}")
+
+        m.rows_done += max(result.rowcount, 0)
+        m.batches_done += 1
+        set_job_step(f"Backfilling {m.key} -> {m.to_type}: {m.rows_done} rows in {m.batches_done} batches")
+        if last:
+            return
+        lower = tuple(upper)
+        if throttle_seconds > 0:
+            await asyncio.sleep(throttle_seconds)
+
+
+async def run_column_migration(
+    engine: AsyncEngine,
+    m: ColumnMigration,
+    batch_size: int,
+    throttle_seconds: float,
+    lock_timeout_ms: int,
+    swap_retries: int = 5,
+    concurrent_indexes: bool = True,
+) -> ColumnMigration:
+    """执行单列迁移，失败时清理影子列与触发器，原列保持不变。"""
+    m.started_at = datetime.utcnow()
+    started = time.perf_counter()
+    try:
+        m.status = "preparing"
+        set_job_step(f"Preparing shadow column {m.shadow_column} on {m.table_name}")
+        await _execute_in_transaction(engine, [f"SET LOCAL lock_timeout = {int(lock_timeout_ms)};"] + prepare_sqls(m))
+
+        m.status = "backfilling"
+        await _backfill(engine, m, batch_size, throttle_seconds)
+
+        if m.indexes:
+            m.status = "indexing"
+            ops = shadow_index_operations(m, concurrent_indexes)
+            await apply_index_operations(engine, ops)
+            failed = [op for op in ops if op.status == "failed"]
+            if failed:
+                raise MigrationError(f"Failed to build index {failed[0].index_name}: {failed[0].error}")
+
+        m.status = "swapping"
+        set_job_step(f"Swapping {m.shadow_column} into {m.key}")
+        for attempt in range(1, swap_retries + 1):
+            try:
+                await _execute_in_transaction(engine, swap_sqls(m, lock_timeout_ms))
+                break
+            except Exception as e:
+                if "lock timeout" not in str(e) or attempt == swap_retries:
+                    raise
+                logger.warning(f"Swap of {m.key} hit lock timeout, retrying ({attempt}/{swap_retries})")
+                await asyncio.sleep(min(2 ** attempt * 0.1, 5))
+
+        m.status = "done"
+    except Exception as e:
+        m.status = "failed"
+        m.error = str(e)
+        logger.exception(f"Online migration of {m.key} failed")
+        try:
+            await _execute_in_transaction(engine, cleanup_sqls(m))
+        except Exception:
+            logger.exception(f"Failed to clean up migration artifacts of {m.key}")
+    finally:
+        m.finished_at = datetime.utcnow()
+        logger.info(
+            f"Online migration {m.key} {m.from_type} -> {m.to_type}: {m.status}, "
+            f"{m.rows_done} rows in {m.batches_done} batches ({time.perf_counter() - started:.1f}s)"
+        )
+    return m
+
+
+async def migrate_table_columns(
+    engine: AsyncEngine,
+    table_id: int,
+    migrations: List[ColumnMigration],
+    batch_size: int,
+    throttle_seconds: float,
+    lock_timeout_ms: int,
+    concurrent_indexes: bool = True,
+) -> bool:
+    """
+    依次迁移一张表的多列 (引用该列的索引在切换前建在影子列上); 全部成功后重新同步其余的索引差异，
+    并将表配置标记为 CREATED。任一列失败则保持 DRAFT，返回 False。
+    """
+    table_name = migrations[0].table_name
+    # 读取配置后立即结束事务: CREATE INDEX CONCURRENTLY 会等待所有已开启的事务结束
+    async with AsyncSessionLocal() as session:
+        indexes_schema = (await session.execute(
+            select(DataTableConfig.indexes_schema).where(DataTableConfig.id == table_id)
+        )).scalar_one_or_none()
+    if indexes_schema is None:
+        return False
+
+    for m in migrations:
+        m.indexes = indexes_on_column(indexes_schema, m.column)
+        await run_column_migration(
+            engine, m, batch_size, throttle_seconds, lock_timeout_ms, concurrent_indexes=concurrent_indexes
+        )
+        if m.status != "done":
+            return False
+
+    async with engine.connect() as conn:
+        snapshot = (await load_table_snapshots(conn, [table_name]))[table_name]
+    ops = plan_index_operations(table_name, snapshot.indexes, indexes_schema, concurrently=concurrent_indexes)
+    await apply_index_operations(engine, ops)
+    if any(op.status == "failed" for op in ops):
+        return False
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(DataTableConfig)
+            .where(DataTableConfig.id == table_id)
+            .values(status=TableStatus.CREATED, last_published_at=datetime.utcnow())
+        )
+        await session.commit()
+    await invalidate_table_cache(table_id)
+    return True
+
+
+@job_handler(COLUMN_MIGRATION_JOB)
+async def run_column_migration_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    migrations = [register_migration(ColumnMigration(**p)) for p in params["migrations"]]
+    ok = await migrate_table_columns(
+        default_engine,
+        params["table_id"],
+        migrations,
+        batch_size=params["batch_size"],
+        throttle_seconds=params["throttle_seconds"],
+        lock_timeout_ms=params["lock_timeout_ms"],
+        concurrent_indexes=params.get("concurrent_indexes", True),
+    )
+    result = {"migrations": [m.to_dict() for m in migrations]}
+    if not ok:
+        raise JobError({"message": f"Online type migration of table '{migrations[0].table_name}' failed", **result})
+    return result
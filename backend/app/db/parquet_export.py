@@ -0,0 +1,329 @@
+"""
+已发布物理表 -> 分区 Parquet 数据集 (离线回测读取)。
+
+目录结构 (hive 风格, 分区键为派生值, 文件中保留原列):
+    {EXPORT_ROOT}/{table_name}/{column}_{granularity}={key}/part-0.parquet
+    {EXPORT_ROOT}/{table_name}/_manifest.json
+
+    - 按所选列切分: 时间列按 day/month/year 截断, 其它列 (granularity=value) 按取值
+    - 每个分区是一个独立的范围查询, 多个分区在多个连接上并行读取 (服务端游标分批), Parquet 编码在线程中执行
+    - Arrow schema 由 columns_schema 经 DDLGenerator._parse_type 的类型映射得到 (arrow_schema_for)
+    - 增量导出: 先用一条聚合查询计算每个分区的行数与内容指纹 (逐行哈希求和), 与上次 manifest 对比,
+      只重写指纹变化的分区, 删除源数据中已不存在的分区; 列定义变化时全量重写
+指纹在读取数据之前计算: 导出期间发生的写入会使下次导出时指纹不一致, 从而再次导出该分区。
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.job_queue import set_job_step
+from app.core.request_metrics import tag_table
+from app.db.arrow_schema import arrow_schema_for, record_batch_from_rows, require_pyarrow
+from app.db.bulk_loader import make_coercer
+from app.db.ddl_generator import DDLGenerator, RANGE_PARTITION_KEY_TYPES
+from app.db.job_runner import JobError, job_handler
+from app.db.row_reader import RangeQuery, build_range_query, stream_row_batches
+from app.db.session import engine as default_engine
+
+logger = logging.getLogger(__name__)
+
+PARQUET_EXPORT_JOB = "parquet_export"
+MANIFEST_FILE = "_manifest.json"
+TIME_GRANULARITIES = ("day", "month", "year")
+NULL_PARTITION_KEY = "__NULL__"
+
+
+class ExportError(ValueError):
+    """导出参数无效 (分区列 / 粒度)。"""
+
+
+@dataclass
+class PartitionInfo:
+    key: str
+    rows: int
+    fingerprint: str
+    lower: Optional[str] = None  # 时间分区的 [lower, upper)
+    upper: Optional[str] = None
+    files: List[str] = field(default_factory=list)
+    bytes: int = 0
+    exported_at: Optional[str] = None
+
+
+@dataclass
+class ExportSpec:
+    table_name: str
+    columns_schema: List[Dict[str, Any]]
+    partition_column: str
+    granularity: str
+    root: Path
+
+    @property
+    def column_type(self) -> str:
+        return {c["name"]: c["type"] for c in self.columns_schema}[self.partition_column]
+
+    @property
+    def is_time(self) -> bool:
+        return self.granularity in TIME_GRANULARITIES
+
+    @property
+    def partition_dir_name(self) -> str:
+        return f"{self.partition_column}_{self.granularity}"
+
+    @property
+    def schema_fingerprint(self) -> str:
+        payload = json.dumps(
+            [[c["name"], c["type"]] for c in self.columns_schema] + [self.partition_column, self.granularity]
+        )
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def partition_path(self, key: str) -> Path:
+        return self.root / f"{self.partition_dir_name}={quote(key, safe='')}"
+
+
+def validate_export(columns_schema: List[Dict[str, Any]], partition_column: str, granularity: str):
+    type_map = {c["name"]: c["type"] for c in columns_schema}
+    if partition_column not in type_map:
+        raise ExportError(f"Unknown partition column '{partition_column}'")
+    is_time_column = type_map[partition_column].strip().upper() in RANGE_PARTITION_KEY_TYPES
+    if granularity in TIME_GRANULARITIES and not is_time_column:
+        raise ExportError(f"Granularity '{granularity}' requires a DATE/TIMESTAMP/TIMESTAMPTZ partition column")
+    if granularity not in TIME_GRANULARITIES + ("value",):
+        raise ExportError(f"Unsupported granularity '{granularity}'")
+    if type_map[partition_column].strip().upper().endswith("[]") or type_map[partition_column].strip().upper() in ("JSON", "JSONB"):
+        raise ExportError(f"Column '{partition_column}' cannot be used as a partition column")
+    if not any(c.get("is_pk") for c in columns_schema):
+        raise ExportError("Export requires a primary key (partitions are read in primary key order)")
+
+
+def fingerprint_sql(spec: ExportSpec) -> str:
+    """每个分区一行: 分区下界 (或取值)、行数、行内容哈希之和。"""
+    col = spec.partition_column
+    if spec.is_time:
+        # timestamptz 按 UTC 截断, 与读取时的 [lower, upper) 边界一致 (不受会话时区影响)
+        source = f"({col} AT TIME ZONE 'UTC')" if spec.column_type.strip().upper() == "TIMESTAMPTZ" else col
+        key_expr = f"date_trunc('{spec.granularity}', {source})::date"
+    else:
+        key_expr = f"{col}::text"
+    return (
+        f"SELECT {key_expr} AS part_key, count(*) AS rows, "
+        f"coalesce(sum(hashtextextended(t::text, 0)::numeric), 0)::text AS checksum "
+        f"FROM {spec.table_name} AS t GROUP BY 1 ORDER BY 1"
+    )
+
+
+def _format_period(d: date, granularity: str) -> str:
+    if granularity == "year":
+        return f"{d.year:04d}"
+    if granularity == "month":
+        return f"{d.year:04d}-{d.month:02d}"
+    return d.isoformat()
+
+
+def partitions_from_rows(spec: ExportSpec, rows) -> Dict[str, PartitionInfo]:
+    partitions = {}
+    for part_key, count, checksum in rows:
+        fingerprint = hashlib.sha1(f"{count}:{checksum}".encode()).hexdigest()
+        if part_key is None:
+            partitions[NULL_PARTITION_KEY] = PartitionInfo(key=NULL_PARTITION_KEY, rows=count, fingerprint=fingerprint)
+        elif spec.is_time:
+            key = _format_period(part_key, spec.granularity)
+            partitions[key] = PartitionInfo(
+                key=key, rows=count, fingerprint=fingerprint,
+                lower=part_key.isoformat(), upper=DDLGenerator._next_period(part_key, spec.granularity).isoformat(),
+            )
+        else:
+            partitions[str(part_key)] = PartitionInfo(key=str(part_key), rows=count, fingerprint=fingerprint)
+    return partitions
+
+
+def plan_export(
+    spec: ExportSpec, current: Dict[str, PartitionInfo], manifest: Optional[Dict[str, Any]], full: bool = False
+) -> Tuple[List[str], List[str]]:
+    """返回 (需要重写的分区, 需要删除的分区)。"""
+    previous: Dict[str, Any] = {}
+    if manifest and not full and manifest.get("schema_fingerprint") == spec.schema_fingerprint:
+        previous = manifest.get("partitions", {})
+    to_write = [
+        key for key, part in current.items()
+        if key not in previous or previous[key].get("fingerprint") != part.fingerprint
+    ]
+    old_keys = set(manifest.get("partitions", {})) if manifest else set()
+    to_delete = sorted(old_keys - set(current))
+    return to_write, to_delete
+
+
+def partition_query(spec: ExportSpec, part: PartitionInfo) -> RangeQuery:
+    if spec.is_time and part.key != NULL_PARTITION_KEY:
+        # 时间列截断到日期边界: [lower, upper) 的范围条件可利用索引与分区裁剪
+        return build_range_query(
+            spec.table_name, spec.columns_schema,
+            time_column=spec.partition_column, start=part.lower, end=part.upper,
+        )
+    query = build_range_query(spec.table_name, spec.columns_schema)
+    if part.key == NULL_PARTITION_KEY:
+        condition, params = f"{spec.partition_column} IS NULL", {}
+    else:
+        # 分区键来自 col::text, 还原为列类型后比较, 可以使用索引
+        value = make_coercer(spec.column_type)(part.key)
+        condition, params = f"{spec.partition_column} = :part_value", {"part_value": value}
+    head, order = query.sql.split(" ORDER BY ", 1)
+    query.sql = f"{head} WHERE {condition} ORDER BY {order}"
+    query.params.update(params)
+    return query
+
+
+def read_manifest(root: Path) -> Optional[Dict[str, Any]]:
+    path = root / MANIFEST_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def _write_manifest(root: Path, manifest: Dict[str, Any]):
+    tmp = root / (MANIFEST_FILE + ".tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2))
+    os.replace(tmp, root / MANIFEST_FILE)
+
+
+async def write_parquet(engine: AsyncEngine, query: RangeQuery, schema, path: Path, batch_rows: int) -> int:
+    """分批读取查询结果写入一个 zstd 压缩的 Parquet 文件, 返回写入的行数。"""
+    require_pyarrow()
+    import pyarrow.parquet as pq
+
+    rows_written = 0
+    writer = await asyncio.to_thread(pq.ParquetWriter, str(path), schema, compression="zstd")
+    try:
+        async for rows in stream_row_batches(engine, query, batch_rows):
+            batch = record_batch_from_rows(schema, rows)
+            await asyncio.to_thread(writer.write_batch, batch)
+            rows_written += len(rows)
+    finally:
+        await asyncio.to_thread(writer.close)
+    return rows_written
+
+
+async def _export_partition(engine: AsyncEngine, spec: ExportSpec, part: PartitionInfo, schema, batch_rows: int):
+    """读取一个分区并写入 part-0.parquet (先写临时文件再替换, 读者不会看到写了一半的文件)。"""
+    directory = spec.partition_path(part.key)
+    directory.mkdir(parents=True, exist_ok=True)
+    target = directory / "part-0.parquet"
+    tmp = directory / "part-0.parquet.tmp"
+
+    await write_parquet(engine, partition_query(spec, part), schema, tmp, batch_rows)
+
+    # 清理该分区中旧的文件
+    for stale in directory.iterdir():
+        if stale.name not in (tmp.name, target.name):
+            stale.unlink()
+    os.replace(tmp, target)
+    part.files = [str(target.relative_to(spec.root))]
+    part.bytes = target.stat().st_size
+    part.exported_at = datetime.now(timezone.utc).isoformat()
+
+
+async def export_table(
+    engine: AsyncEngine,
+    spec: ExportSpec,
+    parallelism: int,
+    batch_rows: int,
+    full: bool = False,
+) -> Dict[str, Any]:
+    """导出 (或增量导出) 一张表, 返回本次导出的摘要; manifest 在所有分区写完后更新。"""
+    started = time.perf_counter()
+    schema = arrow_schema_for(spec.columns_schema)
+    spec.root.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(spec.root)
+
+    set_job_step(f"Fingerprinting partitions of {spec.table_name}")
+    async with engine.connect() as conn:
+        rows = (await conn.execute(text(fingerprint_sql(spec)))).all()
+    current = partitions_from_rows(spec, rows)
+    to_write, to_delete = plan_export(spec, current, manifest, full)
+
+    # 保留未变化分区的文件信息
+    previous = (manifest or {}).get("partitions", {})
+    for key, part in current.items():
+        if key not in to_write:
+            part.files = previous[key].get("files", [])
+            part.bytes = previous[key].get("bytes", 0)
+            part.exported_at = previous[key].get("exported_at")
+
+    semaphore = asyncio.Semaphore(parallelism)
+    written = 0
+
+    async def run(key: str):
+        nonlocal written
+        async with semaphore:
+            await _export_partition(engine, spec, current[key], schema, batch_rows)
+            written += 1
+            set_job_step(f"{written}/{len(to_write)} partitions of {spec.table_name} written")
+
+    await asyncio.gather(*(run(key) for key in to_write))
+
+    for key in to_delete:
+        shutil.rmtree(spec.partition_path(key), ignore_errors=True)
+
+    _write_manifest(spec.root, {
+        "table_name": spec.table_name,
+        "partition_column": spec.partition_column,
+        "granularity": spec.granularity,
+        "schema_fingerprint": spec.schema_fingerprint,
+        "arrow_schema": [{"name": f.name, "type": str(f.type)} for f in schema],
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+        "partitions": {key: asdict(part) for key, part in sorted(current.items())},
+    })
+
+    elapsed = time.perf_counter() - started
+    rows_written = sum(current[key].rows for key in to_write)
+    logger.info(
+        f"Exported {spec.table_name} to {spec.root}: {len(to_write)}/{len(current)} partitions rewritten, "
+        f"{len(to_delete)} removed, {rows_written} rows in {elapsed:.1f}s"
+    )
+    return {
+        "path": str(spec.root),
+        "partitions": len(current),
+        "rewritten": sorted(to_write),
+        "unchanged": len(current) - len(to_write),
+        "deleted": to_delete,
+        "rows_written": rows_written,
+        "elapsed_seconds": round(elapsed, 3),
+    }
+
+
+def export_root(table_name: str) -> Path:
+    return Path(settings.EXPORT_ROOT) / table_name
+
+
+@job_handler(PARQUET_EXPORT_JOB)
+async def run_parquet_export_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    spec = ExportSpec(
+        table_name=params["table_name"],
+        columns_schema=params["columns_schema"],
+        partition_column=params["partition_column"],
+        granularity=params["granularity"],
+        root=export_root(params["table_name"]),
+    )
+    try:
+        require_pyarrow()
+    except RuntimeError as e:
+        raise JobError(str(e), status_code=400)
+    with tag_table(params["table_name"]):
+        return await export_table(
+            default_engine, spec,
+            parallelism=params.get("parallelism") or settings.EXPORT_PARALLELISM,
+            batch_rows=params.get("batch_rows") or settings.EXPORT_BATCH_ROWS,
+            full=params.get("full", False),
+        )
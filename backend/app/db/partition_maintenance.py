@@ -0,0 +1,74 @@
+"""
+分区维护任务：为所有已发布的 range 分区表持续补建未来分区。
+"""
+import asyncio
+import logging
+from typing import List
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.request_metrics import tag_table
+from app.db.ddl_generator import DDLGenerator
+from app.db.session import AsyncSessionLocal
+from app.models.data_table import DataTableConfig, TableStatus
+
+logger = logging.getLogger(__name__)
+
+
+async def is_partitioned_table(session: AsyncSession, table_name: str) -> bool:
+    stmt = text("SELECT relkind::text FROM pg_class WHERE oid = to_regclass(:name)")
+    relkind = (await session.execute(stmt, {"name": table_name})).scalar_one_or_none()
+    return relkind == "p"
+
+
+async def ensure_partitions(session: AsyncSession, table_name: str, partition_config: dict) -> List[str]:
+    """
+    补建当前周期到 premake 之后的分区 (CREATE ... IF NOT EXISTS, 可重复执行)。
+    调用方负责 commit。
+    """
+    sqls = DDLGenerator.generate_partition_sqls(table_name, partition_config)
+    for sql in sqls:
+        await session.execute(text(sql))
+    return sqls
+
+
+async def run_partition_maintenance() -> int:
+    """
+    对所有已发布且配置了 range 分区的表执行一次分区补建。
+    每张表单独提交，单表失败不影响其他表。返回成功处理的表数量。
+    """
+    async with AsyncSessionLocal() as session:
+        stmt = select(DataTableConfig.table_name, DataTableConfig.partition_config).where(
+            DataTableConfig.status == TableStatus.CREATED,
+            DataTableConfig.partition_config.is_not(None),
+        )
+        targets = [
+            (name, cfg) for name, cfg in (await session.execute(stmt)).all()
+            if cfg and cfg.get("strategy") == "range"
+        ]
+
+    done = 0
+    for table_name, partition_config in targets:
+        with tag_table(table_name):
+            async with AsyncSessionLocal() as session:
+                try:
+                    if not await is_partitioned_table(session, table_name):
+                        continue
+                    await ensure_partitions(session, table_name, partition_config)
+                    await session.commit()
+                    done += 1
+                except Exception:
+                    await session.rollback()
+                    logger.exception(f"Partition maintenance failed for table {table_name}")
+    return done
+
+
+async def partition_maintenance_loop(interval_seconds: int):
+    while True:
+        try:
+            count = await run_partition_maintenance()
+            logger.info(f"Partition maintenance finished for {count} tables")
+        except Exception:
+            logger.exception("Partition maintenance run failed")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,73 @@
+"""
+带统计的异步连接池。
+
+在 AsyncAdaptedQueuePool 的 checkout (_do_get) 外计时，记录等待时长、溢出连接的创建、
+池耗尽时的排队与超时次数，通过 /metrics 导出。
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.metrics import Histogram, MetricFamily
+
+
+@dataclass
+class PoolStats:
+    checkouts: int = 0
+    overflow_checkouts: int = 0  # 超出 pool_size 新建溢出连接的次数
+    exhausted: int = 0  # 池与溢出均已用尽、需要排队等待的次数
+    timeouts: int = 0  # 等待超过 pool_timeout 的次数
+    wait_seconds: Histogram = field(default_factory=Histogram)
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        overflow_before = self._overflow
+        if self._max_overflow > -1 and self._overflow >= self._max_overflow and self._pool.empty():
+            self.stats.exhausted += 1
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.checkouts += 1
+        if self._overflow > overflow_before and self._overflow > 0:
+            self.stats.overflow_checkouts += 1
+        self.stats.wait_seconds.observe(time.perf_counter() - started)
+        return record
+
+    def recreate(self):
+        # engine.dispose() 会重建连接池, 统计沿用
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def collect_pool_metrics(pool) -> Iterable[MetricFamily]:
+    yield MetricFamily("qf_db_pool_size", "gauge", "Configured pool size").add(pool.size())
+    yield MetricFamily("qf_db_pool_checked_out", "gauge", "Connections currently checked out").add(pool.checkedout())
+    yield MetricFamily("qf_db_pool_checked_in", "gauge", "Idle connections in the pool").add(pool.checkedin())
+    yield MetricFamily("qf_db_pool_overflow", "gauge", "Current overflow connections").add(max(pool.overflow(), 0))
+
+    stats = getattr(pool, "stats", None)
+    if stats is None:
+        return
+    yield MetricFamily("qf_db_pool_checkouts_total", "counter", "Connection checkouts").add(stats.checkouts)
+    yield MetricFamily(
+        "qf_db_pool_overflow_checkouts_total", "counter", "Checkouts that opened an overflow connection"
+    ).add(stats.overflow_checkouts)
+    yield MetricFamily(
+        "qf_db_pool_exhausted_total", "counter", "Checkouts that had to wait because pool and overflow were full"
+    ).add(stats.exhausted)
+    yield MetricFamily("qf_db_pool_timeouts_total", "counter", "Checkouts that timed out").add(stats.timeouts)
+    wait = MetricFamily("qf_db_pool_checkout_wait_seconds", "histogram", "Time spent waiting for a connection")
+    stats.wait_seconds.add_to(wait)
+    yield wait
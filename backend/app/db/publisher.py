@@ -0,0 +1,379 @@
+"""
+数据表发布 (物理建表 / 结构同步)。
+
+单表发布与批量发布共用 publish_table_config:
+    - 每张表在独立的 AUTOCOMMIT 连接上持有会话级 advisory lock，同一张表的并发发布直接失败 (409)
+    - DDL 在一个事务内通过驱动连接一次发送 (单次往返)，索引变更在提交后执行，类型迁移在后台执行
+批量发布用信号量限制并发表数；每张表最多同时占用 3 个连接 (锁 / 事务 / 索引)。
+进程内所有发布 (单表 / 批量) 共用一组发布槽位, 槽位数为连接池容量 (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+扣除留给请求的 PUBLISH_POOL_RESERVE 后能同时容纳的表数, 避免各表持锁等待连接而死锁。
+两者均可作为后台任务 (publish / bulk_publish) 执行，列类型迁移的回填总是作为 column_migration 任务执行。
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.cache import invalidate_table_cache, response_cache, table_tag
+from app.core.config import settings
+from app.core.job_queue import set_job_step
+from app.core.request_metrics import tag_table
+from app.db.bulk_loader import get_asyncpg_connection
+from app.db.catalog import get_table_snapshot, invalidate_snapshots
+from app.db.ddl_generator import DDLGenerator
+from app.db.index_sync import apply_index_operations, plan_index_operations
+from app.db.job_runner import enqueue_job, has_active_job, job_handler
+from app.db.online_migration import COLUMN_MIGRATION_JOB, ColumnMigration, is_migration_running
+from app.db.session import AsyncSessionLocal, engine as default_engine
+from app.db.sql_metrics import record_statement
+from app.models.data_table import DataTableConfig, TableStatus
+
+logger = logging.getLogger(__name__)
+
+# advisory lock 的第一个 key, 与其它模块的锁区分; 第二个 key 为表配置 id
+PUBLISH_LOCK_NAMESPACE = 0x5146
+
+# 发布一张表同时占用的连接数上限 (锁 / 事务 / 索引)
+CONNECTIONS_PER_TABLE = 3
+
+_publish_semaphore: Optional[asyncio.Semaphore] = None
+
+PUBLISH_JOB = "publish"
+BULK_PUBLISH_JOB = "bulk_publish"
+
+
+class PublishError(Exception):
+    """发布失败, status_code/detail 直接映射为 HTTP 响应。"""
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class _PublishLock:
+    """表级会话 advisory lock。使用 AUTOCOMMIT 连接: 空闲事务会阻塞 CREATE INDEX CONCURRENTLY。"""
+
+    def __init__(self, engine: AsyncEngine, table_id: int):
+        self.engine = engine
+        self.table_id = table_id
+        self._conn = None
+
+    async def __aenter__(self):
+        conn = await self.engine.connect()
+        try:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            acquired = (await conn.execute(
+                text("SELECT pg_try_advisory_lock(:ns, :id)"), {"ns": PUBLISH_LOCK_NAMESPACE, "id": self.table_id}
+            )).scalar()
+        except Exception:
+            await conn.close()
+            raise
+        if not acquired:
+            await conn.close()
+            raise PublishError(409, "Table is being published by another request")
+        self._conn = conn
+        return self
+
+    async def __aexit__(self, *exc):
+        try:
+            await self._conn.execute(
+                text("SELECT pg_advisory_unlock(:ns, :id)"), {"ns": PUBLISH_LOCK_NAMESPACE, "id": self.table_id}
+            )
+        except Exception:
+            # 会话锁不会随连接归还连接池而释放, 解锁失败时丢弃该连接
+            logger.exception(f"Failed to release publish lock of table {self.table_id}")
+            await self._conn.invalidate()
+        finally:
+            await self._conn.close()
+
+
+async def _execute_ddl_batch(session: AsyncSession, sqls: List[str]):
+    """在 session 的当前事务中, 经驱动连接以一个多语句脚本执行 DDL (simple query protocol)。"""
+    if not sqls:
+        return
+    script = "\n".join(sqls)
+    set_job_step(script)
+    started = time.perf_counter()
+    pg_conn = await get_asyncpg_connection(session)
+    await pg_conn.execute(script)
+    # 驱动层执行不经过 engine 事件, 单独上报耗时
+    record_statement(script, time.perf_counter() - started)
+    invalidate_snapshots(session)
+
+
+def max_publish_concurrency() -> int:
+    """连接池扣除请求预留后能同时容纳的发布表数 (至少 1)"""
+    available = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW - settings.PUBLISH_POOL_RESERVE
+    return max(1, available // CONNECTIONS_PER_TABLE)
+
+
+def _publish_slots() -> asyncio.Semaphore:
+    global _publish_semaphore
+    if _publish_semaphore is None:
+        _publish_semaphore = asyncio.Semaphore(max_publish_concurrency())
+    return _publish_semaphore
+
+
+async def publish_table_config(
+    engine: AsyncEngine,
+    session: AsyncSession,
+    table_id: int,
+    batch_size: Optional[int] = None,
+    throttle_ms: Optional[int] = None,
+) -> Dict[str, Any]:
+    """发布或同步一张表, 失败时抛出 PublishError。发布槽位已满时等待。"""
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+    # _publish_locked 为后续 SQL 打上表名标签, 返回时恢复调用方 (e.g. 任务 worker) 原来的标签
+    with tag_table(None):
+        async with _publish_slots(), _PublishLock(engine, table_id):
+            timings["lock_ms"] = (time.perf_counter() - started) * 1000
+            result = await _publish_locked(engine, session, table_id, batch_size, throttle_ms, timings)
+    timings["total_ms"] = (time.perf_counter() - started) * 1000
+    result["timings"] = {k: round(v, 1) for k, v in timings.items()}
+    return result
+
+
+async def _publish_locked(
+    engine: AsyncEngine,
+    session: AsyncSession,
+    id: int,
+    batch_size: Optional[int],
+    throttle_ms: Optional[int],
+    timings: Dict[str, float],
+) -> Dict[str, Any]:
+    stmt = select(DataTableConfig).where(DataTableConfig.id == id)
+    result = await session.execute(stmt)
+    config = result.scalar_one_or_none()
+
+    if not config:
+        raise PublishError(404, "Table config not found")
+    tag_table(config.table_name)
+
+    if config.status == TableStatus.CREATED:
+        raise PublishError(400, "Table is already published/synced")
+
+    if is_migration_running(config.table_name) or await has_active_job(session, COLUMN_MIGRATION_JOB, id):
+        raise PublishError(409, "An online column migration is still running for this table")
+
+    # Determine mode: Create or Sync
+    # 一次目录查询取得物理表是否存在 / 是否分区 / 列与索引
+    snapshot = await get_table_snapshot(session, config.table_name)
+    table_exists = snapshot is not None
+    is_partitioned = table_exists and snapshot.is_partitioned
+
+    # 已存在的普通表无法原地转换为分区表
+    if table_exists and config.partition_config and not is_partitioned:
+        raise PublishError(
+            400,
+            f"Table '{config.table_name}' exists and is not partitioned; drop and re-publish it to apply partition_config"
+        )
+
+    table_name = config.table_name
+    sqls_to_execute = []
+    index_ops = []
+    migrations = []
+
+    try:
+        if table_exists:
+            # --- Sync Mode ---
+            db_cols, db_indexes = snapshot.columns, snapshot.indexes
+
+            # 0. Sync Table Comment
+            if config.description:
+                safe_desc = config.description.replace("'", "''")
+                sqls_to_execute.append(f"COMMENT ON TABLE {config.table_name} IS '{safe_desc}';")
+
+            # 1. Sync Columns (Add/Drop/Comment)
+            sqls_to_execute.extend(DDLGenerator.generate_sync_sqls(config.table_name, db_cols, config.columns_schema))
+
+            # 1.1 类型变化: 提交后走在线迁移 (影子列 + 分批回填)
+            type_changes = DDLGenerator.detect_type_changes(db_cols, config.columns_schema)
+            pk_changes = [c["name"] for c in type_changes if c["is_pk"]]
+            if pk_changes:
+                raise PublishError(
+                    400,
+                    f"Changing the type of primary key columns is not supported: {', '.join(pk_changes)}"
+                )
+            pk_cols = [c["name"] for c in config.columns_schema if c.get("is_pk")]
+            comments = {c["name"]: c.get("comment", "") for c in config.columns_schema}
+            migrations = [
+                ColumnMigration(
+                    table_name=config.table_name,
+                    column=c["name"],
+                    from_type=c["from_type"],
+                    to_type=c["to_type"],
+                    pk_columns=pk_cols,
+                    comment=comments[c["name"]],
+                )
+                for c in type_changes
+            ]
+
+            # 2. Sync Indexes: 只变更有差异的索引, 在 DDL 事务提交后以 CONCURRENTLY 执行
+            #    (分区父表不支持 CONCURRENTLY, 退化为普通的单条语句)
+            index_ops = plan_index_operations(
+                config.table_name, db_indexes, config.indexes_schema, concurrently=not is_partitioned
+            )
+
+            # 3. Sync Partitions (补建缺失的分区)
+            if config.partition_config:
+                sqls_to_execute.extend(DDLGenerator.generate_partition_sqls(config.table_name, config.partition_config))
+
+        else:
+            # --- Create Mode ---
+            ddl_sqls = DDLGenerator.generate_create_table_sqls(
+                config.table_name,
+                config.description,
+                config.columns_schema,
+                config.partition_config
+            )
+            idx_sqls = DDLGenerator.generate_index_sqls(
+                config.table_name,
+                config.indexes_schema
+            )
+            sqls_to_execute = ddl_sqls + idx_sqls
+
+        # Execute SQLs
+        logger.info(f"Executing SQLs for table {config.table_name}: {sqls_to_execute}")
+        ddl_started = time.perf_counter()
+        await _execute_ddl_batch(session, sqls_to_execute)
+
+        # Update Status (有索引变更或类型迁移时, 待其全部成功后再标记)
+        if not index_ops and not migrations:
+            config.status = TableStatus.CREATED
+            config.last_published_at = datetime.utcnow()
+        await session.commit()
+        timings["ddl_ms"] = (time.perf_counter() - ddl_started) * 1000
+
+    except PublishError:
+        await session.rollback()
+        raise
+    except Exception as e:
+        await session.rollback()
+        logger.exception(f"Failed to publish/sync table {id}")
+        err_msg = str(e)
+        if "already exists" in err_msg:
+             raise PublishError(400, f"Conflict: {err_msg}")
+        raise PublishError(500, f"Database Execution failed: {err_msg}")
+
+    # Apply index changes outside the DDL transaction
+    if index_ops:
+        index_started = time.perf_counter()
+        await apply_index_operations(engine, index_ops)
+        timings["index_ms"] = (time.perf_counter() - index_started) * 1000
+        sqls_to_execute.extend(op.sql for op in index_ops)
+
+        failed = [op for op in index_ops if op.status == "failed"]
+        if failed:
+            raise PublishError(500, {
+                "message": f"Index sync failed for table '{table_name}': {', '.join(op.index_name for op in failed)}",
+                "executed_sqls": sqls_to_execute,
+                "index_operations": [op.to_dict() for op in index_ops],
+            })
+
+        if not migrations:
+            config.status = TableStatus.CREATED
+            config.last_published_at = datetime.utcnow()
+            await session.commit()
+
+    if migrations:
+        job = await enqueue_job(session, COLUMN_MIGRATION_JOB, {
+            "table_id": id,
+            "migrations": [m.to_params() for m in migrations],
+            "batch_size": batch_size or settings.ONLINE_MIGRATION_BATCH_SIZE,
+            "throttle_seconds": (throttle_ms if throttle_ms is not None else settings.ONLINE_MIGRATION_THROTTLE_MS) / 1000,
+            "lock_timeout_ms": settings.ONLINE_MIGRATION_LOCK_TIMEOUT_MS,
+            "concurrent_indexes": not is_partitioned,
+        }, table_id=id)
+
+        return {
+            "message": f"Table '{table_name}' synced; online type migration started for {', '.join(m.column for m in migrations)}",
+            "executed_sqls": sqls_to_execute,
+            "index_operations": [op.to_dict() for op in index_ops],
+            "migrations": [m.to_dict() for m in migrations],
+            "migration_job_id": job.id,
+        }
+
+    return {
+        "message": f"Table '{table_name}' {'synced' if table_exists else 'published'} successfully",
+        "executed_sqls": sqls_to_execute,
+        "index_operations": [op.to_dict() for op in index_ops],
+    }
+
+
+async def publish_tables(
+    engine: AsyncEngine,
+    table_ids: List[int],
+    concurrency: int,
+    batch_size: Optional[int] = None,
+    throttle_ms: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """并发发布多张表, 每张表使用独立 session; 单表失败不影响其它表。结果顺序与 table_ids 一致。"""
+    semaphore = asyncio.Semaphore(concurrency)
+    finished = 0
+
+    async def run(table_id: int) -> Dict[str, Any]:
+        nonlocal finished
+        async with semaphore:
+            started = time.perf_counter()
+            item: Dict[str, Any] = {"id": table_id}
+            async with AsyncSessionLocal() as session:
+                try:
+                    item.update(await publish_table_config(engine, session, table_id, batch_size, throttle_ms))
+                    item["status_code"] = 200
+                except PublishError as e:
+                    item.update(status_code=e.status_code, error=e.detail)
+                except Exception as e:
+                    logger.exception(f"Failed to publish table {table_id}")
+                    item.update(status_code=500, error=str(e))
+            item["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            finished += 1
+            set_job_step(f"{finished}/{len(table_ids)} tables finished")
+            return item
+
+    return list(await asyncio.gather(*(run(table_id) for table_id in table_ids)))
+
+
+def summarize_publish_results(results: List[Dict[str, Any]], elapsed_seconds: float) -> Dict[str, Any]:
+    succeeded = sum(1 for r in results if r["status_code"] == 200)
+    return {
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "elapsed_ms": round(elapsed_seconds * 1000, 1),
+        "results": results,
+    }
+
+
+@job_handler(PUBLISH_JOB)
+async def run_publish_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    table_id = params["table_id"]
+    try:
+        async with AsyncSessionLocal() as session:
+            return await publish_table_config(
+                default_engine, session, table_id, params.get("batch_size"), params.get("throttle_ms")
+            )
+    finally:
+        await invalidate_table_cache(table_id)
+
+
+@job_handler(BULK_PUBLISH_JOB)
+async def run_bulk_publish_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    table_ids = params["table_ids"]
+    started = time.perf_counter()
+    try:
+        results = await publish_tables(
+            default_engine, table_ids,
+            concurrency=params.get("concurrency") or settings.PUBLISH_CONCURRENCY,
+            batch_size=params.get("batch_size"),
+            throttle_ms=params.get("throttle_ms"),
+        )
+    finally:
+        await invalidate_table_cache()
+        await response_cache.invalidate(*(table_tag(i) for i in table_ids))
+    return summarize_publish_results(results, time.perf_counter() - started)
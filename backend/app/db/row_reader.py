@@ -0,0 +1,203 @@
+"""
+物理表的流式范围读取。
+
+基于主键的 keyset (seek) 分页 + 服务端游标，按批次编码为 NDJSON 或 Arrow IPC 流，
+内存占用与批次大小相关，与结果集大小无关。
+"""
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.db.arrow_schema import arrow_schema_for, record_batch_from_rows, require_pyarrow
+from app.db.bulk_loader import make_coercer
+from app.db.ddl_generator import RANGE_PARTITION_KEY_TYPES
+
+READ_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+class RowQueryError(ValueError):
+    """读取参数无效 (列/游标/过滤条件)。"""
+
+
+@dataclass
+class RangeQuery:
+    sql: str
+    params: Dict[str, Any]
+    columns: List[str]
+    keyset_columns: List[str]
+    column_types: Dict[str, str] = field(default_factory=dict)
+
+
+def _coerce_param(type_str: str, value: Any, what: str):
+    try:
+        return make_coercer(type_str)(value)
+    except (ValueError, TypeError) as e:
+        raise RowQueryError(f"Invalid {what}: {e}")
+
+
+def build_range_query(
+    table_name: str,
+    columns_schema: List[Dict[str, Any]],
+    columns: Optional[Sequence[str]] = None,
+    after: Optional[Sequence[Any]] = None,
+    pk_eq: Optional[Dict[str, Any]] = None,
+    time_column: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> RangeQuery:
+    """
+    生成 keyset 分页查询:
+        SELECT cols FROM t WHERE (pk...) > (:after...) AND ... ORDER BY pk... LIMIT n
+    主键列总是包含在输出中，客户端用最后一行的主键值作为下一页的 after。
+    时间范围为 [start, end)。
+    """
+    type_map = {c["name"]: c["type"] for c in columns_schema}
+    pk_cols = [c["name"] for c in columns_schema if c.get("is_pk")]
+    if not pk_cols:
+        raise RowQueryError("Table has no primary key, keyset pagination is not possible")
+
+    if columns:
+        unknown = [c for c in columns if c not in type_map]
+        if unknown:
+            raise RowQueryError(f"Unknown columns: {', '.join(unknown)}")
+        selected = pk_cols + [c for c in columns if c not in pk_cols]
+    else:
+        selected = list(type_map)
+
+    where = []
+    params: Dict[str, Any] = {}
+
+    if after is not None:
+        if not isinstance(after, (list, tuple)) or len(after) != len(pk_cols):
+            raise RowQueryError(f"'after' must contain {len(pk_cols)} values ({', '.join(pk_cols)})")
+        placeholders = []
+        for i, (col, value) in enumerate(zip(pk_cols, after)):
+            params[f"k{i}"] = _coerce_param(type_map[col], value, f"'after' value for {col}")
+            placeholders.append(f":k{i}")
+        where.append(f"({', '.join(pk_cols)}) > ({', '.join(placeholders)})")
+
+    if pk_eq is not None and not isinstance(pk_eq, dict):
+        raise RowQueryError("Equality filters must be a JSON object")
+    for i, (col, value) in enumerate((pk_eq or {}).items()):
+        if col not in pk_cols:
+            raise RowQueryError(f"Equality filters are only supported on primary key columns, got '{col}'")
+        params[f"eq{i}"] = _coerce_param(type_map[col], value, f"filter value for {col}")
+        where.append(f"{col} = :eq{i}")
+
+    if start is not None or end is not None:
+        if not time_column:
+            raise RowQueryError("start/end require a time_column")
+        if time_column not in type_map:
+            raise RowQueryError(f"Unknown time_column '{time_column}'")
+        if type_map[time_column].strip().upper() not in RANGE_PARTITION_KEY_TYPES:
+            raise RowQueryError(f"time_column '{time_column}' must be DATE/TIMESTAMP/TIMESTAMPTZ")
+        if start is not None:
+            params["start"] = _coerce_param(type_map[time_column], start, "start")
+            where.append(f"{time_column} >= :start")
+        if end is not None:
+            params["end"] = _coerce_param(type_map[time_column], end, "end")
+            where.append(f"{time_column} < :end")
+
+    sql = f"SELECT {', '.join(selected)} FROM {table_name}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {', '.join(pk_cols)}"
+    if limit is not None:
+        sql += " LIMIT :limit"
+        params["limit"] = limit
+
+    return RangeQuery(
+        sql=sql,
+        params=params,
+        columns=selected,
+        keyset_columns=pk_cols,
+        column_types={c: type_map[c] for c in selected},
+    )
+
+
+async def stream_row_batches(engine: AsyncEngine, query: RangeQuery, batch_size: int) -> AsyncIterator[Sequence[Sequence[Any]]]:
+    """
+    使用独立连接上的服务端游标分批读取。
+    不复用请求的 session: 响应流式发送时请求依赖已经被清理。
+    """
+    async with engine.connect() as conn:
+        result = await conn.stream(
+            text(query.sql).execution_options(yield_per=batch_size), query.params
+        )
+        async for partition in result.partitions(batch_size):
+            yield partition
+
+
+def _json_default(v: Any):
+    if isinstance(v, Decimal):
+        return float(v)
+    if isinstance(v, (datetime, date, dt_time)):
+        return v.isoformat()
+    return str(v)
+
+
+def _decode_json_columns(query: RangeQuery) -> List[int]:
+    # 驱动以字符串返回 json/jsonb，输出时还原为 JSON 对象
+    return [
+        i for i, c in enumerate(query.columns)
+        if query.column_types[c].strip().upper() in ("JSON", "JSONB")
+    ]
+
+
+async def encode_ndjson(batches: AsyncIterator[Sequence[Sequence[Any]]], query: RangeQuery) -> AsyncIterator[bytes]:
+    json_cols = _decode_json_columns(query)
+    columns = query.columns
+    async for rows in batches:
+        lines = []
+        for row in rows:
+            values = list(row)
+            for i in json_cols:
+                if isinstance(values[i], str):
+                    values[i] = json.loads(values[i])
+            lines.append(json.dumps(dict(zip(columns, values)), ensure_ascii=False, default=_json_default))
+        yield ("\n".join(lines) + "\n").encode()
+
+
+class _ChunkSink:
+    """供 pyarrow IPC writer 写入的最小 file-like 对象，按批次取出已写字节。"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def encode_arrow(batches: AsyncIterator[Sequence[Sequence[Any]]], query: RangeQuery, columns_schema: List[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    pa = require_pyarrow()
+    schema = arrow_schema_for(columns_schema, query.columns)
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, schema)
+    yield sink.drain()  # schema message
+    async for rows in batches:
+        writer.write_batch(record_batch_from_rows(schema, rows))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
@@ -0,0 +1,98 @@
+"""
+SQL 语句计时。
+
+通过 engine 事件为每条语句计时，按 (路由, 语句类型) 记录延迟直方图，按物理表名累计耗时与次数；
+超过 SLOW_SQL_THRESHOLD_MS 的语句写入慢查询日志。
+绕过 SQLAlchemy 直接走驱动连接的操作 (COPY / 批量 DDL 脚本) 由调用方使用 record_statement 上报。
+"""
+import logging
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.metrics import Histogram, MetricFamily, register_collector
+from app.core.request_metrics import current_route, current_table
+
+slow_logger = logging.getLogger("app.db.slow_sql")
+
+OPERATIONS = {
+    "SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "COPY", "CREATE", "ALTER", "DROP",
+    "COMMENT", "LOCK", "SET", "EXPLAIN", "BEGIN", "COMMIT", "ROLLBACK", "SHOW",
+}
+
+_durations: Dict[Tuple[str, str], Histogram] = {}
+_table_totals: Dict[str, list] = {}  # table -> [count, seconds]
+_slow_counts: Dict[str, int] = {}
+
+
+def statement_operation(statement: str) -> str:
+    words = statement.lstrip(" \t\n(").split(None, 1)
+    op = words[0].upper().rstrip(";") if words else ""
+    return op if op in OPERATIONS else "OTHER"
+
+
+def record_statement(statement: str, seconds: float, operation: Optional[str] = None):
+    route = current_route()
+    table = current_table()
+    op = operation or statement_operation(statement)
+
+    hist = _durations.get((route, op))
+    if hist is None:
+        hist = _durations[(route, op)] = Histogram()
+    hist.observe(seconds)
+
+    if table:
+        totals = _table_totals.setdefault(table, [0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+
+    threshold_ms = settings.SLOW_SQL_THRESHOLD_MS
+    if threshold_ms > 0 and seconds * 1000 >= threshold_ms:
+        _slow_counts[route] = _slow_counts.get(route, 0) + 1
+        slow_logger.warning(
+            f"Slow SQL {seconds * 1000:.0f}ms route={route} table={table or '-'}: "
+            f"{' '.join(statement.split())[:settings.SLOW_SQL_MAX_LENGTH]}"
+        )
+
+
+def instrument_engine(engine: Engine):
+    """为同步 Engine (AsyncEngine.sync_engine) 注册计时事件。"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._qf_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_qf_started", None)
+        if started is not None:
+            context._qf_started = None
+            record_statement(statement, time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        context = exception_context.execution_context
+        started = getattr(context, "_qf_started", None)
+        if started is not None and exception_context.statement:
+            record_statement(exception_context.statement, time.perf_counter() - started)
+
+
+@register_collector
+def collect_sql_metrics() -> Iterable[MetricFamily]:
+    duration = MetricFamily("qf_db_statement_duration_seconds", "histogram", "SQL statement latency by route and operation")
+    for (route, op), hist in sorted(_durations.items()):
+        hist.add_to(duration, {"route": route, "operation": op})
+
+    table_count = MetricFamily("qf_db_table_statements_total", "counter", "SQL statements issued per physical table")
+    table_seconds = MetricFamily("qf_db_table_statement_seconds_total", "counter", "SQL time spent per physical table")
+    for table, (count, seconds) in sorted(_table_totals.items()):
+        table_count.add(count, {"table": table})
+        table_seconds.add(seconds, {"table": table})
+
+    slow = MetricFamily("qf_db_slow_statements_total", "counter", "Statements slower than SLOW_SQL_THRESHOLD_MS")
+    for route, count in sorted(_slow_counts.items()):
+        slow.add(count, {"route": route})
+    return [duration, table_count, table_seconds, slow]
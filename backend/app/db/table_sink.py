@@ -0,0 +1,285 @@
+"""
+物理表的微批写入 (工作流 table_sink 节点使用)。
+
+记录 (dict) 按 DataTableConfig.columns_schema 校验与类型转换后进入缓冲区, 缓冲达到 batch_rows 行或
+最早一行已等待 flush_seconds 秒时作为一批交给写入任务; 每批在独立事务中写入并提交:
+    insert  二进制 COPY 直接写入
+    upsert  COPY 到暂存表再按主键合并 (与上传接口相同, 见 app.db.bulk_loader)
+写入与校验并行: 写入任务处理当前批次时继续接收下一批。等待写入的批次达到 max_pending 时 add 阻塞 (背压),
+并通过 on_pause / on_resume 通知上游 (e.g. 暂停 thread 节点的 ResultStream), Postgres 跟不上时内存占用有上限。
+每批的写入耗时计入 per-run 统计 (stats) 与 /metrics 的 qf_table_sink_* 指标。
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.core.metrics import Histogram, MetricFamily, register_collector
+from app.core.request_metrics import tag_table
+from app.db.bulk_loader import (
+    IngestError, MergeCounts, build_coercers, get_asyncpg_connection, merge_sql, staging_table_name,
+    staging_table_sql,
+)
+from app.db.session import AsyncSessionLocal
+from app.db.sql_metrics import record_statement
+
+SINK_MODES = ("insert", "upsert")
+# 统计中保留的校验错误数
+MAX_REPORTED_ERRORS = 20
+
+_flush_seconds: Dict[str, Histogram] = {}
+_rows_written: Dict[str, int] = {}
+
+
+@register_collector
+def collect_sink_metrics() -> Iterable[MetricFamily]:
+    flush = MetricFamily("qf_table_sink_flush_seconds", "histogram", "Micro-batch write latency per physical table")
+    for table, hist in sorted(_flush_seconds.items()):
+        hist.add_to(flush, {"table": table})
+    rows = MetricFamily("qf_table_sink_rows_total", "counter", "Rows written by workflow table sinks")
+    for table, count in sorted(_rows_written.items()):
+        rows.add(count, {"table": table})
+    return [flush, rows]
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class TableSink:
+    """微批写入一张物理表: start() 后多次 add(), 最后 close(); 出错时 abort()。"""
+
+    def __init__(
+        self,
+        table_name: str,
+        columns_schema: List[Dict[str, Any]],
+        *,
+        mode: str = "insert",
+        columns: Optional[List[str]] = None,
+        batch_rows: int = 5000,
+        flush_seconds: float = 1.0,
+        max_pending: int = 2,
+        skip_invalid: bool = False,
+        on_pause: Optional[Callable[[], None]] = None,
+        on_resume: Optional[Callable[[], None]] = None,
+    ):
+        known = [c["name"] for c in columns_schema]
+        self.columns = list(columns) if columns else known
+        unknown = [c for c in self.columns if c not in known]
+        if unknown:
+            raise IngestError(f"Unknown columns: {', '.join(unknown)}")
+        self.pk_columns = [c["name"] for c in columns_schema if c.get("is_pk")]
+        if mode == "upsert":
+            if not self.pk_columns:
+                raise IngestError("Upsert requires a primary key in columns_schema")
+            missing = [c for c in self.pk_columns if c not in self.columns]
+            if missing:
+                raise IngestError(f"Upsert requires the primary key columns: {', '.join(missing)}")
+
+        self.table_name = table_name
+        self.columns_schema = columns_schema
+        self.mode = mode
+        self.batch_rows = batch_rows
+        self.flush_seconds = flush_seconds
+        self.skip_invalid = skip_invalid
+        self._on_pause = on_pause
+        self._on_resume = on_resume
+        self._coercers = build_coercers(columns_schema, self.columns)
+        self._known = set(self.columns)
+        self._pk_positions = [self.columns.index(c) for c in self.pk_columns if c in self._known]
+
+        self._buffer: List[Tuple[Any, ...]] = []
+        self._buffer_started: Optional[float] = None
+        self._buffer_filled = asyncio.Event()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._flush_lock = asyncio.Lock()
+        self._writer: Optional[asyncio.Task] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+
+        self.received = 0
+        self.written = 0
+        self.rejected = 0
+        self.errors: List[str] = []
+        self.merge = MergeCounts() if mode == "upsert" else None
+        self.flush_latencies: List[float] = []
+        self.backpressure_seconds = 0.0
+        self._started = time.perf_counter()
+
+    # --- 校验 ---
+
+    def _coerce(self, record: Any) -> Tuple[Any, ...]:
+        if not isinstance(record, dict):
+            raise IngestError(f"expected an object, got {type(record).__name__}")
+        unknown = record.keys() - self._known
+        if unknown:
+            raise IngestError(f"unknown columns {sorted(unknown)}")
+        try:
+            row = tuple(conv(record.get(c)) for conv, c in zip(self._coercers, self.columns))
+        except (ValueError, TypeError) as e:
+            raise IngestError(str(e)) from None
+        for position in self._pk_positions:
+            if row[position] is None:
+                raise IngestError(f"primary key column '{self.columns[position]}' is null")
+        return row
+
+    # --- 缓冲与背压 ---
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._writer = asyncio.create_task(self._write_loop())
+        self._timer = asyncio.create_task(self._timer_loop())
+
+    async def add(self, records: Iterable[Any]):
+        """校验并缓冲一组记录; 缓冲满一批时交给写入任务, 写入跟不上时在此等待。"""
+        if self._error is not None:
+            raise self._error
+        for record in records:
+            self.received += 1
+            try:
+                row = self._coerce(record)
+            except IngestError as e:
+                if not self.skip_invalid:
+                    raise IngestError(f"Row {self.received}: {e}") from None
+                self.rejected += 1
+                if len(self.errors) < MAX_REPORTED_ERRORS:
+                    self.errors.append(f"Row {self.received}: {e}")
+                continue
+            if not self._buffer:
+                self._buffer_started = time.monotonic()
+                self._buffer_filled.set()
+            self._buffer.append(row)
+            if len(self._buffer) >= self.batch_rows:
+                await self.flush()
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            batch, self._buffer, self._buffer_started = self._buffer, [], None
+            if self._queue.full():
+                started = time.perf_counter()
+                if self._on_pause is not None:
+                    self._on_pause()
+                try:
+                    await self._queue.put(batch)
+                finally:
+                    if self._on_resume is not None:
+                        self._on_resume()
+                    self.backpressure_seconds += time.perf_counter() - started
+            else:
+                self._queue.put_nowait(batch)
+        if self._error is not None:
+            raise self._error
+
+    async def _timer_loop(self):
+        # 上游产出较慢时, 不满一批的记录最多等待 flush_seconds 后写入
+        while self._error is None:
+            started = self._buffer_started
+            if started is None:
+                self._buffer_filled.clear()
+                await self._buffer_filled.wait()
+                continue
+            wait = started + self.flush_seconds - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            else:
+                await self.flush()
+
+    # --- 写入 ---
+
+    async def _write_loop(self):
+        with tag_table(self.table_name):
+            while True:
+                batch = await self._queue.get()
+                if batch is None:
+                    return
+                # 写入失败后继续取出 (丢弃) 后续批次, 避免 flush 阻塞; 错误在下一次 add / close 时抛出
+                if self._error is not None:
+                    continue
+                started = time.perf_counter()
+                try:
+                    await self._write(batch)
+                except Exception as e:
+                    self._error = e
+                    continue
+                seconds = time.perf_counter() - started
+                self.flush_latencies.append(seconds)
+                self.written += len(batch)
+                hist = _flush_seconds.get(self.table_name)
+                if hist is None:
+                    hist = _flush_seconds[self.table_name] = Histogram()
+                hist.observe(seconds)
+                _rows_written[self.table_name] = _rows_written.get(self.table_name, 0) + len(batch)
+
+    async def _write(self, batch: List[Tuple[Any, ...]]):
+        """在独立事务中写入一批并提交"""
+        async with AsyncSessionLocal() as session:
+            target = self.table_name
+            if self.mode == "upsert":
+                target = staging_table_name(self.table_name)
+                await session.execute(text(staging_table_sql(target, self.columns_schema, self.columns)))
+            pg_conn = await get_asyncpg_connection(session)
+            started = time.perf_counter()
+            await pg_conn.copy_records_to_table(target, records=batch, columns=self.columns)
+            record_statement(f"COPY {target} FROM STDIN (BINARY)", time.perf_counter() - started, "COPY")
+            if self.mode == "upsert":
+                merge = merge_sql(self.table_name, target, self.columns_schema, self.columns, self.pk_columns)
+                self.merge.add((await session.execute(text(merge))).one(), len(batch))
+            await session.commit()
+
+    async def close(self):
+        """写入剩余的缓冲并等待所有批次提交; 任一批次失败时抛出其错误。未 start() 或已关闭时不做任何事。"""
+        if self._writer is None:
+            return
+        timer, writer, self._timer, self._writer = self._timer, self._writer, None, None
+        timer.cancel()
+        await asyncio.gather(timer, return_exceptions=True)
+        try:
+            await self.flush()
+        finally:
+            await self._queue.put(None)
+            await writer
+        if self._error is not None:
+            raise self._error
+
+    async def abort(self):
+        """放弃尚未写入的批次 (已提交的批次保留)"""
+        for task in (self._timer, self._writer):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*(t for t in (self._timer, self._writer) if t is not None), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self._started
+        write_seconds = sum(self.flush_latencies)
+        stats = {
+            "table": self.table_name,
+            "mode": self.mode,
+            "received": self.received,
+            "rows": self.written,
+            "rejected": self.rejected,
+            "batches": len(self.flush_latencies),
+            "elapsed_seconds": round(elapsed, 3),
+            "write_seconds": round(write_seconds, 3),
+            # 整体吞吐 (含等待上游的时间) 与写入吞吐 (只计写入耗时)
+            "rows_per_sec": round(self.written / elapsed, 1) if elapsed > 0 else 0.0,
+            "write_rows_per_sec": round(self.written / write_seconds, 1) if write_seconds > 0 else 0.0,
+            "backpressure_wait_seconds": round(self.backpressure_seconds, 3),
+        }
+        if self.flush_latencies:
+            stats["flush_seconds"] = {
+                "p50": round(_percentile(self.flush_latencies, 0.5), 4),
+                "p95": round(_percentile(self.flush_latencies, 0.95), 4),
+                "max": round(max(self.flush_latencies), 4),
+            }
+        if self.merge is not None:
+            stats.update(
+                inserted=self.merge.inserted, updated=self.merge.updated,
+                unchanged=self.merge.unchanged, duplicates=self.merge.duplicates,
+            )
+        if self.errors:
+            stats["errors"] = self.errors
+        return stats
@@ -0,0 +1,120 @@
+"""
+物理表的存储统计: 估计行数、总/表/索引/TOAST 大小、最近 vacuum/analyze 时间、死元组比例。
+
+一次查询取回所有受管表 (data_table_configs 中有对应物理表的) 的统计, 分区表汇总各叶子分区;
+结果在进程内缓存 TABLE_STATS_TTL_SECONDS 秒, 列表页渲染不会触发逐表查询。
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 分区表: 行数/大小为各叶子分区之和; vacuum/analyze 时间取最久未处理的分区, 有分区从未处理过时为 NULL
+# (min 会忽略 NULL, 否则会报告其余分区的时间)
+TABLE_STATS_SQL = text("""
+SELECT
+    cfg.table_name AS name,
+    c.relkind::text AS relkind,
+    count(pt.relid) AS partitions,
+    sum(CASE WHEN p.reltuples >= 0 THEN p.reltuples::bigint ELSE s.n_live_tup END) AS row_estimate,
+    coalesce(sum(pg_total_relation_size(pt.relid)), 0) AS total_bytes,
+    coalesce(sum(pg_relation_size(pt.relid)), 0) AS table_bytes,
+    coalesce(sum(pg_indexes_size(pt.relid)), 0) AS index_bytes,
+    coalesce(sum(CASE WHEN p.reltoastrelid <> 0 THEN pg_total_relation_size(p.reltoastrelid) ELSE 0 END), 0) AS toast_bytes,
+    sum(s.n_live_tup) AS live_tuples,
+    sum(s.n_dead_tup) AS dead_tuples,
+    CASE WHEN bool_or(greatest(s.last_vacuum, s.last_autovacuum) IS NULL) THEN NULL
+         ELSE min(greatest(s.last_vacuum, s.last_autovacuum)) END AS last_vacuum_at,
+    CASE WHEN bool_or(greatest(s.last_analyze, s.last_autoanalyze) IS NULL) THEN NULL
+         ELSE min(greatest(s.last_analyze, s.last_autoanalyze)) END AS last_analyze_at
+FROM data_table_configs cfg
+JOIN pg_class c ON c.relname = cfg.table_name AND c.relkind IN ('r', 'p')
+JOIN pg_namespace n ON n.oid = c.relnamespace AND n.nspname = current_schema()
+LEFT JOIN LATERAL (
+    -- 普通表不属于任何分区树, pg_partition_tree 不返回行
+    SELECT c.oid AS relid WHERE c.relkind = 'r'
+    UNION ALL
+    SELECT relid FROM pg_partition_tree(c.oid) WHERE isleaf AND c.relkind = 'p'
+) pt ON true
+LEFT JOIN pg_class p ON p.oid = pt.relid
+LEFT JOIN pg_stat_user_tables s ON s.relid = pt.relid
+GROUP BY cfg.table_name, c.relkind
+""")
+
+
+def _stats_from_row(row, collected_at: datetime) -> Dict[str, Any]:
+    live = int(row.live_tuples) if row.live_tuples is not None else None
+    dead = int(row.dead_tuples) if row.dead_tuples is not None else None
+    return {
+        "row_estimate": int(row.row_estimate) if row.row_estimate is not None else None,
+        "total_bytes": int(row.total_bytes),
+        "table_bytes": int(row.table_bytes),
+        "index_bytes": int(row.index_bytes),
+        "toast_bytes": int(row.toast_bytes),
+        "partitions": int(row.partitions) if row.relkind == "p" else 0,
+        "live_tuples": live,
+        "dead_tuples": dead,
+        "dead_tuple_ratio": round(dead / (live + dead), 4) if live is not None and dead is not None and live + dead else None,
+        "last_vacuum_at": row.last_vacuum_at,
+        "last_analyze_at": row.last_analyze_at,
+        "collected_at": collected_at,
+    }
+
+
+async def load_table_stats(session: AsyncSession) -> Dict[str, Dict[str, Any]]:
+    """一次查询加载所有受管表的统计, key 为物理表名。"""
+    collected_at = datetime.now(timezone.utc)
+    result = await session.execute(TABLE_STATS_SQL)
+    return {row.name: _stats_from_row(row, collected_at) for row in result}
+
+
+class TableStatsCache:
+    """
+    进程内 TTL 缓存。过期或请求了缓存中没有的表 (e.g. 刚发布) 时整体重新加载;
+    并发请求只触发一次加载。加载失败时继续返回旧数据, 不影响列表接口。
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._stats: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _is_stale(self, names) -> bool:
+        return time.monotonic() >= self._expires_at or any(name not in self._stats for name in names)
+
+    async def get(self, session: AsyncSession, table_names: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        names = list(dict.fromkeys(table_names))
+        if not names:
+            return {}
+        if self._is_stale(names):
+            async with self._lock:
+                if self._is_stale(names):  # 等锁期间可能已被其它请求刷新
+                    await self._reload(session, names)
+        return {name: self._stats.get(name) for name in names}
+
+    async def _reload(self, session: AsyncSession, names):
+        try:
+            stats: Dict[str, Optional[Dict[str, Any]]] = dict(await load_table_stats(session))
+        except Exception:
+            logger.exception("Loading table stats failed")
+            stats = dict(self._stats)
+        # 物理表不存在的表也记录下来, 避免每次请求都重新加载
+        for name in names:
+            stats.setdefault(name, None)
+        self._stats = stats
+        self._expires_at = time.monotonic() + self.ttl_seconds
+
+    def invalidate(self):
+        self._expires_at = 0.0
+
+
+table_stats_cache = TableStatsCache(settings.TABLE_STATS_TTL_SECONDS)
@@ -0,0 +1,73 @@
+"""
+消息总线 Topic 的注册表查询, 以及工作流中引用 Topic 的生产者 / 消费者节点 (画布的幽灵连线)。
+"""
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionLocal
+from app.models.topic import Topic
+from app.models.workflow import Workflow
+
+PRODUCER_NODE = "producer"
+CONSUMER_NODE = "consumer"
+# 节点执行时读取的 Topic 配置的缓存时间 (秒), 避免每次发布都查询注册表
+TOPIC_CACHE_SECONDS = 30.0
+
+
+class TopicNotFound(ValueError):
+    """Topic 未注册。"""
+
+
+_topic_cache: Dict[str, Tuple[float, Optional[int]]] = {}
+
+
+async def get_topic(session: AsyncSession, name: str) -> Optional[Topic]:
+    return (await session.execute(select(Topic).where(Topic.name == name))).scalar_one_or_none()
+
+
+async def topic_max_length(name: str) -> Optional[int]:
+    """已注册 Topic 的保留上限 (带缓存); 未注册时抛出 TopicNotFound。"""
+    cached = _topic_cache.get(name)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    async with AsyncSessionLocal() as session:
+        topic = await get_topic(session, name)
+    if topic is None:
+        raise TopicNotFound(f"Topic '{name}' is not registered")
+    _topic_cache[name] = (time.monotonic() + TOPIC_CACHE_SECONDS, topic.max_length)
+    return topic.max_length
+
+
+def invalidate_topic(name: str):
+    _topic_cache.pop(name, None)
+
+
+def _topic_nodes(graph: Dict[str, Any], path: str = "") -> Iterator[Tuple[str, str, str]]:
+    """(topic, 节点类型, 节点路径), 包括循环等容器节点的子图中的节点"""
+    for node in graph.get("nodes") or []:
+        node_path = f"{path}{node.get('id')}"
+        topic = (node.get("config") or {}).get("topic")
+        if node.get("type") in (PRODUCER_NODE, CONSUMER_NODE) and isinstance(topic, str):
+            yield topic, node["type"], node_path
+        if isinstance(node.get("body"), dict):
+            yield from _topic_nodes(node["body"], f"{node_path}.")
+
+
+async def topic_links(session: AsyncSession, topic: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    引用 Topic 的节点: [{topic, producers: [{workflow_id, workflow_name, node}], consumers: [...]}]。
+    画布据此在生产者与消费者之间绘制虚线 (幽灵连线), 包括跨工作流的连接。
+    """
+    rows = (await session.execute(select(Workflow.id, Workflow.name, Workflow.graph).order_by(Workflow.id))).all()
+    links: Dict[str, Dict[str, Any]] = {}
+    for workflow_id, workflow_name, graph in rows:
+        for name, node_type, node_path in _topic_nodes(graph or {}):
+            if topic is not None and name != topic:
+                continue
+            link = links.setdefault(name, {"topic": name, "producers": [], "consumers": []})
+            key = "producers" if node_type == PRODUCER_NODE else "consumers"
+            link[key].append({"workflow_id": workflow_id, "workflow_name": workflow_name, "node": node_path})
+    return [links[name] for name in sorted(links)]
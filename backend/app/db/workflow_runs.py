@@ -0,0 +1,204 @@
+"""
+工作流运行的持久化与后台执行。
+
+POST /workflows/{id}/runs 创建 workflow_runs 记录 (保存图快照) 并入队 workflow_run 任务, 由 worker 执行:
+    - GraphRunner 按依赖并发执行节点 (见 app.engine.runner)
+    - 节点记录写入 workflow_node_runs: 顶层节点结束即写入 (运行期间可查询进度),
+      循环体内的节点按批 (NODE_RECORD_BATCH 条或 NODE_RECORD_FLUSH_SECONDS 秒) 写入
+    - 结束后写回运行状态、输出与耗时; 运行失败时任务同样失败, error 中包含失败的节点
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.job_queue import set_job_step
+from app.db.job_runner import JobError, enqueue_job, job_handler
+from app.db.session import AsyncSessionLocal
+from app.engine import GraphError, GraphRunner, NodeRecord, load_graph
+from app.models.job import Job
+from app.models.workflow import Workflow, WorkflowNodeRun, WorkflowRun, WorkflowRunStatus
+
+logger = logging.getLogger(__name__)
+
+WORKFLOW_RUN_JOB = "workflow_run"
+NODE_RECORD_BATCH = 200
+NODE_RECORD_FLUSH_SECONDS = 1.0
+# 无法转换为 JSON 的输出 (DataFrame 等) 以 repr 记录的最大长度
+MAX_REPR_LENGTH = 2000
+
+
+def to_json(value: Any) -> Any:
+    """运行输出转换为可写入 JSONB 的值; 无法转换的对象记录为 repr。"""
+    try:
+        return jsonable_encoder(value)
+    except (TypeError, ValueError):
+        return repr(value)[:MAX_REPR_LENGTH]
+
+
+class NodeRecordWriter:
+    """GraphRunner 的 on_record 回调: 缓冲节点记录并批量写入 workflow_node_runs。"""
+
+    def __init__(self, run_id: int):
+        self.run_id = run_id
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()
+        self._flushed_at = time.monotonic()
+        self.written = 0
+
+    async def __call__(self, record: NodeRecord):
+        self._buffer.append({
+            "run_id": self.run_id,
+            "node_id": record.node_id,
+            "node_type": record.node_type,
+            "scope": record.scope,
+            "status": record.status.value,
+            "started_at": record.started_at,
+            "finished_at": record.finished_at,
+            "wait_seconds": record.wait_seconds,
+            "elapsed_seconds": record.elapsed_seconds,
+            "detail": to_json(record.detail),
+            "error": record.error,
+        })
+        if (
+            record.scope is None
+            or len(self._buffer) >= NODE_RECORD_BATCH
+            or time.monotonic() - self._flushed_at >= NODE_RECORD_FLUSH_SECONDS
+        ):
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            rows, self._buffer = self._buffer, []
+            self._flushed_at = time.monotonic()
+            if not rows:
+                return
+            # 运行中止时正在写入记录的节点会被取消, 写入本身不随之取消
+            await asyncio.shield(self._insert(rows))
+
+    async def _insert(self, rows: List[Dict[str, Any]]):
+        async with AsyncSessionLocal() as session:
+            await session.execute(insert(WorkflowNodeRun), rows)
+            await session.commit()
+        self.written += len(rows)
+
+
+async def start_run(session: AsyncSession, workflow: Workflow, inputs: Dict[str, Any]) -> Tuple[WorkflowRun, Job]:
+    """创建运行记录 (图快照) 并入队执行。会提交 session 的当前事务。"""
+    run = WorkflowRun(
+        workflow_id=workflow.id,
+        status=WorkflowRunStatus.QUEUED,
+        graph=workflow.graph,
+        inputs=jsonable_encoder(inputs),
+    )
+    session.add(run)
+    await session.flush()
+    job = await enqueue_job(session, WORKFLOW_RUN_JOB, {"run_id": run.id})
+    run.job_id = job.id
+    await session.commit()
+    return run, job
+
+
+async def _finish(run_id: int, status: WorkflowRunStatus, **values):
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(WorkflowRun).where(WorkflowRun.id == run_id).values(status=status, finished_at=func.now(), **values)
+        )
+        await session.commit()
+
+
+async def execute_run(run_id: int) -> Dict[str, Any]:
+    """执行一次排队中的运行, 返回摘要 {run_id, status, elapsed_seconds, nodes, error}。"""
+    async with AsyncSessionLocal() as session:
+        run = await session.get(WorkflowRun, run_id)
+        if run is None:
+            raise JobError("Workflow run not found", status_code=404)
+        if run.status != WorkflowRunStatus.QUEUED:
+            raise JobError(f"Workflow run {run_id} is already {run.status.value}", status_code=409)
+        workflow = await session.get(Workflow, run.workflow_id)
+        max_concurrency = (workflow.max_concurrency if workflow else None) or settings.WORKFLOW_MAX_CONCURRENCY
+        inputs = run.inputs or {}
+        try:
+            graph = load_graph(run.graph)
+        except GraphError as e:
+            # 节点类型在保存之后被移除等情况
+            run.status = WorkflowRunStatus.FAILED
+            run.error = {"node": None, "scope": None, "error": str(e)}
+            run.finished_at = func.now()
+            await session.commit()
+            raise JobError(str(e), status_code=400)
+        run.status = WorkflowRunStatus.RUNNING
+        run.started_at = func.now()
+        await session.commit()
+
+    set_job_step(f"workflow run {run_id}: {len(graph.nodes)} node(s)")
+    writer = NodeRecordWriter(run_id)
+    runner = GraphRunner(graph, max_concurrency=max_concurrency, on_record=writer, run_id=run_id)
+    started = time.perf_counter()
+    try:
+        result = await runner.run(inputs)
+    except BaseException as e:
+        # 任务被取消 (worker 退出) 或执行器自身的错误: 记录已结束的节点后标记失败
+        interrupted = isinstance(e, asyncio.CancelledError)
+        error = "Run interrupted: worker shut down" if interrupted else f"{type(e).__name__}: {e}"
+        await writer.flush()
+        await _finish(
+            run_id, WorkflowRunStatus.FAILED,
+            error={"node": None, "scope": None, "error": error},
+            elapsed_seconds=round(time.perf_counter() - started, 3),
+        )
+        raise
+    await writer.flush()
+
+    status = WorkflowRunStatus.SUCCEEDED if result.status == "succeeded" else WorkflowRunStatus.FAILED
+    await _finish(
+        run_id, status,
+        outputs=to_json(result.output) if status == WorkflowRunStatus.SUCCEEDED else None,
+        error=result.error,
+        elapsed_seconds=result.elapsed_seconds,
+    )
+    logger.info(f"Workflow run {run_id} {status.value} in {result.elapsed_seconds}s: {result.nodes}")
+    return {
+        "run_id": run_id,
+        "status": status.value,
+        "elapsed_seconds": result.elapsed_seconds,
+        "nodes": result.nodes,
+        "error": result.error,
+    }
+
+
+@job_handler(WORKFLOW_RUN_JOB)
+async def run_workflow_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    summary = await execute_run(params["run_id"])
+    if summary["status"] != WorkflowRunStatus.SUCCEEDED.value:
+        raise JobError(summary, status_code=500)
+    return summary
+
+
+async def get_node_runs(session: AsyncSession, run_id: int, loop_nodes: bool = False) -> List[WorkflowNodeRun]:
+    stmt = select(WorkflowNodeRun).where(WorkflowNodeRun.run_id == run_id)
+    if not loop_nodes:
+        stmt = stmt.where(WorkflowNodeRun.scope.is_(None))
+    return list((await session.execute(stmt.order_by(WorkflowNodeRun.id))).scalars().all())
+
+
+def describe_run(run: WorkflowRun, nodes: Optional[List[WorkflowNodeRun]] = None) -> Dict[str, Any]:
+    return {
+        "id": run.id,
+        "workflow_id": run.workflow_id,
+        "job_id": run.job_id,
+        "status": run.status,
+        "inputs": run.inputs,
+        "outputs": run.outputs,
+        "error": run.error,
+        "created_at": run.created_at,
+        "started_at": run.started_at,
+        "finished_at": run.finished_at,
+        "elapsed_seconds": run.elapsed_seconds,
+        "nodes": nodes,
+    }
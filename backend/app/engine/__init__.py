@@ -0,0 +1,24 @@
+"""
+工作流执行引擎: 图解析与校验 (graph)、变量引用与条件 (expressions)、节点类型 (nodes)、异步图执行器 (runner)、
+进程调度器 (process_scheduler, 经共享内存 shared_data 传递大数组)、
+线程调度器 (thread_scheduler, IO 并发 / 限速 / 重试 / 流式输出)、消息总线节点 (mq_nodes, producer / consumer)、
+数据表写入节点 (sink_nodes, table_sink)。
+持久化与后台执行见 app.db.workflow_runs。
+"""
+from app.engine.graph import Graph, GraphError, parse_graph
+from app.engine.nodes import NodeResult, load_graph, node_type
+from app.engine.runner import GraphRunner, NodeRecord, NodeStatus, RunResult
+from app.engine import mq_nodes, process_scheduler, sink_nodes, thread_scheduler  # noqa: F401  注册节点类型
+
+__all__ = [
+    "Graph",
+    "GraphError",
+    "GraphRunner",
+    "NodeRecord",
+    "NodeResult",
+    "NodeStatus",
+    "RunResult",
+    "load_graph",
+    "node_type",
+    "parse_graph",
+]
@@ -0,0 +1,129 @@
+"""
+节点配置中的变量引用与条件表达式。
+
+变量引用: 配置中的字符串可以包含 {{node_id.path}}, 执行节点前替换为上游节点的输出
+    - 整个字符串只有一个引用时保留原始类型 (列表 / 数值 / DataFrame 等), 否则按字符串拼接
+    - path 逐级取 dict 的键 / 列表的下标 / 对象的属性, e.g. {{fetch.rows.0.close}}
+    - 保留变量: {{inputs.x}} 为运行输入, 循环体内 {{loop.item}} / {{loop.index}} / {{loop.output}} (上一轮的输出)
+条件: {"left": "{{fetch.count}}", "op": ">", "right": 0}, 多个条件按 logic (and / or) 组合。
+"""
+import operator
+import re
+from typing import Any, Dict, Iterable, List, Mapping, Set
+
+TEMPLATE = re.compile(r"\{\{\s*([A-Za-z0-9_][\w-]*(?:\.[\w-]+)*)\s*\}\}")
+
+
+class ExpressionError(ValueError):
+    """变量引用无法解析或条件无法求值。"""
+
+
+def _get(value: Any, part: str, path: str) -> Any:
+    if isinstance(value, Mapping):
+        if part in value:
+            return value[part]
+    elif isinstance(value, (list, tuple)):
+        if part.lstrip("-").isdigit() and -len(value) <= int(part) < len(value):
+            return value[int(part)]
+    elif not part.startswith("_") and hasattr(value, part):
+        return getattr(value, part)
+    raise ExpressionError(f"Cannot resolve '{{{{{path}}}}}': no '{part}'")
+
+
+def lookup(scope: Mapping[str, Any], path: str) -> Any:
+    root, *parts = path.split(".")
+    if root not in scope:
+        raise ExpressionError(f"Cannot resolve '{{{{{path}}}}}': '{root}' has no output in this scope")
+    value = scope[root]
+    for part in parts:
+        value = _get(value, part, path)
+    return value
+
+
+def resolve(value: Any, scope: Mapping[str, Any]) -> Any:
+    """递归替换配置 (dict / list / str) 中的变量引用。"""
+    if isinstance(value, str):
+        match = TEMPLATE.fullmatch(value.strip())
+        if match:
+            return lookup(scope, match.group(1))
+        if "{{" not in value:
+            return value
+        return TEMPLATE.sub(lambda m: str(lookup(scope, m.group(1))), value)
+    if isinstance(value, dict):
+        return {key: resolve(item, scope) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve(item, scope) for item in value]
+    return value
+
+
+def references(value: Any) -> Set[str]:
+    """配置中引用的根变量名 (节点 id / inputs / loop), 用于校验引用的是否为上游节点。"""
+    if isinstance(value, str):
+        return {m.group(1).split(".", 1)[0] for m in TEMPLATE.finditer(value)}
+    if isinstance(value, dict):
+        values: Iterable[Any] = value.values()
+    elif isinstance(value, list):
+        values = value
+    else:
+        return set()
+    found = set()
+    for item in values:
+        found |= references(item)
+    return found
+
+
+def _contains(container: Any, item: Any) -> bool:
+    return container is not None and item in container
+
+
+def _is_empty(value: Any, _=None) -> bool:
+    return value is None or (hasattr(value, "__len__") and len(value) == 0)
+
+
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "in": lambda left, right: _contains(right, left),
+    "not in": lambda left, right: not _contains(right, left),
+    "contains": _contains,
+    "not contains": lambda left, right: not _contains(left, right),
+    "empty": _is_empty,
+    "not empty": lambda left, right=None: not _is_empty(left),
+}
+# 不需要 right 的一元运算
+UNARY_OPERATORS = frozenset({"empty", "not empty"})
+LOGICS = frozenset({"and", "or"})
+
+
+def validate_conditions(conditions: Any, logic: Any = "and"):
+    if not isinstance(conditions, list) or not conditions:
+        raise ExpressionError("conditions must be a non-empty list")
+    if logic not in LOGICS:
+        raise ExpressionError(f"logic must be one of: {', '.join(sorted(LOGICS))}")
+    for condition in conditions:
+        if not isinstance(condition, dict) or "left" not in condition:
+            raise ExpressionError("condition must be an object with left / op / right")
+        op = condition.get("op", "==")
+        if op not in OPERATORS:
+            raise ExpressionError(f"Unknown operator '{op}', expected one of: {', '.join(OPERATORS)}")
+        if op not in UNARY_OPERATORS and "right" not in condition:
+            raise ExpressionError(f"Operator '{op}' requires 'right'")
+
+
+def evaluate_condition(condition: Dict[str, Any]) -> bool:
+    """求值一个已解析变量的条件。"""
+    op = condition.get("op", "==")
+    left, right = condition.get("left"), condition.get("right")
+    try:
+        return bool(OPERATORS[op](left, right))
+    except TypeError as e:
+        raise ExpressionError(f"Cannot evaluate {left!r} {op} {right!r}: {e}") from None
+
+
+def evaluate_conditions(conditions: List[Dict[str, Any]], logic: str = "and") -> bool:
+    results = (evaluate_condition(c) for c in conditions)
+    return all(results) if logic == "and" else any(results)
@@ -0,0 +1,205 @@
+"""
+工作流图: 节点 / 连线的解析、结构校验与拓扑排序。
+
+持久化格式 (workflows.graph, JSONB):
+    {
+      "nodes": [
+        {"id": "fetch_daily", "type": "function", "config": {"callable": "etl.vendors:fetch_daily"},
+         "concurrency_key": "tushare", "timeout_seconds": 600, "continue_on_error": false},
+        {"id": "each_symbol", "type": "loop", "config": {"items": "{{fetch_daily.symbols}}"},
+         "body": {"nodes": [...], "edges": [...]}}
+      ],
+      "edges": [{"source": "check", "target": "fetch_daily", "source_handle": "true"}],
+      "concurrency": {"tushare": 2}
+    }
+- source_handle 为控制节点 (if_else / switch) 的分支名, 为空表示无条件; 兼容画布的 sourceHandle 写法,
+  画布默认的 "source" 分支视为无条件; "stream" 为流式连线 (thread 节点), 下游在上游运行期间即开始执行
+- concurrency 为按 key 的并发上限, 同一 key 的节点 (包括循环体内的) 同时执行的数量不超过该值; 只能在顶层定义
+- 循环节点的 body 为嵌套子图 (同样的格式), 子图中的节点只在循环作用域内可见
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Any, Collection, Dict, List, Optional
+
+NODE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_-]{0,63}$")
+# 模板中的保留变量名: 运行输入 / 当前循环
+RESERVED_IDS = frozenset({"inputs", "loop"})
+DEFAULT_HANDLES = frozenset({"", "source"})
+# 流式连线: 源节点开始产出结果时 (而不是结束后) 下游即可执行, 见 app.engine.thread_scheduler
+STREAM_HANDLE = "stream"
+
+
+class GraphError(ValueError):
+    """图结构无效: 重复 / 未知节点、环、无效的连线或配置。"""
+
+
+@dataclass
+class Edge:
+    source: str
+    target: str
+    source_handle: Optional[str] = None
+
+
+@dataclass
+class Node:
+    id: str
+    type: str
+    config: Dict[str, Any] = field(default_factory=dict)
+    body: Optional["Graph"] = None
+    concurrency_key: Optional[str] = None
+    timeout_seconds: Optional[float] = None
+    continue_on_error: bool = False  # 失败时不中止运行, 下游按未选中分支处理 (跳过)
+
+
+@dataclass
+class Graph:
+    nodes: Dict[str, Node]  # 保持定义顺序, 同时就绪的节点按此顺序启动
+    edges: List[Edge]
+    concurrency: Dict[str, int] = field(default_factory=dict)
+    incoming: Dict[str, List[Edge]] = field(init=False, repr=False)
+    outgoing: Dict[str, List[Edge]] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.incoming = {node_id: [] for node_id in self.nodes}
+        self.outgoing = {node_id: [] for node_id in self.nodes}
+        for edge in self.edges:
+            self.incoming[edge.target].append(edge)
+            self.outgoing[edge.source].append(edge)
+
+    def roots(self) -> List[str]:
+        return [node_id for node_id in self.nodes if not self.incoming[node_id]]
+
+    def sinks(self) -> List[str]:
+        return [node_id for node_id in self.nodes if not self.outgoing[node_id]]
+
+    def levels(self) -> List[List[str]]:
+        """
+        按依赖深度分层 (Kahn): 同一层的节点互不依赖, 可以并行执行。有环时抛出 GraphError。
+        """
+        pending = {node_id: len({e.source for e in edges}) for node_id, edges in self.incoming.items()}
+        level = [node_id for node_id, count in pending.items() if count == 0]
+        levels = []
+        seen = 0
+        while level:
+            levels.append(level)
+            seen += len(level)
+            following = []
+            for node_id in level:
+                for target in dict.fromkeys(e.target for e in self.outgoing[node_id]):
+                    pending[target] -= 1
+                    if pending[target] == 0:
+                        following.append(target)
+            following = set(following)
+            level = [node_id for node_id in self.nodes if node_id in following]
+        if seen != len(self.nodes):
+            blocked = [node_id for node_id in self.nodes if pending[node_id] > 0]
+            raise GraphError(f"Graph contains a cycle; nodes on or after it: {', '.join(blocked[:10])}")
+        return levels
+
+    def topological_order(self) -> List[str]:
+        return [node_id for level in self.levels() for node_id in level]
+
+    def ancestors(self, node_id: str) -> set:
+        found = set()
+        stack = [e.source for e in self.incoming[node_id]]
+        while stack:
+            current = stack.pop()
+            if current not in found:
+                found.add(current)
+                stack.extend(e.source for e in self.incoming[current])
+        return found
+
+
+def _positive_int(value: Any, what: str) -> int:
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise GraphError(f"{what} must be a positive integer")
+    return value
+
+
+def _parse_node(data: Any, concurrency_keys: Collection[str], path: str) -> Node:
+    if not isinstance(data, dict):
+        raise GraphError(f"{path.rstrip('.') or 'graph'}: node must be an object")
+    node_id = data.get("id")
+    if not isinstance(node_id, str) or not NODE_ID_PATTERN.match(node_id):
+        raise GraphError(f"{path.rstrip('.') or 'graph'}: invalid node id {node_id!r}")
+    if node_id in RESERVED_IDS:
+        raise GraphError(f"{path}{node_id}: node id is reserved")
+    node_type = data.get("type")
+    if not isinstance(node_type, str) or not node_type:
+        raise GraphError(f"{path}{node_id}: missing node type")
+    config = data.get("config") or {}
+    if not isinstance(config, dict):
+        raise GraphError(f"{path}{node_id}: config must be an object")
+
+    key = data.get("concurrency_key")
+    if key is not None and key not in concurrency_keys:
+        raise GraphError(f"{path}{node_id}: unknown concurrency key '{key}'")
+    timeout = data.get("timeout_seconds")
+    if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0):
+        raise GraphError(f"{path}{node_id}: timeout_seconds must be positive")
+
+    body = None
+    if data.get("body") is not None:
+        body = _parse(data["body"], concurrency_keys, f"{path}{node_id}.")
+    return Node(
+        id=node_id,
+        type=node_type,
+        config=config,
+        body=body,
+        concurrency_key=key,
+        timeout_seconds=timeout,
+        continue_on_error=bool(data.get("continue_on_error", False)),
+    )
+
+
+def _parse(data: Any, concurrency_keys: Collection[str], path: str = "") -> Graph:
+    if not isinstance(data, dict):
+        raise GraphError(f"{path or 'graph'}: must be an object with nodes and edges")
+    raw_nodes = data.get("nodes") or []
+    raw_edges = data.get("edges") or []
+    if not isinstance(raw_nodes, list) or not isinstance(raw_edges, list):
+        raise GraphError(f"{path or 'graph'}: nodes and edges must be lists")
+    if not raw_nodes:
+        raise GraphError(f"{path or 'graph'}: no nodes")
+
+    nodes: Dict[str, Node] = {}
+    for raw in raw_nodes:
+        node = _parse_node(raw, concurrency_keys, path)
+        if node.id in nodes:
+            raise GraphError(f"{path}{node.id}: duplicate node id")
+        nodes[node.id] = node
+
+    edges = []
+    seen = set()
+    for raw in raw_edges:
+        if not isinstance(raw, dict):
+            raise GraphError(f"{path or 'graph'}: edge must be an object")
+        source, target = raw.get("source"), raw.get("target")
+        handle = raw.get("source_handle", raw.get("sourceHandle"))
+        for end in (source, target):
+            if end not in nodes:
+                raise GraphError(f"{path}edge {source} -> {target}: unknown node {end!r}")
+        if source == target:
+            raise GraphError(f"{path}edge {source} -> {target}: self loop")
+        handle = None if handle is None or handle in DEFAULT_HANDLES else str(handle)
+        if (source, target, handle) in seen:
+            raise GraphError(f"{path}edge {source} -> {target}: duplicate edge")
+        seen.add((source, target, handle))
+        edges.append(Edge(source, target, handle))
+
+    graph = Graph(nodes=nodes, edges=edges)
+    graph.levels()  # 环检测
+    return graph
+
+
+def parse_graph(data: Any) -> Graph:
+    """解析并校验图结构 (不检查节点类型, 见 app.engine.nodes.load_graph)。"""
+    if not isinstance(data, dict):
+        raise GraphError("graph: must be an object with nodes and edges")
+    concurrency = data.get("concurrency") or {}
+    if not isinstance(concurrency, dict):
+        raise GraphError("concurrency must be an object of key -> limit")
+    limits = {str(key): _positive_int(value, f"concurrency['{key}']") for key, value in concurrency.items()}
+    graph = _parse(data, limits)
+    graph.concurrency = limits
+    return graph
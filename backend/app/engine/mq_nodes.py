@@ -0,0 +1,78 @@
+"""
+消息总线节点 (app.core.message_bus):
+    producer  把 config.messages (列表, 一次批量发布) 或 config.message 发布到已注册的 config.topic
+    consumer  以消费组 config.group 从 config.topic 读取最多 config.count 条消息, 没有消息时最多等待 block_ms;
+              消费组不存在时创建 (config.start: "$" 只消费之后的消息, "0" 从头消费);
+              ack 为 true (默认) 时读取后立即确认, 为 false 时消息留在待确认列表中, 由其它进程 ack 或 claim
+Topic 以字面名称配置 (不支持变量引用), 画布据此绘制生产者与消费者之间的幽灵连线。
+"""
+from typing import Any, Dict
+
+from app.core.message_bus import TOPIC_NAME_PATTERN, message_bus
+from app.engine.graph import Node
+from app.engine.nodes import NodeResult, node_type
+
+
+def _check_topic(node: Node):
+    topic = node.config.get("topic")
+    if not isinstance(topic, str) or not TOPIC_NAME_PATTERN.match(topic):
+        raise ValueError("config.topic must be a topic name")
+
+
+def _validate_producer(node: Node):
+    _check_topic(node)
+    if ("messages" in node.config) == ("message" in node.config):
+        raise ValueError("producer requires exactly one of config.messages / config.message")
+
+
+def _validate_consumer(node: Node):
+    _check_topic(node)
+    group = node.config.get("group")
+    if not isinstance(group, str) or not group:
+        raise ValueError("config.group is required")
+    for key, minimum in (("count", 1), ("block_ms", 0)):
+        value = node.config.get(key, minimum)
+        if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+            raise ValueError(f"config.{key} must be an integer >= {minimum}")
+    if not isinstance(node.config.get("ack", True), bool):
+        raise ValueError("config.ack must be a boolean")
+
+
+@node_type("producer", validate=_validate_producer)
+async def producer_node(ctx, config: Dict[str, Any]) -> NodeResult:
+    """批量发布消息到 Topic"""
+    from app.db.topics import topic_max_length
+
+    messages = config["messages"] if "messages" in config else [config["message"]]
+    if not isinstance(messages, list):
+        raise ValueError(f"producer messages must be a list, got {type(messages).__name__}")
+    max_length = await topic_max_length(config["topic"])
+    ids = await message_bus.publish(config["topic"], messages, max_length=max_length) if messages else []
+    return NodeResult(
+        {"topic": config["topic"], "ids": ids, "count": len(ids)},
+        detail={"published": len(ids)},
+    )
+
+
+@node_type("consumer", validate=_validate_consumer)
+async def consumer_node(ctx, config: Dict[str, Any]) -> NodeResult:
+    """以消费组批量读取 Topic 的消息"""
+    from app.db.topics import topic_max_length
+
+    topic, group = config["topic"], config["group"]
+    await topic_max_length(topic)  # 确认 Topic 已注册
+    consumer = str(config.get("consumer") or (f"run-{ctx.run_id}" if ctx.run_id is not None else ctx.node.id))
+    await message_bus.create_group(topic, group, config.get("start", "$"))
+    messages = await message_bus.consume(
+        topic, group, consumer, count=config.get("count", 100), block_ms=config.get("block_ms", 0)
+    )
+    if messages and config.get("ack", True):
+        await message_bus.ack(topic, group, [m.id for m in messages])
+    return NodeResult(
+        {
+            "messages": [{"id": m.id, "data": m.data} for m in messages],
+            "count": len(messages),
+            "last_id": messages[-1].id if messages else None,
+        },
+        detail={"consumed": len(messages)},
+    )
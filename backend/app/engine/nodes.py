@@ -0,0 +1,346 @@
+"""
+节点类型注册与内置节点。
+
+节点函数通过 @node_type(name) 注册, 签名为 async fn(ctx: NodeContext, config: dict) -> Any | NodeResult:
+    - config 为已替换变量引用的节点配置 (raw_keys 中的键除外, 由节点自己在合适的作用域中解析)
+    - 返回值作为节点输出, 下游通过 {{node_id...}} 引用; 返回 NodeResult 可以同时指定选中的分支与运行记录的明细
+
+内置节点:
+    start     输出运行输入 (inputs)
+    end       输出 config.outputs (未配置时为各上游节点的输出), 作为 (子) 图的输出
+    function  调用 config.callable ("package.module:function"), 关键字参数为 config.args; 同步函数在线程池中执行
+    if_else   config.conditions / logic, 分支 true | false
+    switch    按 config.value 匹配 config.cases ({分支名: 值或值列表}), 均不匹配时为 default 分支
+    loop      对 config.items 逐项 (max_parallel 并行) 或重复 max_iterations 次执行循环体,
+              break_when 条件成立时提前结束; 输出为各轮循环体输出的列表。
+              items 可以是流式上游 (经 "stream" 连线连接的 thread 节点), 结果到达即开始对应的一轮
+"""
+import asyncio
+import contextvars
+import importlib
+import inspect
+import re
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Collection, Dict, FrozenSet, List, Optional, Tuple
+
+from app.core.config import settings
+from app.engine.expressions import (
+    ExpressionError,
+    evaluate_conditions,
+    references,
+    validate_conditions,
+)
+from app.engine.graph import RESERVED_IDS, STREAM_HANDLE, Graph, GraphError, Node, parse_graph
+
+CALLABLE_PATTERN = re.compile(r"^[A-Za-z_][\w.]*:[A-Za-z_][\w.]*$")
+# function 节点执行同步函数的线程池, 为空时使用事件循环的默认线程池 (thread 节点在其子图中设置为 IO 线程池)
+sync_executor: contextvars.ContextVar[Optional[Executor]] = contextvars.ContextVar("sync_executor", default=None)
+
+
+@dataclass
+class NodeResult:
+    output: Any = None
+    handles: Optional[Collection[str]] = None  # 选中的出边分支, None 表示全部出边
+    detail: Dict[str, Any] = field(default_factory=dict)  # 写入节点运行记录, e.g. 选中的分支 / 循环次数
+
+
+NodeFunction = Callable[[Any, Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class NodeSpec:
+    fn: NodeFunction
+    container: bool = False  # 容器节点 (循环等) 自身不占用并发名额, 由其中执行的节点占用
+    requires_body: bool = False
+    raw_keys: Tuple[str, ...] = ()  # 执行前不解析变量引用的配置项
+    validate: Optional[Callable[[Node], None]] = None  # 保存时校验配置, 抛出 ValueError
+    handles: Optional[Callable[[Node], FrozenSet[str]]] = None  # 控制节点的分支名, 用于校验出边
+    streams: bool = False  # 运行期间通过 ctx.publish 发布流式输出, 可以有流式出边
+
+
+_node_types: Dict[str, NodeSpec] = {}
+
+
+def node_type(
+    name: str,
+    *,
+    container: bool = False,
+    requires_body: bool = False,
+    raw_keys: Tuple[str, ...] = (),
+    validate: Optional[Callable[[Node], None]] = None,
+    handles: Optional[Callable[[Node], FrozenSet[str]]] = None,
+    streams: bool = False,
+):
+    def decorator(fn: NodeFunction) -> NodeFunction:
+        _node_types[name] = NodeSpec(fn, container, requires_body, raw_keys, validate, handles, streams)
+        return fn
+    return decorator
+
+
+def get_node_spec(name: str) -> NodeSpec:
+    spec = _node_types.get(name)
+    if spec is None:
+        raise GraphError(f"Unknown node type '{name}'")
+    return spec
+
+
+def node_types() -> Dict[str, NodeSpec]:
+    return dict(_node_types)
+
+
+def _check_graph(graph: Graph, outer_ids: FrozenSet[str], outer_upstream: FrozenSet[str], path: str = ""):
+    clash = set(graph.nodes) & outer_ids
+    if clash:
+        raise GraphError(f"{path}: node ids shadow enclosing nodes: {', '.join(sorted(clash))}")
+    for node_id, node in graph.nodes.items():
+        where = f"{path}{node_id}"
+        spec = get_node_spec(node.type)
+        if spec.requires_body and node.body is None:
+            raise GraphError(f"{where}: node type '{node.type}' requires a body")
+        if node.body is not None and not spec.requires_body:
+            raise GraphError(f"{where}: node type '{node.type}' does not take a body")
+        if spec.validate is not None:
+            try:
+                spec.validate(node)
+            except GraphError:
+                raise
+            except (ValueError, TypeError) as e:
+                raise GraphError(f"{where}: {e}") from None
+
+        # 只能引用上游节点 (执行时已有输出) 与保留变量
+        upstream = frozenset(graph.ancestors(node_id)) | outer_upstream
+        unknown = references(node.config) - upstream - RESERVED_IDS
+        if unknown:
+            raise GraphError(f"{where}: references {', '.join(sorted(unknown))} which are not upstream nodes")
+
+        for edge in graph.outgoing[node_id]:
+            if edge.source_handle == STREAM_HANDLE and not spec.streams:
+                raise GraphError(f"{where}: node type '{node.type}' has no stream output")
+        if spec.handles is not None:
+            valid = spec.handles(node)
+            for edge in graph.outgoing[node_id]:
+                if edge.source_handle not in (None, STREAM_HANDLE) and edge.source_handle not in valid:
+                    raise GraphError(
+                        f"{where}: unknown branch '{edge.source_handle}', expected one of: {', '.join(sorted(valid))}"
+                    )
+        if node.body is not None:
+            _check_graph(node.body, outer_ids | frozenset(graph.nodes), upstream, f"{where}.")
+
+
+def load_graph(data: Any) -> Graph:
+    """解析并完整校验工作流图: 结构、节点类型与配置、变量引用、分支名。"""
+    graph = parse_graph(data)
+    _check_graph(graph, frozenset(), frozenset())
+    return graph
+
+
+# ---- 内置节点 ----
+
+
+@node_type("start")
+async def start_node(ctx, config: Dict[str, Any]) -> Any:
+    return ctx.scope.get("inputs", {})
+
+
+@node_type("end")
+async def end_node(ctx, config: Dict[str, Any]) -> Any:
+    if "outputs" in config:
+        return config["outputs"]
+    return dict(ctx.inputs)
+
+
+def callable_allowed(module: str) -> bool:
+    """工作流接口没有鉴权, 只允许调用 WORKFLOW_CALLABLE_MODULES 中的模块; 未配置时不允许调用任何模块。"""
+    prefixes = [p.strip() for p in settings.WORKFLOW_CALLABLE_MODULES.split(",") if p.strip()]
+    return any(module == p or module.startswith(p + ".") for p in prefixes)
+
+
+def _private_attribute(attr: str) -> bool:
+    # 禁止 _ 开头的属性 (含 __class__ / __globals__ 等), 避免从允许的模块经属性链访问到任意对象
+    return any(part.startswith("_") for part in attr.split("."))
+
+
+@lru_cache(maxsize=256)
+def import_callable(path: str) -> Callable:
+    module_name, _, attr = path.partition(":")
+    if not callable_allowed(module_name):
+        raise PermissionError(f"Module '{module_name}' is not allowed by WORKFLOW_CALLABLE_MODULES")
+    if _private_attribute(attr):
+        raise PermissionError(f"'{path}' refers to a private attribute")
+    target: Any = importlib.import_module(module_name)
+    for part in attr.split("."):
+        target = getattr(target, part)
+    if not callable(target):
+        raise TypeError(f"'{path}' is not callable")
+    return target
+
+
+def _validate_function(node: Node):
+    path = node.config.get("callable")
+    if not isinstance(path, str) or not CALLABLE_PATTERN.match(path):
+        raise ValueError("config.callable must be 'package.module:function'")
+    if not callable_allowed(path.partition(":")[0]):
+        raise ValueError(f"Module of '{path}' is not allowed by WORKFLOW_CALLABLE_MODULES")
+    if _private_attribute(path.partition(":")[2]):
+        raise ValueError(f"'{path}' refers to a private attribute")
+    if not isinstance(node.config.get("args", {}), dict):
+        raise ValueError("config.args must be an object of keyword arguments")
+
+
+@node_type("function", validate=_validate_function)
+async def function_node(ctx, config: Dict[str, Any]) -> Any:
+    fn = import_callable(config["callable"])
+    args = config.get("args") or {}
+    if inspect.iscoroutinefunction(fn):
+        return await fn(**args)
+    executor = sync_executor.get()
+    if executor is None:
+        result = await asyncio.to_thread(fn, **args)
+    else:
+        call = partial(contextvars.copy_context().run, fn, **args)
+        result = await asyncio.get_running_loop().run_in_executor(executor, call)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+def _validate_if_else(node: Node):
+    validate_conditions(node.config.get("conditions"), node.config.get("logic", "and"))
+
+
+@node_type("if_else", validate=_validate_if_else, handles=lambda node: frozenset({"true", "false"}))
+async def if_else_node(ctx, config: Dict[str, Any]) -> NodeResult:
+    matched = evaluate_conditions(config["conditions"], config.get("logic", "and"))
+    branch = "true" if matched else "false"
+    return NodeResult(matched, handles={branch}, detail={"branch": branch})
+
+
+def _validate_switch(node: Node):
+    if "value" not in node.config:
+        raise ValueError("config.value is required")
+    cases = node.config.get("cases")
+    if not isinstance(cases, dict) or not cases:
+        raise ValueError("config.cases must be a non-empty object of branch -> value(s)")
+    if "default" in cases:
+        raise ValueError("'default' is reserved for the unmatched branch")
+
+
+def _switch_handles(node: Node) -> FrozenSet[str]:
+    return frozenset(node.config.get("cases") or {}) | {"default"}
+
+
+@node_type("switch", validate=_validate_switch, handles=_switch_handles)
+async def switch_node(ctx, config: Dict[str, Any]) -> NodeResult:
+    value = config["value"]
+    branch = "default"
+    for name, match in config["cases"].items():
+        if value == match or (isinstance(match, list) and value in match):
+            branch = name
+            break
+    return NodeResult(value, handles={branch}, detail={"branch": branch})
+
+
+def _validate_loop(node: Node):
+    config = node.config
+    if ("items" in config) == ("max_iterations" in config):
+        raise ValueError("loop requires exactly one of config.items / config.max_iterations")
+    for key in ("max_iterations", "max_parallel"):
+        value = config.get(key, 1)
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            raise ValueError(f"config.{key} must be a positive integer")
+    if "break_when" in config:
+        validate_conditions(config["break_when"], config.get("break_logic", "and"))
+        if config.get("max_parallel", 1) > 1:
+            raise ValueError("break_when requires sequential iterations (max_parallel = 1)")
+    if "max_parallel" in config and "items" not in config:
+        raise ValueError("max_parallel only applies to loops over config.items")
+
+
+async def _enumerate(items: Any) -> AsyncIterator[Tuple[int, Any]]:
+    """列表或流式上游 (async iterable, e.g. thread 节点的 ResultStream) 的逐项枚举。"""
+    index = 0
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield index, item
+            index += 1
+    else:
+        for item in items:
+            yield index, item
+            index += 1
+
+
+async def _map_parallel(ctx, items: Any, parallel: int) -> list:
+    semaphore = asyncio.Semaphore(parallel)
+    tasks: List[asyncio.Task] = []
+    failure: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    async def iteration(index: int, item: Any) -> Any:
+        try:
+            variables = {"loop": {"index": index, "item": item, "output": None}}
+            return await ctx.run_subgraph(ctx.node.body, variables, f"{ctx.node.id}[{index}]")
+        except Exception as e:
+            if not failure.done():
+                failure.set_exception(e)
+            raise
+        finally:
+            semaphore.release()
+
+    async def feed():
+        # 流式上游的项到达即开始对应的一轮
+        async for index, item in _enumerate(items):
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(iteration(index, item)))
+
+    feeder = asyncio.create_task(feed())
+    try:
+        await asyncio.wait([feeder, failure], return_when=asyncio.FIRST_COMPLETED)
+        if failure.done():
+            failure.result()
+        feeder.result()
+        if tasks:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        if failure.done():
+            failure.result()
+        return [task.result() for task in tasks]
+    finally:
+        feeder.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(feeder, *tasks, return_exceptions=True)
+        if failure.done():
+            failure.exception()  # 已处理, 避免 "exception was never retrieved"
+
+
+@node_type("loop", container=True, requires_body=True, raw_keys=("break_when",), validate=_validate_loop)
+async def loop_node(ctx, config: Dict[str, Any]) -> NodeResult:
+    if "items" in config:
+        items = config["items"]
+        if not hasattr(items, "__aiter__"):
+            if isinstance(items, (str, bytes, dict)) or not hasattr(items, "__iter__"):
+                raise ExpressionError(f"loop items must be a list, got {type(items).__name__}")
+            items = list(items)
+        parallel = config.get("max_parallel", 1)
+        if parallel > 1:
+            outputs = await _map_parallel(ctx, items, parallel)
+            return NodeResult(outputs, detail={"iterations": len(outputs)})
+        iterations = _enumerate(items)
+    else:
+        iterations = _enumerate(range(config["max_iterations"]))
+
+    break_when = config.get("break_when")
+    outputs = []
+    previous = None
+    stopped = False
+    async for index, item in iterations:
+        variables = {"loop": {"index": index, "item": item, "output": previous}}
+        previous = await ctx.run_subgraph(ctx.node.body, variables, f"{ctx.node.id}[{index}]")
+        outputs.append(previous)
+        if break_when:
+            # break_when 中的 {{loop.output}} 为本轮的输出
+            conditions = ctx.resolve(break_when, {"loop": {"index": index, "item": item, "output": previous}})
+            if evaluate_conditions(conditions, config.get("break_logic", "and")):
+                stopped = True
+                break
+    return NodeResult(outputs, detail={"iterations": len(outputs), "stopped": stopped})
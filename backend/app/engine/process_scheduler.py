@@ -0,0 +1,290 @@
+"""
+进程调度器 (Process Scheduler): process 容器节点在常驻的进程池中执行其子图 (body)。
+
+计算密集型的子图 (e.g. 对数千个标的计算因子) 在事件循环所在的进程中执行会被 GIL 限制为单核,
+process 节点把子图交给工作进程执行, 获得真正的并行:
+    - 进程池常驻 (spawn 启动, 首次使用时创建), 每个工作进程保留一个事件循环, 避免每次任务的启动开销
+    - config.items 给出时按项 (或每 chunk_size 项一组) 拆分为多个任务并行执行, 输出为各任务输出的列表;
+      子图中以 {{loop.index}} / {{loop.item}} 引用任务序号与该任务的项 (chunk_size 时为项的列表)
+    - 未给出 items 时子图在一个工作进程中执行一次, 输出为子图的输出
+    - 子图引用的上游输出 / inputs 中的大数组与 Arrow 表经共享内存传递 (见 app.engine.shared_data),
+      父进程只写入一次, 所有任务零拷贝读取; 工作进程的输出同样经共享内存返回
+    - 子图中节点的运行记录在任务结束后转发给父运行 (scope 为 "process_node[i]/...")
+
+限制: 并发名额 (max_concurrency / concurrency_key) 在每个任务的工作进程内单独计算;
+运行中的任务无法中断, 节点超时或运行中止时只是不再等待其结果 (结果的共享内存段随即删除)。
+"""
+import asyncio
+import atexit
+import importlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.engine.expressions import ExpressionError, references
+from app.engine.graph import Graph, Node
+from app.engine.nodes import NodeResult, get_node_spec, node_type
+from app.engine.shared_data import SharedSegments, discard, iter_refs, pack, unpack
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def process_workers() -> int:
+    return settings.WORKFLOW_PROCESS_WORKERS or os.cpu_count() or 1
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=process_workers(),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def _reset_pool(pool: ProcessPoolExecutor):
+    """工作进程异常退出后进程池不可再用, 下次使用时重建。"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_process_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+atexit.register(shutdown_process_pool)
+
+
+# ---- 工作进程 ----
+
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+# 仍有零拷贝视图存活 (e.g. 被节点函数缓存) 而未能关闭的输入段, 之后的任务结束时重试
+_stale_segments: List[SharedSegments] = []
+
+
+def _init_worker():
+    global _worker_loop
+    _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+
+
+def _body_modules(graph: Graph) -> Set[str]:
+    """注册子图中各节点类型的模块, 工作进程中导入后节点类型可用。"""
+    modules = set()
+    for node in graph.nodes.values():
+        modules.add(get_node_spec(node.type).fn.__module__)
+        if node.body is not None:
+            modules |= _body_modules(node.body)
+    return modules
+
+
+def _run_task(task: Dict[str, Any]) -> Tuple[Any, Optional[Tuple[str, Optional[str], str]], list, int, float]:
+    """
+    在工作进程中执行一次子图。
+    返回 (打包的输出, 失败信息 (node_id, scope, error), 节点记录, pid, 耗时);
+    输出的共享内存段由父进程读取后删除。
+    """
+    from app.engine.runner import GraphRunner, NodeFailed
+
+    started = time.perf_counter()
+    for module in task["modules"]:
+        importlib.import_module(module)
+    global _stale_segments
+    _stale_segments = [segments for segments in _stale_segments if not segments.close()]
+
+    records: list = []
+    inputs = SharedSegments()
+    outputs = SharedSegments()
+    try:
+        scope = unpack(task["scope"], inputs)
+        runner = GraphRunner(
+            task["body"],
+            max_concurrency=task["max_concurrency"],
+            concurrency=task["concurrency"],
+            on_record=records.append,
+            run_id=task["run_id"],
+        )
+        error = None
+        try:
+            output = _worker_loop.run_until_complete(
+                runner.execute(task["body"], {**scope, **task["variables"]}, task["scope_name"])
+            )
+        except NodeFailed as e:
+            output, error = None, (e.node_id, e.scope, e.error)
+        del scope, runner
+        try:
+            packed = pack(output, outputs, task["min_bytes"])
+        except BaseException:
+            outputs.unlink()
+            raise
+        del output
+    finally:
+        outputs.close()
+        if not inputs.close():
+            _stale_segments.append(inputs)
+    return packed, error, records, os.getpid(), time.perf_counter() - started
+
+
+# ---- process 节点 ----
+
+
+def _body_ids(graph: Graph) -> Set[str]:
+    ids = set(graph.nodes)
+    for node in graph.nodes.values():
+        if node.body is not None:
+            ids |= _body_ids(node.body)
+    return ids
+
+
+def _body_references(graph: Graph) -> Set[str]:
+    """子图 (含嵌套子图) 引用的外部变量, 只把这些变量发送给工作进程。"""
+    refs: Set[str] = set()
+    for node in graph.nodes.values():
+        refs |= references(node.config)
+        if node.body is not None:
+            refs |= _body_references(node.body)
+    return refs - _body_ids(graph) - {"loop"}
+
+
+def _validate_process(node: Node):
+    config = node.config
+    for key in ("chunk_size", "max_parallel"):
+        value = config.get(key, 1)
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            raise ValueError(f"config.{key} must be a positive integer")
+    if "chunk_size" in config and "items" not in config:
+        raise ValueError("chunk_size only applies to config.items")
+
+
+def _discard_result(future: Future):
+    """父节点已不再等待 (取消 / 超时) 的任务: 结果的共享内存段无人读取, 直接删除。"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    discard(future.result()[0])
+
+
+def _read_result(packed: Any) -> Any:
+    """把工作进程的输出拷贝到本进程并删除其共享内存段 (在线程中执行, 取消时同样完成清理)。"""
+    segments = SharedSegments()
+    try:
+        return unpack(packed, segments, copy=True)
+    except BaseException:
+        discard(packed)
+        raise
+    finally:
+        segments.unlink()
+        segments.close()
+
+
+@node_type("process", container=True, requires_body=True, validate=_validate_process)
+async def process_node(ctx, config: Dict[str, Any]) -> NodeResult:
+    """在工作进程中执行子图 (计算密集型), 大数组经共享内存传递"""
+    from app.engine.runner import NodeFailed
+
+    body = ctx.node.body
+    if "items" in config:
+        items = config["items"]
+        if isinstance(items, (str, bytes, dict)) or not hasattr(items, "__iter__"):
+            raise ExpressionError(f"process items must be a list, got {type(items).__name__}")
+        items = list(items)
+        size = config.get("chunk_size")
+        chunks = [items[i:i + size] for i in range(0, len(items), size)] if size else items
+    else:
+        chunks = [None]
+
+    pool = get_process_pool()
+    parallel = config.get("max_parallel") or process_workers()
+    min_bytes = settings.WORKFLOW_SHARED_MEMORY_MIN_BYTES
+    runner = ctx.runner
+    base = {
+        "body": body,
+        "modules": sorted(_body_modules(body)),
+        "max_concurrency": runner.max_concurrency,
+        "concurrency": runner.concurrency,
+        "run_id": ctx.run_id,
+        "min_bytes": min_bytes,
+    }
+    shared = SharedSegments()
+    packing: Optional[asyncio.Future] = None
+    futures: List[asyncio.Future] = []
+    try:
+        # 上游输出只打包一次, 所有任务共享同一组段
+        visible = {name: ctx.scope[name] for name in _body_references(body) if name in ctx.scope}
+        packing = asyncio.ensure_future(asyncio.to_thread(pack, visible, shared, min_bytes))
+        scope = await asyncio.shield(packing)
+        semaphore = asyncio.Semaphore(parallel)
+        workers: Set[int] = set()
+        returned = 0
+
+        async def run_chunk(index: int, item: Any) -> Any:
+            nonlocal returned
+            label = f"{ctx.node.id}[{index}]"
+            task = {
+                **base,
+                "scope": scope,
+                "variables": {"loop": {"index": index, "item": item, "output": None}},
+                "scope_name": f"{ctx.scope_name}/{label}" if ctx.scope_name else label,
+            }
+            async with semaphore:
+                future = pool.submit(_run_task, task)
+                try:
+                    packed, error, records, pid, _ = await asyncio.wrap_future(future)
+                except asyncio.CancelledError:
+                    # 已开始执行的任务无法取消, 结果就绪后删除
+                    future.add_done_callback(_discard_result)
+                    raise
+            output = await asyncio.shield(asyncio.to_thread(_read_result, packed))
+            workers.add(pid)
+            returned += sum(ref.nbytes for ref in iter_refs(packed))
+            for record in records:
+                await ctx.report(record)
+            if error is not None:
+                raise NodeFailed(*error)
+            return output
+
+        futures = [asyncio.ensure_future(run_chunk(i, item)) for i, item in enumerate(chunks)]
+        try:
+            await asyncio.wait(futures, return_when=asyncio.FIRST_EXCEPTION)
+            for future in futures:
+                if future.done() and not future.cancelled() and future.exception() is not None:
+                    raise future.exception()
+            outputs = [future.result() for future in futures]
+        except BrokenProcessPool:
+            _reset_pool(pool)
+            raise
+    finally:
+        for future in futures:
+            future.cancel()
+        if futures:
+            await asyncio.gather(*futures, return_exceptions=True)
+        if packing is not None:
+            await asyncio.gather(packing, return_exceptions=True)
+        shared.unlink()
+        shared.close()
+
+    detail = {
+        "tasks": len(chunks),
+        "workers": len(workers),
+        "shared_bytes": shared.nbytes,
+        "returned_bytes": returned,
+    }
+    return NodeResult(outputs if "items" in config else outputs[0], detail=detail)
@@ -0,0 +1,360 @@
+"""
+异步图执行器 (Async Graph Runner)。
+
+按依赖调度: 节点的所有上游都结束后就绪, 就绪的节点立即在事件循环中启动, 互不依赖的分支
+(e.g. 数十个供应商数据拉取) 并发执行, 而不是按拓扑顺序逐个执行。
+并发受两级限制, 均在整个运行 (包括循环体内的节点) 中共享:
+    - max_concurrency: 同时执行的节点总数
+    - graph.concurrency[key]: 同一 concurrency_key 的节点同时执行的数量 (e.g. 同一数据供应商)
+循环等容器节点自身不占用名额, 避免容器与其中的节点互相等待。
+
+分支: 控制节点 (if_else / switch) 返回选中的分支, 只有来自选中分支的连线 (或无条件连线) 是激活的;
+节点至少有一条激活的入边时执行, 否则跳过, 跳过沿下游传播。汇合节点在所有上游结束后执行一次。
+流式连线 (source_handle "stream"): 上游节点通过 ctx.publish 发布流式输出 (e.g. thread 节点的 ResultStream) 时
+下游即可执行, 引用上游得到的是该流, 在上游运行期间逐个读取结果; 其它下游仍在上游结束后执行并得到最终输出。
+失败: 节点抛出异常或超时, 取消 (子) 图中正在执行的节点并结束运行; continue_on_error 的节点失败后按跳过处理。
+
+每个节点结束 (成功 / 失败 / 跳过 / 取消) 时通过 on_record 报告一条 NodeRecord, 包含排队与执行耗时。
+"""
+import asyncio
+import enum
+import inspect
+import logging
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from app.engine.expressions import resolve
+from app.engine.graph import STREAM_HANDLE, Edge, Graph, Node
+from app.engine.nodes import NodeResult, get_node_spec
+
+logger = logging.getLogger(__name__)
+
+
+class NodeStatus(str, enum.Enum):
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+    CANCELLED = "cancelled"
+
+
+@dataclass
+class NodeRecord:
+    node_id: str
+    node_type: str
+    scope: Optional[str]  # 循环体内的节点所在的循环与轮次, e.g. "each_symbol[3]"; 顶层为 None
+    status: NodeStatus
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    wait_seconds: Optional[float] = None  # 就绪后等待并发名额的时间
+    elapsed_seconds: Optional[float] = None
+    detail: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+@dataclass
+class RunResult:
+    status: str  # succeeded | failed
+    output: Any
+    elapsed_seconds: float
+    nodes: Dict[str, int]  # 各状态的节点数
+    error: Optional[Dict[str, Any]] = None  # {"node", "scope", "error"}
+
+
+class NodeFailed(Exception):
+    """节点失败, 所在的 (子) 图中止。"""
+
+    def __init__(self, node_id: str, scope: Optional[str], error: str):
+        self.node_id = node_id
+        self.scope = scope
+        self.error = error
+        super().__init__(f"Node '{scope + '/' if scope else ''}{node_id}' failed: {error}")
+
+
+RecordCallback = Callable[[NodeRecord], Optional[Awaitable[None]]]
+
+
+class Limits:
+    """整个运行共享的并发名额: 全局上限 + 按 concurrency_key 的上限。"""
+
+    def __init__(self, max_concurrency: Optional[int], per_key: Dict[str, int]):
+        self._global = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self._keys = {key: asyncio.Semaphore(limit) for key, limit in per_key.items()}
+
+    @asynccontextmanager
+    async def slot(self, node: Node, container: bool):
+        if container:
+            yield
+            return
+        # 先取 key 的名额再取全局名额, 等待某个供应商时不占用全局名额
+        semaphores = [self._keys[node.concurrency_key]] if node.concurrency_key else []
+        if self._global is not None:
+            semaphores.append(self._global)
+        acquired = []
+        try:
+            for semaphore in semaphores:
+                await semaphore.acquire()
+                acquired.append(semaphore)
+            yield
+        finally:
+            for semaphore in reversed(acquired):
+                semaphore.release()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class NodeContext:
+    """传给节点函数: 当前节点、可见的变量 (上游输出 / inputs / loop)、激活入边的上游输出与子图执行。"""
+
+    def __init__(
+        self,
+        runner: "GraphRunner",
+        node: Node,
+        scope: Dict[str, Any],
+        inputs: Dict[str, Any],
+        scope_name: Optional[str],
+        publish: Optional[Callable[[Any], None]] = None,
+    ):
+        self.runner = runner
+        self.node = node
+        self.scope = scope
+        self.inputs = inputs
+        self.scope_name = scope_name
+        self._publish = publish
+
+    @property
+    def run_id(self) -> Optional[int]:
+        return self.runner.run_id
+
+    def resolve(self, value: Any, variables: Optional[Dict[str, Any]] = None) -> Any:
+        return resolve(value, {**self.scope, **variables} if variables else self.scope)
+
+    async def run_subgraph(self, graph: Graph, variables: Dict[str, Any], label: str) -> Any:
+        """在当前作用域 (加上 variables) 中执行子图并返回其输出; 子图中的节点失败时抛出 NodeFailed。"""
+        scope_name = f"{self.scope_name}/{label}" if self.scope_name else label
+        return await self.runner.execute(graph, {**self.scope, **variables}, scope_name)
+
+    def publish(self, value: Any):
+        """发布流式输出, 经流式连线连接的下游节点随即开始执行 (没有流式连线时不做任何事)。"""
+        if self._publish is not None:
+            self._publish(value)
+
+    async def report(self, record: NodeRecord):
+        """报告在别处执行的节点的记录 (e.g. process 节点的工作进程中执行的子图节点)。"""
+        await self.runner._emit(record)
+
+
+class GraphRunner:
+    def __init__(
+        self,
+        graph: Graph,
+        *,
+        max_concurrency: Optional[int] = None,
+        on_record: Optional[RecordCallback] = None,
+        run_id: Optional[int] = None,
+        concurrency: Optional[Dict[str, int]] = None,
+    ):
+        """concurrency: 按 concurrency_key 的上限, 默认为 graph.concurrency (在工作进程中执行子图时传入所在图的配置)"""
+        self.graph = graph
+        self.run_id = run_id
+        self.on_record = on_record
+        self.max_concurrency = max_concurrency
+        self.concurrency = graph.concurrency if concurrency is None else concurrency
+        self.limits = Limits(max_concurrency, self.concurrency)
+        self.counts: Counter = Counter()
+
+    async def run(self, inputs: Optional[Dict[str, Any]] = None) -> RunResult:
+        started = time.perf_counter()
+        try:
+            output = await self.execute(self.graph, {"inputs": inputs or {}}, None)
+        except NodeFailed as e:
+            return RunResult(
+                status="failed",
+                output=None,
+                elapsed_seconds=round(time.perf_counter() - started, 3),
+                nodes=dict(self.counts),
+                error={"node": e.node_id, "scope": e.scope, "error": e.error},
+            )
+        return RunResult(
+            status="succeeded",
+            output=output,
+            elapsed_seconds=round(time.perf_counter() - started, 3),
+            nodes=dict(self.counts),
+        )
+
+    async def execute(self, graph: Graph, scope: Dict[str, Any], scope_name: Optional[str]) -> Any:
+        """执行 (子) 图, 返回其输出; 节点失败时取消其余节点并抛出 NodeFailed。"""
+        scope = dict(scope)
+        selected: Dict[str, Optional[frozenset]] = {}  # 已成功的节点选中的分支, None 表示全部出边
+        inactive: Set[str] = set()  # 跳过或失败 (continue_on_error) 的节点, 出边均不激活
+        pending = {node_id: len({e.source for e in edges}) for node_id, edges in graph.incoming.items()}
+        ready = deque(graph.roots())
+        running: Dict[asyncio.Task, str] = {}
+        order = {node_id: i for i, node_id in enumerate(graph.nodes)}
+        streams: Dict[str, Any] = {}  # 已发布流式输出的节点 (运行中)
+        early: Dict[str, Set[str]] = {}  # 经流式连线提前释放的下游
+        published: deque = deque()
+        wakeup = asyncio.Event()
+        has_streams = any(e.source_handle == STREAM_HANDLE for e in graph.edges)
+
+        def publisher(node_id: str) -> Optional[Callable[[Any], None]]:
+            if not any(e.source_handle == STREAM_HANDLE for e in graph.outgoing[node_id]):
+                return None
+
+            def publish(value: Any):
+                published.append((node_id, value))
+                wakeup.set()
+            return publish
+
+        def edge_active(edge: Edge) -> bool:
+            if edge.source in inactive:
+                return False
+            handles = selected[edge.source]
+            return handles is None or edge.source_handle is None or edge.source_handle in handles
+
+        def release(node_id: str, stream: bool = False):
+            if stream:
+                targets = dict.fromkeys(e.target for e in graph.outgoing[node_id] if e.source_handle == STREAM_HANDLE)
+                early[node_id] = set(targets)
+            else:
+                released = early.get(node_id, ())
+                targets = dict.fromkeys(e.target for e in graph.outgoing[node_id] if e.target not in released)
+            for target in targets:
+                pending[target] -= 1
+                if pending[target] == 0:
+                    ready.append(target)
+
+        try:
+            while ready or running:
+                while ready:
+                    node_id = ready.popleft()
+                    node = graph.nodes[node_id]
+                    active = [e for e in graph.incoming[node_id] if edge_active(e)]
+                    if graph.incoming[node_id] and not active:
+                        inactive.add(node_id)
+                        await self._emit(NodeRecord(node_id, node.type, scope_name, NodeStatus.SKIPPED))
+                        release(node_id)
+                        continue
+                    # 经流式连线执行的节点看到的是上游的流, 而不是 (尚未产生的) 最终输出
+                    overrides = {
+                        e.source: streams[e.source] for e in active
+                        if e.source_handle == STREAM_HANDLE and e.source not in scope
+                    }
+                    node_scope = {**scope, **overrides} if overrides else scope
+                    inputs = {e.source: node_scope[e.source] for e in active}
+                    task = asyncio.create_task(
+                        self._run_node(node, node_scope, inputs, scope_name, publisher(node_id) if has_streams else None)
+                    )
+                    running[task] = node_id
+                if not running:
+                    break
+                waiter = asyncio.ensure_future(wakeup.wait()) if has_streams else None
+                try:
+                    done, _ = await asyncio.wait(
+                        [*running, waiter] if waiter else running, return_when=asyncio.FIRST_COMPLETED
+                    )
+                finally:
+                    if waiter is not None:
+                        waiter.cancel()
+                wakeup.clear()
+                while published:
+                    node_id, value = published.popleft()
+                    if node_id in streams:
+                        continue
+                    streams[node_id] = value
+                    selected[node_id] = frozenset({STREAM_HANDLE})
+                    release(node_id, stream=True)
+                for task in sorted(done - {waiter}, key=lambda t: order[running[t]]):
+                    node_id = running.pop(task)
+                    ok, result, error = task.result()
+                    if not ok:
+                        if not graph.nodes[node_id].continue_on_error:
+                            raise NodeFailed(node_id, scope_name, error)
+                        inactive.add(node_id)
+                    else:
+                        scope[node_id] = result.output
+                        selected[node_id] = None if result.handles is None else frozenset(result.handles)
+                    release(node_id)
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+        return self._output(graph, scope)
+
+    @staticmethod
+    def _output(graph: Graph, scope: Dict[str, Any]) -> Any:
+        """(子) 图的输出: 已执行的 end 节点的输出 (多个时合并), 没有 end 节点时为各末端节点的输出。"""
+        ends = [node_id for node_id, node in graph.nodes.items() if node.type == "end" and node_id in scope]
+        if len(ends) == 1:
+            return scope[ends[0]]
+        if ends:
+            merged: Dict[str, Any] = {}
+            for node_id in ends:
+                output = scope[node_id]
+                merged.update(output if isinstance(output, dict) else {node_id: output})
+            return merged
+        return {node_id: scope[node_id] for node_id in graph.sinks() if node_id in scope}
+
+    async def _run_node(
+        self,
+        node: Node,
+        scope: Dict[str, Any],
+        inputs: Dict[str, Any],
+        scope_name: Optional[str],
+        publish: Optional[Callable[[Any], None]] = None,
+    ) -> Tuple[bool, Optional[NodeResult], Optional[str]]:
+        spec = get_node_spec(node.type)
+        record = NodeRecord(node.id, node.type, scope_name, NodeStatus.SUCCEEDED)
+        queued = time.perf_counter()
+        started = None
+        try:
+            async with self.limits.slot(node, spec.container):
+                started = time.perf_counter()
+                record.wait_seconds = round(started - queued, 6)
+                record.started_at = _now()
+                config = {
+                    key: value if key in spec.raw_keys else resolve(value, scope)
+                    for key, value in node.config.items()
+                }
+                call = spec.fn(NodeContext(self, node, scope, inputs, scope_name, publish), config)
+                if node.timeout_seconds:
+                    value = await asyncio.wait_for(call, node.timeout_seconds)
+                else:
+                    value = await call
+            result = value if isinstance(value, NodeResult) else NodeResult(value)
+            record.detail = dict(result.detail)
+            return True, result, None
+        except asyncio.CancelledError:
+            record.status = NodeStatus.CANCELLED
+            raise
+        except asyncio.TimeoutError as e:
+            record.status = NodeStatus.FAILED
+            record.error = str(e) or f"Timed out after {node.timeout_seconds}s"
+            return False, None, record.error
+        except Exception as e:
+            record.status = NodeStatus.FAILED
+            record.error = str(e) if isinstance(e, NodeFailed) else f"{type(e).__name__}: {e}"
+            logger.warning(f"Workflow node {record.scope + '/' if record.scope else ''}{node.id} failed: {record.error}")
+            return False, None, record.error
+        finally:
+            if started is not None:
+                record.finished_at = _now()
+                record.elapsed_seconds = round(time.perf_counter() - started, 6)
+            await self._emit(record)
+
+    async def _emit(self, record: NodeRecord):
+        self.counts[record.status.value] += 1
+        if self.on_record is None:
+            return
+        try:
+            pending = self.on_record(record)
+            if inspect.isawaitable(pending):
+                await pending
+        except Exception:
+            logger.exception(f"Failed to report workflow node {record.node_id}")
@@ -0,0 +1,210 @@
+"""
+进程间传递大块数据的共享内存封装 (process 节点与工作进程之间)。
+
+pickle 传递一个大数组要经过 序列化 -> 管道写入 -> 管道读取 -> 反序列化, 数据被拷贝多次;
+这里发送方把数据一次写入 multiprocessing.shared_memory 段, 只把段名与形状等描述 (SharedArray / SharedArrow) 经 pickle 传递,
+接收方直接映射同一块内存:
+    - NumPy 数组 (非 object dtype): 按原始字节写入, 接收方 np.ndarray(buffer=...) 零拷贝
+    - Arrow Table / RecordBatch: 写为 Arrow IPC stream, 接收方从共享内存零拷贝读取
+    - pandas DataFrame: 经 Arrow 表传递, 接收方转换回 DataFrame
+小于 min_bytes 的对象与其它类型仍然直接 pickle。dict / list / tuple 递归处理。
+
+段的生命周期由 SharedSegments 管理: 创建方负责 unlink, 附加方只 close;
+零拷贝视图存活期间不能 close (close 抛出 BufferError), 需要先释放对视图的引用。
+"""
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Iterator, List
+
+# 共享内存段不能为 0 字节
+_MIN_SEGMENT = 1
+
+
+@dataclass(frozen=True)
+class SharedArray:
+    name: str
+    shape: tuple
+    dtype: Any  # numpy.dtype (可 pickle)
+    nbytes: int
+
+
+@dataclass(frozen=True)
+class SharedArrow:
+    name: str
+    nbytes: int
+    kind: str  # table | batch | pandas
+
+
+SharedRef = (SharedArray, SharedArrow)
+
+
+class SharedSegments:
+    """一组共享内存段。"""
+
+    def __init__(self):
+        self._segments: List[SharedMemory] = []
+        self.nbytes = 0
+
+    def create(self, size: int) -> SharedMemory:
+        segment = SharedMemory(create=True, size=max(size, _MIN_SEGMENT))
+        self._segments.append(segment)
+        self.nbytes += size
+        return segment
+
+    def attach(self, name: str) -> SharedMemory:
+        segment = SharedMemory(name=name)
+        self._segments.append(segment)
+        self.nbytes += segment.size
+        return segment
+
+    def close(self) -> bool:
+        """关闭本进程的映射; 仍有零拷贝视图存活的段保留, 返回是否全部关闭。"""
+        remaining = []
+        for segment in self._segments:
+            try:
+                segment.close()
+            except BufferError:
+                remaining.append(segment)
+        self._segments = remaining
+        return not remaining
+
+    def unlink(self):
+        """删除段 (已映射的进程仍可访问, 全部 close 后释放内存)。"""
+        for segment in self._segments:
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _is_pandas(value: Any) -> bool:
+    return type(value).__module__.startswith("pandas") and type(value).__name__ == "DataFrame"
+
+
+def _arrow_kind(value: Any):
+    module = type(value).__module__
+    if not module.startswith("pyarrow"):
+        return None
+    import pyarrow as pa
+
+    if isinstance(value, pa.Table):
+        return "table"
+    if isinstance(value, pa.RecordBatch):
+        return "batch"
+    return None
+
+
+def _pack_arrow(value: Any, kind: str, segments: SharedSegments) -> SharedArrow:
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(value) if kind == "pandas" else value
+    # 先用 MockOutputStream 计算 IPC 的字节数, 再直接写入共享内存 (不经过中间缓冲)
+    sink = pa.MockOutputStream()
+    writer = pa.ipc.new_stream(sink, table.schema)
+    writer.write(table)
+    writer.close()
+    size = sink.size()
+
+    segment = segments.create(size)
+    stream = pa.FixedSizeBufferWriter(pa.py_buffer(segment.buf))
+    writer = pa.ipc.new_stream(stream, table.schema)
+    writer.write(table)
+    writer.close()
+    stream.close()
+    del writer, stream
+    return SharedArrow(segment.name, size, kind)
+
+
+def _pack_array(value: Any, segments: SharedSegments) -> SharedArray:
+    import numpy as np
+
+    segment = segments.create(value.nbytes)
+    target = np.ndarray(value.shape, dtype=value.dtype, buffer=segment.buf)
+    target[...] = value
+    del target
+    return SharedArray(segment.name, value.shape, value.dtype, value.nbytes)
+
+
+def pack(value: Any, segments: SharedSegments, min_bytes: int) -> Any:
+    """把 value 中的大数组 / Arrow 表写入共享内存, 替换为可 pickle 的描述。"""
+    if isinstance(value, dict):
+        return {key: pack(item, segments, min_bytes) for key, item in value.items()}
+    if isinstance(value, list):
+        return [pack(item, segments, min_bytes) for item in value]
+    if type(value) is tuple:
+        return tuple(pack(item, segments, min_bytes) for item in value)
+
+    if type(value).__module__ == "numpy" and type(value).__name__ == "ndarray":
+        if value.dtype.hasobject or value.nbytes < min_bytes:
+            return value
+        return _pack_array(value, segments)
+    kind = "pandas" if _is_pandas(value) else _arrow_kind(value)
+    if kind is not None:
+        nbytes = int(value.memory_usage(deep=False).sum()) if kind == "pandas" else value.nbytes
+        if nbytes < min_bytes:
+            return value
+        return _pack_arrow(value, kind, segments)
+    return value
+
+
+def _unpack_ref(ref: Any, segments: SharedSegments, copy: bool) -> Any:
+    segment = segments.attach(ref.name)
+    if isinstance(ref, SharedArray):
+        import numpy as np
+
+        view = np.ndarray(ref.shape, dtype=ref.dtype, buffer=segment.buf)
+        return view.copy() if copy else view
+
+    import pyarrow as pa
+
+    if copy:
+        # 拷贝一次到进程内存后零拷贝读取, 之后共享内存段可以立即释放
+        buffer = pa.py_buffer(bytes(segment.buf[:ref.nbytes]))
+    else:
+        buffer = pa.py_buffer(segment.buf[:ref.nbytes])
+    table = pa.ipc.open_stream(buffer).read_all()
+    if ref.kind == "pandas":
+        return table.to_pandas()
+    if ref.kind == "batch":
+        batches = table.to_batches()
+        return batches[0] if len(batches) == 1 else table.combine_chunks().to_batches()[0]
+    return table
+
+
+def unpack(value: Any, segments: SharedSegments, copy: bool = False) -> Any:
+    """
+    还原 pack 的结果。copy=False 时数组 / 表直接映射共享内存 (只读使用, 存活期间 segments 不能关闭);
+    copy=True 时拷贝到进程内存, 返回后即可关闭并删除段。
+    """
+    if isinstance(value, SharedRef):
+        return _unpack_ref(value, segments, copy)
+    if isinstance(value, dict):
+        return {key: unpack(item, segments, copy) for key, item in value.items()}
+    if isinstance(value, list):
+        return [unpack(item, segments, copy) for item in value]
+    if type(value) is tuple:
+        return tuple(unpack(item, segments, copy) for item in value)
+    return value
+
+
+def iter_refs(value: Any) -> Iterator[Any]:
+    if isinstance(value, SharedRef):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from iter_refs(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from iter_refs(item)
+
+
+def discard(value: Any):
+    """删除 pack 结果中的所有段 (结果不再被读取时, e.g. 接收方已取消)。"""
+    segments = SharedSegments()
+    for ref in iter_refs(value):
+        try:
+            segments.attach(ref.name)
+        except FileNotFoundError:
+            continue
+    segments.unlink()
+    segments.close()
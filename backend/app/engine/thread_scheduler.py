@@ -0,0 +1,314 @@
+"""
+线程调度器 (Thread Scheduler): thread 容器节点把子图 (e.g. 一个数据拉取节点) 按参数列表 (标的 / 日期) 并发展开,
+适用于受请求频率与延迟限制 (而不是 CPU) 的 IO 任务:
+    - 并发: 同时执行的项数不超过 config.max_parallel; 子图中的同步函数在共享的 IO 线程池 (WORKFLOW_IO_THREADS) 中执行,
+      不受事件循环默认线程池的大小限制
+    - 限速: config.host (可以引用 {{loop.item}}) 相同且速率相同的请求共享一个令牌桶, 速率为 config.rate_limit 或
+      WORKFLOW_HOST_RATE_LIMITS 中该 host 的配置 (进程内所有运行共享; 对同一 host 配置了不同速率的节点各用各的令牌桶);
+      只配置 rate_limit 时只限制本节点
+    - 重试: 每项最多重试 config.retries 次, 指数退避 (backoff_seconds 起, 上限 max_backoff_seconds, 随机抖动);
+      config.retry_budget 限制整个节点的重试总次数, 供应商整体故障时不会对每一项都重试到上限
+    - 失败: on_error 为 fail (默认) 时任一项最终失败即取消其余项; 为 skip 时该项输出为 None, 继续执行
+    - 流式: 节点开始执行即发布 ResultStream, 经 "stream" 连线连接的下游随即执行, 按完成顺序逐个读取各项的输出;
+      普通连线的下游在全部完成后执行, 得到按参数顺序排列的输出列表; 流式下游暂停读取时 (背压) 不再开始新的项
+
+每次尝试是一次子图执行, 记录的 scope 为 "node[i]", 重试为 "node[i]#2" / "node[i]#3" ...
+"""
+import asyncio
+import functools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import parse_rate_limits, settings
+from app.engine.expressions import ExpressionError
+from app.engine.graph import Node
+from app.engine.nodes import NodeResult, node_type, sync_executor
+
+ON_ERROR = ("fail", "skip")
+
+_io_executor: Optional[ThreadPoolExecutor] = None
+_io_lock = threading.Lock()
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    global _io_executor
+    with _io_lock:
+        if _io_executor is None:
+            _io_executor = ThreadPoolExecutor(max_workers=settings.WORKFLOW_IO_THREADS, thread_name_prefix="workflow-io")
+        return _io_executor
+
+
+def shutdown_io_executor():
+    global _io_executor
+    with _io_lock:
+        executor, _io_executor = _io_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class RateLimiter:
+    """
+    令牌桶 (GCRA): 平均每秒 rate 次, 空闲后最多连续 burst 次。
+    acquire 同步预留时间片后等待, 不使用 asyncio 原语, 可以在多个事件循环 (运行) 之间共享。
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if not rate > 0 or burst < 1:
+            raise ValueError(f"Invalid rate limit {rate}:{burst}, rate must be > 0 and burst >= 1")
+        self.rate = rate
+        self.burst = burst
+        self._interval = 1 / rate
+        self._next = 0.0
+
+    async def acquire(self) -> float:
+        """等待一个名额, 返回等待的秒数。"""
+        now = time.monotonic()
+        start = max(self._next, now - (self.burst - 1) * self._interval)
+        self._next = start + self._interval
+        wait = start - now
+        if wait > 0:
+            await asyncio.sleep(wait)
+            return wait
+        return 0.0
+
+
+# key: (host, 每秒次数, burst)
+_host_limiters: Dict[Tuple[str, float, int], RateLimiter] = {}
+
+
+@functools.lru_cache(maxsize=4)
+def _configured_rate_limits(value: str) -> Dict[str, Tuple[float, int]]:
+    # 配置在 Settings 加载时已校验, 这里只解析一次
+    return parse_rate_limits(value)
+
+
+def host_limiter(host: str, rate: Optional[float] = None, burst: Optional[int] = None) -> Optional[RateLimiter]:
+    """host 的共享限速器; 节点配置的速率覆盖全局配置, 两者都没有时不限速。"""
+    default = _configured_rate_limits(settings.WORKFLOW_HOST_RATE_LIMITS).get(host)
+    if rate is None and default is None:
+        return None
+    rate = rate if rate is not None else default[0]
+    burst = burst if burst is not None else (default[1] if default else 1)
+    key = (host, float(rate), burst)
+    limiter = _host_limiters.get(key)
+    if limiter is None:
+        limiter = _host_limiters[key] = RateLimiter(rate, burst)
+    return limiter
+
+
+class RetryBudget:
+    """整个节点共享的重试次数; None 表示不限制。"""
+
+    def __init__(self, total: Optional[int]):
+        self.remaining = total
+        self.used = 0
+        self.denied = 0
+
+    def take(self) -> bool:
+        if self.remaining is not None:
+            if self.remaining <= 0:
+                self.denied += 1
+                return False
+            self.remaining -= 1
+        self.used += 1
+        return True
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """第 attempt 次重试前的等待 (full jitter)。"""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class ResultStream:
+    """
+    thread 节点的流式输出: 各项的输出按完成顺序追加, 下游以 async for 读取 (可以有多个读取方, 各自从头读取);
+    节点失败时读取方在读完已有的输出后收到错误。
+    背压: 读取方处理不过来时调用 pause (e.g. table_sink 节点的写入队列已满), 节点在 resume 之前不再开始新的项。
+    """
+
+    def __init__(self):
+        self._items: List[Any] = []
+        self._waiters: List[asyncio.Future] = []
+        self._closed = False
+        self._error: Optional[str] = None
+        self._paused = 0
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __repr__(self) -> str:
+        state = "failed" if self._error else "closed" if self._closed else "open"
+        return f"<ResultStream {len(self._items)} item(s), {state}>"
+
+    def _wake(self):
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def append(self, item: Any):
+        self._items.append(item)
+        self._wake()
+
+    def pause(self):
+        self._paused += 1
+        self._resumed.clear()
+
+    def resume(self):
+        self._paused = max(0, self._paused - 1)
+        if not self._paused:
+            self._resumed.set()
+
+    async def wait_resumed(self) -> float:
+        """读取方暂停时等待其恢复, 返回等待的秒数。"""
+        if self._resumed.is_set():
+            return 0.0
+        started = time.perf_counter()
+        await self._resumed.wait()
+        return time.perf_counter() - started
+
+    def close(self, error: Optional[str] = None):
+        if self._closed:
+            return
+        self._closed = True
+        self._error = error
+        self._wake()
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        index = 0
+        while True:
+            if index < len(self._items):
+                yield self._items[index]
+                index += 1
+            elif self._error is not None:
+                raise RuntimeError(f"Stream aborted: {self._error}")
+            elif self._closed:
+                return
+            else:
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+                await waiter
+
+
+def _validate_thread(node: Node):
+    config = node.config
+    if "items" not in config:
+        raise ValueError("config.items is required")
+    for key, minimum in (("max_parallel", 1), ("burst", 1), ("retries", 0), ("retry_budget", 0)):
+        value = config.get(key, minimum)
+        if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+            raise ValueError(f"config.{key} must be an integer >= {minimum}")
+    for key in ("rate_limit", "backoff_seconds", "max_backoff_seconds", "attempt_timeout_seconds"):
+        value = config.get(key, 1)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            raise ValueError(f"config.{key} must be a positive number")
+    if config.get("on_error", "fail") not in ON_ERROR:
+        raise ValueError(f"config.on_error must be one of: {', '.join(ON_ERROR)}")
+    if "host" in config and not isinstance(config["host"], str):
+        raise ValueError("config.host must be a string")
+
+
+@node_type(
+    "thread", container=True, requires_body=True, raw_keys=("host",), validate=_validate_thread, streams=True,
+)
+async def thread_node(ctx, config: Dict[str, Any]) -> NodeResult:
+    """按参数列表并发执行子图 (IO 密集型), 支持限速、重试与流式输出"""
+    items = config["items"]
+    if isinstance(items, (str, bytes, dict)) or not hasattr(items, "__iter__"):
+        raise ExpressionError(f"thread items must be a list, got {type(items).__name__}")
+    items = list(items)
+    node = ctx.node
+    retries = config.get("retries", 0)
+    base = config.get("backoff_seconds", 0.5)
+    cap = config.get("max_backoff_seconds", 30)
+    attempt_timeout = config.get("attempt_timeout_seconds")
+    skip_failed = config.get("on_error", "fail") == "skip"
+    rate, burst = config.get("rate_limit"), config.get("burst")
+    # 没有 host 时 rate_limit 只限制本节点的各项
+    local_limiter = RateLimiter(rate, burst or 1) if rate and "host" not in config else None
+
+    semaphore = asyncio.Semaphore(config.get("max_parallel", 8))
+    budget = RetryBudget(config.get("retry_budget"))
+    stream = ResultStream()
+    outputs: List[Any] = [None] * len(items)
+    errors: Dict[int, str] = {}
+    hosts = set()
+    rate_wait = 0.0
+    paused = 0.0
+
+    async def run_item(index: int, item: Any):
+        nonlocal rate_wait, paused
+        variables = {"loop": {"index": index, "item": item, "output": None}}
+        limiter = local_limiter
+        if "host" in config:
+            host = str(ctx.resolve(node.config["host"], variables))
+            hosts.add(host)
+            limiter = host_limiter(host, rate, burst)
+        attempt = 1
+        while True:
+            label = f"{node.id}[{index}]" + (f"#{attempt}" if attempt > 1 else "")
+            try:
+                async with semaphore:
+                    paused += await stream.wait_resumed()
+                    if limiter is not None:
+                        rate_wait += await limiter.acquire()
+                    call = ctx.run_subgraph(node.body, variables, label)
+                    if attempt_timeout:
+                        try:
+                            output = await asyncio.wait_for(call, attempt_timeout)
+                        except asyncio.TimeoutError:
+                            raise TimeoutError(f"Item {index} timed out after {attempt_timeout}s") from None
+                    else:
+                        output = await call
+            except Exception as e:
+                if attempt <= retries and budget.take():
+                    await asyncio.sleep(backoff_delay(attempt, base, cap))
+                    attempt += 1
+                    continue
+                if not skip_failed:
+                    raise
+                errors[index] = str(e)
+                return
+            outputs[index] = output
+            stream.append(output)
+            return
+
+    token = sync_executor.set(get_io_executor())
+    ctx.publish(stream)
+    tasks = [asyncio.create_task(run_item(i, item)) for i, item in enumerate(items)]
+    try:
+        if tasks:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in tasks:
+            if task.done() and not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+    except BaseException as e:
+        stream.close(str(e) or type(e).__name__)
+        raise
+    finally:
+        sync_executor.reset(token)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    stream.close()
+
+    detail = {
+        "items": len(items),
+        "succeeded": len(items) - len(errors),
+        "failed": len(errors),
+        "retries": budget.used,
+        "retries_denied": budget.denied,
+        "rate_wait_seconds": round(rate_wait, 3),
+        "backpressure_wait_seconds": round(paused, 3),
+    }
+    if hosts:
+        detail["hosts"] = sorted(hosts)
+    if errors:
+        # 只保留前几项的错误, 避免记录过大
+        detail["errors"] = {str(i): errors[i] for i in sorted(errors)[:20]}
+    return NodeResult(outputs, detail=detail)
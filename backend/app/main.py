@@ -1,9 +1,52 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.data_tables import router as data_tables_router
+from app.api.jobs import router as jobs_router
+from app.api.metrics import router as metrics_router
+from app.api.topics import router as topics_router
+from app.api.workflows import router as workflows_router
+from app.core.config import settings
+from app.core.request_metrics import MetricsMiddleware
+from app.core.serialization import FastJSONResponse
+from app.db.aggregation import rollup_refresh_loop
+from app.db.job_runner import JobWorkerPool
+from app.db.lifecycle import lifecycle_loop
+from app.db.partition_maintenance import partition_maintenance_loop
+from app.engine.process_scheduler import shutdown_process_pool
+from app.engine.thread_scheduler import shutdown_io_executor
 import uvicorn
 
-app = FastAPI(title="EasyQuant Pro API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background maintenance tasks
+    tasks = []
+    if settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(
+            partition_maintenance_loop(settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS)
+        ))
+    if settings.ROLLUP_REFRESH_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(
+            rollup_refresh_loop(settings.ROLLUP_REFRESH_INTERVAL_SECONDS)
+        ))
+    if settings.LIFECYCLE_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(
+            lifecycle_loop(settings.LIFECYCLE_INTERVAL_SECONDS)
+        ))
+    # 后台任务 worker (发布 / 同步 / 回填)
+    worker_pool = JobWorkerPool(settings.JOB_WORKERS) if settings.JOB_WORKERS > 0 else None
+    if worker_pool:
+        await worker_pool.start()
+    yield
+    if worker_pool:
+        await worker_pool.stop()
+    await asyncio.to_thread(shutdown_process_pool)
+    shutdown_io_executor()
+    for task in tasks:
+        task.cancel()
+
+app = FastAPI(title="EasyQuant Pro API", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Configure CORS
 origins = [
@@ -18,8 +61,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(data_tables_router, prefix="/api/v1", tags=["data-tables"])
+app.include_router(jobs_router, prefix="/api/v1", tags=["jobs"])
+app.include_router(workflows_router, prefix="/api/v1", tags=["workflows"])
+app.include_router(topics_router, prefix="/api/v1", tags=["topics"])
+app.include_router(metrics_router, tags=["metrics"])
 
 @app.get("/")
 def read_root():
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Enum, Text, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, Enum, Text, DateTime, Index, UniqueConstraint
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 import enum
@@ -32,6 +32,14 @@ class DataTableConfig(Base, TimestampMixin):
     定义了系统中的数据表结构，用于自动建表和 ETL 映射。
     """
     __tablename__ = "data_table_configs"
+    __table_args__ = (
+        # 列表页的模糊搜索 (ILIKE '%term%') 依赖 pg_trgm 的 GIN 索引, 由 alembic 迁移创建扩展
+        Index("ix_data_table_configs_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_data_table_configs_table_name_trgm", "table_name", postgresql_using="gin", postgresql_ops={"table_name": "gin_trgm_ops"}),
+        Index("ix_data_table_configs_description_trgm", "description", postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"}),
+        # 按分类过滤时的 keyset 分页 (ORDER BY id DESC)
+        Index("ix_data_table_configs_category_id_id", "category_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     category_id = Column(Integer, ForeignKey("table_categories.id"), nullable=False)
@@ -53,5 +61,47 @@ class DataTableConfig(Base, TimestampMixin):
     # Optional: Partitioning config
     partition_config = Column(JSONB, nullable=True, comment="分区策略配置")
 
+    # Optional: range 分区的冷热分层与保留策略, e.g. {"tier_after_days": 365, "tier_action": "archive", "drop_after_days": 1825}
+    lifecycle_policy = Column(JSONB, nullable=True, comment="数据生命周期策略")
+
     # Relationship
-    category = relationship("TableCategory", back_populates="tables")
\ No newline at end of file
+    category = relationship("TableCategory", back_populates="tables")
+
+
+class TableRollup(Base, TimestampMixin):
+    """
+    聚合物化表 (rollup)
+    热点的聚合查询 (e.g. 1 分钟线 -> 5 分钟线) 预先计算到独立的物理表, 按水位增量刷新。
+    """
+    __tablename__ = "table_rollups"
+    __table_args__ = (
+        UniqueConstraint("table_id", "name", name="uq_table_rollups_table_id_name"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    table_id = Column(Integer, ForeignKey("data_table_configs.id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String, nullable=False, comment="rollup 名称 (e.g., 5min)")
+    rollup_table = Column(String, unique=True, nullable=False, comment="物化表名")
+
+    # 聚合定义: {"time_column", "bucket", "origin", "group_by", "aggregations": {"open": "first(open)", ...}}
+    spec = Column(JSONB, nullable=False, comment="聚合定义")
+    lookback_buckets = Column(Integer, nullable=False, default=1, comment="每次刷新重算水位之前的桶数 (覆盖迟到数据)")
+    watermark = Column(DateTime, nullable=True, comment="早于该时间 (UTC) 的桶已完整物化, 之后的桶查询时实时聚合")
+    last_refreshed_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class TableLifecycleEvent(Base, TimestampMixin):
+    """
+    生命周期策略的执行记录: 每个分区的每次操作 (移动表空间 / 归档并解除挂载 / 删除) 一条。
+    """
+    __tablename__ = "table_lifecycle_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    table_id = Column(Integer, ForeignKey("data_table_configs.id", ondelete="CASCADE"), nullable=False, index=True)
+    partition_name = Column(String, nullable=False, comment="分区表名")
+    action = Column(String, nullable=False, comment="tier | archive | drop")
+    status = Column(String, nullable=False, comment="done | failed")
+    # e.g. {"upper": "2024-02-01", "tablespace": "cold"} / {"path": ..., "rows": ..., "bytes": ...}
+    detail = Column(JSONB, nullable=False, default=dict, comment="操作明细")
+    error = Column(Text, nullable=True)
+    elapsed_seconds = Column(Float, nullable=True)
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, Integer, String, Enum, Text, DateTime, Index
+from sqlalchemy.dialects.postgresql import JSONB
+import enum
+
+from app.db.base_class import Base, TimestampMixin
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class Job(Base, TimestampMixin):
+    """
+    后台任务 (发布 / 同步 / 回填等长耗时操作)
+    由 worker 从队列取出执行，进度与结果写回本表供 GET /jobs/{id} 查询。
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # 按表查询进行中的任务 (e.g. 同一张表的回填是否仍在运行)
+        Index("ix_jobs_table_id_status", "table_id", "status"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False, comment="任务类型 (e.g., publish, bulk_publish, column_migration)")
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, nullable=False)
+    table_id = Column(Integer, nullable=True, comment="关联的数据表配置 id")
+    params = Column(JSONB, nullable=False, default=dict, comment="任务参数")
+
+    # Progress
+    current_step = Column(Text, nullable=True, comment="当前执行的步骤 / SQL")
+    attempts = Column(Integer, nullable=False, default=0, comment="被 worker 领取的次数")
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True, comment="worker 最近一次写回进度的时间")
+
+    # Outcome
+    result = Column(JSONB, nullable=True, comment="成功时的返回结果")
+    error = Column(JSONB, nullable=True, comment="失败原因: {status_code, detail}")
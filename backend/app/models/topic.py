@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, Text
+
+from app.db.base_class import Base, TimestampMixin
+
+
+class Topic(Base, TimestampMixin):
+    """
+    消息总线的 Topic 注册表; 消息本身存放在消息总线中 (Redis Streams 或进程内, 见 app.core.message_bus)。
+    """
+    __tablename__ = "topics"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False, comment="Topic 名称, 生产者 / 消费者节点以名称引用")
+    description = Column(Text, nullable=True)
+    max_length = Column(Integer, nullable=True, comment="保留的消息数上限 (发布时近似裁剪), 为空表示不限制")
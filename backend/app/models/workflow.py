@@ -0,0 +1,67 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Enum, Text, DateTime, Index
+from sqlalchemy.dialects.postgresql import JSONB
+import enum
+
+from app.db.base_class import Base, TimestampMixin
+
+class WorkflowRunStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class Workflow(Base, TimestampMixin):
+    """
+    工作流定义: 节点 / 连线图 (格式见 app.engine.graph), 由后台任务按依赖并发执行。
+    """
+    __tablename__ = "workflows"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False, comment="工作流名称")
+    description = Column(Text, nullable=True)
+    graph = Column(JSONB, nullable=False, comment="节点与连线 {nodes, edges, concurrency}")
+    max_concurrency = Column(Integer, nullable=True, comment="一次运行中同时执行的节点数上限, 为空时使用全局配置")
+
+
+class WorkflowRun(Base, TimestampMixin):
+    """
+    工作流的一次运行; graph 为启动时的快照, 运行期间修改工作流不影响本次运行。
+    """
+    __tablename__ = "workflow_runs"
+    __table_args__ = (
+        Index("ix_workflow_runs_workflow_id_id", "workflow_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    workflow_id = Column(Integer, ForeignKey("workflows.id", ondelete="CASCADE"), nullable=False)
+    job_id = Column(Integer, nullable=True, comment="执行本次运行的后台任务 id")
+    status = Column(Enum(WorkflowRunStatus), default=WorkflowRunStatus.QUEUED, nullable=False)
+    graph = Column(JSONB, nullable=False, comment="启动时的图快照")
+    inputs = Column(JSONB, nullable=False, default=dict, comment="运行输入")
+    outputs = Column(JSONB, nullable=True, comment="end 节点 (或末端节点) 的输出")
+    # {"node", "scope", "error"}
+    error = Column(JSONB, nullable=True, comment="导致运行失败的节点与原因")
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    elapsed_seconds = Column(Float, nullable=True)
+
+
+class WorkflowNodeRun(Base):
+    """
+    运行中每个节点 (循环体内的节点每轮一条) 的执行记录: 状态、排队等待与执行耗时。
+    """
+    __tablename__ = "workflow_node_runs"
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey("workflow_runs.id", ondelete="CASCADE"), nullable=False, index=True)
+    node_id = Column(String, nullable=False)
+    node_type = Column(String, nullable=False)
+    scope = Column(String, nullable=True, comment="循环体内的节点所在的循环与轮次, e.g. each_symbol[3]")
+    status = Column(String, nullable=False, comment="succeeded | failed | skipped | cancelled")
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    wait_seconds = Column(Float, nullable=True, comment="就绪后等待并发名额的时间")
+    elapsed_seconds = Column(Float, nullable=True)
+    # e.g. {"branch": "true"} / {"iterations": 12}
+    detail = Column(JSONB, nullable=False, default=dict)
+    error = Column(Text, nullable=True)
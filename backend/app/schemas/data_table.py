@@ -1,5 +1,6 @@
-from typing import List, Dict, Any, Optional
-from pydantic import BaseModel, Field, field_validator, ConfigDict
+from datetime import date, datetime
+from typing import List, Dict, Any, Optional, Literal
+from pydantic import BaseModel, Field, field_validator, model_validator, ConfigDict
 from app.models.data_table import TableStatus
 
 class ColumnDef(BaseModel):
@@ -9,9 +10,65 @@ class ColumnDef(BaseModel):
     comment: str
 
 class IndexDef(BaseModel):
+    """
+    索引定义, e.g. 只追加的时序表用 BRIN: {"columns": ["trade_date"], "method": "brin", "storage": {"pages_per_range": 32}}
+    覆盖索引: {"columns": ["ts_code", "trade_date"], "order": {"trade_date": "desc"}, "include": ["close"]}
+    部分索引: {"columns": ["ts_code"], "where": "trade_date >= DATE '2024-01-01'"}
+    """
     name: str
     columns: List[str]
     unique: bool = False
+    method: Literal["btree", "brin", "hash", "gin"] = "btree"
+    include: List[str] = Field([], description="INCLUDE 的非键列 (仅 btree), 支持仅索引扫描")
+    where: Optional[str] = Field(None, description="部分索引条件, 只能引用本表列")
+    order: Dict[str, Literal["asc", "desc"]] = Field({}, description="键列的排序方向 (仅 btree), 默认 asc")
+    storage: Dict[str, int | bool] = Field(
+        {}, description="存储参数, e.g. fillfactor (btree/hash), pages_per_range / autosummarize (brin), fastupdate (gin)"
+    )
+
+class PartitionConfig(BaseModel):
+    """
+    分区策略
+    range: 按时间列 (day/month/year) 切分, 预建 premake 个未来分区, 由后台任务持续补建
+    list: 按枚举值切分 (e.g. exchange)
+    """
+    key: str = Field(..., pattern="^[a-z_][a-z0-9_]*$", description="分区键")
+    strategy: Literal["range", "list"]
+    interval: Optional[Literal["day", "month", "year"]] = None
+    premake: int = Field(3, ge=0, le=400, description="预建的未来分区数")
+    start: Optional[date] = Field(None, description="首个 range 分区的起始日期 (覆盖历史数据)")
+    values: List[str] = []
+    default_partition: bool = True
+
+    @model_validator(mode="after")
+    def check_strategy(self):
+        if self.strategy == "range" and not self.interval:
+            raise ValueError("range 分区必须指定 interval")
+        if self.strategy == "list" and not self.values:
+            raise ValueError("list 分区必须指定 values")
+        return self
+
+class LifecyclePolicy(BaseModel):
+    """
+    range 分区表的冷热分层与保留策略, 按分区上界计算年龄 (分区内的数据全部早于 N 天才处理)。
+    tier_after_days 天后: tablespace = 移到 (较慢的) 表空间; archive = 导出为 Parquet (zstd) 后解除挂载
+    drop_after_days 天后: 删除分区 (archive 模式下尚未归档的分区先导出再删除, Parquet 文件保留)
+    """
+    enabled: bool = True
+    tier_after_days: Optional[int] = Field(None, ge=1)
+    tier_action: Literal["tablespace", "archive"] = "tablespace"
+    tablespace: Optional[str] = Field(None, pattern="^[a-z_][a-z0-9_]*$", description="tier_action=tablespace 的目标表空间")
+    drop_after_days: Optional[int] = Field(None, ge=1)
+
+    @model_validator(mode="after")
+    def check_policy(self):
+        if self.tier_after_days is None and self.drop_after_days is None:
+            raise ValueError("必须指定 tier_after_days 或 drop_after_days")
+        if self.tier_after_days is not None and self.tier_action == "tablespace" and not self.tablespace:
+            raise ValueError("tier_action=tablespace 必须指定 tablespace")
+        if self.tier_after_days is not None and self.drop_after_days is not None and self.drop_after_days <= self.tier_after_days:
+            raise ValueError("drop_after_days 必须大于 tier_after_days")
+        return self
 
 class DataTableCreate(BaseModel):
     name: str
@@ -20,6 +77,7 @@ class DataTableCreate(BaseModel):
     description: str
     columns_schema: List[ColumnDef]
     indexes_schema: List[IndexDef] = []
+    partition_config: Optional[PartitionConfig] = None
     
     @field_validator('indexes_schema')
     @classmethod
@@ -31,14 +89,42 @@ class DataTableCreate(BaseModel):
         
         col_names = {c.name for c in info.data['columns_schema']}
         for idx in v:
-            for col in idx.columns:
+            for col in [*idx.columns, *idx.include, *idx.order]:
                 if col not in col_names:
                     raise ValueError(f"索引字段 '{col}' 未在列定义中找到")
         return v
 
+    @field_validator('partition_config')
+    @classmethod
+    def validate_partition_key(cls, v, info):
+        if v is None or not info.data or 'columns_schema' not in info.data:
+            return v
+
+        pk_names = {c.name for c in info.data['columns_schema'] if c.is_pk}
+        if v.key not in {c.name for c in info.data['columns_schema']}:
+            raise ValueError(f"分区键 '{v.key}' 未在列定义中找到")
+        if v.key not in pk_names:
+            raise ValueError(f"分区键 '{v.key}' 必须是主键的一部分")
+        return v
+
 class DataTableUpdate(DataTableCreate):
     pass
 
+class TableStats(BaseModel):
+    """物理表的存储统计 (来自 pg_class / pg_stat_user_tables 的估计值, 分区表为各分区之和)"""
+    row_estimate: Optional[int] = None
+    total_bytes: int
+    table_bytes: int
+    index_bytes: int
+    toast_bytes: int
+    partitions: int = 0
+    live_tuples: Optional[int] = None
+    dead_tuples: Optional[int] = None
+    dead_tuple_ratio: Optional[float] = None
+    last_vacuum_at: Optional[datetime] = None
+    last_analyze_at: Optional[datetime] = None
+    collected_at: datetime
+
 class DataTableResponse(BaseModel):
     id: int
     name: str
@@ -49,8 +135,11 @@ class DataTableResponse(BaseModel):
     last_published_at: Any | None = None
     columns_schema: List[Dict[str, Any]]
     indexes_schema: List[Dict[str, Any]]
+    partition_config: Optional[Dict[str, Any]] = None
+    lifecycle_policy: Optional[Dict[str, Any]] = None
     created_at: Any
     updated_at: Any
+    stats: Optional[TableStats] = None  # 仅已发布的表, 有缓存 (TABLE_STATS_TTL_SECONDS)
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -73,4 +162,99 @@ class CategoryUpdate(BaseModel):
 
 class DataTableListResponse(BaseModel):
     total: int
+    estimated: bool = False  # total 为查询计划的行数估计 (count=estimate)
+    next_cursor: Optional[int] = None  # 下一页请求的 cursor (最后一条的 id), None 表示没有更多
     items: List[DataTableResponse]
+
+class IngestResponse(BaseModel):
+    table_name: str
+    format: str
+    mode: Literal["insert", "upsert"] = "insert"
+    rows: int
+    bytes: int
+    elapsed_seconds: float
+    rows_per_sec: float
+    bytes_per_sec: float
+    # upsert 模式的合并结果
+    inserted: Optional[int] = None
+    updated: Optional[int] = None
+    unchanged: Optional[int] = None
+    duplicates: Optional[int] = None  # 同一批次内重复的主键, 只保留最后一行
+
+class BulkPublishRequest(BaseModel):
+    ids: Optional[List[int]] = Field(None, min_length=1, description="要发布的表配置 id")
+    category_id: Optional[int] = Field(None, description="发布该分类下所有未发布的表")
+    concurrency: Optional[int] = Field(None, ge=1, le=32, description="同时发布的表数, 默认取配置; 不超过连接池能容纳的表数")
+    batch_size: Optional[int] = Field(None, ge=100, description="在线类型迁移的每批回填行数")
+    throttle_ms: Optional[int] = Field(None, ge=0, description="在线类型迁移的批间休眠 (毫秒)")
+    background: bool = Field(False, description="作为后台任务执行, 立即返回 202 与任务 id")
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.ids is None) == (self.category_id is None):
+            raise ValueError("必须且只能指定 ids 或 category_id 之一")
+        return self
+
+class BulkPublishResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    elapsed_ms: float
+    results: List[Dict[str, Any]]
+
+class ParquetExportRequest(BaseModel):
+    partition_column: str = Field(..., description="切分数据集的列")
+    granularity: Literal["day", "month", "year", "value"] = Field("month", description="时间列的截断粒度, 非时间列使用 value")
+    full: bool = Field(False, description="忽略上次导出的指纹, 重写所有分区")
+    parallelism: Optional[int] = Field(None, ge=1, le=32, description="并行读取的分区数, 默认取配置")
+    batch_rows: Optional[int] = Field(None, ge=1000, description="每批读取行数")
+
+class AggregateRequest(BaseModel):
+    """
+    按时间分桶聚合 (重采样), e.g. 1 分钟线 -> 5 分钟线:
+    {"bucket": "5 minutes", "aggregations": {"open": "first", "high": "max", "low": "min", "close": "last",
+     "vol": "sum", "vwap": "vwap(close, vol)"}}
+    """
+    time_column: Optional[str] = Field(None, description="分桶的时间列, 默认为 range 分区键")
+    bucket: str = Field(..., description="桶宽度, e.g. '30 seconds', '5 minutes', '1 day', '1 week', '1 month'")
+    origin: Optional[datetime] = Field(None, description="固定宽度桶的对齐点, 默认 2000-01-03 (周一)")
+    group_by: Optional[List[str]] = Field(None, description="分组列, 默认为除时间列以外的主键列")
+    aggregations: Dict[str, str] = Field(..., description="输出列 -> 聚合函数: first/last/min/max/sum/count/vwap(price, volume)")
+    start: Optional[str] = Field(None, description="原始行的时间下界 (含)")
+    end: Optional[str] = Field(None, description="原始行的时间上界 (不含)")
+    filters: Optional[Dict[str, Any]] = Field(None, description="分组列过滤, 值为列表时匹配其中任一值")
+    use_rollup: bool = Field(True, description="存在匹配的 rollup 时读取物化结果")
+
+class RollupCreate(BaseModel):
+    name: str = Field(..., pattern="^[a-z0-9_]+$", description="rollup 名称, 物化表名为 {table_name}_rollup_{name}")
+    time_column: Optional[str] = None
+    bucket: str
+    origin: Optional[datetime] = None
+    group_by: Optional[List[str]] = None
+    aggregations: Dict[str, str]
+    lookback_buckets: int = Field(1, ge=0, le=1000, description="每次刷新重算水位之前的桶数")
+
+class RollupResponse(BaseModel):
+    id: int
+    table_id: int
+    name: str
+    rollup_table: str
+    spec: Dict[str, Any]
+    lookback_buckets: int
+    watermark: Optional[datetime] = None
+    last_refreshed_at: Optional[datetime] = None
+    created_at: Any
+
+    model_config = ConfigDict(from_attributes=True)
+
+class LifecycleEventResponse(BaseModel):
+    id: int
+    partition_name: str
+    action: str
+    status: str
+    detail: Dict[str, Any]
+    error: Optional[str] = None
+    elapsed_seconds: Optional[float] = None
+    created_at: Any
+
+    model_config = ConfigDict(from_attributes=True)
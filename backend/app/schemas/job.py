@@ -0,0 +1,29 @@
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+from app.models.job import JobStatus
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: JobStatus
+    table_id: Optional[int] = None
+    params: Dict[str, Any]
+    current_step: Optional[str] = None  # 正在执行的步骤 / SQL
+    attempts: int
+    elapsed_seconds: Optional[float] = None  # 开始执行至今 (或至结束) 的耗时
+    result: Optional[Any] = None
+    error: Optional[Dict[str, Any]] = None  # {status_code, detail}
+    created_at: Any
+    started_at: Any | None = None
+    finished_at: Any | None = None
+    heartbeat_at: Any | None = None
+
+class JobAccepted(BaseModel):
+    """后台执行的请求立即返回的任务信息, 通过 status_url 轮询结果"""
+    job_id: int
+    kind: str
+    status: JobStatus
+    status_url: str
+
+class JobListResponse(BaseModel):
+    items: List[JobResponse]
@@ -0,0 +1,91 @@
+from typing import Any, List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from app.core.message_bus import TOPIC_NAME_PATTERN
+
+TOPIC_NAME = TOPIC_NAME_PATTERN.pattern
+GROUP_NAME = r"^[A-Za-z0-9_][A-Za-z0-9_.:-]{0,127}$"
+# 消息 id "<ms>-<seq>"; 另外 "$" 表示最新, "0" 表示从头
+OFFSET = r"^(\$|\d+(-\d+)?)$"
+
+class TopicCreate(BaseModel):
+    name: str = Field(..., pattern=TOPIC_NAME, description="字母、数字与 _ . : -, 例如 ticks.cn.stock")
+    description: Optional[str] = None
+    max_length: Optional[int] = Field(None, ge=1, description="保留的消息数上限 (发布时近似裁剪), 为空表示不限制")
+
+class TopicUpdate(BaseModel):
+    description: Optional[str] = None
+    max_length: Optional[int] = Field(None, ge=1)
+
+class TopicResponse(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    max_length: Optional[int] = None
+    created_at: Any
+    updated_at: Any
+
+    model_config = ConfigDict(from_attributes=True)
+
+class TopicNodeRef(BaseModel):
+    workflow_id: int
+    workflow_name: str
+    node: str  # 节点路径, 子图中的节点为 "loop.node"
+
+class TopicLinkResponse(BaseModel):
+    """引用同一 Topic 的生产者与消费者节点, 画布据此绘制幽灵连线"""
+    topic: str
+    producers: List[TopicNodeRef]
+    consumers: List[TopicNodeRef]
+
+class GroupInfo(BaseModel):
+    name: str
+    consumers: int
+    pending: int  # 已投递未确认的消息数
+    last_delivered_id: Optional[str] = None
+    lag: Optional[int] = None  # 尚未投递给该组的消息数
+
+class TopicInfoResponse(TopicResponse):
+    length: int
+    first_id: Optional[str] = None
+    last_id: Optional[str] = None
+    groups: List[GroupInfo]
+    producers: List[TopicNodeRef] = []
+    consumers: List[TopicNodeRef] = []
+
+class PublishRequest(BaseModel):
+    messages: List[Any] = Field(..., min_length=1, max_length=10000, description="一次批量发布的消息 (任意 JSON)")
+
+class PublishResponse(BaseModel):
+    ids: List[str]
+
+class MessageResponse(BaseModel):
+    id: str
+    data: Any
+    deliveries: Optional[int] = None
+
+class MessageListResponse(BaseModel):
+    items: List[MessageResponse]
+    last_id: Optional[str] = None  # 下一次回放 / ack 的位置
+
+class GroupCreate(BaseModel):
+    group: str = Field(..., pattern=GROUP_NAME)
+    start: str = Field("$", pattern=OFFSET, description='"$" 只消费之后的消息, "0" 从头消费, 或消息 id')
+
+class ConsumeRequest(BaseModel):
+    consumer: str = Field(..., min_length=1, max_length=200, description="组内的消费者名称, 同组的消费者分摊消息")
+    count: int = Field(100, ge=1, le=10000)
+    block_ms: int = Field(0, ge=0, le=30000, description="没有新消息时最多等待的毫秒数")
+
+class AckRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=10000)
+
+class AckResponse(BaseModel):
+    acked: int
+
+class OffsetRequest(BaseModel):
+    offset: str = Field(..., pattern=OFFSET, description="把消费组移到该位置, 之后的消息重新投递")
+
+class ClaimRequest(BaseModel):
+    consumer: str = Field(..., min_length=1, max_length=200)
+    min_idle_ms: int = Field(60000, ge=0, description="只转交投递后超过该时长仍未确认的消息")
+    count: int = Field(100, ge=1, le=10000)
@@ -0,0 +1,107 @@
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from app.engine import load_graph
+from app.models.workflow import WorkflowRunStatus
+
+def _check_graph(graph: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    # GraphError 是 ValueError, 校验失败返回 422
+    if graph is not None:
+        load_graph(graph)
+    return graph
+
+class WorkflowCreate(BaseModel):
+    """graph 的格式见 app.engine.graph; 保存时校验结构、节点配置与变量引用"""
+    name: str = Field(..., min_length=1, max_length=200)
+    description: Optional[str] = None
+    graph: Dict[str, Any]
+    max_concurrency: Optional[int] = Field(None, ge=1, le=1024, description="同时执行的节点数上限, 为空时使用全局配置")
+
+    @field_validator("graph")
+    @classmethod
+    def check_graph(cls, v):
+        return _check_graph(v)
+
+class WorkflowUpdate(BaseModel):
+    name: Optional[str] = Field(None, min_length=1, max_length=200)
+    description: Optional[str] = None
+    graph: Optional[Dict[str, Any]] = None
+    max_concurrency: Optional[int] = Field(None, ge=1, le=1024)
+
+    @field_validator("graph")
+    @classmethod
+    def check_graph(cls, v):
+        return _check_graph(v)
+
+class WorkflowResponse(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    graph: Dict[str, Any]
+    max_concurrency: Optional[int] = None
+    created_at: Any
+    updated_at: Any
+
+    model_config = ConfigDict(from_attributes=True)
+
+class WorkflowSummary(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    node_count: int
+    max_concurrency: Optional[int] = None
+    updated_at: Any
+
+class GraphValidateRequest(BaseModel):
+    graph: Dict[str, Any]
+
+class GraphPlanResponse(BaseModel):
+    """levels: 按依赖深度分层的节点, 同一层的节点互不依赖, 可以并行执行"""
+    node_count: int
+    levels: List[List[str]]
+
+class NodeTypeResponse(BaseModel):
+    type: str
+    container: bool
+    requires_body: bool
+    streams: bool = False  # 有流式输出, 可以连出 "stream" 连线
+    description: Optional[str] = None
+
+class WorkflowRunRequest(BaseModel):
+    inputs: Dict[str, Any] = Field({}, description="运行输入, 节点中以 {{inputs.x}} 引用")
+
+class WorkflowRunAccepted(BaseModel):
+    run_id: int
+    job_id: int
+    status: WorkflowRunStatus
+    status_url: str
+
+class WorkflowNodeRunResponse(BaseModel):
+    node_id: str
+    node_type: str
+    scope: Optional[str] = None  # 循环体内的节点所在的循环与轮次
+    status: str
+    started_at: Any | None = None
+    finished_at: Any | None = None
+    wait_seconds: Optional[float] = None  # 等待并发名额的时间
+    elapsed_seconds: Optional[float] = None
+    detail: Dict[str, Any] = {}
+    error: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class WorkflowRunResponse(BaseModel):
+    id: int
+    workflow_id: int
+    job_id: Optional[int] = None
+    status: WorkflowRunStatus
+    inputs: Dict[str, Any]
+    outputs: Optional[Any] = None
+    error: Optional[Dict[str, Any]] = None  # {node, scope, error}
+    created_at: Any
+    started_at: Any | None = None
+    finished_at: Any | None = None
+    elapsed_seconds: Optional[float] = None
+    nodes: Optional[List[WorkflowNodeRunResponse]] = None
+
+class WorkflowRunListResponse(BaseModel):
+    items: List[WorkflowRunResponse]
@@ -0,0 +1,10 @@
+"""
+性能基准测试 (DDL 生成 / 元数据接口 / 发布与同步 / 写入吞吐)。
+
+需要本地 Postgres, 连接参数与应用相同 (POSTGRES_* 环境变量或 .env), 建议使用单独的数据库:
+    cd backend
+    POSTGRES_DB=quantflow_bench python -m benchmarks.run --out benchmarks/results/base.json
+    POSTGRES_DB=quantflow_bench python -m benchmarks.run --baseline benchmarks/results/base.json
+
+基准数据写入 code 为 bench 的分类, 物理表名以 bench_ 开头, 运行结束后清理 (--keep 保留以便重复运行)。
+"""
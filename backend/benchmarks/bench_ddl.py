@@ -0,0 +1,67 @@
+"""
+DDLGenerator: 建表 / 分区 / 同步 SQL 的生成耗时 (纯 Python, 不访问数据库)。
+"""
+from datetime import date, timedelta
+from typing import List
+
+from app.db.ddl_generator import DDLGenerator
+
+from benchmarks.core import BenchContext, Measurement, latency, time_sync
+from benchmarks.dataset import wide_columns
+
+
+def _db_columns(columns):
+    """模拟 Inspector / 目录快照返回的列 (类型为 SQLAlchemy 类型对象)"""
+    return [
+        {"name": c["name"], "type": DDLGenerator._parse_type(c["type"]), "comment": c.get("comment") or None}
+        for c in columns
+    ]
+
+
+async def run(ctx: BenchContext) -> List[Measurement]:
+    n = ctx.options["columns"]
+    repeat = ctx.repeat * 10
+    columns = wide_columns(n, ctx.seed)
+    results = []
+
+    results.append(latency(
+        f"ddl.create_table_sqls[cols={n}]",
+        time_sync(lambda: DDLGenerator.generate_create_table_sqls("bench_ddl", "benchmark", columns), repeat),
+        columns=n,
+    ))
+
+    partition = {
+        "key": "trade_date", "strategy": "range", "interval": "day", "premake": 30,
+        "start": (date.today() - timedelta(days=365)).isoformat(),
+    }
+    results.append(latency(
+        f"ddl.create_table_sqls[cols={n},partitions=day]",
+        time_sync(lambda: DDLGenerator.generate_create_table_sqls("bench_ddl", "benchmark", columns, partition), repeat),
+        columns=n, partitions=len(DDLGenerator.generate_partition_sqls("bench_ddl", partition)),
+    ))
+
+    # 同步: 10% 的列改注释, 新增与删除各 5% 的列
+    db_columns = _db_columns(columns)
+    step = 10
+    changed = [
+        {**c, "comment": f"{c['comment']} (v2)"} if i % step == 0 and not c["is_pk"] else c
+        for i, c in enumerate(columns)
+        if not (i % 20 == 1 and not c["is_pk"])
+    ]
+    changed += [{"name": f"n{i:03d}", "type": "NUMERIC(18, 4)", "is_pk": False, "comment": ""} for i in range(n // 20)]
+    results.append(latency(
+        f"ddl.sync_sqls[cols={n}]",
+        time_sync(lambda: DDLGenerator.generate_sync_sqls("bench_ddl", db_columns, changed), repeat),
+        columns=n, statements=len(DDLGenerator.generate_sync_sqls("bench_ddl", db_columns, changed)),
+    ))
+    results.append(latency(
+        f"ddl.detect_type_changes[cols={n}]",
+        time_sync(lambda: DDLGenerator.detect_type_changes(db_columns, changed), repeat),
+        columns=n,
+    ))
+    results.append(latency(
+        f"ddl.validate_schema[cols={n}]",
+        time_sync(lambda: DDLGenerator.validate_schema("bench_ddl", columns, [], partition), repeat),
+        columns=n,
+    ))
+    return results
@@ -0,0 +1,57 @@
+"""
+写入吞吐 (行/秒): CSV / NDJSON 的 COPY 写入与 upsert 合并, 经由 POST /data-tables/{id}/rows。
+"""
+import csv
+import io
+import json
+import time
+from typing import List
+
+from app.db.session import AsyncSessionLocal
+
+from benchmarks.core import BenchContext, Measurement, throughput
+from benchmarks.dataset import fresh_table, ohlcv_columns, ohlcv_csv
+
+
+def _to_ndjson(body: bytes) -> bytes:
+    rows = csv.DictReader(io.StringIO(body.decode()))
+    return ("\n".join(json.dumps(r) for r in rows) + "\n").encode()
+
+
+async def run(ctx: BenchContext) -> List[Measurement]:
+    client = ctx.client
+    rows = ctx.options["ingest_rows"]
+    table_name = "bench_ingest"
+    async with AsyncSessionLocal() as session:
+        table_id = await fresh_table(session, client, ctx.category_id, table_name, ohlcv_columns())
+    (await client.post(f"/api/v1/data-tables/{table_id}/publish")).raise_for_status()
+
+    async def measure(body: bytes, content_type: str, **params) -> float:
+        started = time.perf_counter()
+        response = await client.post(
+            f"/api/v1/data-tables/{table_id}/rows", params=params, content=body,
+            headers={"content-type": content_type},
+        )
+        elapsed = time.perf_counter() - started
+        response.raise_for_status()
+        return rows / elapsed
+
+    # 请求体在计时之外生成; 每轮使用新的主键区间
+    offset = 0
+    samples = {"csv": [], "ndjson": [], "upsert": []}
+    for _ in range(ctx.repeat):
+        samples["csv"].append(await measure(ohlcv_csv(rows, offset), "text/csv"))
+        offset += rows
+    for _ in range(ctx.repeat):
+        samples["ndjson"].append(await measure(_to_ndjson(ohlcv_csv(rows, offset)), "application/x-ndjson"))
+        offset += rows
+    # upsert: 一半主键已存在 (更新), 一半为新行
+    for _ in range(ctx.repeat):
+        samples["upsert"].append(await measure(ohlcv_csv(rows, offset - rows // 2), "text/csv", mode="upsert"))
+        offset += rows - rows // 2
+
+    return [
+        throughput(f"ingest.insert_csv[rows={rows}]", samples["csv"], rows=rows),
+        throughput(f"ingest.insert_ndjson[rows={rows}]", samples["ndjson"], rows=rows),
+        throughput(f"ingest.upsert_csv[rows={rows},overlap=0.5]", samples["upsert"], rows=rows),
+    ]
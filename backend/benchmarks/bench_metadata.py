@@ -0,0 +1,77 @@
+"""
+元数据接口: 表列表在不同页深度 (offset / cursor) 与搜索条件下的延迟。
+
+每个请求带不同的 _bench 参数, 绕过响应缓存, 测量的是查询与序列化的真实开销。
+"""
+from typing import Any, Dict, List
+
+from benchmarks.core import BenchContext, Measurement, latency, time_async
+
+PAGE_SIZE = 20
+SEARCH_TERMS = ["dividend", "north flow", "zzz_no_match"]
+
+
+async def run(ctx: BenchContext) -> List[Measurement]:
+    client = ctx.client
+    total = ctx.options["configs"]
+    base = {"category_id": ctx.category_id, "page_size": PAGE_SIZE}
+    results = []
+
+    def request(params: Dict[str, Any]):
+        async def call(i: int):
+            response = await client.get("/api/v1/data-tables", params={**base, **params, "_bench": i})
+            response.raise_for_status()
+            return response.json()
+        return call
+
+    offsets = sorted({o for o in (0, 1000, 10000, total - PAGE_SIZE) if 0 <= o <= max(total - PAGE_SIZE, 0)})
+    for offset in offsets:
+        params = {"page": offset // PAGE_SIZE + 1, "count": "estimate"}
+        results.append(latency(
+            f"metadata.list[offset={offset}]",
+            await time_async(request(params), ctx.repeat),
+            offset=offset, configs=total,
+        ))
+
+    for mode in ("exact", "estimate"):
+        results.append(latency(
+            f"metadata.list[count={mode}]",
+            await time_async(request({"count": mode}), ctx.repeat),
+            configs=total,
+        ))
+
+    # 列表页只需要名称与状态: 投影前后的对比 (PAGE_SIZE * 5 行, 放大 JSONB 列的开销)
+    for fields in (None, "name,table_name,status"):
+        params = {"page_size": PAGE_SIZE * 5, "count": "estimate", **({"fields": fields} if fields else {})}
+        results.append(latency(
+            f"metadata.list[fields={fields or 'all'}]",
+            await time_async(request(params), ctx.repeat),
+            page_size=PAGE_SIZE * 5,
+        ))
+
+    # cursor 分页: 定位到最后一页附近, 与同深度的 offset 分页对比
+    deep = await request({"page": max(total // PAGE_SIZE - 1, 1), "count": "estimate"})(0)
+    cursor = deep["items"][0]["id"] + 1 if deep["items"] else None
+    if cursor is not None:
+        results.append(latency(
+            "metadata.list[cursor=deep]",
+            await time_async(request({"cursor": cursor, "count": "estimate"}), ctx.repeat),
+            configs=total,
+        ))
+
+    for term in SEARCH_TERMS:
+        results.append(latency(
+            f"metadata.search[{term}]",
+            await time_async(request({"search": term, "count": "exact"}), ctx.repeat),
+            configs=total,
+        ))
+
+    first = await request({"count": "estimate"})(0)
+    if first["items"]:
+        table_id = first["items"][0]["id"]
+
+        async def get_table(i: int):
+            (await client.get(f"/api/v1/data-tables/{table_id}", params={"_bench": i})).raise_for_status()
+
+        results.append(latency("metadata.get_table", await time_async(get_table, ctx.repeat)))
+    return results
@@ -0,0 +1,86 @@
+"""
+进程调度器: 大数组传给工作进程的开销 (pickle 与共享内存) 及 process 节点按标的分组计算因子的耗时。
+"""
+import asyncio
+from typing import List
+
+import numpy as np
+
+from app.engine import GraphRunner, load_graph
+from app.engine.process_scheduler import get_process_pool, process_workers
+from app.engine.shared_data import SharedSegments, pack, unpack
+
+from benchmarks.core import BenchContext, Measurement, latency, time_async
+
+DAYS = 250
+
+
+def _column_means(frame: np.ndarray) -> float:
+    return float(frame.mean(axis=1).sum())
+
+
+def _column_means_shared(packed) -> float:
+    segments = SharedSegments()
+    frame = unpack(packed, segments)
+    try:
+        return _column_means(frame)
+    finally:
+        del frame
+        segments.close()
+
+
+def prices(symbols: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).random((symbols, DAYS)) + 1
+
+
+def momentum(frame: np.ndarray, rows: List[int]) -> np.ndarray:
+    """工作进程中的因子计算 (frame 为共享内存视图, rows 为本任务的连续行号)"""
+    window = frame[rows[0]:rows[-1] + 1]
+    return window[:, -1] / window[:, -20:].mean(axis=1) - 1
+
+
+async def run(ctx: BenchContext) -> List[Measurement]:
+    symbols = ctx.options["symbols"]
+    frame = prices(symbols, ctx.seed)
+    params = {"symbols": symbols, "days": DAYS, "mbytes": round(frame.nbytes / 2**20, 1)}
+    pool = get_process_pool()
+    loop = asyncio.get_running_loop()
+    results = []
+
+    async def pickled(_):
+        await loop.run_in_executor(pool, _column_means, frame)
+
+    results.append(latency(f"process.handoff_pickle[symbols={symbols}]", await time_async(pickled, ctx.repeat), **params))
+
+    async def shared(_):
+        segments = SharedSegments()
+        try:
+            packed = pack(frame, segments, min_bytes=0)
+            await loop.run_in_executor(pool, _column_means_shared, packed)
+        finally:
+            segments.unlink()
+            segments.close()
+
+    results.append(latency(f"process.handoff_shared[symbols={symbols}]", await time_async(shared, ctx.repeat), **params))
+
+    chunk = -(-symbols // process_workers())
+    graph = load_graph({"nodes": [
+        {"id": "frame", "type": "function", "config": {
+            "callable": f"{__name__}:prices", "args": {"symbols": symbols, "seed": ctx.seed},
+        }},
+        {"id": "factors", "type": "process", "config": {"items": list(range(symbols)), "chunk_size": chunk}, "body": {
+            "nodes": [{"id": "momentum", "type": "function", "config": {
+                "callable": f"{__name__}:momentum", "args": {"frame": "{{frame}}", "rows": "{{loop.item}}"},
+            }}],
+        }},
+    ], "edges": [{"source": "frame", "target": "factors"}]})
+
+    async def node(_):
+        result = await GraphRunner(graph).run()
+        assert result.status == "succeeded", result.error
+
+    results.append(latency(
+        f"process.node[symbols={symbols}]", await time_async(node, ctx.repeat),
+        tasks=-(-symbols // chunk), workers=process_workers(), **params,
+    ))
+    return results
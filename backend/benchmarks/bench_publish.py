@@ -0,0 +1,78 @@
+"""
+发布 (建表) 与同步 (加列 + 重建索引) 耗时随表数据量的变化。
+"""
+from typing import List
+
+from sqlalchemy import text
+
+from app.db.session import AsyncSessionLocal, engine
+
+from benchmarks.core import BenchContext, Measurement, latency, time_async
+from benchmarks.dataset import fresh_table, wide_columns
+
+_FILLABLE = ("BIGINT", "INT", "NUMERIC(18, 4)", "NUMERIC(10, 2)", "DOUBLE PRECISION")
+
+
+async def _fill(table_name: str, rows: int, numeric_columns: List[str]):
+    """生成 rows 行: 主键 + 数值列, 其余列为 NULL"""
+    if rows <= 0:
+        return
+    cols = ", ".join(numeric_columns)
+    values = ", ".join(f"(g * {i + 7}) % 1000" for i in range(len(numeric_columns)))
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            f"INSERT INTO {table_name} (ts_code, trade_date, {cols}) "
+            f"SELECT lpad((g % 500)::text, 6, '0') || '.SZ', date '2000-01-03' + g / 500, {values} "
+            f"FROM generate_series(0, :rows - 1) g"
+        ), {"rows": rows})
+        await conn.execute(text(f"ANALYZE {table_name}"))
+
+
+async def run(ctx: BenchContext) -> List[Measurement]:
+    client = ctx.client
+    n = ctx.options["columns"]
+    columns = wide_columns(n, ctx.seed)
+    numeric_columns = [c["name"] for c in columns if c["type"] in _FILLABLE][:10]
+    results = []
+    create_samples = []
+
+    for size in ctx.options["table_sizes"]:
+        table_name = f"bench_pub_{size}"
+        async with AsyncSessionLocal() as session:
+            table_id = await fresh_table(session, client, ctx.category_id, table_name, columns)
+
+        async def publish(_: int):
+            response = await client.post(f"/api/v1/data-tables/{table_id}/publish")
+            response.raise_for_status()
+
+        create_samples += await time_async(publish, 1, warmup=0)
+        await _fill(table_name, size, numeric_columns)
+
+        # 每轮新增一列并把索引换到另一列: ADD COLUMN + DROP/CREATE INDEX CONCURRENTLY
+        config = (await client.get(f"/api/v1/data-tables/{table_id}", params={"_bench": "config"})).json()
+
+        async def sync(i: int):
+            round_columns = columns + [
+                {"name": f"s{j:03d}", "type": "BIGINT", "is_pk": False, "comment": ""} for j in range(i + 2)
+            ]
+            index_column = numeric_columns[i % len(numeric_columns)]
+            response = await client.put(f"/api/v1/data-tables/{table_id}", json={
+                "name": config["name"], "table_name": table_name, "category_id": ctx.category_id,
+                "description": config["description"], "columns_schema": round_columns,
+                "indexes_schema": [{"name": f"idx_{index_column}", "columns": [index_column]}],
+            })
+            response.raise_for_status()
+
+        async def put_and_publish(i: int):
+            await sync(i)
+            await publish(i)
+
+        # PUT 也计入耗时, 占比很小 (不访问物理表)
+        results.append(latency(
+            f"publish.sync[cols={n},rows={size}]",
+            await time_async(put_and_publish, ctx.repeat),
+            columns=n, rows=size,
+        ))
+
+    results.append(latency(f"publish.create[cols={n}]", create_samples, columns=n))
+    return results
@@ -0,0 +1,135 @@
+"""
+计时、结果汇总与回归比较。
+
+结果文件格式:
+    {"meta": {...}, "results": {"<name>": {"unit", "better", "value", "min", "max", "mean", "p95", "runs", "params"}}}
+value 为样本中位数; better 表示数值越低 (耗时) 还是越高 (吞吐) 越好。
+"""
+import json
+import statistics
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+@dataclass
+class BenchContext:
+    client: Any  # 绑定到应用的 httpx.AsyncClient (进程内 ASGI, 包含中间件与序列化开销)
+    category_id: int
+    seed: int
+    repeat: int
+    options: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Measurement:
+    name: str
+    unit: str
+    better: str  # lower | higher
+    samples: List[float]
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        return {
+            "unit": self.unit,
+            "better": self.better,
+            "value": round(statistics.median(ordered), 4),
+            "min": round(ordered[0], 4),
+            "max": round(ordered[-1], 4),
+            "mean": round(statistics.fmean(ordered), 4),
+            "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+            "runs": len(ordered),
+            "params": self.params,
+        }
+
+
+def time_sync(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> List[float]:
+    """同步函数的耗时样本 (毫秒)"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+async def time_async(fn: Callable[[int], Awaitable[Any]], repeat: int, warmup: int = 1) -> List[float]:
+    """异步函数的耗时样本 (毫秒); fn 接收轮次序号, 便于每轮使用不同的参数"""
+    for i in range(warmup):
+        await fn(-1 - i)
+    samples = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        await fn(i)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def latency(name: str, samples: List[float], **params) -> Measurement:
+    return Measurement(name, "ms", "lower", samples, params)
+
+
+def throughput(name: str, samples: List[float], **params) -> Measurement:
+    return Measurement(name, "rows/s", "higher", samples, params)
+
+
+def save_results(path: Path, meta: Dict[str, Any], measurements: List[Measurement]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"meta": meta, "results": {m.name: m.summary() for m in measurements}}
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2, default=str))
+
+
+def load_results(path: Path) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text())
+
+
+def threshold_for(name: str, default: float, overrides: Optional[Dict[str, float]] = None) -> float:
+    """按名称前缀匹配的阈值, 最长前缀优先"""
+    matches = [prefix for prefix in (overrides or {}) if name.startswith(prefix)]
+    return overrides[max(matches, key=len)] if matches else default
+
+
+def compare_results(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = 0.2,
+    overrides: Optional[Dict[str, float]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    对比两次运行中同名的结果, change 为相对基线的变化比例 (正数表示变差)。
+    变差超过阈值的记为 regressed; 只在一侧出现的结果不参与比较。
+    """
+    rows = []
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base or not base["value"] or base["unit"] != cur["unit"]:
+            continue
+        change = (cur["value"] - base["value"]) / base["value"]
+        if cur["better"] == "higher":
+            change = -change
+        limit = threshold_for(name, threshold, overrides)
+        rows.append({
+            "name": name,
+            "unit": cur["unit"],
+            "baseline": base["value"],
+            "current": cur["value"],
+            "change": round(change, 4),
+            "threshold": limit,
+            "regressed": change > limit,
+        })
+    return rows
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    width = max([len(r["name"]) for r in rows] + [4])
+    lines = [f"{'name':<{width}}  {'baseline':>12}  {'current':>12}  {'change':>8}"]
+    for r in rows:
+        flag = "  REGRESSED" if r["regressed"] else ""
+        lines.append(
+            f"{r['name']:<{width}}  {r['baseline']:>12.3f}  {r['current']:>12.3f}  {r['change'] * 100:>7.1f}%{flag}"
+        )
+    return "\n".join(lines)
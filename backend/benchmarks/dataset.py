@@ -0,0 +1,155 @@
+"""
+基准数据生成: 可复现 (按 seed) 的表配置与宽表定义。
+"""
+import random
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.data_table import DataTableConfig, TableCategory, TableStatus
+
+BENCH_CATEGORY = "bench"
+TABLE_PREFIX = "bench_"
+
+_WORDS = [
+    "stock", "daily", "minute", "bar", "tick", "fund", "index", "option", "future", "bond", "factor", "flow",
+    "north", "margin", "holder", "dividend", "income", "balance", "cash", "forecast", "industry", "concept",
+    "limit", "block", "trade", "rating", "macro", "rate", "shibor", "cpi", "ppi", "pmi", "money", "supply",
+]
+COLUMN_TYPES = [
+    "NUMERIC(18, 4)", "NUMERIC(10, 2)", "BIGINT", "INT", "DOUBLE PRECISION", "VARCHAR(32)", "TEXT",
+    "DATE", "TIMESTAMP", "BOOLEAN", "JSONB",
+]
+
+
+def wide_columns(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """(ts_code, trade_date) 主键 + count-2 个随机类型的列"""
+    rng = random.Random(seed)
+    columns = [
+        {"name": "ts_code", "type": "VARCHAR(20)", "is_pk": True, "comment": "security code"},
+        {"name": "trade_date", "type": "DATE", "is_pk": True, "comment": "trade date"},
+    ]
+    for i in range(1, count - 1):
+        columns.append({"name": f"c{i:03d}", "type": rng.choice(COLUMN_TYPES), "is_pk": False, "comment": f"field {i}"})
+    return columns
+
+
+def ohlcv_columns() -> List[Dict[str, Any]]:
+    columns = [
+        {"name": "ts_code", "type": "VARCHAR(20)", "is_pk": True, "comment": "security code"},
+        {"name": "trade_date", "type": "DATE", "is_pk": True, "comment": "trade date"},
+    ]
+    for name in ("open", "high", "low", "close"):
+        columns.append({"name": name, "type": "NUMERIC(10, 2)", "is_pk": False, "comment": ""})
+    columns.append({"name": "vol", "type": "BIGINT", "is_pk": False, "comment": ""})
+    columns.append({"name": "amount", "type": "NUMERIC(18, 4)", "is_pk": False, "comment": ""})
+    return columns
+
+
+def ohlcv_csv(rows: int, offset: int = 0, symbols: int = 500) -> bytes:
+    """rows 行日线 CSV, 行号 offset 起; 相同行号生成相同主键 (用于 upsert 重叠)"""
+    start = date(2000, 1, 3)
+    lines = ["ts_code,trade_date,open,high,low,close,vol,amount"]
+    for i in range(offset, offset + rows):
+        px = 10 + (i * 7919 % 1000) / 100
+        lines.append(
+            f"{i % symbols:06d}.SZ,{start + timedelta(days=i // symbols)},"
+            f"{px:.2f},{px + 0.5:.2f},{px - 0.5:.2f},{px + 0.1:.2f},{1000 + i % 977},{px * 1000:.4f}"
+        )
+    return ("\n".join(lines) + "\n").encode()
+
+
+def config_row(index: int, category_id: int, seed: int) -> Dict[str, Any]:
+    rng = random.Random(f"{seed}:{index}")
+    words = rng.sample(_WORDS, 3)
+    columns = wide_columns(rng.randint(5, 40), seed=index)
+    data_cols = [c["name"] for c in columns if not c["is_pk"]]
+    indexes = [
+        {"name": f"idx_{j}", "columns": rng.sample(data_cols, min(len(data_cols), rng.randint(1, 2))), "unique": False}
+        for j in range(rng.randint(0, 2))
+    ]
+    return {
+        "category_id": category_id,
+        "name": " ".join(words).title(),
+        "table_name": f"{TABLE_PREFIX}{index:06d}_{'_'.join(words)}",
+        "description": f"{' '.join(rng.sample(_WORDS, 6))} ({index})",
+        "status": TableStatus.DRAFT,
+        "columns_schema": columns,
+        "indexes_schema": indexes,
+    }
+
+
+def config_rows(count: int, category_id: int, seed: int, start: int = 0) -> Iterator[Dict[str, Any]]:
+    for index in range(start, count):
+        yield config_row(index, category_id, seed)
+
+
+async def ensure_category(session: AsyncSession) -> int:
+    stmt = select(TableCategory.id).where(TableCategory.code == BENCH_CATEGORY)
+    category_id = (await session.execute(stmt)).scalar_one_or_none()
+    if category_id is None:
+        category = TableCategory(code=BENCH_CATEGORY, name="Benchmark", description="generated by benchmarks")
+        session.add(category)
+        await session.flush()
+        category_id = category.id
+    await session.commit()
+    return category_id
+
+
+async def seed_configs(session: AsyncSession, category_id: int, count: int, seed: int, batch: int = 1000) -> int:
+    """
+    补齐 count 条表配置 (已存在的不重复生成), 返回新插入的数量。
+    插入后 ANALYZE, 使查询计划与行数估计基于最新统计。
+    """
+    stmt = select(func.count()).select_from(DataTableConfig).where(
+        DataTableConfig.category_id == category_id, DataTableConfig.table_name.like(f"{TABLE_PREFIX}0%")
+    )
+    existing = (await session.execute(stmt)).scalar()
+    pending = []
+    inserted = 0
+    for row in config_rows(count, category_id, seed, start=existing):
+        pending.append(row)
+        if len(pending) >= batch:
+            await session.execute(insert(DataTableConfig), pending)
+            inserted += len(pending)
+            pending = []
+    if pending:
+        await session.execute(insert(DataTableConfig), pending)
+        inserted += len(pending)
+    await session.commit()
+    if inserted:
+        await session.execute(text("ANALYZE data_table_configs"))
+        await session.commit()
+    return inserted
+
+
+async def cleanup(session: AsyncSession, category_id: int):
+    """删除基准产生的物理表、表配置与分类"""
+    tables = (await session.execute(select(DataTableConfig.table_name).where(
+        DataTableConfig.category_id == category_id, DataTableConfig.status == TableStatus.CREATED
+    ))).scalars().all()
+    for table_name in tables:
+        await session.execute(text(f"DROP TABLE IF EXISTS {table_name} CASCADE"))
+    await session.execute(delete(DataTableConfig).where(DataTableConfig.category_id == category_id))
+    await session.execute(delete(TableCategory).where(TableCategory.id == category_id))
+    await session.commit()
+
+
+async def fresh_table(
+    session: AsyncSession, client, category_id: int, table_name: str, columns: List[Dict[str, Any]]
+) -> int:
+    """通过接口创建表配置 (同名的旧配置与物理表先删除), 返回配置 id"""
+    stmt = select(DataTableConfig.id).where(DataTableConfig.table_name == table_name)
+    existing = (await session.execute(stmt)).scalar_one_or_none()
+    await session.rollback()
+    if existing is not None:
+        (await client.delete(f"/api/v1/data-tables/{existing}")).raise_for_status()
+    response = await client.post("/api/v1/data-tables", json={
+        "name": table_name, "table_name": table_name, "category_id": category_id,
+        "description": "benchmark", "columns_schema": columns, "indexes_schema": [],
+    })
+    response.raise_for_status()
+    return response.json()["id"]
+
@@ -0,0 +1,153 @@
+"""
+运行基准并保存 JSON 结果, 可选与基线比较 (变差超过阈值时退出码为 1)。
+
+    python -m benchmarks.run [--suite ddl,metadata,publish,ingest,process] [--quick]
+                             [--out benchmarks/results/run.json]
+                             [--baseline benchmarks/results/base.json --threshold 0.2 --threshold-override publish.=0.5]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+# process 基准的 function 节点调用 benchmarks 中的函数; 在导入 app 之前设置, 工作进程经环境变量继承
+os.environ.setdefault("WORKFLOW_CALLABLE_MODULES", "benchmarks")
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+
+from app.db.session import AsyncSessionLocal, engine
+from app.main import app
+
+from benchmarks import bench_ddl, bench_ingest, bench_metadata, bench_process, bench_publish
+from benchmarks.core import BenchContext, compare_results, format_comparison, load_results, save_results
+from benchmarks.dataset import cleanup, ensure_category, seed_configs
+
+SUITES = {
+    "ddl": bench_ddl.run,
+    "metadata": bench_metadata.run,
+    "publish": bench_publish.run,
+    "ingest": bench_ingest.run,
+    "process": bench_process.run,
+}
+
+DEFAULTS = {"configs": 50_000, "columns": 300, "table_sizes": "0,100000,1000000", "ingest_rows": 100_000, "symbols": 5_000, "repeat": 5}
+QUICK = {"configs": 2_000, "columns": 60, "table_sizes": "0,10000", "ingest_rows": 10_000, "symbols": 500, "repeat": 3}
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="QuantFlow backend benchmarks")
+    parser.add_argument("--suite", default=",".join(SUITES), help="逗号分隔: " + ", ".join(SUITES))
+    parser.add_argument("--quick", action="store_true", help="小规模数据, 用于快速检查")
+    parser.add_argument("--configs", type=int, help=f"表配置数量 (默认 {DEFAULTS['configs']})")
+    parser.add_argument("--columns", type=int, help=f"宽表列数 (默认 {DEFAULTS['columns']})")
+    parser.add_argument("--table-sizes", help=f"发布/同步测试的表行数 (默认 {DEFAULTS['table_sizes']})")
+    parser.add_argument("--ingest-rows", type=int, help=f"每次写入的行数 (默认 {DEFAULTS['ingest_rows']})")
+    parser.add_argument("--symbols", type=int, help=f"process 基准的标的数 (默认 {DEFAULTS['symbols']})")
+    parser.add_argument("--repeat", type=int, help=f"每项的重复次数 (默认 {DEFAULTS['repeat']})")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", type=Path, help="结果文件, 默认 benchmarks/results/<时间>.json")
+    parser.add_argument("--baseline", type=Path, help="对比的基线结果文件")
+    parser.add_argument("--threshold", type=float, default=0.2, help="允许的变差比例 (默认 0.2 即 20%%)")
+    parser.add_argument(
+        "--threshold-override", action="append", default=[], metavar="PREFIX=RATIO",
+        help="按结果名前缀覆盖阈值, e.g. publish.=0.5, 可重复",
+    )
+    parser.add_argument("--keep", action="store_true", help="保留基准数据 (重复运行时跳过生成)")
+    parser.add_argument("--verbose", action="store_true", help="输出应用日志 (慢 SQL 等)")
+    args = parser.parse_args(argv)
+
+    preset = QUICK if args.quick else DEFAULTS
+    for key, value in preset.items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+    args.table_sizes = [int(s) for s in str(args.table_sizes).split(",") if s.strip()]
+    args.suites = [s.strip() for s in args.suite.split(",") if s.strip()]
+    unknown = [s for s in args.suites if s not in SUITES]
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(unknown)}")
+    try:
+        args.overrides = {k: float(v) for k, v in (o.split("=", 1) for o in args.threshold_override)}
+    except ValueError:
+        parser.error("--threshold-override expects PREFIX=RATIO")
+    return args
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> int:
+    options = {
+        "configs": args.configs, "columns": args.columns,
+        "table_sizes": args.table_sizes, "ingest_rows": args.ingest_rows, "symbols": args.symbols,
+    }
+    async with AsyncSessionLocal() as session:
+        server_version = (await session.execute(text("SHOW server_version"))).scalar()
+        category_id = await ensure_category(session)
+        if "metadata" in args.suites:
+            inserted = await seed_configs(session, category_id, args.configs, args.seed)
+            print(f"seeded {inserted} table configs ({args.configs} total)")
+
+    meta = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "postgres": server_version,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "options": options,
+        "suites": args.suites,
+    }
+
+    measurements = []
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+            ctx = BenchContext(client=client, category_id=category_id, seed=args.seed, repeat=args.repeat, options=options)
+            for suite in args.suites:
+                print(f"== {suite}")
+                for m in await SUITES[suite](ctx):
+                    summary = m.summary()
+                    print(f"  {m.name:<48} {summary['value']:>14.3f} {m.unit:<6} (min {summary['min']:.3f}, p95 {summary['p95']:.3f})")
+                    measurements.append(m)
+    finally:
+        if not args.keep:
+            async with AsyncSessionLocal() as session:
+                await cleanup(session, category_id)
+        await engine.dispose()
+
+    out = args.out or RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    save_results(out, meta, measurements)
+    print(f"results saved to {out}")
+
+    if args.baseline:
+        rows = compare_results(load_results(args.baseline), load_results(out), args.threshold, args.overrides)
+        print(format_comparison(rows))
+        regressed = [r["name"] for r in rows if r["regressed"]]
+        if regressed:
+            print(f"{len(regressed)} regression(s) beyond threshold: {', '.join(regressed)}")
+            return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if not args.verbose:
+        logging.getLogger("app").setLevel(logging.ERROR)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
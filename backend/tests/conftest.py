@@ -1,6 +1,19 @@
+import os
 
 import pytest
 
+# function 节点只能调用 WORKFLOW_CALLABLE_MODULES 中的模块; 经环境变量设置, process 节点的工作进程也能读取
+os.environ.setdefault("WORKFLOW_CALLABLE_MODULES", "tests")
+
 @pytest.fixture
 def anyio_backend():
     return 'asyncio'
+
+
+
+@pytest.fixture(autouse=True)
+def response_cache_backend():
+    # 每个测试使用独立的进程内缓存
+    from app.core.cache import MemoryCacheBackend, response_cache
+    response_cache.backend = MemoryCacheBackend(max_entries=128, ttl_seconds=60)
+    yield response_cache.backend
@@ -0,0 +1,165 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app.db.aggregation import (
+    AggregateError, Bucket, build_aggregate_query, build_aggregate_spec, parse_aggregation, rollup_covers
+)
+
+COLUMNS = [
+    {"name": "ts_code", "type": "VARCHAR(20)", "is_pk": True, "comment": ""},
+    {"name": "trade_time", "type": "TIMESTAMP", "is_pk": True, "comment": ""},
+    {"name": "open", "type": "NUMERIC(10, 2)", "comment": ""},
+    {"name": "close", "type": "NUMERIC(10, 2)", "comment": ""},
+    {"name": "vol", "type": "BIGINT", "comment": ""},
+    {"name": "extra", "type": "JSONB", "comment": ""},
+]
+
+OHLCV = {"open": "first", "close": "last", "vol": "sum", "vwap": "vwap(close, vol)"}
+
+
+def _spec(bucket="5 minutes", aggregations=OHLCV, **kwargs):
+    return build_aggregate_spec("bars_1min", COLUMNS, "trade_time", bucket, aggregations, **kwargs)
+
+
+def test_bucket_parse_and_alignment():
+    assert str(Bucket.parse("5 minutes")) == "5 minute"
+    assert str(Bucket.parse("1h")) == "1 hour"
+    assert str(Bucket.parse("month")) == "1 month"
+    with pytest.raises(AggregateError, match="width of 1"):
+        Bucket.parse("3 months")
+    assert str(Bucket.parse("30s")) == "30 second"
+    assert str(Bucket.parse("15 mins")) == "15 minute"
+    assert str(Bucket.parse("2 Weeks")) == "2 week"
+    for bad in ("5 fortnights", "5ms", "5 hs", "2 minutesss"):
+        with pytest.raises(AggregateError, match="Unknown bucket unit"):
+            Bucket.parse(bad)
+    with pytest.raises(AggregateError, match="Invalid bucket"):
+        Bucket.parse("-5 minutes")
+
+    five = Bucket.parse("5 minutes")
+    ts = datetime(2024, 1, 2, 9, 33, 10)
+    assert five.floor(ts) == datetime(2024, 1, 2, 9, 30)
+    assert five.ceil(ts) == datetime(2024, 1, 2, 9, 35)
+    assert five.ceil(datetime(2024, 1, 2, 9, 35)) == datetime(2024, 1, 2, 9, 35)
+    # 周线从周一开始 (2024-01-03 为周三)
+    assert Bucket.parse("1 week").floor(datetime(2024, 1, 3, 12)) == datetime(2024, 1, 1)
+    quarter = Bucket.parse("quarter")
+    assert quarter.floor(datetime(2024, 5, 20)) == datetime(2024, 4, 1)
+    assert quarter.shift(datetime(2024, 1, 1), -1) == datetime(2023, 10, 1)
+
+
+def test_bucket_sql_keeps_column_type():
+    assert Bucket.parse("5 minutes").sql("t", "TIMESTAMP") == (
+        "date_bin(INTERVAL '5 minute', t, TIMESTAMP '2000-01-03 00:00:00')"
+    )
+    assert Bucket.parse("1 day").sql("t", "TIMESTAMPTZ") == (
+        "(date_bin(INTERVAL '1 day', (t AT TIME ZONE 'UTC'), TIMESTAMP '2000-01-03 00:00:00') AT TIME ZONE 'UTC')"
+    )
+    assert Bucket.parse("1 month").sql("d", "DATE") == "(date_trunc('month', d::timestamp))::date"
+    with pytest.raises(AggregateError, match="finer than the DATE column"):
+        Bucket.parse("1 hour").sql("d", "DATE")
+
+
+def test_parse_aggregation():
+    assert parse_aggregation("high", "max").canonical == "max(high)"
+    assert parse_aggregation("hi", "MAX(high)").canonical == "max(high)"
+    assert parse_aggregation("n", "count").canonical == "count(*)"
+    assert parse_aggregation("vwap", "vwap(close, vol)").canonical == "vwap(close, vol)"
+    with pytest.raises(AggregateError, match=r"vwap\(price, volume\)"):
+        parse_aggregation("vwap", "vwap")
+    with pytest.raises(AggregateError, match="expected one of"):
+        parse_aggregation("x", "median")
+
+
+def test_build_spec_validation_and_output_schema():
+    spec = _spec()
+    assert spec.group_by == ["ts_code"]
+    assert [(c["name"], c["type"], c["is_pk"]) for c in spec.output_schema()] == [
+        ("ts_code", "VARCHAR(20)", True),
+        ("trade_time", "TIMESTAMP", True),
+        ("open", "NUMERIC(10, 2)", False),
+        ("close", "NUMERIC(10, 2)", False),
+        ("vol", "BIGINT", False),
+        ("vwap", "DOUBLE PRECISION", False),
+    ]
+    with pytest.raises(AggregateError, match="requires a numeric column"):
+        _spec(aggregations={"x": "sum(extra)"})
+    with pytest.raises(AggregateError, match="Unknown column"):
+        _spec(aggregations={"x": "max(missing)"})
+    with pytest.raises(AggregateError, match="conflicts"):
+        _spec(aggregations={"ts_code": "count"})
+
+
+def test_live_query():
+    query = build_aggregate_query(
+        _spec(), start="2024-01-02 09:30:00", end="2024-01-03", filters={"ts_code": ["000001.SZ", "600000.SH"]}
+    )
+    assert query.sql == (
+        "SELECT ts_code, date_bin(INTERVAL '5 minute', trade_time, TIMESTAMP '2000-01-03 00:00:00') AS trade_time, "
+        "(array_agg(open ORDER BY trade_time))[1] AS open, (array_agg(close ORDER BY trade_time DESC))[1] AS close, "
+        "sum(vol)::bigint AS vol, (sum(close * vol) / NULLIF(sum(vol), 0))::double precision AS vwap "
+        "FROM bars_1min WHERE ts_code = ANY(:f0) AND trade_time >= :t0 AND trade_time < :t1 "
+        "GROUP BY 1, 2 ORDER BY ts_code, trade_time"
+    )
+    assert query.params == {
+        "f0": ["000001.SZ", "600000.SH"],
+        "t0": datetime(2024, 1, 2, 9, 30),
+        "t1": datetime(2024, 1, 3),
+    }
+    assert query.columns == ["ts_code", "trade_time", "open", "close", "vol", "vwap"]
+    with pytest.raises(AggregateError, match="group_by columns"):
+        build_aggregate_query(_spec(), filters={"vol": 1})
+
+
+def test_rollup_query_splits_at_bucket_edges_and_watermark():
+    spec = _spec()
+    query = build_aggregate_query(
+        spec, start="2024-01-02 09:31:00", end="2024-01-02 15:00:00",
+        rollup_table="bars_1min_rollup_5min", watermark=datetime(2024, 1, 2, 14, 0),
+    )
+    parts = query.sql.split(" UNION ALL ")
+    assert len(parts) == 3
+    assert "FROM bars_1min WHERE trade_time >= :t0 AND trade_time < :t1" in parts[0]
+    assert parts[1] == (
+        "(SELECT ts_code, trade_time, open, close, vol, vwap FROM bars_1min_rollup_5min "
+        "WHERE trade_time >= :rollup_lo AND trade_time < :rollup_hi)"
+    )
+    assert "FROM bars_1min WHERE trade_time >= :t2 AND trade_time < :t3" in parts[2]
+    assert query.params == {
+        "t0": datetime(2024, 1, 2, 9, 31),
+        "t1": datetime(2024, 1, 2, 9, 35),
+        "rollup_lo": datetime(2024, 1, 2, 9, 35),
+        "rollup_hi": datetime(2024, 1, 2, 14, 0),
+        "t2": datetime(2024, 1, 2, 14, 0),
+        "t3": datetime(2024, 1, 2, 15, 0),
+    }
+
+    # 区间完全落在水位之后: 只实时聚合
+    query = build_aggregate_query(spec, start="2024-01-02 14:00:00", rollup_table="r", watermark=datetime(2024, 1, 2, 14, 0))
+    assert "UNION ALL" not in query.sql and "FROM bars_1min " in query.sql
+
+
+def test_timestamptz_and_date_bounds():
+    columns = [
+        {"name": "ts_code", "type": "VARCHAR(20)", "is_pk": True, "comment": ""},
+        {"name": "ts", "type": "TIMESTAMPTZ", "is_pk": True, "comment": ""},
+        {"name": "d", "type": "DATE", "comment": ""},
+        {"name": "close", "type": "NUMERIC(10, 2)", "comment": ""},
+    ]
+    spec = build_aggregate_spec("t", columns, "ts", "1 hour", {"close": "last"})
+    query = build_aggregate_query(spec, start="2024-01-02T10:30:00+08:00", rollup_table="r", watermark=datetime(2024, 1, 2, 6))
+    assert query.params["rollup_lo"] == datetime(2024, 1, 2, 3, tzinfo=timezone.utc)
+
+    spec = build_aggregate_spec("t", columns, "d", "1 week", {"close": "last"}, group_by=["ts_code"])
+    query = build_aggregate_query(spec, start="2024-01-03", rollup_table="r", watermark=datetime(2024, 2, 5))
+    assert query.params["rollup_lo"] == date(2024, 1, 8)
+
+
+def test_rollup_covers():
+    rollup = _spec(aggregations={**OHLCV, "high": "max(close)"}).to_params()
+    assert rollup_covers(_spec(), rollup)
+    assert rollup_covers(_spec(aggregations={"close": "last(close)"}), rollup)
+    assert not rollup_covers(_spec(aggregations={"close": "first"}), rollup)
+    assert not rollup_covers(_spec(bucket="15 minutes"), rollup)
+    assert not rollup_covers(_spec(origin=datetime(2024, 1, 1, 9, 30)), rollup)
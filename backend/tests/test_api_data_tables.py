@@ -2,8 +2,10 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock
 from httpx import AsyncClient, ASGITransport
+from sqlalchemy.dialects import postgresql
 from app.main import app
 from app.db.session import get_session
+from app.models.data_table import TableStatus
 
 @pytest.mark.anyio
 async def test_get_categories_empty():
@@ -63,3 +65,124 @@ async def test_create_data_table_endpoint():
     assert response.status_code == 200
     # Verify add was called
     assert mock_session.add.called
+
+@pytest.mark.anyio
+async def test_list_tables_cursor_pagination():
+    rows = [
+        dict(
+            id=i, name=f"t{i}", table_name=f"t{i}", category_id=1, description="", status=TableStatus.DRAFT,
+            last_published_at=None, columns_schema=[], indexes_schema=[], partition_config=None, lifecycle_policy=None,
+            created_at=None, updated_at=None,
+        )
+        for i in (9, 8, 7)
+    ]
+    mock_session = AsyncMock()
+    mock_result = MagicMock()
+    mock_result.mappings.return_value.all.return_value = rows
+    mock_result.scalar.return_value = [{"Plan": {"Node Type": "Seq Scan", "Plan Rows": 120}}]
+    mock_session.execute.return_value = mock_result
+
+    async def override_get_session():
+        yield mock_session
+
+    app.dependency_overrides[get_session] = override_get_session
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.get(
+            "/api/v1/data-tables", params={"cursor": 10, "page_size": 2, "count": "estimate", "search": "x'"}
+        )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [i["id"] for i in body["items"]] == [9, 8]
+    assert body["next_cursor"] == 8
+    assert (body["total"], body["estimated"]) == (120, True)
+    # estimate 只执行 EXPLAIN, 不执行 count 查询; 搜索词作为绑定参数传入
+    assert mock_session.execute.await_count == 2
+    explain = mock_session.execute.await_args_list[0].args[0].compile(dialect=postgresql.dialect())
+    assert str(explain).startswith("EXPLAIN (FORMAT JSON) SELECT") and "x'" not in str(explain)
+    assert "%x'%" in explain.params.values()
+    stmt = mock_session.execute.await_args.args[0]
+    assert "data_table_configs.id < " in str(stmt)
+
+@pytest.mark.anyio
+async def test_list_tables_field_projection():
+    mock_session = AsyncMock()
+    mock_result = MagicMock()
+    mock_result.mappings.return_value.all.return_value = [{"id": 3, "name": "t3", "status": TableStatus.DRAFT}]
+    mock_result.scalar.return_value = 1
+    mock_session.execute.return_value = mock_result
+
+    async def override_get_session():
+        yield mock_session
+
+    app.dependency_overrides[get_session] = override_get_session
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.get("/api/v1/data-tables", params={"fields": "name,status"})
+        unknown = await ac.get("/api/v1/data-tables", params={"fields": "name,secret"})
+
+    assert response.status_code == 200
+    # id 始终返回
+    assert response.json()["items"] == [{"id": 3, "name": "t3", "status": "draft"}]
+    # 只查询投影的列, 不读取 JSONB 列定义
+    sql = str(mock_session.execute.await_args.args[0])
+    assert "data_table_configs.name" in sql and "columns_schema" not in sql
+    assert unknown.status_code == 400
+
+@pytest.mark.anyio
+async def test_bulk_publish_by_category_only_drafts(monkeypatch):
+    mock_session = AsyncMock()
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = [1, 2]
+    mock_session.execute.return_value = mock_result
+
+    async def override_get_session():
+        yield mock_session
+
+    async def publish_tables(engine, table_ids, concurrency, batch_size=None, throttle_ms=None):
+        return [
+            {"id": 1, "status_code": 200, "table_name": "t1"},
+            {"id": 2, "status_code": 409, "error": "Table is being published by another request"},
+        ]
+
+    app.dependency_overrides[get_session] = override_get_session
+    monkeypatch.setattr("app.api.data_tables.publish_tables", publish_tables)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.post("/api/v1/data-tables/publish", json={"category_id": 5})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (1, 1)
+    assert body["results"][1]["status_code"] == 409
+    # 只选取草稿状态的表 (已发布与已归档的表不会被重新发布)
+    stmt = mock_session.execute.await_args.args[0]
+    params = stmt.compile().params
+    assert TableStatus.DRAFT in params.values()
+    assert TableStatus.ARCHIVED not in params.values() and "!=" not in str(stmt)
+
+@pytest.mark.anyio
+async def test_export_conflicts_with_active_export():
+    config = MagicMock(
+        table_name="daily", last_published_at="2024-01-01",
+        columns_schema=[{"name": "trade_date", "type": "DATE", "is_pk": True}, {"name": "close", "type": "NUMERIC(10,2)"}],
+    )
+    mock_session = AsyncMock()
+    mock_session.get.return_value = config
+    mock_result = MagicMock()
+    mock_result.scalar_one_or_none.return_value = 42  # 已有排队中的导出任务
+    mock_session.execute.return_value = mock_result
+
+    async def override_get_session():
+        yield mock_session
+
+    app.dependency_overrides[get_session] = override_get_session
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.post("/api/v1/data-tables/7/export", json={"partition_column": "trade_date"})
+
+    assert response.status_code == 409
+    assert not mock_session.add.called
+    sql = str(mock_session.execute.await_args.args[0])
+    assert "jobs.kind" in sql and "jobs.table_id" in sql
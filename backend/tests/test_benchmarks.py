@@ -0,0 +1,44 @@
+from benchmarks.core import Measurement, compare_results, latency, threshold_for, throughput
+from benchmarks.dataset import config_row, ohlcv_csv, wide_columns
+
+
+def _results(*measurements):
+    return {"meta": {}, "results": {m.name: m.summary() for m in measurements}}
+
+
+def test_summary_uses_median():
+    summary = latency("x", [5.0, 1.0, 3.0, 100.0, 2.0]).summary()
+    assert summary["value"] == 3.0
+    assert summary["min"] == 1.0 and summary["max"] == 100.0
+    assert summary["better"] == "lower" and summary["runs"] == 5
+
+
+def test_compare_results_direction_and_thresholds():
+    baseline = _results(latency("metadata.list", [10.0]), throughput("ingest.csv", [1000.0]), latency("old", [1.0]))
+    current = _results(latency("metadata.list", [13.0]), throughput("ingest.csv", [700.0]), latency("new", [1.0]))
+
+    rows = {r["name"]: r for r in compare_results(baseline, current, threshold=0.2)}
+    assert set(rows) == {"metadata.list", "ingest.csv"}  # 只比较两侧都有的结果
+    assert rows["metadata.list"]["change"] == 0.3 and rows["metadata.list"]["regressed"]
+    assert rows["ingest.csv"]["change"] == 0.3 and rows["ingest.csv"]["regressed"]  # 吞吐下降也是变差
+
+    rows = {r["name"]: r for r in compare_results(baseline, current, 0.2, {"ingest.": 0.5})}
+    assert not rows["ingest.csv"]["regressed"]
+    assert rows["metadata.list"]["regressed"]
+
+
+def test_threshold_longest_prefix_wins():
+    overrides = {"publish.": 0.5, "publish.sync": 1.0}
+    assert threshold_for("publish.sync[rows=0]", 0.2, overrides) == 1.0
+    assert threshold_for("publish.create", 0.2, overrides) == 0.5
+    assert threshold_for("ddl.sync_sqls", 0.2, overrides) == 0.2
+
+
+def test_dataset_is_deterministic():
+    assert config_row(7, 1, seed=42) == config_row(7, 1, seed=42)
+    assert config_row(7, 1, seed=42) != config_row(8, 1, seed=42)
+    columns = wide_columns(300, seed=1)
+    assert len(columns) == 300 and [c["name"] for c in columns if c["is_pk"]] == ["ts_code", "trade_date"]
+    lines = ohlcv_csv(3, offset=500).decode().splitlines()
+    assert lines[0] == "ts_code,trade_date,open,high,low,close,vol,amount"
+    assert lines[1].startswith("000000.SZ,2000-01-04,")
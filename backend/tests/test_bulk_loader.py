@@ -0,0 +1,146 @@
+import pytest
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+from httpx import AsyncClient, ASGITransport
+
+from app.main import app
+from app.db.session import get_session
+from app.db.bulk_loader import (
+    IngestError, CsvUploadReader, NdjsonUploadReader, UploadReader, make_coercer, merge_sql, resolve_format,
+    staging_table_sql, upsert_upload
+)
+from app.models.data_table import DataTableConfig, TableStatus
+
+COLUMNS = [
+    {"name": "ts_code", "type": "VARCHAR(20)", "is_pk": True, "comment": ""},
+    {"name": "trade_date", "type": "DATE", "is_pk": True, "comment": ""},
+    {"name": "close", "type": "NUMERIC(10, 2)", "comment": ""},
+    {"name": "vol", "type": "BIGINT", "comment": ""},
+    {"name": "note", "type": "TEXT", "comment": ""},
+]
+
+
+async def _chunks(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+async def _collect(reader):
+    await reader.open()
+    return [r async for r in reader.records()]
+
+
+def test_coercers():
+    assert make_coercer("INT")("42") == 42
+    assert make_coercer("NUMERIC(10, 2)")("1.50") == Decimal("1.50")
+    assert make_coercer("DATE")("20240102") == date(2024, 1, 2)
+    assert make_coercer("BOOLEAN")("t") is True
+    assert make_coercer("BIGINT")("") is None
+    assert make_coercer("TEXT")("") == ""
+    assert make_coercer("INT[]")("[1, 2]") == [1, 2]
+    assert make_coercer("TIMESTAMPTZ")("2024-01-02T09:30:00") == datetime(2024, 1, 2, 9, 30, tzinfo=timezone.utc)
+    with pytest.raises(ValueError):
+        make_coercer("INT")("abc")
+
+
+@pytest.mark.anyio
+async def test_csv_reader_handles_chunk_boundaries():
+    data = (
+        'ts_code,trade_date,close,vol,note\n'
+        '000001.SZ,2024-01-02,10.50,1000,"multi\nline, quoted"\n'
+        '000002.SZ,2024-01-02,,2000,plain\n'
+    ).encode()
+    reader = CsvUploadReader(_chunks(data, 7), COLUMNS)
+    rows = await _collect(reader)
+
+    assert reader.columns == ["ts_code", "trade_date", "close", "vol", "note"]
+    assert rows[0] == ("000001.SZ", date(2024, 1, 2), Decimal("10.50"), 1000, "multi\nline, quoted")
+    assert rows[1][2] is None
+    assert reader.rows_read == 2
+    assert reader.bytes_read == len(data)
+
+
+@pytest.mark.anyio
+async def test_csv_reader_rejects_unknown_header():
+    reader = CsvUploadReader(_chunks(b"ts_code,bogus\nx,y\n", 64), COLUMNS)
+    with pytest.raises(IngestError):
+        await reader.open()
+
+
+def test_upload_reader_requires_open_and_records():
+    with pytest.raises(TypeError):
+        UploadReader(_chunks(b"", 64), COLUMNS)
+
+    class HeaderOnly(UploadReader):
+        async def open(self):
+            return []
+
+    with pytest.raises(TypeError):
+        HeaderOnly(_chunks(b"", 64), COLUMNS)
+
+
+@pytest.mark.anyio
+async def test_ndjson_reader():
+    data = b'{"ts_code": "A", "trade_date": "2024-01-02", "vol": 5}\n\n{"ts_code": "B", "trade_date": "2024-01-03"}'
+    reader = NdjsonUploadReader(_chunks(data, 10), COLUMNS)
+    rows = await _collect(reader)
+    assert rows == [
+        ("A", date(2024, 1, 2), None, 5, None),
+        ("B", date(2024, 1, 3), None, None, None),
+    ]
+
+    bad = NdjsonUploadReader(_chunks(b'{"ts_code": "A", "vol": "x"}\n', 64), COLUMNS)
+    with pytest.raises(IngestError, match="Row 1"):
+        await _collect(bad)
+
+
+def test_staging_table_sql():
+    sql = staging_table_sql("qf_stage_bars", COLUMNS, ["ts_code", "trade_date", "close"])
+    assert sql.startswith("CREATE TEMPORARY TABLE qf_stage_bars (__qf_ord BIGINT GENERATED ALWAYS AS IDENTITY, ")
+    assert "ts_code VARCHAR(20), trade_date DATE, close NUMERIC(10, 2))" in sql
+    assert sql.endswith("ON COMMIT DROP")
+
+
+def test_merge_sql_updates_only_changed_uploaded_columns():
+    sql = merge_sql("bars", "qf_stage_bars", COLUMNS, ["ts_code", "trade_date", "close", "vol"], ["ts_code", "trade_date"])
+    assert "SELECT DISTINCT ON (ts_code, trade_date) ts_code, trade_date, close, vol FROM qf_stage_bars" in sql
+    assert "ON CONFLICT (ts_code, trade_date) DO UPDATE SET close = EXCLUDED.close, vol = EXCLUDED.vol" in sql
+    assert "WHERE ROW(t.close, t.vol) IS DISTINCT FROM ROW(EXCLUDED.close, EXCLUDED.vol)" in sql
+    assert "note" not in sql
+
+    pk_only = merge_sql("bars", "qf_stage_bars", COLUMNS, ["ts_code", "trade_date"], ["ts_code", "trade_date"])
+    assert "DO NOTHING" in pk_only
+
+
+@pytest.mark.anyio
+async def test_upsert_requires_primary_key_in_upload():
+    reader = CsvUploadReader(_chunks(b"close,vol\n1,2\n", 64), COLUMNS)
+    with pytest.raises(IngestError, match="ts_code, trade_date"):
+        await upsert_upload(AsyncMock(), "bars", COLUMNS, reader, batch_rows=1000)
+
+
+def test_resolve_format():
+    assert resolve_format(None, "text/csv; charset=utf-8") == "csv"
+    assert resolve_format("NDJSON", None) == "ndjson"
+    with pytest.raises(IngestError):
+        resolve_format(None, "application/octet-stream")
+
+
+@pytest.mark.anyio
+async def test_ingest_requires_published_table():
+    config = DataTableConfig(id=1, table_name="daily_bar", status=TableStatus.DRAFT, columns_schema=COLUMNS)
+    mock_session = AsyncMock()
+    mock_result = MagicMock()
+    mock_result.scalar_one_or_none.return_value = config
+    mock_session.execute.return_value = mock_result
+
+    async def override_get_session():
+        yield mock_session
+
+    app.dependency_overrides[get_session] = override_get_session
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.post("/api/v1/data-tables/1/rows?format=csv", content=b"ts_code\nA\n")
+
+    assert response.status_code == 400
@@ -0,0 +1,97 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from httpx import AsyncClient, ASGITransport
+
+from app.main import app
+from app.db.session import get_session
+from app.models.data_table import TableCategory
+
+
+@pytest.mark.anyio
+async def test_categories_cached_with_etag():
+    mock_session = AsyncMock()
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = [TableCategory(id=1, code="m", name="Market", description=None)]
+    mock_session.execute.return_value = mock_result
+
+    async def override_get_session():
+        yield mock_session
+
+    app.dependency_overrides[get_session] = override_get_session
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        first = await ac.get("/api/v1/categories")
+        second = await ac.get("/api/v1/categories")
+        not_modified = await ac.get("/api/v1/categories", headers={"If-None-Match": first.headers["etag"]})
+
+        assert first.json() == [{"id": 1, "code": "m", "name": "Market", "description": None}]
+        assert second.content == first.content
+        assert second.headers["x-cache"] == "HIT"
+        assert not_modified.status_code == 304
+        # 命中缓存时不访问数据库
+        assert mock_session.execute.await_count == 1
+
+        # 写操作使缓存失效
+        mock_result.scalar_one_or_none.return_value = TableCategory(id=1, code="m", name="Market", description=None)
+        await ac.put("/api/v1/categories/1", json={"name": "Market Data", "description": None})
+        mock_result.scalars.return_value.all.return_value = [TableCategory(id=1, code="m", name="Market Data", description=None)]
+        after = await ac.get("/api/v1/categories", headers={"If-None-Match": first.headers["etag"]})
+
+    assert after.status_code == 200
+    assert after.headers["x-cache"] == "MISS"
+    assert after.json()[0]["name"] == "Market Data"
+
+
+@pytest.mark.anyio
+async def test_large_responses_compressed():
+    import gzip
+    from app.core.compression import compressed_bodies
+
+    compressed_bodies.clear()
+    categories = [TableCategory(id=i, code=f"c{i}", name=f"Category {i}", description="x" * 50) for i in range(100)]
+    mock_session = AsyncMock()
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = categories
+    mock_session.execute.return_value = mock_result
+
+    async def override_get_session():
+        yield mock_session
+
+    app.dependency_overrides[get_session] = override_get_session
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        plain = await ac.get("/api/v1/categories", headers={"Accept-Encoding": "identity"})
+        zipped = await ac.get("/api/v1/categories", headers={"Accept-Encoding": "gzip;q=0.8, br"})
+
+    assert "content-encoding" not in plain.headers
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert zipped.headers["etag"] == plain.headers["etag"]
+    assert zipped.json() == plain.json()  # httpx 自动解压
+    assert int(zipped.headers["content-length"]) < len(plain.content)
+
+
+def test_negotiate_encoding():
+    from app.core.compression import negotiate_encoding, supported_encodings
+
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding("br") is None
+    assert negotiate_encoding("gzip;q=0, br") is None
+    assert negotiate_encoding("deflate, gzip;q=0.5") == "gzip"
+    assert negotiate_encoding("*") == supported_encodings()[0]
+
+
+def test_json_dumps_matches_standard_encoder():
+    import json
+    from datetime import datetime, timezone
+    from decimal import Decimal
+    from fastapi.encoders import jsonable_encoder
+    from app.core.serialization import json_dumps
+    from app.models.data_table import TableStatus
+    from app.schemas.data_table import CategoryResponse
+
+    payload = {
+        "status": TableStatus.CREATED, "at": datetime(2024, 1, 2, 3, 4, 5, 600, tzinfo=timezone.utc),
+        "naive": datetime(2024, 1, 2), "amount": Decimal("1.50"), "vol": Decimal("10"), "name": "日线",
+        "model": CategoryResponse(id=1, code="m", name="Market", description=None),
+    }
+    assert json.loads(json_dumps(payload)) == jsonable_encoder(payload)
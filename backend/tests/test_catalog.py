@@ -0,0 +1,52 @@
+from app.db.catalog import TableSnapshot, table_drift
+from app.db.ddl_generator import DDLGenerator
+
+COLUMNS = [
+    {"name": "ts_code", "type": "VARCHAR(20)", "is_pk": True, "comment": "代码"},
+    {"name": "close", "type": "NUMERIC(10, 2)", "comment": ""},
+]
+INDEXES = [{"name": "idx_close", "columns": ["close"], "unique": False}]
+
+
+def _snapshot(**overrides):
+    data = dict(
+        name="daily_bar",
+        relkind="r",
+        columns=[
+            {"name": "ts_code", "type": "character varying(20)", "comment": "代码"},
+            {"name": "close", "type": "numeric(10,2)", "comment": None},
+        ],
+        indexes=[{"name": "idx_close", "column_names": ["close"], "unique": False, "valid": True, "dialect_options": {}}],
+        primary_key=["ts_code"],
+    )
+    data.update(overrides)
+    return TableSnapshot(**data)
+
+
+def test_table_in_sync():
+    assert table_drift("daily_bar", COLUMNS, INDEXES, None, _snapshot())["in_sync"]
+    assert table_drift("daily_bar", COLUMNS, INDEXES, None, None) == {"exists": False, "in_sync": False}
+
+
+def test_table_drift_details():
+    snapshot = _snapshot(
+        columns=[
+            {"name": "ts_code", "type": "character varying(20)", "comment": "代码"},
+            {"name": "close", "type": "integer", "comment": "x"},
+            {"name": "junk", "type": "integer", "comment": None},
+        ],
+        relkind="p",
+    )
+    drift = table_drift("daily_bar", COLUMNS, INDEXES, None, snapshot)
+    assert not drift["in_sync"]
+    assert drift["extra_columns"] == ["junk"]
+    assert drift["comment_changes"] == ["close"]
+    assert [c["name"] for c in drift["type_changes"]] == ["close"]
+    assert drift["partitioning_changed"]
+
+
+def test_invalid_index_is_rebuilt():
+    db_indexes = [{"name": "idx_close", "column_names": ["close"], "unique": False, "valid": False, "dialect_options": {}}]
+    to_drop, to_create = DDLGenerator.diff_indexes("daily_bar", db_indexes, INDEXES)
+    assert to_drop == ["idx_close"]
+    assert [i["name"] for i in to_create] == ["idx_close"]
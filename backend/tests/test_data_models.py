@@ -11,7 +11,7 @@ SQLiteTypeCompiler.visit_JSONB = lambda self, type_, **kw: "JSON"
 
 from app.db.base_class import Base
 from app.models.data_table import DataTableConfig, TableCategory, TableStatus
-from app.schemas.data_table import DataTableCreate, ColumnDef
+from app.schemas.data_table import BulkPublishRequest, DataTableCreate, ColumnDef
 
 # Use in-memory SQLite for testing model definitions
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -72,3 +72,11 @@ def test_pydantic_schemas():
         columns_schema=[col]
     )
     assert dt_create.table_name == "test_phys"
+
+def test_bulk_publish_request():
+    assert BulkPublishRequest(ids=[1, 2]).category_id is None
+    assert BulkPublishRequest(category_id=3).ids is None
+    with pytest.raises(ValueError):
+        BulkPublishRequest()
+    with pytest.raises(ValueError):
+        BulkPublishRequest(ids=[1], category_id=3)
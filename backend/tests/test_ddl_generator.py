@@ -0,0 +1,182 @@
+from datetime import date
+
+from app.db.ddl_generator import DDLGenerator
+
+COLUMNS = [
+    {"name": "ts_code", "type": "VARCHAR(20)", "is_pk": True, "comment": "代码"},
+    {"name": "trade_date", "type": "DATE", "is_pk": True, "comment": "交易日"},
+    {"name": "exchange", "type": "VARCHAR(8)", "comment": ""},
+    {"name": "close", "type": "NUMERIC(10, 2)", "comment": ""},
+]
+
+
+def test_create_partitioned_table():
+    partition = {"key": "trade_date", "strategy": "range", "interval": "month", "premake": 2, "start": "2024-11-01"}
+    sqls = DDLGenerator.generate_create_table_sqls("daily_bar", "日线", COLUMNS, partition)
+
+    assert "PARTITION BY RANGE (trade_date)" in sqls[0]
+    partitions = [s for s in sqls if "PARTITION OF" in s]
+    assert partitions[0] == (
+        "CREATE TABLE IF NOT EXISTS daily_bar_p202411 PARTITION OF daily_bar "
+        "FOR VALUES FROM ('2024-11-01') TO ('2024-12-01');"
+    )
+    assert partitions[-1].endswith("DEFAULT;")
+
+
+def test_range_partition_premake():
+    partition = {"key": "trade_date", "strategy": "range", "interval": "month", "premake": 2, "default_partition": False}
+    sqls = DDLGenerator.generate_partition_sqls("daily_bar", partition, today=date(2024, 12, 15))
+    names = [s.split()[5] for s in sqls]
+    assert names == ["daily_bar_p202412", "daily_bar_p202501", "daily_bar_p202502"]
+
+
+def test_list_partitions():
+    partition = {"key": "exchange", "strategy": "list", "values": ["SSE", "SZSE"], "default_partition": False}
+    sqls = DDLGenerator.generate_partition_sqls("tick", partition)
+    assert sqls == [
+        "CREATE TABLE IF NOT EXISTS tick_p_sse PARTITION OF tick FOR VALUES IN ('SSE');",
+        "CREATE TABLE IF NOT EXISTS tick_p_szse PARTITION OF tick FOR VALUES IN ('SZSE');",
+    ]
+
+
+def test_list_partition_names_do_not_collide():
+    name = DDLGenerator.list_partition_name
+    values = ["A-B", "A_B", "a b", "上交所", "深交所", "x" * 80, "x" * 81]
+    names = [name("tick", v) for v in values]
+    assert len(set(names)) == len(values)
+    assert names[1] == "tick_p_a_b"
+    assert names[0].startswith("tick_p_a_b_") and names[3].startswith("tick_p_")
+    assert all(len(n.encode()) <= 63 for n in names)
+    assert name("tick", "上交所") == names[3]  # 稳定
+
+    # 只有大小写不同的值仍对应同一个分区表名, 校验时拒绝
+    cfg = {"key": "ts_code", "strategy": "list", "values": ["sse", "SSE"]}
+    is_valid, msg = DDLGenerator.validate_schema("tick", COLUMNS, [], cfg)
+    assert not is_valid and "tick_p_sse" in msg
+    cfg["values"] = values
+    assert DDLGenerator.validate_schema("tick", COLUMNS, [], cfg) == (True, None)
+
+
+def test_range_partition_names_fit_identifier_limit():
+    table = "t" * 58
+    cfg = {"key": "trade_date", "strategy": "range", "interval": "month", "premake": 3}
+    sqls = DDLGenerator.generate_partition_sqls(table, cfg, today=date(2024, 1, 15))
+    names = [sql.split()[5] for sql in sqls]
+    # 4 个月分区 + 默认分区, 截断后互不相同且不超过 63 字节
+    assert len(set(names)) == 5
+    assert all(len(n) <= 63 for n in names)
+    assert names[-1] == DDLGenerator.default_partition_name(table) and "DEFAULT" in sqls[-1]
+    # 未超长的名称保持不变
+    assert DDLGenerator.range_partition_name("daily", date(2024, 1, 1), "month") == "daily_p202401"
+    assert DDLGenerator.default_partition_name("daily") == "daily_default"
+
+
+def test_validate_partition_config():
+    range_cfg = {"key": "trade_date", "strategy": "range", "interval": "day"}
+    assert DDLGenerator.validate_schema("daily_bar", COLUMNS, [], range_cfg) == (True, None)
+
+    # 分区键不在主键中
+    is_valid, _ = DDLGenerator.validate_schema("daily_bar", COLUMNS, [], {"key": "exchange", "strategy": "list", "values": ["SSE"]})
+    assert not is_valid
+
+    # range 分区键必须是时间类型
+    is_valid, _ = DDLGenerator.validate_schema("daily_bar", COLUMNS, [], {"key": "ts_code", "strategy": "range", "interval": "day"})
+    assert not is_valid
+
+    # 唯一索引必须包含分区键
+    unique_idx = [{"name": "uk_code", "columns": ["ts_code"], "unique": True}]
+    is_valid, _ = DDLGenerator.validate_schema("daily_bar", COLUMNS, unique_idx, range_cfg)
+    assert not is_valid
+
+
+def test_diff_indexes_only_touches_changes():
+    db_indexes = [
+        {"name": "idx_daily_bar_trade_date", "column_names": ["trade_date"], "unique": False, "dialect_options": {}},
+        {"name": "idx_close", "column_names": ["close"], "unique": False, "dialect_options": {}},
+        {"name": "idx_stale", "column_names": ["exchange"], "unique": False, "dialect_options": {}},
+        {"name": "uq_constraint", "column_names": ["ts_code"], "unique": True, "duplicates_constraint": "uq_constraint"},
+    ]
+    desired = [
+        {"name": "", "columns": ["trade_date"], "unique": False},  # unchanged (auto-named)
+        {"name": "idx_close", "columns": ["close"], "unique": False, "method": "brin"},  # method changed
+        {"name": "idx_new", "columns": ["exchange", "trade_date"], "unique": False},  # new
+    ]
+    to_drop, to_create = DDLGenerator.diff_indexes("daily_bar", db_indexes, desired)
+
+    assert to_drop == ["idx_close", "idx_stale"]
+    assert [i["name"] for i in to_create] == ["idx_close", "idx_new"]
+
+    sqls = DDLGenerator.generate_index_sqls("daily_bar", to_create, concurrently=True)
+    assert sqls[0] == "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_close ON daily_bar USING brin (close);"
+    assert DDLGenerator.generate_drop_index_sqls(["idx_stale"], concurrently=True) == ["DROP INDEX CONCURRENTLY IF EXISTS idx_stale;"]
+
+
+def test_generate_index_options():
+    idx = {
+        "name": "idx_recent", "columns": ["ts_code", "trade_date"], "order": {"trade_date": "desc"},
+        "include": ["close"], "storage": {"fillfactor": 90, "deduplicate_items": False},
+        "where": "trade_date >=  DATE '2024-01-01'",
+    }
+    sqls = DDLGenerator.generate_index_sqls("daily_bar", [idx, {"name": "", "columns": ["trade_date"], "method": "brin"}])
+    assert sqls == [
+        "CREATE INDEX IF NOT EXISTS idx_recent ON daily_bar (ts_code, trade_date DESC) INCLUDE (close) "
+        "WITH (fillfactor = 90, deduplicate_items = off) WHERE trade_date >= DATE '2024-01-01';",
+        "COMMENT ON INDEX idx_recent IS 'where: trade_date >= DATE ''2024-01-01''';",
+        "CREATE INDEX IF NOT EXISTS idx_daily_bar_trade_date ON daily_bar USING brin (trade_date);",
+    ]
+
+
+def test_validate_index_options():
+    columns = COLUMNS + [{"name": "tags", "type": "JSONB", "comment": ""}]
+
+    def error(**idx):
+        ok, msg = DDLGenerator.validate_schema("daily_bar", columns, [{"name": "i", "columns": ["trade_date"], **idx}])
+        return None if ok else msg
+
+    assert error(method="brin", storage={"pages_per_range": 32, "autosummarize": True}) is None
+    assert error(columns=["tags"], method="gin") is None
+    assert error(where="trade_date >= '2024-01-01'::date AND close IS NOT NULL") is None
+    assert error(where="lower(exchange) IN ('sse', 'szse')") is None
+    assert "unique" in error(method="brin", unique=True)
+    assert "include" in error(method="hash", include=["close"])
+    assert "JSONB" in error(method="gin")
+    assert "已是索引列" in error(include=["trade_date"])
+    assert "pages_per_range" in error(storage={"pages_per_range": 32})
+    assert "超出范围" in error(storage={"fillfactor": 5})
+    # WHERE 条件直接拼接进 DDL: 拒绝未知标识符、子查询、分号与注释
+    assert "WHERE" in error(where="secret > 0")
+    assert "WHERE" in error(where="close > (SELECT 1)")
+    assert "WHERE" in error(where="close > 0; DROP TABLE daily_bar")
+    assert "WHERE" in error(where="close > 0 -- x")
+    assert "注释" in error(where="close > 1 --")
+    assert "注释" in error(where="close > 1 /* x */")
+    assert "注释" in error(where="close >-- 1")
+    assert error(where="close > - 1 AND close < 2 * - 1") is None
+    assert "WHERE" in error(where="(close > 0")
+
+
+def test_diff_indexes_compares_options():
+    desired = [
+        {"name": "idx_cover", "columns": ["ts_code", "trade_date"], "order": {"trade_date": "desc"}, "include": ["close"]},
+        {"name": "idx_brin", "columns": ["trade_date"], "method": "brin", "storage": {"pages_per_range": 32}},
+        {"name": "idx_recent", "columns": ["ts_code"], "where": "trade_date >= DATE '2024-01-01'"},
+    ]
+    # catalog 快照中的形式: 谓词已被数据库改写, 通过注释比较
+    db_indexes = [
+        {"name": "idx_cover", "column_names": ["ts_code", "trade_date"], "unique": False, "include_columns": ["close"],
+         "column_sorting": {"trade_date": ("desc",)}, "dialect_options": {"postgresql_include": ["close"]}},
+        {"name": "idx_brin", "column_names": ["trade_date"], "unique": False,
+         "dialect_options": {"postgresql_using": "brin", "postgresql_with": {"pages_per_range": "32"}}},
+        {"name": "idx_recent", "column_names": ["ts_code"], "unique": False, "comment": "where: trade_date >= DATE '2024-01-01'",
+         "dialect_options": {"postgresql_where": "trade_date >= '2024-01-01'::date"}},
+    ]
+    assert DDLGenerator.diff_indexes("daily_bar", db_indexes, desired) == ([], [])
+
+    changed = [
+        {**desired[0], "order": {}},
+        {**desired[1], "storage": {"pages_per_range": 64}},
+        {**desired[2], "where": "trade_date >= DATE '2025-01-01'"},
+    ]
+    to_drop, to_create = DDLGenerator.diff_indexes("daily_bar", db_indexes, changed)
+    assert to_drop == ["idx_cover", "idx_brin", "idx_recent"]
+    assert len(to_create) == 3
@@ -0,0 +1,53 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.db.index_sync import apply_index_operations, plan_index_operations
+
+DB_INDEXES = [
+    {"name": "idx_close", "column_names": ["close"], "unique": False, "dialect_options": {}},
+    {"name": "idx_stale", "column_names": ["exchange"], "unique": False, "dialect_options": {}},
+]
+DESIRED = [
+    {"name": "idx_close", "columns": ["close"], "unique": True, "where": "close > 0"},  # 定义变化
+    {"name": "idx_new", "columns": ["exchange"]},
+]
+
+
+def test_changed_index_is_built_before_the_old_one_is_dropped():
+    ops = plan_index_operations("daily_bar", DB_INDEXES, DESIRED)
+    assert [(op.action, op.index_name) for op in ops] == [
+        ("drop", "idx_stale"),
+        ("drop", "idx_close__qf_tmp"),
+        ("create", "idx_close__qf_tmp"),
+        ("drop", "idx_close"),
+        ("rename", "idx_close"),
+        ("comment", "idx_close"),
+        ("create", "idx_new"),
+    ]
+    assert ops[2].sql.startswith("CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_close__qf_tmp ON daily_bar")
+    assert ops[4].sql == "ALTER INDEX idx_close__qf_tmp RENAME TO idx_close;"
+    assert [op.depends_on for op in ops[3:6]] == ["idx_close__qf_tmp"] * 3
+
+
+@pytest.mark.anyio
+async def test_failed_replacement_keeps_old_index():
+    executed = []
+
+    async def execute(stmt):
+        executed.append(str(stmt))
+        if str(stmt).startswith("CREATE UNIQUE INDEX"):
+            raise RuntimeError("could not create unique index")
+
+    conn = AsyncMock()
+    conn.execution_options.return_value = conn
+    conn.execute.side_effect = execute
+    engine = MagicMock()
+    engine.connect.return_value.__aenter__.return_value = conn
+
+    ops = await apply_index_operations(engine, plan_index_operations("daily_bar", DB_INDEXES, DESIRED))
+
+    assert [op.status for op in ops] == ["done", "done", "failed", "skipped", "skipped", "skipped", "done"]
+    # 只清理残留的临时索引, 旧索引不删除
+    assert "DROP INDEX IF EXISTS idx_close__qf_tmp" in executed
+    assert not any("idx_close;" in sql and sql.startswith("DROP") for sql in executed)
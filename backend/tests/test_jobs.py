@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.core.job_queue import MemoryJobQueue, current_job, job_context, set_job_step
+from app.db import job_runner
+from app.db.session import get_session
+from app.main import app
+from app.models.data_table import DataTableConfig
+from app.models.job import Job, JobStatus
+
+
+def test_set_job_step_only_inside_job():
+    set_job_step("SELECT 1")  # 不在任务中: 忽略
+    assert current_job() is None
+
+    with job_context(42) as ctx:
+        set_job_step("CREATE INDEX CONCURRENTLY ix\n    ON t (a)")
+        assert ctx.step == "CREATE INDEX CONCURRENTLY ix ON t (a)"
+        assert ctx.dirty
+    assert current_job() is None
+
+
+@pytest.mark.anyio
+async def test_memory_queue_roundtrip():
+    queue = MemoryJobQueue()
+    await queue.put(1)
+    await queue.put(2)
+    assert await queue.get(0.1) == 1
+    assert await queue.get(0.1) == 2
+    assert await queue.get(0.01) is None
+
+
+def test_describe_job_prefers_live_step():
+    started = datetime.now(timezone.utc) - timedelta(seconds=30)
+    job = Job(
+        id=7, kind="publish", status=JobStatus.RUNNING, params={"table_id": 1}, attempts=1,
+        started_at=started, current_step="old step", created_at=started,
+    )
+    assert job_runner.describe_job(job)["current_step"] == "old step"
+
+    with job_context(7) as ctx:
+        ctx.set_step("new step")
+        job_runner._running[7] = ctx
+        try:
+            data = job_runner.describe_job(job)
+        finally:
+            job_runner._running.pop(7)
+    assert data["current_step"] == "new step"
+    assert data["elapsed_seconds"] >= 30
+
+
+@pytest.mark.anyio
+async def test_background_publish_returns_job(monkeypatch):
+    queue = MemoryJobQueue()
+    monkeypatch.setattr(job_runner, "job_queue", queue)
+
+    added = []
+    mock_session = AsyncMock()
+    mock_session.get.return_value = DataTableConfig(id=3, table_name="t3")
+    mock_session.add = MagicMock(side_effect=added.append)
+
+    async def commit():
+        for obj in added:
+            obj.id = 11
+    mock_session.commit.side_effect = commit
+
+    async def override_get_session():
+        yield mock_session
+
+    app.dependency_overrides[get_session] = override_get_session
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.post("/api/v1/data-tables/3/publish?background=true&batch_size=1000")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 202
+    assert response.json() == {"job_id": 11, "kind": "publish", "status": "queued", "status_url": "/api/v1/jobs/11"}
+    job = added[0]
+    assert job.table_id == 3
+    assert job.params == {"table_id": 3, "batch_size": 1000, "throttle_ms": None}
+    assert await queue.get(0.1) == 11
+
+
+@pytest.mark.anyio
+async def test_get_job_not_found():
+    mock_session = AsyncMock()
+    mock_session.get.return_value = None
+
+    async def override_get_session():
+        yield mock_session
+
+    app.dependency_overrides[get_session] = override_get_session
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.get("/api/v1/jobs/999")
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 404
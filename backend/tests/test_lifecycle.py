@@ -0,0 +1,68 @@
+from datetime import date
+
+import pytest
+from pydantic import ValidationError
+
+from app.db.lifecycle import LifecycleError, PartitionState, parse_upper_bound, plan_lifecycle, validate_policy_target
+from app.schemas.data_table import LifecyclePolicy
+
+TODAY = date(2026, 10, 18)
+PARTITIONS = [
+    PartitionState("bar_p2024", date(2025, 1, 1)),
+    PartitionState("bar_p2025", date(2026, 1, 1)),
+    PartitionState("bar_p2026", date(2027, 1, 1)),
+    PartitionState("bar_p2023", date(2024, 1, 1), tablespace="cold"),
+]
+
+
+def test_parse_upper_bound():
+    assert parse_upper_bound("FOR VALUES FROM ('2024-01-01') TO ('2024-02-01')") == date(2024, 2, 1)
+    assert parse_upper_bound("FOR VALUES FROM ('2024-01-01 00:00:00') TO ('2024-01-02 00:00:00')") == date(2024, 1, 2)
+    assert parse_upper_bound("FOR VALUES FROM ('2024-01-01') TO (MAXVALUE)") is None
+    assert parse_upper_bound("DEFAULT") is None
+
+
+def test_plan_tablespace_tiering():
+    policy = {"tier_after_days": 180, "tier_action": "tablespace", "tablespace": "cold", "drop_after_days": 900}
+    actions = [(a.action, a.partition) for a in plan_lifecycle(policy, PARTITIONS, TODAY)]
+    # p2023 已超过保留期, 直接删除 (不再移动); p2024 / p2025 的数据全部早于 180 天; p2026 包含当前数据
+    assert actions == [("drop", "bar_p2023"), ("tier", "bar_p2024"), ("tier", "bar_p2025")]
+
+    moved = [PartitionState(p.name, p.upper, tablespace="cold") for p in PARTITIONS]
+    assert [a.action for a in plan_lifecycle(policy, moved, TODAY)] == ["drop"]
+
+
+def test_plan_archive_before_drop():
+    policy = {"tier_after_days": 180, "tier_action": "archive", "drop_after_days": 650}
+    actions = [(a.action, a.partition) for a in plan_lifecycle(policy, PARTITIONS, TODAY)]
+    # 需要删除但尚未归档的分区先归档
+    assert actions == [
+        ("archive", "bar_p2023"), ("drop", "bar_p2023"),
+        ("archive", "bar_p2024"), ("drop", "bar_p2024"),
+        ("archive", "bar_p2025"),
+    ]
+    detached = [PartitionState("bar_p2025", date(2026, 1, 1), attached=False)]
+    assert plan_lifecycle(policy, detached, TODAY) == []
+
+    # 只配置保留期的 archive 策略: 删除前同样先导出
+    policy = {"tier_action": "archive", "drop_after_days": 650}
+    actions = [(a.action, a.partition) for a in plan_lifecycle(policy, PARTITIONS, TODAY)]
+    assert actions == [
+        ("archive", "bar_p2023"), ("drop", "bar_p2023"),
+        ("archive", "bar_p2024"), ("drop", "bar_p2024"),
+    ]
+    assert LifecyclePolicy(**policy).tier_after_days is None
+
+
+def test_policy_validation():
+    with pytest.raises(ValidationError):
+        LifecyclePolicy(tier_after_days=30)  # tablespace 模式必须指定表空间
+    with pytest.raises(ValidationError):
+        LifecyclePolicy(tier_after_days=30, tier_action="archive", drop_after_days=30)
+    with pytest.raises(ValidationError):
+        LifecyclePolicy()
+    assert LifecyclePolicy(drop_after_days=30).tier_after_days is None
+
+    with pytest.raises(LifecycleError):
+        validate_policy_target({"key": "exchange", "strategy": "list", "values": ["sse"]})
+    validate_policy_target({"key": "trade_date", "strategy": "range", "interval": "month"})
@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.message_bus import MemoryMessageBus, MessageBusError
+from app.engine import GraphError, GraphRunner, load_graph
+from app.engine import mq_nodes
+
+
+@pytest.fixture
+def bus():
+    return MemoryMessageBus()
+
+
+@pytest.mark.anyio
+async def test_publish_batch_and_group_fan_out(bus):
+    # 先创建的组从 "0" 开始, 能读到之前发布的消息; "$" 只读之后的
+    await bus.publish("ticks", [{"p": 1}])
+    assert await bus.create_group("ticks", "replay", "0")
+    assert await bus.create_group("ticks", "live")
+    assert not await bus.create_group("ticks", "live")
+    ids = await bus.publish("ticks", [{"p": 2}, {"p": 3}, None])
+    assert len(ids) == 3 and ids == sorted(ids)
+
+    replay = await bus.consume("ticks", "replay", "a", count=10)
+    live = await bus.consume("ticks", "live", "a", count=10)
+    assert [m.data for m in replay] == [{"p": 1}, {"p": 2}, {"p": 3}, None]
+    assert [m.id for m in live] == ids
+    # 同组的消费者分摊消息
+    await bus.publish("ticks", [4, 5])
+    first = await bus.consume("ticks", "live", "a", count=1)
+    second = await bus.consume("ticks", "live", "b", count=10)
+    assert [m.data for m in first + second] == [4, 5]
+
+    info = await bus.info("ticks")
+    assert info["length"] == 6
+    groups = {g["name"]: g for g in info["groups"]}
+    assert groups["replay"]["lag"] == 2 and groups["replay"]["pending"] == 4
+    assert groups["live"]["lag"] == 0 and groups["live"]["consumers"] == 2
+
+    with pytest.raises(MessageBusError, match="does not exist"):
+        await bus.consume("ticks", "missing", "a")
+
+
+@pytest.mark.anyio
+async def test_ack_claim_and_offsets(bus):
+    await bus.create_group("orders", "risk", "0")
+    ids = await bus.publish("orders", ["a", "b", "c"])
+    messages = await bus.consume("orders", "risk", "worker-1")
+    assert await bus.ack("orders", "risk", ids[:1]) == 1
+    assert await bus.ack("orders", "risk", ids[:1]) == 0
+
+    # worker-1 退出, 未确认的消息转交 worker-2, 投递次数加一
+    assert await bus.claim("orders", "risk", "worker-2", min_idle_ms=60000) == []
+    claimed = await bus.claim("orders", "risk", "worker-2", min_idle_ms=0)
+    assert [(m.data, m.deliveries) for m in claimed] == [("b", 2), ("c", 2)]
+    assert [m.deliveries for m in messages] == [1, 1, 1]
+
+    # 回放不影响消费组; set_offset 把组移回去重新消费
+    assert [m.data for m in await bus.read("orders", after=ids[0])] == ["b", "c"]
+    assert [m.data for m in await bus.read("orders", count=1)] == ["a"]
+    await bus.set_offset("orders", "risk", ids[0])
+    assert [m.data for m in await bus.consume("orders", "risk", "worker-2")] == ["b", "c"]
+    with pytest.raises(MessageBusError, match="Invalid message id"):
+        await bus.read("orders", after="latest")
+
+
+@pytest.mark.anyio
+async def test_blocking_consume_and_trimming(bus):
+    await bus.create_group("bars", "g")
+
+    async def publish_later():
+        await asyncio.sleep(0.05)
+        await bus.publish("bars", ["bar"])
+
+    started = time.perf_counter()
+    task = asyncio.create_task(publish_later())
+    messages = await bus.consume("bars", "g", "c", block_ms=2000)
+    await task
+    assert [m.data for m in messages] == ["bar"]
+    assert time.perf_counter() - started < 1
+    assert await bus.consume("bars", "g", "c", block_ms=20) == []
+
+    await bus.publish("bars", list(range(100)), max_length=10)
+    info = await bus.info("bars")
+    assert info["length"] == 10
+    assert [m.data for m in await bus.read("bars", count=1)] == [90]
+
+
+@pytest.mark.anyio
+async def test_producer_and_consumer_nodes(bus, monkeypatch):
+    async def topic_max_length(name):
+        return 1000
+
+    monkeypatch.setattr(mq_nodes, "message_bus", bus)
+    monkeypatch.setattr("app.db.topics.topic_max_length", topic_max_length)
+    await bus.create_group("signals", "strategy", "0")
+    data = {
+        "nodes": [
+            {"id": "start", "type": "start"},
+            {"id": "pub", "type": "producer",
+             "config": {"topic": "signals", "messages": [{"code": "{{inputs.code}}"}, {"code": "000002.SZ"}]}},
+            {"id": "sub", "type": "consumer", "config": {"topic": "signals", "group": "strategy", "count": 10}},
+            {"id": "end", "type": "end", "config": {"outputs": {"pub": "{{pub}}", "sub": "{{sub}}"}}},
+        ],
+        "edges": [
+            {"source": "start", "target": "pub"}, {"source": "pub", "target": "sub"}, {"source": "sub", "target": "end"},
+        ],
+    }
+    result = await GraphRunner(load_graph(data)).run({"code": "000001.SZ"})
+    assert result.status == "succeeded", result.error
+    assert result.output["pub"]["count"] == 2
+    consumed = result.output["sub"]
+    assert [m["data"]["code"] for m in consumed["messages"]] == ["000001.SZ", "000002.SZ"]
+    assert consumed["last_id"] == result.output["pub"]["ids"][-1]
+    # 默认读取后立即确认
+    assert (await bus.info("signals"))["groups"][0]["pending"] == 0
+
+    with pytest.raises(GraphError, match="config.topic"):
+        load_graph({"nodes": [{"id": "p", "type": "producer", "config": {"topic": "{{inputs.t}}", "message": 1}}],
+                    "edges": []})
+    with pytest.raises(GraphError, match="config.group"):
+        load_graph({"nodes": [{"id": "c", "type": "consumer", "config": {"topic": "signals"}}], "edges": []})
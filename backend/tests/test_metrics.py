@@ -0,0 +1,110 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.core import metrics
+from app.core.metrics import Histogram, MetricFamily, register_collector, render_prometheus
+from app.db.pool import PoolStats, collect_pool_metrics
+
+
+def test_histogram_is_cumulative():
+    family = MetricFamily("qf_test_seconds", "histogram", "test")
+    hist = Histogram(buckets=(0.1, 1))
+    for v in (0.05, 0.5, 0.7, 3):
+        hist.observe(v)
+    hist.add_to(family, {"route": "/x"})
+
+    samples = {(name, labels.get("le")): value for name, labels, value in family.samples}
+    assert samples[("qf_test_seconds_bucket", "0.1")] == 1
+    assert samples[("qf_test_seconds_bucket", "1")] == 3
+    assert samples[("qf_test_seconds_bucket", "+Inf")] == 4
+    assert samples[("qf_test_seconds_count", None)] == 4
+
+
+def test_pool_metrics_rendered():
+    pool = MagicMock()
+    pool.size.return_value = 10
+    pool.checkedout.return_value = 3
+    pool.checkedin.return_value = 7
+    pool.overflow.return_value = -7
+    pool.stats = PoolStats(checkouts=5, exhausted=1)
+
+    collector = register_collector(lambda: collect_pool_metrics(pool))
+    try:
+        text = render_prometheus()
+    finally:
+        metrics._collectors.remove(collector)
+
+    assert "# TYPE qf_db_pool_checked_out gauge" in text
+    assert "qf_db_pool_checked_out 3\n" in text
+    assert "qf_db_pool_overflow 0\n" in text
+    assert "qf_db_pool_exhausted_total 1\n" in text
+    assert 'qf_db_pool_checkout_wait_seconds_bucket{le="+Inf"} 0\n' in text
+
+
+def test_statement_operation():
+    from app.db.sql_metrics import statement_operation
+    assert statement_operation("  select 1") == "SELECT"
+    assert statement_operation("(SELECT 1) UNION (SELECT 2)") == "SELECT"
+    assert statement_operation("COPY t FROM STDIN") == "COPY"
+    assert statement_operation("VACUUM t") == "OTHER"
+
+
+def test_slow_statement_logged_with_route_and_table(monkeypatch, caplog):
+    from app.core.config import settings
+    from app.core.request_metrics import tag_table
+    from app.db import sql_metrics
+
+    monkeypatch.setattr(settings, "SLOW_SQL_THRESHOLD_MS", 100)
+    monkeypatch.setattr(settings, "SLOW_SQL_MAX_LENGTH", 20)
+    with tag_table("qf_slow_test"), caplog.at_level("WARNING", logger="app.db.slow_sql"):
+        sql_metrics.record_statement("SELECT 1", 0.01)
+        sql_metrics.record_statement("SELECT *   FROM qf_slow_test WHERE a = 1", 0.2)
+
+    assert len(caplog.records) == 1
+    assert "route=background table=qf_slow_test: SELECT * FROM qf_slo\n" in caplog.text
+    assert sql_metrics._table_totals["qf_slow_test"][0] == 2
+    text = render_prometheus()
+    assert 'qf_db_table_statements_total{table="qf_slow_test"} 2\n' in text
+
+
+def test_request_metrics_use_route_template():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app)
+    client.get("/api/v1/does-not-exist/42")
+    client.get("/metrics")
+    text = client.get("/metrics").text
+    assert 'qf_http_requests_total{method="GET",route="unmatched",status="404"}' in text
+    assert 'qf_http_requests_total{method="GET",route="/metrics",status="200"}' in text
+    assert "/does-not-exist" not in text
+
+
+@pytest.mark.anyio
+async def test_background_loop_restores_table_tag(monkeypatch):
+    from app.core.request_metrics import current_table
+    from app.db import partition_maintenance
+
+    seen = []
+    session = AsyncMock()
+    session.execute.return_value.all = MagicMock(return_value=[
+        ("qf_a", {"strategy": "range"}), ("qf_b", {"strategy": "range"}), ("qf_c", {"strategy": "list"}),
+    ])
+
+    async def is_partitioned_table(session, table_name):
+        seen.append(current_table())
+        return table_name != "qf_b"
+
+    async def ensure_partitions(session, table_name, partition_config):
+        return []
+
+    monkeypatch.setattr(partition_maintenance, "AsyncSessionLocal", MagicMock(return_value=session))
+    monkeypatch.setattr(partition_maintenance, "is_partitioned_table", is_partitioned_table)
+    monkeypatch.setattr(partition_maintenance, "ensure_partitions", ensure_partitions)
+    session.__aenter__.return_value = session
+
+    assert await partition_maintenance.run_partition_maintenance() == 1
+    assert seen == ["qf_a", "qf_b"]
+    # 长期运行的循环任务上不残留最后处理的表名 (之后的 SQL 不会被错误归到该表)
+    assert current_table() is None
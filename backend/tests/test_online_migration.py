@@ -0,0 +1,85 @@
+from sqlalchemy import BIGINT, INTEGER, NUMERIC, VARCHAR
+
+from app.db.ddl_generator import DDLGenerator
+from app.db.online_migration import (
+    ColumnMigration, batch_bound_sql, batch_update_sql, indexes_on_column, prepare_sqls, shadow_index_operations,
+    swap_sqls
+)
+
+
+def test_detect_type_changes():
+    db_cols = [
+        {"name": "ts_code", "type": VARCHAR(length=20)},
+        {"name": "close", "type": NUMERIC(precision=10, scale=2)},
+        {"name": "vol", "type": INTEGER()},
+    ]
+    new_cols = [
+        {"name": "ts_code", "type": "varchar(20)", "is_pk": True},
+        {"name": "close", "type": "NUMERIC(10,2)"},
+        {"name": "vol", "type": "BIGINT"},
+        {"name": "amount", "type": "DOUBLE"},  # 新列, 不属于类型变化
+    ]
+    changes = DDLGenerator.detect_type_changes(db_cols, new_cols)
+    assert changes == [{"name": "vol", "from_type": "INTEGER", "to_type": "BIGINT", "is_pk": False}]
+    assert DDLGenerator.canonical_type("character varying(20)") == DDLGenerator.canonical_type(VARCHAR(20))
+    assert DDLGenerator.canonical_type(BIGINT()) == "BIGINT"
+
+
+def test_migration_sqls():
+    m = ColumnMigration(
+        table_name="daily_bar", column="close", from_type="NUMERIC(10,2)", to_type="NUMERIC(18, 4)",
+        pk_columns=["ts_code", "trade_date"], comment="收盘'价",
+    )
+    assert prepare_sqls(m)[0] == "ALTER TABLE daily_bar ADD COLUMN IF NOT EXISTS close__qf_new NUMERIC(18, 4);"
+
+    assert batch_bound_sql(m, first=True) == (
+        "SELECT ts_code, trade_date FROM daily_bar ORDER BY ts_code, trade_date OFFSET :offset LIMIT 1"
+    )
+    assert batch_update_sql(m, first=False, last=False) == (
+        "UPDATE daily_bar SET close__qf_new = close::NUMERIC(18, 4) "
+        "WHERE (ts_code, trade_date) > (:lo0, :lo1) AND (ts_code, trade_date) <= (:hi0, :hi1)"
+    )
+    assert "WHERE" not in batch_update_sql(m, first=True, last=True)
+
+    sqls = swap_sqls(m, lock_timeout_ms=3000)
+    assert sqls[0] == "SET LOCAL lock_timeout = 3000;"
+    assert "RENAME COLUMN close__qf_new TO close" in sqls[-2]
+    assert sqls[-1] == "COMMENT ON COLUMN daily_bar.close IS '收盘''价';"
+
+    # 触发器中的转换失败只计数, 切换前检查
+    assert "EXCEPTION WHEN others" in prepare_sqls(m)[3]
+    assert "qf_cast_err_daily_bar_close" in sqls[2] and "RAISE EXCEPTION" in sqls[2]
+
+
+def test_indexes_rebuilt_on_shadow_column():
+    indexes_schema = [
+        {"name": "uq_close", "columns": ["ts_code", "close"], "unique": True, "order": {"close": "desc"}},
+        {"name": "idx_part", "columns": ["ts_code"], "include": ["close"], "where": "close > 0 AND ts_code <> 'close'"},
+        {"columns": ["close"]},
+        {"name": "idx_other", "columns": ["ts_code"], "where": "closed IS TRUE"},
+    ]
+    m = ColumnMigration(
+        table_name="daily_bar", column="close", from_type="NUMERIC(10,2)", to_type="NUMERIC(18, 4)",
+        pk_columns=["ts_code", "trade_date"],
+    )
+    m.indexes = indexes_on_column(indexes_schema, "close")
+    assert [idx.get("name") for idx in m.indexes] == ["uq_close", "idx_part", None]
+
+    ops = shadow_index_operations(m, concurrently=True)
+    assert [op.sql for op in ops] == [
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_close__qf_new ON daily_bar (ts_code, close__qf_new DESC);",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_part__qf_new ON daily_bar (ts_code) INCLUDE (close__qf_new) "
+        "WHERE close__qf_new > 0 AND ts_code <> 'close';",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_daily_bar_close__qf_new ON daily_bar (close__qf_new);",
+    ]
+    # 切换时影子列上的索引接替原索引名, 部分索引重新记录 WHERE 条件
+    sqls = swap_sqls(m, lock_timeout_ms=3000)
+    renames = [sql for sql in sqls if sql.startswith("ALTER INDEX")]
+    assert renames == [
+        "ALTER INDEX uq_close__qf_new RENAME TO uq_close;",
+        "ALTER INDEX idx_part__qf_new RENAME TO idx_part;",
+        "ALTER INDEX idx_daily_bar_close__qf_new RENAME TO idx_daily_bar_close;",
+    ]
+    assert sqls.index("DROP INDEX IF EXISTS uq_close;") > sqls.index("ALTER TABLE daily_bar DROP COLUMN close;")
+    comment = sqls[sqls.index("ALTER INDEX idx_part__qf_new RENAME TO idx_part;") + 1]
+    assert comment.startswith("COMMENT ON INDEX idx_part IS")
@@ -0,0 +1,79 @@
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from app.db.parquet_export import (
+    ExportError, ExportSpec, NULL_PARTITION_KEY, fingerprint_sql, partition_query, partitions_from_rows,
+    plan_export, validate_export
+)
+
+COLUMNS = [
+    {"name": "ts_code", "type": "VARCHAR(20)", "is_pk": True, "comment": ""},
+    {"name": "trade_date", "type": "DATE", "is_pk": True, "comment": ""},
+    {"name": "exchange", "type": "VARCHAR(8)", "comment": ""},
+    {"name": "close", "type": "NUMERIC(10, 2)", "comment": ""},
+]
+
+
+def _spec(column="trade_date", granularity="month"):
+    return ExportSpec("bars", COLUMNS, column, granularity, Path("/tmp/exports/bars"))
+
+
+def test_validate_export():
+    validate_export(COLUMNS, "trade_date", "month")
+    validate_export(COLUMNS, "exchange", "value")
+    with pytest.raises(ExportError, match="requires a DATE"):
+        validate_export(COLUMNS, "close", "month")
+    with pytest.raises(ExportError, match="Unknown partition column"):
+        validate_export(COLUMNS, "missing", "value")
+
+
+def test_fingerprint_sql_groups_by_truncated_period():
+    sql = fingerprint_sql(_spec())
+    assert sql.startswith("SELECT date_trunc('month', trade_date)::date AS part_key, count(*) AS rows")
+    assert "hashtextextended(t::text, 0)" in sql
+    assert sql.endswith("FROM bars AS t GROUP BY 1 ORDER BY 1")
+
+
+def test_plan_export_rewrites_changed_and_drops_missing_partitions():
+    spec = _spec()
+    current = partitions_from_rows(spec, [
+        (date(2024, 1, 1), 10, "100"),
+        (date(2024, 2, 1), 12, "250"),
+        (date(2024, 3, 1), 5, "7"),
+    ])
+    assert current["2024-02"].lower == "2024-02-01" and current["2024-02"].upper == "2024-03-01"
+
+    manifest = {
+        "schema_fingerprint": spec.schema_fingerprint,
+        "partitions": {
+            "2024-01": {"fingerprint": current["2024-01"].fingerprint},
+            "2024-02": {"fingerprint": "stale"},
+            "2023-12": {"fingerprint": "gone"},
+        },
+    }
+    to_write, to_delete = plan_export(spec, current, manifest)
+    assert to_write == ["2024-02", "2024-03"]
+    assert to_delete == ["2023-12"]
+
+    # 列定义变化时全量重写
+    manifest["schema_fingerprint"] = "other"
+    assert plan_export(spec, current, manifest)[0] == ["2024-01", "2024-02", "2024-03"]
+
+
+def test_partition_query_filters_each_partition():
+    spec = _spec()
+    part = partitions_from_rows(spec, [(date(2024, 1, 1), 1, "1")])["2024-01"]
+    query = partition_query(spec, part)
+    assert "trade_date >= :start AND trade_date < :end" in query.sql
+    assert query.params == {"start": date(2024, 1, 1), "end": date(2024, 2, 1)}
+
+    value_spec = _spec("exchange", "value")
+    parts = partitions_from_rows(value_spec, [("SSE", 1, "1"), (None, 2, "2")])
+    assert value_spec.partition_path("SSE").name == "exchange_value=SSE"
+    query = partition_query(value_spec, parts["SSE"])
+    assert query.sql == (
+        "SELECT ts_code, trade_date, exchange, close FROM bars WHERE exchange = :part_value ORDER BY ts_code, trade_date"
+    )
+    assert "exchange IS NULL" in partition_query(value_spec, parts[NULL_PARTITION_KEY]).sql
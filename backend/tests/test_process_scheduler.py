@@ -0,0 +1,114 @@
+import os
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from app.engine import GraphError, GraphRunner, NodeStatus, load_graph
+from app.engine.process_scheduler import shutdown_process_pool
+from app.engine.shared_data import SharedArray, SharedArrow, SharedSegments, pack, unpack
+
+MODULE = "tests.test_process_scheduler"
+
+
+def prices(n: int):
+    return np.arange(n * 4, dtype=np.float64).reshape(n, 4)
+
+
+def factor(frame, symbols):
+    # frame 为共享内存的零拷贝视图
+    assert not frame.flags.owndata
+    rows = frame[[int(s) for s in symbols]]
+    return {"pid": os.getpid(), "symbols": symbols, "score": rows.mean(axis=1) * 2}
+
+
+def fail(message: str):
+    raise RuntimeError(message)
+
+
+def fn(name: str, **args) -> dict:
+    return {"callable": f"{MODULE}:{name}", "args": args}
+
+
+@pytest.fixture(autouse=True, scope="module")
+def process_pool():
+    yield
+    shutdown_process_pool()
+
+
+def test_pack_round_trip():
+    array = np.random.default_rng(1).random((256, 64))
+    table = pa.table({"code": [f"{i:06d}.SZ" for i in range(5000)], "close": np.arange(5000, dtype=np.float64)})
+    value = {"array": array, "rows": [table, table.to_batches()[0]], "small": np.arange(3), "n": 1}
+
+    sender = SharedSegments()
+    packed = pack(value, sender, min_bytes=1024)
+    assert isinstance(packed["array"], SharedArray)
+    assert [type(ref) for ref in packed["rows"]] == [SharedArrow, SharedArrow]
+    assert isinstance(packed["small"], np.ndarray) and packed["n"] == 1
+
+    receiver = SharedSegments()
+    view = unpack(packed, receiver)
+    assert np.array_equal(view["array"], array) and not view["array"].flags.owndata
+    assert view["rows"][0].equals(table)
+    assert view["rows"][1].equals(table.to_batches()[0])
+    # 零拷贝视图存活时不能关闭映射
+    assert receiver.close() is False
+    del view
+    assert receiver.close() is True
+
+    copied = unpack(packed, receiver, copy=True)
+    sender.unlink()
+    assert receiver.close() and sender.close()
+    assert np.array_equal(copied["array"], array) and copied["array"].flags.owndata
+
+
+def test_process_node_validation():
+    with pytest.raises(GraphError, match="chunk_size only applies"):
+        load_graph({"nodes": [{"id": "p", "type": "process", "config": {"chunk_size": 2}, "body": {"nodes": [
+            {"id": "a", "type": "end"},
+        ]}}], "edges": []})
+
+
+@pytest.mark.anyio
+async def test_process_node_runs_body_in_workers():
+    data = {
+        "nodes": [
+            {"id": "load", "type": "function", "config": fn("prices", n=50_000)},
+            {"id": "factors", "type": "process", "config": {"items": [str(i) for i in range(10)], "chunk_size": 4},
+             "body": {"nodes": [
+                 {"id": "calc", "type": "function",
+                  "config": fn("factor", frame="{{load}}", symbols="{{loop.item}}")},
+             ]}},
+        ],
+        "edges": [{"source": "load", "target": "factors"}],
+    }
+    records = []
+    result = await GraphRunner(load_graph(data), on_record=records.append).run()
+    assert result.status == "succeeded", result.error
+
+    outputs = result.output["factors"]
+    assert [o["calc"]["symbols"] for o in outputs] == [["0", "1", "2", "3"], ["4", "5", "6", "7"], ["8", "9"]]
+    assert {o["calc"]["pid"] for o in outputs}.isdisjoint({os.getpid()})
+    assert np.allclose(outputs[0]["calc"]["score"], prices(4).mean(axis=1) * 2)
+
+    record = next(r for r in records if r.node_id == "factors")
+    assert record.detail["tasks"] == 3
+    assert record.detail["shared_bytes"] == 50_000 * 4 * 8  # 上游数组只写入一次
+    # 工作进程中节点的记录转发给父运行
+    assert {r.scope for r in records if r.node_id == "calc"} == {"factors[0]", "factors[1]", "factors[2]"}
+
+
+@pytest.mark.anyio
+async def test_process_node_failure():
+    data = {"nodes": [
+        {"id": "p", "type": "process", "config": {"items": [1, 2]}, "body": {"nodes": [
+            {"id": "bad", "type": "function", "config": fn("fail", message="item {{loop.item}}")},
+        ]}},
+    ], "edges": []}
+    records = []
+    result = await GraphRunner(load_graph(data), on_record=records.append).run()
+    assert result.status == "failed"
+    assert result.error["node"] == "p"
+    assert result.error["error"].startswith("Node 'p[")
+    assert any(r.node_id == "bad" and r.status == NodeStatus.FAILED for r in records)
@@ -0,0 +1,91 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.core.config import settings
+from app.db import publisher
+from app.db.publisher import PublishError, _PublishLock, max_publish_concurrency, publish_tables
+
+
+class NoLock:
+    def __init__(self, engine, table_id):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession(NoLock):
+    def __init__(self):
+        pass
+
+
+@pytest.fixture
+def publish_slots(monkeypatch):
+    # 连接池 5 + 2, 预留 1 个: 同时最多发布 2 张表
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 5)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 2)
+    monkeypatch.setattr(settings, "PUBLISH_POOL_RESERVE", 1)
+    monkeypatch.setattr(publisher, "_publish_semaphore", None)
+
+
+def test_max_publish_concurrency(monkeypatch, publish_slots):
+    assert max_publish_concurrency() == 2
+    monkeypatch.setattr(settings, "PUBLISH_POOL_RESERVE", 20)
+    assert max_publish_concurrency() == 1
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 10)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 20)
+    monkeypatch.setattr(settings, "PUBLISH_POOL_RESERVE", 6)
+    assert max_publish_concurrency() == 8
+
+
+@pytest.mark.anyio
+async def test_publish_tables_capped_by_pool(monkeypatch, publish_slots):
+    active = peak = 0
+
+    async def publish_locked(engine, session, table_id, batch_size, throttle_ms, timings):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        if table_id == 3:
+            raise PublishError(409, "Table is being published by another request")
+        return {"table_name": f"t{table_id}"}
+
+    monkeypatch.setattr(publisher, "_publish_locked", publish_locked)
+    monkeypatch.setattr(publisher, "_PublishLock", NoLock)
+    monkeypatch.setattr(publisher, "AsyncSessionLocal", FakeSession)
+    # 两个批量发布同时进行: 合计仍不超过发布槽位数
+    first, second = await asyncio.gather(
+        publish_tables(MagicMock(), [1, 2, 3, 4, 5, 6], concurrency=32),
+        publish_tables(MagicMock(), [7, 8], concurrency=32),
+    )
+
+    assert peak == 2
+    assert [r["id"] for r in first] == [1, 2, 3, 4, 5, 6]
+    assert [r["status_code"] for r in first + second] == [200, 200, 409, 200, 200, 200, 200, 200]
+    assert first[2]["error"] == "Table is being published by another request"
+    assert first[0]["table_name"] == "t1" and "lock_ms" in first[0]["timings"]
+
+
+@pytest.mark.anyio
+async def test_publish_lock_conflict():
+    conn = AsyncMock()
+    conn.execution_options.return_value = conn
+    conn.execute.return_value = MagicMock(scalar=MagicMock(return_value=False))
+    engine = MagicMock()
+    engine.connect = AsyncMock(return_value=conn)
+
+    with pytest.raises(PublishError) as e:
+        async with _PublishLock(engine, 7):
+            pass
+    assert e.value.status_code == 409
+    # 未取得锁时立即归还连接
+    conn.close.assert_awaited_once()
+    params = conn.execute.await_args.args[1]
+    assert params == {"ns": publisher.PUBLISH_LOCK_NAMESPACE, "id": 7}
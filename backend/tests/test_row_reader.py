@@ -0,0 +1,50 @@
+import pytest
+from datetime import date
+
+from app.db.row_reader import RowQueryError, build_range_query
+
+COLUMNS = [
+    {"name": "ts_code", "type": "VARCHAR(20)", "is_pk": True, "comment": ""},
+    {"name": "trade_date", "type": "DATE", "is_pk": True, "comment": ""},
+    {"name": "close", "type": "NUMERIC(10, 2)", "comment": ""},
+    {"name": "vol", "type": "BIGINT", "comment": ""},
+]
+
+
+def test_keyset_query():
+    query = build_range_query(
+        "daily_bar", COLUMNS,
+        columns=["close"],
+        after=["000001.SZ", "2024-01-02"],
+        time_column="trade_date", start="2024-01-01", end="2024-02-01",
+        limit=1000,
+    )
+    assert query.columns == ["ts_code", "trade_date", "close"]
+    assert query.keyset_columns == ["ts_code", "trade_date"]
+    assert query.sql == (
+        "SELECT ts_code, trade_date, close FROM daily_bar "
+        "WHERE (ts_code, trade_date) > (:k0, :k1) AND trade_date >= :start AND trade_date < :end "
+        "ORDER BY ts_code, trade_date LIMIT :limit"
+    )
+    assert query.params["k1"] == date(2024, 1, 2)
+    assert query.params["end"] == date(2024, 2, 1)
+
+
+def test_pk_equality_filter():
+    query = build_range_query("daily_bar", COLUMNS, pk_eq={"ts_code": "000001.SZ"})
+    assert "WHERE ts_code = :eq0" in query.sql
+    assert query.columns == ["ts_code", "trade_date", "close", "vol"]
+
+    with pytest.raises(RowQueryError):
+        build_range_query("daily_bar", COLUMNS, pk_eq={"vol": 1})
+
+
+def test_invalid_queries():
+    with pytest.raises(RowQueryError):
+        build_range_query("daily_bar", COLUMNS, columns=["nope"])
+    with pytest.raises(RowQueryError):
+        build_range_query("daily_bar", COLUMNS, after=["000001.SZ"])
+    with pytest.raises(RowQueryError):
+        build_range_query("daily_bar", COLUMNS, start="2024-01-01")
+    with pytest.raises(RowQueryError):
+        build_range_query("daily_bar", COLUMNS, time_column="vol", start="2024-01-01")
@@ -0,0 +1,178 @@
+import asyncio
+import time
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.db.bulk_loader import IngestError
+from app.db.table_sink import TableSink
+from app.engine import GraphError, GraphRunner, load_graph
+
+MODULE = "tests.test_table_sink"
+SCHEMA = [
+    {"name": "ts_code", "type": "VARCHAR(20)", "is_pk": True},
+    {"name": "trade_date", "type": "DATE", "is_pk": True},
+    {"name": "close", "type": "NUMERIC(10,2)"},
+]
+
+
+class FakeSink(TableSink):
+    """写入改为记录批次 (不连接数据库), 每批耗时 delay 秒"""
+
+    def __init__(self, *args, delay: float = 0.0, **kwargs):
+        super().__init__("daily", SCHEMA, *args, **kwargs)
+        self.delay = delay
+        self.batches = []
+
+    async def _write(self, batch):
+        await asyncio.sleep(self.delay)
+        self.batches.append(batch)
+
+
+def bar(i: int, **extra) -> dict:
+    return {"ts_code": f"{i:06d}.SZ", "trade_date": "20240102", "close": "10.5", **extra}
+
+
+@pytest.mark.anyio
+async def test_flush_by_rows_and_time():
+    sink = FakeSink(batch_rows=3, flush_seconds=0.05)
+    sink.start()
+    await sink.add([bar(i) for i in range(7)])
+    await asyncio.sleep(0.01)
+    assert [len(b) for b in sink.batches] == [3, 3]
+    # 不满一批的记录在 flush_seconds 后写入
+    await asyncio.sleep(0.1)
+    assert [len(b) for b in sink.batches] == [3, 3, 1]
+    await sink.add([bar(7)])
+    await sink.close()
+    assert [len(b) for b in sink.batches] == [3, 3, 1, 1]
+    assert sink.batches[0][0] == ("000000.SZ", date(2024, 1, 2), Decimal("10.5"))
+    stats = sink.stats()
+    assert (stats["rows"], stats["batches"]) == (8, 4)
+    assert set(stats["flush_seconds"]) == {"p50", "p95", "max"}
+
+
+@pytest.mark.anyio
+async def test_close_without_start_is_noop():
+    sink = FakeSink(batch_rows=3)
+    await sink.close()
+    await sink.abort()
+    sink.start()
+    await sink.add([bar(1)])
+    await sink.close()
+    await sink.close()
+    assert [len(b) for b in sink.batches] == [1]
+
+
+@pytest.mark.anyio
+async def test_validation():
+    sink = FakeSink(batch_rows=10)
+    sink.start()
+    with pytest.raises(IngestError, match="Row 2: unknown columns \\['volume'\\]"):
+        await sink.add([bar(1), bar(2, volume=1)])
+    await sink.abort()
+
+    sink = FakeSink(batch_rows=10, skip_invalid=True)
+    sink.start()
+    await sink.add([bar(1), bar(2, close="n/a"), {"ts_code": None, "trade_date": "2024-01-02"}, [1, 2]])
+    await sink.close()
+    stats = sink.stats()
+    assert (stats["rows"], stats["rejected"]) == (1, 3)
+    assert stats["errors"] == [
+        "Row 2: invalid numeric 'n/a'",
+        "Row 3: primary key column 'ts_code' is null",
+        "Row 4: expected an object, got list",
+    ]
+
+    with pytest.raises(IngestError, match="primary key columns: trade_date"):
+        FakeSink(mode="upsert", columns=["ts_code", "close"])
+
+
+@pytest.mark.anyio
+async def test_backpressure_pauses_upstream():
+    events = []
+    sink = FakeSink(
+        batch_rows=2, max_pending=1, delay=0.05,
+        on_pause=lambda: events.append("pause"), on_resume=lambda: events.append("resume"),
+    )
+    sink.start()
+    started = time.perf_counter()
+    for i in range(5):
+        await sink.add([bar(2 * i), bar(2 * i + 1)])
+    # 写入队列最多 1 批: 上游在写入完成前被阻塞
+    assert time.perf_counter() - started > 0.1
+    await sink.close()
+    assert len(sink.batches) == 5
+    assert events[:2] == ["pause", "resume"] and events.count("pause") == events.count("resume")
+    assert sink.stats()["backpressure_wait_seconds"] > 0.1
+
+
+@pytest.mark.anyio
+async def test_write_error_surfaces():
+    class FailingSink(FakeSink):
+        async def _write(self, batch):
+            raise ConnectionError("server closed the connection")
+
+    sink = FailingSink(batch_rows=1)
+    sink.start()
+    with pytest.raises(ConnectionError):
+        for i in range(5):
+            await sink.add([bar(i)])
+            await asyncio.sleep(0)
+        await sink.close()
+    await sink.abort()
+
+
+started_items = []
+
+
+async def pull(i: int):
+    started_items.append(time.perf_counter())
+    await asyncio.sleep(0.02)
+    return bar(i)
+
+
+async def slow_reader(rows):
+    # 读取方暂停流式上游 0.2s
+    rows.pause()
+    await asyncio.sleep(0.2)
+    rows.resume()
+    return len([row async for row in rows])
+
+
+@pytest.mark.anyio
+async def test_thread_node_waits_while_stream_paused():
+    started_items.clear()
+    data = {
+        "nodes": [
+            {"id": "pull", "type": "thread", "config": {"items": [1, 2, 3], "max_parallel": 1}, "body": {"nodes": [
+                {"id": "get", "type": "function",
+                 "config": {"callable": f"{MODULE}:pull", "args": {"i": "{{loop.item}}"}}},
+            ]}},
+            {"id": "read", "type": "function",
+             "config": {"callable": f"{MODULE}:slow_reader", "args": {"rows": "{{pull}}"}}},
+        ],
+        "edges": [{"source": "pull", "target": "read", "source_handle": "stream"}],
+    }
+    records = []
+    result = await GraphRunner(load_graph(data), on_record=records.append).run()
+    assert result.status == "succeeded", result.error
+    assert result.output["read"] == 3
+    # 第一项在读取方暂停前已开始, 其余项等到恢复后才开始
+    assert started_items[1] - started_items[0] > 0.15
+    detail = next(r for r in records if r.node_id == "pull").detail
+    assert detail["backpressure_wait_seconds"] > 0.15
+
+
+def test_table_sink_config_validation():
+    def node(**config):
+        return {"nodes": [{"id": "load", "type": "table_sink", "config": config}], "edges": []}
+
+    load_graph(node(table_id=1, rows=[], mode="upsert", batch_rows=1000, flush_seconds=0.5))
+    with pytest.raises(GraphError, match="table_id"):
+        load_graph(node(table_id="daily", rows=[]))
+    with pytest.raises(GraphError, match="config.mode"):
+        load_graph(node(table_id=1, rows=[], mode="merge"))
+    with pytest.raises(GraphError, match="max_pending_batches"):
+        load_graph(node(table_id=1, rows=[], max_pending_batches=0))
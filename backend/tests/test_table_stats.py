@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.db import table_stats
+from app.db.table_stats import TableStatsCache, _stats_from_row
+
+
+def _row(**overrides):
+    row = dict(
+        name="bars", relkind="p", partitions=3, row_estimate=900, total_bytes=8192 * 10, table_bytes=8192 * 6,
+        index_bytes=8192 * 4, toast_bytes=0, live_tuples=900, dead_tuples=100, last_vacuum_at=None, last_analyze_at=None,
+    )
+    row.update(overrides)
+    return SimpleNamespace(**row)
+
+
+def test_stats_from_row():
+    now = datetime.now(timezone.utc)
+    stats = _stats_from_row(_row(), now)
+    assert stats["dead_tuple_ratio"] == 0.1
+    assert stats["partitions"] == 3
+    assert stats["collected_at"] is now
+
+    # 从未 analyze / 无统计的普通表
+    stats = _stats_from_row(_row(relkind="r", partitions=1, row_estimate=None, live_tuples=None, dead_tuples=None), now)
+    assert stats["partitions"] == 0
+    assert stats["row_estimate"] is None and stats["dead_tuple_ratio"] is None
+
+
+@pytest.mark.anyio
+async def test_cache_reloads_on_expiry_and_unknown_tables(monkeypatch):
+    load = AsyncMock(return_value={"a": {"row_estimate": 1}})
+    monkeypatch.setattr(table_stats, "load_table_stats", load)
+    cache = TableStatsCache(ttl_seconds=300)
+    session = object()
+
+    assert await cache.get(session, []) == {}
+    assert load.await_count == 0
+
+    assert await cache.get(session, ["a", "missing"]) == {"a": {"row_estimate": 1}, "missing": None}
+    assert await cache.get(session, ["a", "missing"]) == {"a": {"row_estimate": 1}, "missing": None}
+    assert load.await_count == 1  # 物理表不存在的表也被缓存
+
+    await cache.get(session, ["new_table"])  # 新发布的表
+    assert load.await_count == 2
+
+    cache.invalidate()
+    await cache.get(session, ["a"])
+    assert load.await_count == 3
+
+
+@pytest.mark.anyio
+async def test_cache_keeps_previous_stats_on_failure(monkeypatch):
+    cache = TableStatsCache(ttl_seconds=300)
+    monkeypatch.setattr(table_stats, "load_table_stats", AsyncMock(return_value={"a": {"row_estimate": 1}}))
+    await cache.get(object(), ["a"])
+
+    cache.invalidate()
+    monkeypatch.setattr(table_stats, "load_table_stats", AsyncMock(side_effect=RuntimeError("boom")))
+    assert await cache.get(object(), ["a"]) == {"a": {"row_estimate": 1}}
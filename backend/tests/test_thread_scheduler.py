@@ -0,0 +1,192 @@
+import asyncio
+import time
+from collections import Counter
+
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import Settings, parse_rate_limits, settings
+from app.engine import GraphError, GraphRunner, NodeStatus, load_graph
+from app.engine.thread_scheduler import RateLimiter, RetryBudget, host_limiter
+
+MODULE = "tests.test_thread_scheduler"
+attempts: Counter = Counter()
+received = []
+
+
+def fetch(symbol: str, delay: float = 0.05):
+    # 同步 IO 函数, 在 IO 线程池中执行
+    time.sleep(delay)
+    return {"symbol": symbol}
+
+
+async def flaky(symbol: str, failures: int):
+    attempts[symbol] += 1
+    if attempts[symbol] <= failures:
+        raise ConnectionError(f"{symbol} reset")
+    return symbol
+
+
+async def slow(symbol: str, delay: float):
+    await asyncio.sleep(delay)
+    return symbol
+
+
+async def collect(rows):
+    async for row in rows:
+        received.append((row, time.perf_counter()))
+    return len(received)
+
+
+def fn(name: str, **args) -> dict:
+    return {"callable": f"{MODULE}:{name}", "args": args}
+
+
+def thread(config: dict, callable_: str, **args) -> dict:
+    return {"id": "pull", "type": "thread", "config": config, "body": {"nodes": [
+        {"id": "get", "type": "function", "config": fn(callable_, **args)},
+    ]}}
+
+
+async def run(data):
+    records = []
+    result = await GraphRunner(load_graph(data), on_record=records.append).run()
+    return result, records
+
+
+@pytest.mark.anyio
+async def test_rate_limiter_and_retry_budget():
+    limiter = RateLimiter(rate=50, burst=2)
+    started = time.perf_counter()
+    waits = [await limiter.acquire() for _ in range(6)]
+    # 前 2 次不等待, 之后每次间隔 20ms
+    assert waits[:2] == [0.0, 0.0]
+    assert 0.07 < time.perf_counter() - started < 0.2
+
+    with pytest.raises(ValueError, match="rate must be > 0"):
+        RateLimiter(rate=0)
+
+    budget = RetryBudget(2)
+    assert [budget.take() for _ in range(3)] == [True, True, False]
+    assert (budget.used, budget.denied) == (2, 1)
+
+
+@pytest.mark.anyio
+async def test_sync_fetches_run_concurrently_in_io_threads():
+    symbols = [f"{i:06d}.SZ" for i in range(32)]
+    data = {"nodes": [thread({"items": symbols, "max_parallel": 32}, "fetch", symbol="{{loop.item}}", delay=0.1)],
+            "edges": []}
+    started = time.perf_counter()
+    result, records = await run(data)
+    assert result.status == "succeeded"
+    assert [o["get"]["symbol"] for o in result.output["pull"]] == symbols
+    # 事件循环默认线程池只有 min(32, cpu + 4) 个线程
+    assert time.perf_counter() - started < 0.5
+
+
+@pytest.mark.anyio
+async def test_retries_backoff_and_budget():
+    attempts.clear()
+    retry = {"retries": 2, "backoff_seconds": 0.01, "max_backoff_seconds": 0.02}
+    data = {"nodes": [thread({"items": ["a", "b", "c"], **retry}, "flaky", symbol="{{loop.item}}", failures=2)],
+            "edges": []}
+    result, records = await run(data)
+    assert result.status == "succeeded"
+    assert result.output["pull"] == [{"get": s} for s in "abc"]
+    detail = next(r for r in records if r.node_id == "pull").detail
+    assert detail["retries"] == 6 and detail["failed"] == 0
+    assert {r.scope for r in records if r.node_id == "get" and r.status == NodeStatus.FAILED} == {
+        f"pull[{i}]{suffix}" for i in range(3) for suffix in ("", "#2")
+    }
+
+    # 重试预算用完后不再重试; skip 时失败项的输出为 None
+    attempts.clear()
+    config = {"items": ["a", "b", "c"], "retry_budget": 1, "on_error": "skip", "max_parallel": 1, **retry}
+    data = {"nodes": [thread(config, "flaky", symbol="{{loop.item}}", failures=1)], "edges": []}
+    result, records = await run(data)
+    assert result.status == "succeeded"
+    assert result.output["pull"] == [{"get": "a"}, None, None]
+    detail = next(r for r in records if r.node_id == "pull").detail
+    assert (detail["succeeded"], detail["failed"], detail["retries"], detail["retries_denied"]) == (1, 2, 1, 2)
+    assert detail["errors"]["1"] == "Node 'pull[1]/get' failed: ConnectionError: b reset"
+
+
+@pytest.mark.anyio
+async def test_host_rate_limit():
+    data = {"nodes": [thread(
+        {"items": list(range(6)), "max_parallel": 6, "host": "vendor-{{loop.item}}-api", "rate_limit": 20},
+        "slow", symbol="x", delay=0,
+    )], "edges": []}
+    result, records = await run(data)
+    assert result.status == "succeeded"
+    detail = next(r for r in records if r.node_id == "pull").detail
+    # 每个 host 一个令牌桶, 互不影响
+    assert len(detail["hosts"]) == 6 and detail["rate_wait_seconds"] == 0
+
+    data["nodes"][0]["config"]["host"] = "shared-api"
+    started = time.perf_counter()
+    result, records = await run(data)
+    # 同一 host 每秒 20 次: 6 次至少 0.25s
+    assert time.perf_counter() - started > 0.24
+
+
+def test_host_rate_limit_config(monkeypatch):
+    assert parse_rate_limits("api.tushare.pro=3, data.example.com=10:20") == {
+        "api.tushare.pro": (3.0, 1), "data.example.com": (10.0, 20),
+    }
+    for value in ("api=0", "api=-1", "api=5:0", "api=fast", "=3"):
+        with pytest.raises(ValueError, match="Invalid rate limit"):
+            parse_rate_limits(value)
+    # 无效的配置在加载 Settings 时即报错
+    with pytest.raises(ValidationError):
+        Settings(WORKFLOW_HOST_RATE_LIMITS="api=0")
+
+    monkeypatch.setattr(settings, "WORKFLOW_HOST_RATE_LIMITS", "cfg-api=5:2")
+    assert host_limiter("cfg-api") is host_limiter("cfg-api", 5, 2)
+    assert (host_limiter("cfg-api").rate, host_limiter("cfg-api").burst) == (5, 2)
+    # 不同速率的节点各用一个令牌桶, 不会改写彼此的配置
+    fast = host_limiter("cfg-api", 50)
+    assert fast is not host_limiter("cfg-api") and host_limiter("cfg-api").rate == 5
+    assert host_limiter("other-api") is None
+
+
+@pytest.mark.anyio
+async def test_results_stream_to_downstream():
+    received.clear()
+    data = {
+        "nodes": [
+            # 每项的延迟不同, 完成顺序为 1, 2, 0
+            thread({"items": [0.3, 0.05, 0.1], "max_parallel": 3},
+                   "slow", symbol="{{loop.index}}", delay="{{loop.item}}"),
+            {"id": "sink", "type": "function", "config": fn("collect", rows="{{pull}}")},
+            {"id": "each", "type": "loop", "config": {"items": "{{pull}}", "max_parallel": 2}, "body": {"nodes": [
+                {"id": "echo", "type": "end", "config": {"outputs": {"symbol": "{{loop.item.get}}"}}},
+            ]}},
+            {"id": "done", "type": "end", "config": {"outputs": {"all": "{{pull}}", "sink": "{{sink}}", "each": "{{each}}"}}},
+        ],
+        "edges": [
+            {"source": "pull", "target": "sink", "source_handle": "stream"},
+            {"source": "pull", "target": "each", "source_handle": "stream"},
+            {"source": "pull", "target": "done"}, {"source": "sink", "target": "done"}, {"source": "each", "target": "done"},
+        ],
+    }
+    started = time.perf_counter()
+    result, records = await run(data)
+    assert result.status == "succeeded", result.error
+    assert [row for row, _ in received] == [{"get": 1}, {"get": 2}, {"get": 0}]
+    # 下游在上游结束前就收到了已完成的项
+    assert received[0][1] - started < 0.2
+    # 普通连线的下游得到按参数顺序排列的输出
+    assert result.output["all"] == [{"get": i} for i in range(3)]
+    assert result.output["sink"] == 3
+    assert [o["symbol"] for o in result.output["each"]] == [1, 2, 0]
+
+
+def test_stream_edges_require_streaming_source():
+    with pytest.raises(GraphError, match="has no stream output"):
+        load_graph({"nodes": [
+            {"id": "a", "type": "function", "config": fn("fetch", symbol="x")},
+            {"id": "b", "type": "end"},
+        ], "edges": [{"source": "a", "target": "b", "source_handle": "stream"}]})
+    with pytest.raises(GraphError, match="on_error"):
+        load_graph({"nodes": [thread({"items": [1], "on_error": "ignore"}, "fetch", symbol="x")], "edges": []})
@@ -0,0 +1,227 @@
+import asyncio
+import time
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.engine import GraphError, GraphRunner, NodeStatus, load_graph
+from app.main import app
+
+MODULE = "tests.test_workflow_engine"
+
+
+async def pull(vendor: str, delay: float = 0.05):
+    await asyncio.sleep(delay)
+    return {"vendor": vendor, "rows": len(vendor)}
+
+
+def add(a, b):
+    return a + b
+
+
+def fail(message: str):
+    raise RuntimeError(message)
+
+
+def fn(name: str, **args) -> dict:
+    return {"callable": f"{MODULE}:{name}", "args": args}
+
+
+async def run(data, inputs=None, **kwargs):
+    records = []
+    result = await GraphRunner(load_graph(data), on_record=records.append, **kwargs).run(inputs)
+    return result, {(r.scope, r.node_id): r for r in records}
+
+
+def test_graph_validation():
+    with pytest.raises(GraphError, match="cycle"):
+        load_graph({
+            "nodes": [{"id": "a", "type": "start"}, {"id": "b", "type": "end"}],
+            "edges": [{"source": "a", "target": "b"}, {"source": "b", "target": "a"}],
+        })
+    with pytest.raises(GraphError, match="not upstream"):
+        # b 与 a 没有依赖关系, 执行时 a 的输出可能还不存在
+        load_graph({"nodes": [
+            {"id": "a", "type": "start"},
+            {"id": "b", "type": "function", "config": fn("add", a="{{a.x}}", b=1)},
+        ], "edges": []})
+    with pytest.raises(GraphError, match="unknown branch"):
+        load_graph({"nodes": [
+            {"id": "check", "type": "if_else", "config": {"conditions": [{"left": 1, "op": ">", "right": 0}]}},
+            {"id": "b", "type": "end"},
+        ], "edges": [{"source": "check", "target": "b", "sourceHandle": "maybe"}]})
+    with pytest.raises(GraphError, match="Unknown node type"):
+        load_graph({"nodes": [{"id": "a", "type": "teleport"}], "edges": []})
+    with pytest.raises(GraphError, match="requires a body"):
+        load_graph({"nodes": [{"id": "a", "type": "loop", "config": {"items": [1]}}], "edges": []})
+
+    graph = load_graph({
+        "nodes": [{"id": n, "type": "end"} for n in ("a", "b", "c", "d")],
+        "edges": [{"source": "a", "target": "b"}, {"source": "a", "target": "c", "sourceHandle": "source"},
+                  {"source": "b", "target": "d"}, {"source": "c", "target": "d"}],
+    })
+    assert graph.levels() == [["a"], ["b", "c"], ["d"]]
+    assert graph.edges[1].source_handle is None  # 画布的默认分支视为无条件
+
+
+def test_function_callable_allowlist(monkeypatch):
+    from app.core.config import Settings, settings
+    from app.engine.nodes import import_callable
+
+    def function(callable_: str) -> dict:
+        return {"nodes": [{"id": "f", "type": "function", "config": {"callable": callable_}}], "edges": []}
+
+    # 默认配置 (未设置 WORKFLOW_CALLABLE_MODULES) 不允许调用任何模块
+    monkeypatch.setattr(settings, "WORKFLOW_CALLABLE_MODULES", Settings.model_fields["WORKFLOW_CALLABLE_MODULES"].default)
+    for path in ("os:system", "builtins:eval", f"{MODULE}:add"):
+        with pytest.raises(GraphError, match="not allowed"):
+            load_graph(function(path))
+    with pytest.raises(PermissionError):
+        import_callable.__wrapped__("os:system")
+
+    # 允许的模块中也不能经 _ 开头的属性访问其它对象
+    monkeypatch.setattr(settings, "WORKFLOW_CALLABLE_MODULES", "tests")
+    load_graph(function(f"{MODULE}:add"))
+    with pytest.raises(GraphError, match="private attribute"):
+        load_graph(function(f"{MODULE}:add.__globals__"))
+    with pytest.raises(PermissionError):
+        import_callable.__wrapped__(f"{MODULE}:fn.__class__.__init__")
+
+
+@pytest.mark.anyio
+async def test_independent_branches_run_concurrently_with_limits():
+    vendors = [f"v{i}" for i in range(8)]
+    data = {
+        "nodes": [{"id": "start", "type": "start"}]
+        + [{"id": v, "type": "function", "config": fn("pull", vendor=v, delay=0.1), "concurrency_key": "vendor"}
+           for v in vendors]
+        + [{"id": "end", "type": "end", "config": {"outputs": {"first": "{{v0.rows}}", "n": "{{inputs.n}}"}}}],
+        "edges": [{"source": "start", "target": v} for v in vendors] + [{"source": v, "target": "end"} for v in vendors],
+        "concurrency": {"vendor": 4},
+    }
+    started = time.perf_counter()
+    result, records = await run(data, {"n": 3})
+    elapsed = time.perf_counter() - started
+
+    assert result.status == "succeeded"
+    assert result.output == {"first": 2, "n": 3}
+    # 8 个拉取按 vendor 上限 4 分两批执行, 而不是逐个执行 (0.8s)
+    assert 0.18 < elapsed < 0.5
+    waits = sorted(records[(None, v)].wait_seconds for v in vendors)
+    assert waits[3] < 0.05 and waits[4] > 0.05
+    assert all(records[(None, v)].elapsed_seconds >= 0.09 for v in vendors)
+
+
+@pytest.mark.anyio
+async def test_branches_skip_unselected_paths_and_join():
+    data = {
+        "nodes": [
+            {"id": "start", "type": "start"},
+            {"id": "check", "type": "if_else", "config": {
+                "conditions": [{"left": "{{inputs.rows}}", "op": ">", "right": 0}, {"left": "{{inputs.codes}}", "op": "not empty"}],
+            }},
+            {"id": "load", "type": "function", "config": fn("add", a="{{inputs.rows}}", b=1)},
+            {"id": "alert", "type": "function", "config": fn("add", a=0, b=0)},
+            {"id": "route", "type": "switch", "config": {"value": "{{inputs.market}}", "cases": {"cn": ["SSE", "SZSE"], "us": "NYSE"}}},
+            {"id": "cn_only", "type": "function", "config": fn("add", a=1, b=1)},
+            {"id": "after_cn", "type": "function", "config": fn("add", a="{{cn_only}}", b=1)},
+            {"id": "fallback", "type": "function", "config": fn("add", a=2, b=2)},
+            {"id": "end", "type": "end"},
+        ],
+        "edges": [
+            {"source": "start", "target": "check"}, {"source": "start", "target": "route"},
+            {"source": "check", "target": "load", "source_handle": "true"},
+            {"source": "check", "target": "alert", "source_handle": "false"},
+            {"source": "route", "target": "cn_only", "source_handle": "cn"},
+            {"source": "route", "target": "fallback", "source_handle": "default"},
+            {"source": "cn_only", "target": "after_cn"},
+            {"source": "load", "target": "end"}, {"source": "alert", "target": "end"},
+            {"source": "after_cn", "target": "end"}, {"source": "fallback", "target": "end"},
+        ],
+    }
+    result, records = await run(data, {"rows": 10, "codes": ["000001.SZ"], "market": "HKEX"})
+    assert result.status == "succeeded"
+    # end 没有配置 outputs 时输出激活入边的上游输出; 汇合节点只执行一次
+    assert result.output == {"load": 11, "fallback": 4}
+    assert records[(None, "check")].detail == {"branch": "true"}
+    assert records[(None, "route")].detail == {"branch": "default"}
+    # 跳过沿下游传播
+    assert {n for (_, n), r in records.items() if r.status == NodeStatus.SKIPPED} == {"alert", "cn_only", "after_cn"}
+
+
+@pytest.mark.anyio
+async def test_loops():
+    body = {"nodes": [{"id": "step", "type": "function", "config": fn("pull", vendor="{{loop.item}}", delay=0.05)}]}
+    data = {
+        "nodes": [
+            {"id": "each", "type": "loop", "config": {"items": "{{inputs.symbols}}", "max_parallel": 4}, "body": body},
+            {"id": "until", "type": "loop", "config": {
+                "max_iterations": 10,
+                "break_when": [{"left": "{{loop.output.total}}", "op": ">=", "right": 6}],
+            }, "body": {"nodes": [
+                {"id": "acc", "type": "function", "config": fn("add", a="{{loop.index}}", b=0)},
+                {"id": "out", "type": "end", "config": {"outputs": {"total": "{{acc}}"}}},
+            ], "edges": [{"source": "acc", "target": "out"}]}},
+        ],
+        "edges": [],
+    }
+    started = time.perf_counter()
+    result, records = await run(data, {"symbols": ["a", "bb", "ccc", "dddd"]})
+    assert result.status == "succeeded"
+    assert [o["step"]["rows"] for o in result.output["each"]] == [1, 2, 3, 4]
+    assert time.perf_counter() - started < 0.15  # 4 轮并行
+    assert records[(None, "each")].detail == {"iterations": 4}
+    assert records[("each[2]", "step")].status == NodeStatus.SUCCEEDED
+    # break_when 在 loop.output.total 达到 6 的那一轮之后结束
+    assert [o["total"] for o in result.output["until"]] == [0, 1, 2, 3, 4, 5, 6]
+    assert records[(None, "until")].detail == {"iterations": 7, "stopped": True}
+
+
+@pytest.mark.anyio
+async def test_failure_cancels_running_nodes():
+    data = {
+        "nodes": [
+            {"id": "slow", "type": "function", "config": fn("pull", vendor="x", delay=5)},
+            {"id": "soft", "type": "function", "config": fn("fail", message="optional vendor down"), "continue_on_error": True},
+            {"id": "after_soft", "type": "function", "config": fn("add", a=1, b=1)},
+            {"id": "each", "type": "loop", "config": {"items": [1, 2, 3]}, "body": {"nodes": [
+                {"id": "wait", "type": "function", "config": fn("pull", vendor="x", delay=0.05)},
+                {"id": "bad", "type": "function", "config": fn("fail", message="vendor {{loop.item}} down")},
+            ], "edges": [{"source": "wait", "target": "bad"}]}},
+        ],
+        "edges": [{"source": "soft", "target": "after_soft"}],
+    }
+    started = time.perf_counter()
+    result, records = await run(data)
+    assert time.perf_counter() - started < 1
+    assert result.status == "failed"
+    assert result.error["node"] == "each"
+    assert result.error["error"] == "Node 'each[0]/bad' failed: RuntimeError: vendor 1 down"
+    assert records[(None, "slow")].status == NodeStatus.CANCELLED
+    assert records[(None, "soft")].status == NodeStatus.FAILED
+    assert records[(None, "after_soft")].status == NodeStatus.SKIPPED
+    assert records[("each[0]", "bad")].error == "RuntimeError: vendor 1 down"
+
+
+@pytest.mark.anyio
+async def test_node_timeout():
+    data = {"nodes": [
+        {"id": "hang", "type": "function", "config": fn("pull", vendor="x", delay=5), "timeout_seconds": 0.05},
+    ], "edges": []}
+    result, records = await run(data)
+    assert result.status == "failed"
+    assert records[(None, "hang")].error == "Timed out after 0.05s"
+
+
+@pytest.mark.anyio
+async def test_validate_endpoint():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.post("/api/v1/workflows/validate", json={"graph": {
+            "nodes": [{"id": "a", "type": "start"}, {"id": "b", "type": "end"}, {"id": "c", "type": "end"}],
+            "edges": [{"source": "a", "target": "b"}, {"source": "a", "target": "c"}],
+        }})
+        assert response.status_code == 200
+        assert response.json() == {"node_count": 3, "levels": [["a"], ["b", "c"]]}
+
+        response = await ac.post("/api/v1/workflows/validate", json={"graph": {"nodes": [], "edges": []}})
+        assert response.status_code == 400